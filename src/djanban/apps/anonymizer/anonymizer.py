@@ -1,56 +1,185 @@
 from __future__ import unicode_literals
 
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import multiprocessing
+import os
 import re
+import shutil
+
 from django.apps import apps
+from django.conf import settings
 from django.core.serializers import serialize
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
 from django.utils import timezone
 
 
+# Anonymized dump of the database.
+# Objects are written in JSON Lines format (a serialized object by line, optionally compressed with gzip) as they
+# are read in chunks of chunk_size objects, so tables are never completely loaded in memory. Models can be dumped
+# by several worker processes.
+# Anonymization is deterministic: each word is always replaced by the same pseudo-random word (keeping its digits),
+# so values that are used to join data (uuids, usernames...) keep matching and unique values keep being unique.
 class Anonymizer(object):
 
-    def __init__(self, *args, **kwargs):
-        super(Anonymizer, self).__init__(*args, **kwargs)
+    APP_NAMES = ["boards", "hourly_rates", "journal", "dev_times", "dev_environment", "forecasters", "members",
+                 "notifications", "reporter", "reports", "repositories", "requirements", "visitors", "workflows"]
+
+    # Maximum number of anonymized words kept in memory by each process
+    WORD_CACHE_MAX_SIZE = 100000
+
+    _word_cache = {}
+
+    def __init__(self, output_path=None, compress=False, chunk_size=1000, processes=1):
+        if output_path is None:
+            output_path = "anonymized_data-{0}.jsonl{1}".format(timezone.now().isoformat(), ".gz" if compress else "")
+        self.output_path = output_path
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.processes = processes
 
     @staticmethod
     def anonymize_string(string):
-        return re.sub("\w", "x", string)
+        return re.sub(r"\w+", Anonymizer._anonymize_word, string, flags=re.UNICODE)
+
+    # Replace the letters of a word by pseudo-random letters that depend only on the word and the SECRET_KEY
+    @staticmethod
+    def _anonymize_word(match):
+        word = match.group(0)
+        if word not in Anonymizer._word_cache:
+            if len(Anonymizer._word_cache) >= Anonymizer.WORD_CACHE_MAX_SIZE:
+                Anonymizer._word_cache.clear()
+            digest = ""
+            while len(digest) < len(word):
+                digest += hmac.new(
+                    settings.SECRET_KEY.encode("utf-8"), (digest + word).encode("utf-8"), hashlib.sha256
+                ).hexdigest()
+            # Digits are kept so short identifiers (e.g. card-1, card-2) do not collide
+            Anonymizer._word_cache[word] = "".join(
+                character if character.isdigit() else "abcdefghijklmnop"[int(hex_digit, 16)]
+                for character, hex_digit in zip(word, digest)
+            )
+        return Anonymizer._word_cache[word]
+
+    # Models that are dumped
+    @staticmethod
+    def get_models():
+        models = []
+        for app_name in Anonymizer.APP_NAMES:
+            models += list(apps.get_app_config(app_name).get_models())
+        return models
+
+    # Anonymized serialized objects of a model (dicts with the keys model, pk and fields)
+    @staticmethod
+    def serialize(klass, chunk_size=1000):
+        local_fields = [field for field in klass._meta.local_fields if field.serialize]
+        anonymized_field_names = [
+            field.name for field in local_fields if field.__class__.__name__ in ("CharField", "TextField")
+        ]
+        m2m_fields = [
+            field for field in klass._meta.local_many_to_many
+            if field.serialize and field.remote_field.through._meta.auto_created
+        ]
+
+        queryset = klass._base_manager.order_by("pk")
+        last_pk = None
+        while True:
+            chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            objects = list(chunk_queryset[:chunk_size].iterator())
+            if not objects:
+                break
+            last_pk = objects[-1].pk
+
+            m2m_values = {field.name: Anonymizer._get_m2m_values(field, objects) for field in m2m_fields}
+
+            serialized_objects = serialize("python", objects, fields=[field.name for field in local_fields])
+            for serialized_object in serialized_objects:
+                fields = serialized_object["fields"]
+                for field_name in anonymized_field_names:
+                    if fields.get(field_name):
+                        fields[field_name] = Anonymizer.anonymize_string(fields[field_name])
+                for field in m2m_fields:
+                    fields[field.name] = m2m_values[field.name].get(serialized_object["pk"], [])
+                yield serialized_object
 
+    # Primary keys of the objects related with each object by a many-to-many field (read in only one query)
     @staticmethod
-    def anonymize(klass, objects):
-        for object_ in objects:
-            for field in klass._meta.fields:
-                field_name = field.name
-                field_type = field.__class__.__name__
-                if field_type in ("CharField", "TextField"):
-                    field_value = getattr(object_, field_name)
-                    if field_value:
-                        anoymized_field_value = Anonymizer.anonymize_string(field_value)
-                        setattr(object_, field_name, anoymized_field_value)
+    def _get_m2m_values(field, objects):
+        through = field.remote_field.through
+        source_field_name = field.m2m_field_name()
+        target_field_name = field.m2m_reverse_field_name()
+        m2m_values = {}
+        relationships = through._default_manager.filter(
+            **{"{0}__in".format(source_field_name): [object_.pk for object_ in objects]}
+        ).order_by("pk").values_list(
+            through._meta.get_field(source_field_name).attname, through._meta.get_field(target_field_name).attname
+        )
+        for object_pk, related_object_pk in relationships:
+            m2m_values.setdefault(object_pk, []).append(related_object_pk)
+        return m2m_values
 
+    # Write the anonymized objects of a model in a file. Returns the number of written objects.
     @staticmethod
-    def anonymize_objects(klass):
-        objects = klass.objects.all()
-        Anonymizer.anonymize(klass, objects)
-        return objects
+    def write(klass, output_file, chunk_size=1000):
+        number_of_objects = 0
+        for serialized_object in Anonymizer.serialize(klass, chunk_size):
+            line = json.dumps(serialized_object, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+            output_file.write(line.encode("utf-8"))
+            number_of_objects += 1
+        return number_of_objects
 
+    # Open the file where the objects are written
     @staticmethod
-    def serialize(klass):
-        objects = Anonymizer.anonymize_objects(klass)
-        return serialize("json", objects)
+    def open(path, compress):
+        if compress:
+            return gzip.open(path, "wb")
+        return io.open(path, "wb")
 
-    def run(self):
-        filename = "anonymized_data-{0}.json".format(timezone.now().isoformat())
+    # Dump the models to the output file.
+    # The function progress (if passed) is called with the label of each model and its number of objects after
+    # each model is dumped. Returns the path of the output file.
+    def run(self, progress=None):
+        models = Anonymizer.get_models()
 
-        out = open(filename, "w")
+        if self.processes <= 1:
+            with Anonymizer.open(self.output_path, self.compress) as output_file:
+                for model in models:
+                    number_of_objects = Anonymizer.write(model, output_file, self.chunk_size)
+                    if progress:
+                        progress(model._meta.label, number_of_objects)
+            return self.output_path
 
-        for app_name in ["boards", "hourly_rates", "journal", "dev_times", "dev_environment", "forecasters", "members",
-                         "notifications", "reporter", "reports", "repositories", "requirements",
-                         "visitors", "workflows"]:
-            models = apps.get_app_config(app_name).get_models()
-            for model in models:
-                objects = Anonymizer.serialize(model)
-                out.write(objects)
+        # Each model is dumped by a worker process in its own file and the files are concatenated in order
+        # (concatenated gzip files are a valid gzip file)
+        tasks = [
+            (model._meta.label, "{0}.{1}.part".format(self.output_path, model_index), self.compress, self.chunk_size)
+            for model_index, model in enumerate(models)
+        ]
+        # Worker processes cannot share the database connections of this process
+        connections.close_all()
+        pool = multiprocessing.Pool(processes=self.processes)
+        try:
+            with io.open(self.output_path, "wb") as output_file:
+                for model_label, part_path, number_of_objects in pool.imap(_write_model, tasks):
+                    with io.open(part_path, "rb") as part_file:
+                        shutil.copyfileobj(part_file, output_file)
+                    os.remove(part_path)
+                    if progress:
+                        progress(model_label, number_of_objects)
+        finally:
+            pool.close()
+            pool.join()
+        return self.output_path
 
-        out.close()
 
-        return filename
+# Dump a model in a file (executed in the worker processes of Anonymizer.run)
+def _write_model(task):
+    model_label, path, compress, chunk_size = task
+    with Anonymizer.open(path, compress) as output_file:
+        number_of_objects = Anonymizer.write(apps.get_model(model_label), output_file, chunk_size)
+    connections.close_all()
+    return model_label, path, number_of_objects
@@ -1,8 +1,6 @@
-
 from __future__ import unicode_literals, absolute_import
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
 
 from djanban.apps.anonymizer.anonymizer import Anonymizer
 
@@ -10,10 +8,34 @@ from djanban.apps.anonymizer.anonymizer import Anonymizer
 class Command(BaseCommand):
     help = 'Anonymize all data'
 
-    @transaction.atomic
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', dest='output', default=None,
+            help=u'Path of the output file. By default, a new file in the current directory'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', dest='compress', default=False,
+            help=u'Compress the output file with gzip'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, dest='chunk_size', default=1000,
+            help=u'Number of objects that are read at the same time'
+        )
+        parser.add_argument(
+            '--processes', type=int, dest='processes', default=1,
+            help=u'Number of models that are anonymized at the same time'
+        )
+
     def handle(self, *args, **options):
 
-        anonymizer = Anonymizer()
-        fileoutput = anonymizer.run()
+        anonymizer = Anonymizer(
+            output_path=options["output"], compress=options["compress"], chunk_size=options["chunk_size"],
+            processes=options["processes"]
+        )
+        fileoutput = anonymizer.run(progress=self.progress)
 
         self.stdout.write(self.style.SUCCESS(u"Database anonymized successfully. Output stored in file {0}".format(fileoutput)))
+
+    # Show the number of objects of each anonymized model
+    def progress(self, model_label, number_of_objects):
+        self.stdout.write(u"{0}: {1} objects".format(model_label, number_of_objects))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import gzip
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from djanban.apps.anonymizer.anonymizer import Anonymizer
+from djanban.apps.boards.models import Board, Card, List
+from djanban.apps.members.models import Member
+
+
+# Tests of the anonymized dump of the database
+class AnonymizerTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        user = get_user_model().objects.create_user("anonymizer")
+        self.member = Member.objects.create(user=user, is_developer=True)
+        self.board = Board.objects.create(creator=self.member, name="Secret board", description="board description",
+                                          comments="board comments", uuid="anonymizer-board")
+        list_ = List.objects.create(board=self.board, name="List", uuid="list-1", type="development", position=1)
+        now = timezone.now()
+        self.cards = []
+        for position in (1, 2, 3):
+            card = Card.objects.create(
+                board=self.board, list=list_, uuid="card-{0}".format(position), name="Secret card",
+                description="Secret description", position=position, url="https://trello.com/c/{0}".format(position),
+                short_url="https://trello.com/{0}".format(position), creation_datetime=now,
+                last_activity_datetime=now
+            )
+            card.members.add(self.member)
+            self.cards.append(card)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    # The same words are always replaced by the same words
+    def test_anonymize_string(self):
+        anonymized_string = Anonymizer.anonymize_string("Secret card-1, secret card-2")
+        self.assertEqual(len(anonymized_string), len("Secret card-1, secret card-2"))
+        self.assertNotIn("Secret", anonymized_string)
+        words = anonymized_string.replace(",", "").replace("-", " ").split(" ")
+        self.assertEqual(words[1], words[4])
+        self.assertEqual([words[2], words[5]], ["1", "2"])
+
+    # Objects are written in chunks, keeping their relations and unique values
+    def test_run(self):
+        output_path = "{0}/dump.jsonl.gz".format(self.tmp_dir)
+        Anonymizer(output_path=output_path, compress=True, chunk_size=2).run()
+
+        with gzip.open(output_path, "rb") as output_file:
+            serialized_objects = [json.loads(line.decode("utf-8")) for line in output_file]
+        serialized_cards = [
+            serialized_object for serialized_object in serialized_objects if serialized_object["model"] == "boards.card"
+        ]
+
+        self.assertEqual([serialized_card["pk"] for serialized_card in serialized_cards],
+                         [card.id for card in self.cards])
+        self.assertEqual(len({serialized_card["fields"]["uuid"] for serialized_card in serialized_cards}), 3)
+        for serialized_card in serialized_cards:
+            self.assertNotEqual(serialized_card["fields"]["name"], "Secret card")
+            self.assertEqual(serialized_card["fields"]["board"], self.board.id)
+            self.assertEqual(serialized_card["fields"]["members"], [self.member.id])
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import os
+import time
+from io import open
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from djanban.apps.boards.models import Board, Card, Label, List
+from djanban.apps.members.models import Member
+
+
+# File with the query and time budgets of the endpoints of the API
+BUDGETS_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_budgets.json")
+
+
+# Size of a synthetic board
+class BoardSize(object):
+
+    def __init__(self, name, num_lists, num_cards_per_list, num_members, num_labels):
+        self.name = name
+        self.num_lists = num_lists
+        self.num_cards_per_list = num_cards_per_list
+        self.num_members = num_members
+        self.num_labels = num_labels
+
+    @property
+    def num_cards(self):
+        return self.num_lists * self.num_cards_per_list
+
+    def __str__(self):
+        return "{0} ({1} lists x {2} cards, {3} members, {4} labels)".format(
+            self.name, self.num_lists, self.num_cards_per_list, self.num_members, self.num_labels
+        )
+
+
+# Board with synthetic data created with a given size.
+# All the objects are created with bulk operations so big boards can be generated quickly.
+class SyntheticBoard(object):
+
+    LIST_TYPES = ("ready_to_develop", "development", "after_development_in_review", "done")
+
+    def __init__(self, size, prefix="benchmark"):
+        self.size = size
+        self.prefix = prefix
+        self.members = []
+        self.board = None
+        self.lists = []
+        self.labels = []
+        self.cards = []
+
+    # Create the board, its lists, members, labels and cards
+    def create(self):
+        now = timezone.now()
+        prefix = self.prefix
+
+        # Members are not paired with Trello, so changes in the board are not sent to Trello API
+        User = get_user_model()
+        for member_index in range(0, self.size.num_members):
+            user = User.objects.create_user(
+                "{0}-member-{1}".format(prefix, member_index), "{0}-{1}@example.com".format(prefix, member_index)
+            )
+            self.members.append(Member.objects.create(user=user, is_developer=True))
+
+        self.board = Board.objects.create(
+            creator=self.members[0], name="{0} board".format(prefix), uuid="{0}-board".format(prefix),
+            description="Synthetic board", comments="", last_activity_datetime=now
+        )
+        self.board.members.add(*self.members)
+
+        List.objects.bulk_create([
+            List(board=self.board, name="List {0}".format(list_index), uuid="{0}-list-{1}".format(prefix, list_index),
+                 type=SyntheticBoard.LIST_TYPES[list_index % len(SyntheticBoard.LIST_TYPES)], position=list_index)
+            for list_index in range(0, self.size.num_lists)
+        ])
+        self.lists = list(self.board.lists.order_by("position"))
+
+        Label.objects.bulk_create([
+            Label(board=self.board, name="Label {0}".format(label_index),
+                  uuid="{0}-label-{1}".format(prefix, label_index), color=Label.NATIVE_LABEL_NAMES[label_index % 10][1])
+            for label_index in range(0, self.size.num_labels)
+        ])
+        self.labels = list(self.board.labels.order_by("id"))
+
+        cards = []
+        for list_ in self.lists:
+            for position in range(0, self.size.num_cards_per_list):
+                uuid = "{0}-card-{1}-{2}".format(prefix, list_.position, position)
+                cards.append(
+                    Card(board=self.board, list=list_, uuid=uuid, name="Card {0}".format(uuid),
+                         url="https://example.com/c/{0}".format(uuid), short_url="https://example.com/{0}".format(uuid),
+                         description="Description of {0}".format(uuid), position=position,
+                         creation_datetime=now, last_activity_datetime=now)
+                )
+        Card.objects.bulk_create(cards, batch_size=500)
+        self.cards = list(self.board.cards.order_by("id"))
+
+        # Each card has two members and two labels
+        card_members = []
+        card_labels = []
+        for card_index, card in enumerate(self.cards):
+            for offset in (0, 1):
+                if self.members:
+                    card_members.append(Card.members.through(
+                        card_id=card.id, member_id=self.members[(card_index + offset) % len(self.members)].id
+                    ))
+                if self.labels:
+                    card_labels.append(Card.labels.through(
+                        card_id=card.id, label_id=self.labels[(card_index + offset) % len(self.labels)].id
+                    ))
+        Card.members.through.objects.bulk_create(set_unique(card_members, ("card_id", "member_id")), batch_size=500)
+        Card.labels.through.objects.bulk_create(set_unique(card_labels, ("card_id", "label_id")), batch_size=500)
+
+        return self
+
+
+# Remove the relationships that are repeated (the same attributes)
+def set_unique(objects, attributes):
+    unique_objects = {tuple(getattr(object_, attribute) for attribute in attributes): object_ for object_ in objects}
+    return list(unique_objects.values())
+
+
+# Measure of a call to an endpoint
+class BenchmarkResult(object):
+
+    def __init__(self, endpoint, size, status_code, number_of_queries, elapsed_time):
+        self.endpoint = endpoint
+        self.size = size
+        self.status_code = status_code
+        self.number_of_queries = number_of_queries
+        self.elapsed_time = elapsed_time
+
+    def __str__(self):
+        return "{0} [{1}]: {2} queries, {3:.4f} s".format(
+            self.endpoint, self.size.name, self.number_of_queries, self.elapsed_time
+        )
+
+
+# Benchmark of the endpoints of the JSON API over a synthetic board
+class ApiBenchmark(object):
+
+    # Endpoints measured by this benchmark
+    ENDPOINTS = ("get_board", "get_card", "move_to_list", "add_se_time")
+
+    def __init__(self, synthetic_board):
+        self.synthetic_board = synthetic_board
+        self.board = synthetic_board.board
+        self.client = Client()
+        self.client.force_login(synthetic_board.members[0].user)
+
+    # Run the endpoints a number of times and return the result of the worst run of each endpoint
+    def run(self, repetitions=1):
+        self.warm_up()
+        results = []
+        for endpoint in ApiBenchmark.ENDPOINTS:
+            endpoint_results = [self.measure(endpoint, repetition) for repetition in range(0, repetitions)]
+            results.append(max(endpoint_results, key=lambda result: (result.number_of_queries, result.elapsed_time)))
+        return results
+
+    # Call once to an endpoint and measure the number of queries and the time it takes
+    def measure(self, endpoint, repetition=0):
+        call = getattr(self, "_call_{0}".format(endpoint))
+        card = self.synthetic_board.cards[repetition % len(self.synthetic_board.cards)]
+        with CaptureQueriesContext(connection) as queries:
+            start_time = time.time()
+            response = call(card)
+            elapsed_time = time.time() - start_time
+        return BenchmarkResult(endpoint, self.synthetic_board.size, response.status_code, len(queries), elapsed_time)
+
+    # The first serialization of the members creates their default avatars, so it is not measured
+    def warm_up(self):
+        self._call_get_board(card=None)
+
+    def _call_get_board(self, card):
+        return self.client.get(reverse("api:get_board", args=(self.board.id,)))
+
+    def _call_get_card(self, card):
+        return self.client.get(reverse("api:get_card", args=(self.board.id, card.id)))
+
+    # The card is moved to the next list
+    def _call_move_to_list(self, card):
+        card.refresh_from_db()
+        lists = self.synthetic_board.lists
+        next_list = lists[(lists.index(card.list) + 1) % len(lists)]
+        return self.client.post(
+            reverse("api:move_to_list", args=(self.board.id, card.id)),
+            data=json.dumps({"new_list": next_list.id, "position": "top"}), content_type="application/json"
+        )
+
+    def _call_add_se_time(self, card):
+        return self.client.post(
+            reverse("api:add_se_time", args=(self.board.id, card.id)),
+            data=json.dumps({"spent_time": "1.5", "estimated_time": "2", "date": "", "description": "Benchmark"}),
+            content_type="application/json"
+        )
+
+
+# Budgets of the endpoints by size:
+# {"sizes": {<size name>: {"num_lists": ..., ...}},
+#  "budgets": {<endpoint>: {<size name>: {"max_queries": ..., "max_seconds": ...}}}}
+def load_budgets(path=BUDGETS_FILE_PATH):
+    with open(path, "r", encoding="utf-8") as budgets_file:
+        return json.load(budgets_file)
+
+
+# Store the budgets of the endpoints in a JSON file
+def save_budgets(budgets, path=BUDGETS_FILE_PATH):
+    with open(path, "w", encoding="utf-8") as budgets_file:
+        budgets_file.write(json.dumps(budgets, indent=2, separators=(",", ": "), sort_keys=True, ensure_ascii=False) + "\n")
+
+
+# Sizes of the synthetic boards defined in the budgets
+def get_sizes(budgets):
+    return [
+        BoardSize(size_name, **size_attributes)
+        for size_name, size_attributes in sorted(budgets["sizes"].items(), key=lambda item: item[1]["num_lists"])
+    ]
+
+
+# Return the messages of the budgets exceeded by these results.
+# Times are checked only if check_time is True, as they depend on the machine the benchmark is run.
+def get_budget_violations(results, budgets, check_time=True):
+    violations = []
+    for result in results:
+        if result.status_code != 200:
+            violations.append("{0}: HTTP status {1}".format(result, result.status_code))
+            continue
+        budget = budgets["budgets"].get(result.endpoint, {}).get(result.size.name)
+        if budget is None:
+            violations.append("{0}: there is no budget for this endpoint and size".format(result))
+            continue
+        if result.number_of_queries > budget["max_queries"]:
+            violations.append("{0}: exceeds the budget of {1} queries".format(result, budget["max_queries"]))
+        if check_time and result.elapsed_time > budget["max_seconds"]:
+            violations.append("{0}: exceeds the budget of {1} s".format(result, budget["max_seconds"]))
+    return violations
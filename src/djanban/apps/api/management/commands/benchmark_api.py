@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from djanban.apps.api.benchmarks import ApiBenchmark, SyntheticBoard, get_budget_violations, get_sizes, \
+    load_budgets, save_budgets
+
+
+# Measure the number of queries and the time of the endpoints of the JSON API over synthetic boards.
+# The synthetic boards are created inside a transaction that is rolled back, so no data is kept.
+class Command(BaseCommand):
+    help = u'Benchmark the JSON API and check its query and time budgets'
+
+    def __init__(self, stdout=None, stderr=None, no_color=False):
+        super(Command, self).__init__(stdout, stderr, no_color)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repetitions', type=int, dest='repetitions', default=5,
+            help=u'Number of times each endpoint is called. The worst call is compared with the budget.'
+        )
+        parser.add_argument(
+            '--no-time', action='store_false', dest='check_time', default=True,
+            help=u'Check only the number of queries'
+        )
+        parser.add_argument(
+            '--update-budgets', action='store_true', dest='update_budgets', default=False,
+            help=u'Store the current number of queries of the endpoints as their budgets'
+        )
+
+    # Handle de command action
+    def handle(self, *args, **options):
+        budgets = load_budgets()
+
+        results = []
+        media_root = tempfile.mkdtemp()
+        setup_test_environment()
+        try:
+            # Default avatars of the synthetic members are stored in a temporary directory
+            with override_settings(MEDIA_ROOT=media_root, TMP_DIR=media_root), transaction.atomic():
+                for size in get_sizes(budgets):
+                    self.stdout.write(self.style.SUCCESS(u"Benchmarking board of size {0}".format(size)))
+                    synthetic_board = SyntheticBoard(size, prefix="benchmark-{0}".format(size.name)).create()
+                    results += ApiBenchmark(synthetic_board).run(repetitions=options["repetitions"])
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        for result in results:
+            self.stdout.write(u"{0}".format(result))
+
+        if options["update_budgets"]:
+            for result in results:
+                endpoint_budgets = budgets["budgets"].setdefault(result.endpoint, {})
+                endpoint_budgets.setdefault(result.size.name, {"max_seconds": 1.0})["max_queries"] = result.number_of_queries
+            save_budgets(budgets)
+            self.stdout.write(self.style.SUCCESS(u"Query budgets updated"))
+            return
+
+        violations = get_budget_violations(results, budgets, check_time=options["check_time"])
+        if violations:
+            for violation in violations:
+                self.stdout.write(self.style.ERROR(violation))
+            raise CommandError(u"{0} budget(s) exceeded".format(len(violations)))
+
+        self.stdout.write(self.style.SUCCESS(u"All the endpoints are within their budgets"))
@@ -2,12 +2,12 @@
 
 from __future__ import unicode_literals
 
-from django.db.models import Q
 from django.urls import reverse
 from django.conf import settings
 from crequest.middleware import CrequestMiddleware
 
-from djanban.apps.boards.models import CardMemberRelationship, CardLabelRelationship, Card
+from djanban.apps.boards.models import Card
+from djanban.apps.boards.snapshot import get_board_snapshot
 from djanban.apps.reports.models import CardReview
 
 
@@ -15,6 +15,7 @@ class Serializer(object):
 
     def __init__(self, board=None):
         self.board = board
+        self._board_snapshot = None
         self.serialized_members_by_id = None
         self.serialized_members_by_card = None
         self.current_user = None
@@ -22,6 +23,13 @@ class Serializer(object):
         self.serialized_labels_by_id = None
         self.serialized_labels_by_card = None
 
+    # Lists, labels, members and cards of the board shared with the rest of the request
+    @property
+    def board_snapshot(self):
+        if self._board_snapshot is None:
+            self._board_snapshot = get_board_snapshot(self.board)
+        return self._board_snapshot
+
     def _init_member_cache(self):
 
         current_request = CrequestMiddleware.get_request()
@@ -31,38 +39,41 @@ class Serializer(object):
             self.current_member = self.current_user.member
 
         if self.serialized_members_by_id is None:
-            self.serialized_members_by_id = {member.id: self.serialize_member(member) for member in self.board.members.all()}
+            self.serialized_members_by_id = {
+                member.id: self.serialize_member(member) for member in self.board_snapshot.members
+            }
         if self.serialized_members_by_card is None:
-            self.serialized_members_by_card = CardMemberRelationship.get_members_by_card(
-                self.board, member_cache=self.serialized_members_by_id
-            )
+            self.serialized_members_by_card = {}
+            for card_id, members in self.board_snapshot.members_by_card.items():
+                for member in members:
+                    if member.id not in self.serialized_members_by_id:
+                        self.serialized_members_by_id[member.id] = self.serialize_member(member)
+                self.serialized_members_by_card[card_id] = [
+                    self.serialized_members_by_id[member.id] for member in members
+                ]
 
     def _init_label_cache(self):
 
         if self.serialized_labels_by_id is None:
             self.serialized_labels_by_id = {
-                label.id: self.serialize_label(label) for label in self.board.labels.all()
+                label.id: self.serialize_label(label) for label in self.board_snapshot.labels
             }
 
         if self.serialized_labels_by_card is None:
-            self.serialized_labels_by_card = CardLabelRelationship.get_labels_by_card(
-                self.board, label_cache=self.serialized_labels_by_id
-            )
+            self.serialized_labels_by_card = {
+                card_id: [self.serialized_labels_by_id[label.id] for label in labels]
+                for card_id, labels in self.board_snapshot.labels_by_card.items()
+            }
 
     def serialize_board(self):
 
         self._init_member_cache()
         self._init_label_cache()
 
-        cards = self.board.cards.exclude(Q(list__type="closed")|Q(list__type="ignored")).\
-            order_by("list", "position")
-
-        cards_by_list = {list_.id: [] for list_ in self.board.active_lists.order_by("position")}
-        for card in cards:
-            cards_by_list[card.list_id].append(card)
+        cards_by_list = self.board_snapshot.active_cards_by_list
 
         lists_json = []
-        for list_ in self.board.active_lists.order_by("position"):
+        for list_ in self.board_snapshot.active_lists:
             list_json = self.serialize_list(list_)
 
             card_list = []
@@ -82,8 +93,8 @@ class Serializer(object):
             "local_url": reverse("boards:view", args=(self.board.id,)),
             "identicon_url": reverse("boards:view_identicon", args=(self.board.id, 40, 40)),
             "lists": lists_json,
-            "members": [self.serialized_members_by_id[member.id] for member in self.board.members.all().order_by("id")],
-            "labels": [self.serialized_labels_by_id[label.id] for label in self.board.labels.exclude(name="").order_by("name")],
+            "members": [self.serialized_members_by_id[member.id] for member in self.board_snapshot.members],
+            "labels": [self.serialized_labels_by_id[label.id] for label in self.board_snapshot.named_labels],
             "requirements": [self.serialize_requirement(requirement) for requirement in self.board.requirements.all()],
         }
         return board_json
@@ -157,8 +168,8 @@ class Serializer(object):
                 "id": self.board.id,
                 "uuid": self.board.uuid,
                 "name": self.board.name,
-                "lists": [self.serialize_list(list_) for list_ in self.board.active_lists.order_by("position")],
-                "labels": [self.serialize_label(label) for label in self.board.labels.exclude(name="").order_by("name")]
+                "lists": [self.serialize_list(list_) for list_ in self.board_snapshot.active_lists],
+                "labels": [self.serialize_label(label) for label in self.board_snapshot.named_labels]
             },
             "list": self.serialize_list(card_list),
             "members": [self.serialize_member(member) for member in card.members.all().order_by("id")],
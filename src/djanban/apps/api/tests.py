@@ -1,3 +1,63 @@
-from django.test import TestCase
+# -*- coding: utf-8 -*-
 
-# Create your tests here.
+from __future__ import unicode_literals
+
+from crequest.middleware import CrequestMiddleware
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+
+from djanban.apps.api.benchmarks import ApiBenchmark, BoardSize, SyntheticBoard, get_budget_violations, get_sizes, \
+    load_budgets
+from djanban.apps.api.serializers import Serializer
+from djanban.apps.members.models import Member
+
+
+# Query budgets of the JSON API.
+# If this test fails, some change has added queries to an endpoint (maybe a N+1 query in a serialization).
+# Check it with the benchmark_api command and update the budgets if the new queries are needed.
+class ApiQueryBudgetTest(TestCase):
+
+    def test_query_budgets(self):
+        budgets = load_budgets()
+        violations = []
+        for size in get_sizes(budgets):
+            synthetic_board = SyntheticBoard(size, prefix=size.name).create()
+            results = ApiBenchmark(synthetic_board).run(repetitions=2)
+            violations += get_budget_violations(results, budgets, check_time=False)
+        self.assertEqual(violations, [])
+
+    # The number of queries of the endpoints must not depend on the size of the board
+    def test_number_of_queries_does_not_depend_on_board_size(self):
+        number_of_queries_by_size = []
+        for size in get_sizes(load_budgets()):
+            synthetic_board = SyntheticBoard(size, prefix=size.name).create()
+            results = ApiBenchmark(synthetic_board).run()
+            number_of_queries_by_size.append({result.endpoint: result.number_of_queries for result in results})
+        self.assertTrue(all(
+            number_of_queries == number_of_queries_by_size[0] for number_of_queries in number_of_queries_by_size
+        ))
+
+
+# Test for the serialization of the boards
+class SerializerTest(TestCase):
+
+    def tearDown(self):
+        CrequestMiddleware.del_request()
+
+    # Only the members of the board are members in the board JSON, but cards keep all their members
+    def test_board_members(self):
+        synthetic_board = SyntheticBoard(BoardSize("small", 2, 2, 2, 1), prefix="small").create()
+        non_member = Member.objects.create(user=get_user_model().objects.create_user("non-member"))
+        card = synthetic_board.cards[0]
+        card.members.add(non_member)
+
+        request = RequestFactory().get("/")
+        request.user = synthetic_board.members[0].user
+        CrequestMiddleware.set_request(request)
+        board_json = Serializer(synthetic_board.board).serialize_board()
+
+        self.assertEqual([member_json["id"] for member_json in board_json["members"]],
+                         [member.id for member in synthetic_board.members])
+        card_json = next(card_json for list_json in board_json["lists"] for card_json in list_json["cards"]
+                         if card_json["id"] == card.id)
+        self.assertIn(non_member.id, [member_json["id"] for member_json in card_json["members"]])
@@ -12,6 +12,7 @@ urlpatterns = [
     # Board API
     url(r'^boards/info/?$', boards.get_boards, name="get_boards"),
     url(r'^board/(?P<board_id>\d+)/info/?$', boards.get_board, name="get_board"),
+    url(r'^board/(?P<board_id>\d+)/gantt/?$', boards.get_gantt_chart, name="get_gantt_chart"),
     url(r'^board/(?P<board_id>\d+)/member/?$', boards.add_member, name="add_member"),
     url(r'^board/(?P<board_id>\d+)/member/(?P<member_id>\d+)/?$', boards.remove_member, name="remove_member"),
 
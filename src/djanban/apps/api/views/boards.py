@@ -4,15 +4,17 @@ from __future__ import unicode_literals, absolute_import
 
 import json
 
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.db import transaction
 from django.http import Http404, HttpResponseBadRequest
 from django.http import JsonResponse
 
-from djanban.apps.api.http import JsonResponseMethodNotAllowed, JsonResponseNotFound
+from djanban.apps.api.http import JsonResponseBadRequest, JsonResponseMethodNotAllowed, JsonResponseNotFound
 from djanban.apps.api.serializers import Serializer
 from djanban.apps.api.util import get_board_or_404
 from djanban.apps.base.auth import get_user_boards
 from djanban.apps.base.decorators import member_required
+from djanban.apps.boards.gantt import GanttChart
 from djanban.apps.boards.models import Board
 from djanban.apps.members.models import Member, MemberRole
 
@@ -53,6 +55,38 @@ def get_board(request, board_id):
     return JsonResponse(serializer.serialize_board())
 
 
+# Tasks of the gantt chart of a board, paginated by card
+@member_required
+def get_gantt_chart(request, board_id):
+    if request.method != "GET":
+        return JsonResponseMethodNotAllowed({"message": "HTTP method not allowed."})
+    try:
+        board = get_user_boards(request.user).get(id=board_id)
+    except Board.DoesNotExist:
+        return JsonResponseNotFound({"message": "Not found."})
+
+    try:
+        page_size = int(request.GET.get("page_size", GanttChart.BATCH_SIZE))
+    except ValueError:
+        return JsonResponseBadRequest({"message": "Invalid page size."})
+    if page_size <= 0 or page_size > GanttChart.BATCH_SIZE:
+        return JsonResponseBadRequest({"message": "Invalid page size."})
+
+    try:
+        page, tasks = GanttChart(board).get_page(request.GET.get("page", 1), page_size)
+    except PageNotAnInteger:
+        return JsonResponseBadRequest({"message": "Invalid page."})
+    except EmptyPage:
+        return JsonResponseNotFound({"message": "Page not found."})
+
+    return JsonResponse({
+        "page": page.number,
+        "num_pages": page.paginator.num_pages,
+        "num_cards": page.paginator.count,
+        "tasks": tasks
+    })
+
+
 # Add a member to a board
 @member_required
 @transaction.atomic
@@ -24,6 +24,7 @@ from djanban.apps.boards.models import Board, Card, CardComment, List, CardAttac
 
 # Point of access to several actions
 from djanban.apps.forecasters.models import Forecaster
+from djanban.apps.forecasters.registry import model_registry
 from djanban.utils.custom_uuid import custom_uuid
 
 
@@ -380,19 +381,20 @@ def update_forecasts(request, board_id, card_id):
     except (Board.DoesNotExist, Card.DoesNotExist) as e:
         return JsonResponseNotFound({"message": "Not found."})
 
-    available_card_forecasters = Forecaster.objects.filter(
+    available_card_forecasters = list(Forecaster.objects.filter(
         (Q(board=None) & Q(member=None)) |
         (Q(board=card.board) & Q(member=None)) |
         (Q(board=None) & Q(member__in=card.members.all()))
-    )
+    ))
 
     serializer = Serializer(board=card.board)
 
+    # All the forecasts are made at once with the compiled models of the forecasters
+    forecasts = model_registry.predict([card], available_card_forecasters)
+
     estimations = []
     for forecaster in available_card_forecasters:
-
-        forecast = forecaster.make_forecast(card=card)
-        estimations.append(serializer.serialize_forecast(forecast))
+        estimations.append(serializer.serialize_forecast(forecasts[(forecaster.id, card.id)]))
 
     return JsonResponse(estimations, safe=False, encoder=DjangoJSONEncoder)
 
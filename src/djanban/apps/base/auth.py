@@ -29,9 +29,14 @@ def user_is_administrator(user):
     Returns
     -------
     True if the user belongs to administrator groups, False otherwise.
+    The result is kept in the user object, so the groups of the user of a request are only checked once.
     """
-    return user and user.is_authenticated() and\
-           (user.groups.filter(name=settings.ADMINISTRATOR_GROUP).exists() or user.is_superuser)
+    if not user or not user.is_authenticated():
+        return False
+    if not hasattr(user, "_is_administrator"):
+        user._is_administrator = user.is_superuser or\
+            user.groups.filter(name=settings.ADMINISTRATOR_GROUP).exists()
+    return user._is_administrator
 
 
 # Informs if one user is a member
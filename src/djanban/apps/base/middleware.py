@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+
+# Report the number of database queries of each request in the X-Query-Count header of its response.
+# Queries are only recorded by Django when DEBUG is True, so the header is only added in that case.
+# Query logs are reset by Django when each request starts.
+class QueryCountMiddleware(MiddlewareMixin):
+
+    HEADER = "X-Query-Count"
+
+    def process_response(self, request, response):
+        if settings.DEBUG:
+            response[QueryCountMiddleware.HEADER] = "{0}".format(
+                sum(len(connection.queries) for connection in connections.all())
+            )
+        return response
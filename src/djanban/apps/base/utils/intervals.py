@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+import bisect
+import threading
+import time
+from datetime import date as date_type, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+# Index of objects that are applied in a date interval (objects with start_date and end_date attributes, where a
+# None end date means that the interval has no end).
+# The date line is split in the segments where the same object is applied, so the object of a date is found with a
+# binary search. When the intervals of several objects overlap, the first one of them is applied.
+class DateIntervalIndex(object):
+
+    def __init__(self, objects):
+        objects = list(objects)
+
+        boundaries = set()
+        for object_ in objects:
+            boundaries.add(DateIntervalIndex._get_start_date(object_))
+            if object_.end_date is not None:
+                boundaries.add(object_.end_date + timedelta(days=1))
+
+        self._start_dates = []
+        self._objects = []
+        for boundary in sorted(boundaries):
+            applied_object = next((object_ for object_ in objects if DateIntervalIndex._contains(object_, boundary)),
+                                  None)
+            # Consecutive segments of the same object are merged
+            if self._objects and self._objects[-1] is applied_object:
+                continue
+            self._start_dates.append(boundary)
+            self._objects.append(applied_object)
+
+    # Return the object applied in a date or None if there is none
+    def get(self, date):
+        segment_index = bisect.bisect_right(self._start_dates, date) - 1
+        if segment_index < 0:
+            return None
+        return self._objects[segment_index]
+
+    # Segments of the date line where an object is applied: tuples with their start date, their end date (None if
+    # the segment has no end) and the applied object
+    @property
+    def segments(self):
+        segments = []
+        for segment_index, (start_date, object_) in enumerate(zip(self._start_dates, self._objects)):
+            if object_ is None:
+                continue
+            end_date = None
+            if segment_index + 1 < len(self._start_dates):
+                end_date = self._start_dates[segment_index + 1] - timedelta(days=1)
+            segments.append((start_date, end_date, object_))
+        return segments
+
+    @staticmethod
+    def _get_start_date(object_):
+        return object_.start_date if object_.start_date is not None else date_type.min
+
+    @staticmethod
+    def _contains(object_, date):
+        return DateIntervalIndex._get_start_date(object_) <= date and \
+            (object_.end_date is None or date <= object_.end_date)
+
+
+# Date interval indices of the objects of some owner (e.g. the hourly rates of a board) shared by all the requests
+# of this process.
+# Each index is valid while the versions of its owner and of its namespace do not change. These versions are stored
+# in a shared cache and are incremented when the objects change (see the signal receivers of the models), so changes
+# made by other processes are seen in the next request. Indices are also built again after timeout seconds, in case
+# the versions are evicted from the shared cache.
+class DateIntervalIndexCache(object):
+
+    VERSION_KEY_PREFIX = "date_interval_indices"
+
+    def __init__(self, timeout, cache_alias="default"):
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self._indices = {}
+        self._lock = threading.Lock()
+
+    # Return the index of an owner building it with the passed function if it is not cached or it has expired
+    def get(self, namespace, owner_id, get_objects):
+        key = (namespace, owner_id)
+        versions = self._get_versions(namespace, owner_id)
+        now = time.time()
+        with self._lock:
+            cached_index = self._indices.get(key)
+            if cached_index is not None and cached_index[1] == versions and now - cached_index[0] < self.timeout:
+                return cached_index[2]
+
+        index = DateIntervalIndex(get_objects())
+        with self._lock:
+            self._indices[key] = (now, versions, index)
+        return index
+
+    # Make the index of an owner (or of all the owners of a namespace if no owner is passed) invalid in all processes.
+    # The version is incremented again when the current transaction is committed, because other processes could have
+    # built the index with the objects before the change in the meantime.
+    def invalidate(self, namespace, owner_id=None):
+        with self._lock:
+            if owner_id is not None:
+                self._indices.pop((namespace, owner_id), None)
+            else:
+                for key in [key for key in self._indices.keys() if key[0] == namespace]:
+                    del self._indices[key]
+
+        version_key = self._get_version_key(namespace, owner_id)
+        self._increment_version(version_key)
+        transaction.on_commit(lambda: self._increment_version(version_key))
+
+    # Remove all the indices of this process
+    def clear(self):
+        with self._lock:
+            self._indices.clear()
+
+    # Versions of the namespace and of the owner
+    def _get_versions(self, namespace, owner_id):
+        namespace_version_key = self._get_version_key(namespace)
+        owner_version_key = self._get_version_key(namespace, owner_id)
+        versions = self._get_shared_cache().get_many([namespace_version_key, owner_version_key])
+        return versions.get(namespace_version_key, 0), versions.get(owner_version_key, 0)
+
+    def _increment_version(self, version_key):
+        shared_cache = self._get_shared_cache()
+        shared_cache.add(version_key, 0, None)
+        try:
+            shared_cache.incr(version_key)
+        # The version has been evicted from the shared cache
+        except ValueError:
+            shared_cache.set(version_key, 1, None)
+
+    def _get_shared_cache(self):
+        return caches[self.cache_alias]
+
+    @staticmethod
+    def _get_version_key(namespace, owner_id=None):
+        if owner_id is None:
+            return "{0}.{1}".format(DateIntervalIndexCache.VERSION_KEY_PREFIX, namespace)
+        return "{0}.{1}.{2}".format(DateIntervalIndexCache.VERSION_KEY_PREFIX, namespace, owner_id)
+
+
+# Indices of this process
+date_interval_indices = DateIntervalIndexCache(
+    timeout=settings.DATE_INTERVAL_INDEX_CACHE_TIMEOUT, cache_alias=settings.DATE_INTERVAL_INDEX_CACHE_ALIAS
+)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.query import QuerySet
+
+from djanban.apps.boards.models import Card, CardAttachment, CardComment, List
+from djanban.apps.reports.models import CardMovement
+
+
+# Stats of the cards that are stored as columns of the cards, grouped by what they depend on
+ATTACHMENT_STATS = ("number_of_attachments",)
+BLOCKING_STATS = ("is_blocked",)
+MOVEMENT_STATS = ("end_datetime", "completion_datetime", "time_in_lists", "list_arrival_datetime")
+ALL_STATS = ATTACHMENT_STATS + BLOCKING_STATS + MOVEMENT_STATS
+
+
+# Stats of some cards (passed by id) computed from their attachments, blocking cards, movements and comments.
+# Stats of all cards are computed with a fixed number of queries (one for each one of the stat groups and another
+# one for the cards), so they can be computed after a fetch or for checking the stored stats of a whole board.
+class CardStats(object):
+
+    def __init__(self, card_ids, stats=ALL_STATS):
+        self.stats = [stat for stat in ALL_STATS if stat in stats]
+
+        self._cards = {}
+        if not isinstance(card_ids, QuerySet):
+            card_ids = list(card_ids)
+        if card_ids:
+            self._cards = {
+                card["id"]: card for card in Card.objects.filter(id__in=card_ids).
+                values("id", "list_id", "list__type", "creation_datetime", "last_activity_datetime", *ALL_STATS)
+            }
+
+        self.values = {card_id: {} for card_id in self._cards.keys()}
+        if not self._cards:
+            return
+        if set(self.stats) & set(ATTACHMENT_STATS):
+            self._compute_attachment_stats()
+        if set(self.stats) & set(BLOCKING_STATS):
+            self._compute_blocking_stats()
+        if set(self.stats) & set(MOVEMENT_STATS):
+            self._compute_movement_stats()
+
+    # Ids of the cards whose stored stats are different from the computed ones
+    @property
+    def inconsistent_card_ids(self):
+        return sorted(card_id for card_id in self.values.keys() if self._get_changed_values(card_id))
+
+    # Store the stats of the cards that have changed and set them in the card objects that are passed.
+    # Returns the number of updated cards.
+    def update(self, cards=None):
+        changed_values_by_card = {}
+        for card_id in self.values.keys():
+            changed_values = self._get_changed_values(card_id)
+            if changed_values:
+                changed_values_by_card[card_id] = changed_values
+        # Several cards are updated atomically
+        if len(changed_values_by_card) > 1:
+            with transaction.atomic():
+                for card_id, changed_values in changed_values_by_card.items():
+                    Card.objects.filter(id=card_id).update(**changed_values)
+        elif changed_values_by_card:
+            card_id, changed_values = list(changed_values_by_card.items())[0]
+            Card.objects.filter(id=card_id).update(**changed_values)
+        for card in (cards or []):
+            for stat, value in self.values.get(card.id, {}).items():
+                setattr(card, stat, value)
+        return len(changed_values_by_card)
+
+    def _get_changed_values(self, card_id):
+        card_values = self.values[card_id]
+        stored_card = self._cards[card_id]
+        return {stat: value for stat, value in card_values.items() if stored_card[stat] != value}
+
+    def _compute_attachment_stats(self):
+        number_of_attachments = dict(
+            CardAttachment.objects.filter(card_id__in=self._cards.keys()).
+            values_list("card_id").annotate(count=Count("id")).order_by()
+        )
+        for card_id in self._cards.keys():
+            self.values[card_id]["number_of_attachments"] = number_of_attachments.get(card_id, 0)
+
+    # A card is blocked if any of its blocking cards is not done
+    def _compute_blocking_stats(self):
+        blocked_card_ids = set(
+            Card.blocking_cards.through.objects.
+            filter(from_card_id__in=self._cards.keys()).exclude(to_card__list__type="done").
+            values_list("from_card_id", flat=True)
+        )
+        for card_id in self._cards.keys():
+            self.values[card_id]["is_blocked"] = card_id in blocked_card_ids
+
+    # End and completion datetimes of the cards and the time they have passed in each list (see Card.end_datetime,
+    # Card.completion_datetime and Card.time_in_each_list)
+    def _compute_movement_stats(self):
+        last_comment_datetimes = {}
+        if "end_datetime" in self.stats:
+            last_comment_datetimes = dict(
+                CardComment.objects.filter(card_id__in=self._cards.keys()).
+                values_list("card_id").annotate(max=Max("creation_datetime")).order_by()
+            )
+
+        movements_by_card = {}
+        movements = CardMovement.objects.filter(card_id__in=self._cards.keys()).\
+            order_by("datetime", "id").\
+            values_list("id", "card_id", "source_list_id", "destination_list__type", "datetime", "source_list__type")
+        for movement in movements:
+            movements_by_card.setdefault(movement[1], []).append(movement)
+
+        for card_id, card in self._cards.items():
+            movements = movements_by_card.get(card_id, [])
+            done_movements = [movement for movement in movements if movement[3] == "done"]
+
+            # End datetime: last arrival to a done list or last comment
+            end_datetimes = [
+                end_datetime for end_datetime in (
+                    max(movement[4] for movement in done_movements) if done_movements else None,
+                    last_comment_datetimes.get(card_id)
+                )
+                if end_datetime is not None
+            ]
+
+            # Completion datetime: last arrival to a done list of a done card
+            completion_datetime = None
+            if card["list__type"] == "done":
+                completion_datetime = card["last_activity_datetime"]
+                if done_movements:
+                    completion_datetime = max(done_movements, key=lambda movement: movement[0])[4]
+
+            # Time in the active lists the card has left and arrival datetime to the list where the card is being
+            # (None if that list is not active or it is a done list because then the time is not counted)
+            time_in_lists = {}
+            list_arrival_datetime = card["creation_datetime"]
+            for movement in movements:
+                if movement[2] is not None and movement[5] in List.ACTIVE_LIST_TYPES:
+                    time_in_lists[movement[2]] = time_in_lists.get(movement[2], 0) + \
+                        (movement[4] - list_arrival_datetime).total_seconds()
+                list_arrival_datetime = movement[4]
+            if (movements and movements[-1][3] == "done") or card["list__type"] not in List.ACTIVE_LIST_TYPES:
+                list_arrival_datetime = None
+
+            card_values = {
+                "end_datetime": max(end_datetimes) if end_datetimes else card["creation_datetime"],
+                "completion_datetime": completion_datetime,
+                "time_in_lists": json.dumps(time_in_lists, sort_keys=True),
+                "list_arrival_datetime": list_arrival_datetime,
+            }
+            self.values[card_id].update({stat: card_values[stat] for stat in MOVEMENT_STATS if stat in self.stats})
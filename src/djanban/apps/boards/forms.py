@@ -10,6 +10,7 @@ from django.forms import models
 from django.utils import timezone
 
 from djanban.apps.boards.models import Board, Card, List, Label
+from djanban.apps.charts import dependencies
 from djanban.apps.fetch.fetchers.trello.boards import Initializer
 from djanban.apps.members.models import MemberRole
 from djanban.remote_backends.factory import RemoteBackendConnectorFactory
@@ -106,8 +107,8 @@ class NewListForm(models.ModelForm):
                 # Create the list
                 super(NewListForm, self).save(commit=True)
 
-                # Clean cached charts for this lists' board
-                self.instance.board.clean_cached_charts()
+                # Invalidate the cached charts that depend on the lists of this lists' board
+                self.instance.board.invalidate_cached_charts(dependencies.MOVEMENTS)
         return self.instance
 
 
@@ -134,8 +135,8 @@ class EditListForm(models.ModelForm):
                 # Edit the list
                 super(EditListForm, self).save(commit=True)
 
-                # Clean cached charts for this lists' board
-                self.instance.board.clean_cached_charts()
+                # Invalidate the cached charts that depend on the lists of this lists' board
+                self.instance.board.invalidate_cached_charts(dependencies.MOVEMENTS)
         return self.instance
 
 
@@ -177,8 +178,8 @@ class SwapListForm(forms.Form):
 
                 self.instance = board.edit_list(current_member, self.instance)
 
-                # Clean cached charts for this lists' board
-                self.instance.board.clean_cached_charts()
+                # Invalidate the cached charts that depend on the lists of this lists' board
+                self.instance.board.invalidate_cached_charts(dependencies.MOVEMENTS)
         return self.instance
 
 
@@ -277,8 +278,8 @@ class NewCardForm(models.ModelForm):
                 self.instance.last_activity_datetime = timezone.now()
                 # Create the card
                 super(NewCardForm, self).save(commit=True)
-                # Clean cached charts for this board
-                board.clean_cached_charts()
+                # Invalidate the cached charts that depend on the cards of this board
+                board.invalidate_cached_charts(dependencies.CARDS, dependencies.MOVEMENTS)
 
 
 class LabelForm(models.ModelForm):
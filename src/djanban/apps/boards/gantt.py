@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.core.paginator import Paginator
+from django.db.models import Min
+from django.urls import reverse
+
+from djanban.apps.boards.models import Card, List
+from djanban.apps.members.models import Member
+from djanban.apps.reports.models import CardMovement
+
+
+# Tasks of the Gantt chart of a board (the format of each task is the one expected by JSGantt.TaskItem).
+# There is a task for each member of each started card. The data of the cards is loaded with a fixed number of
+# grouped queries for each batch of cards instead of several queries for each card.
+class GanttChart(object):
+
+    # Number of cards whose data is loaded in each batch of queries
+    BATCH_SIZE = 500
+
+    # Percentage of completion of the cards of each list type (the rest of the list types are completed)
+    COMPLETION_PERCENTAGES = {
+        "development": 0,
+        "after_development_in_review": 75,
+        "after_development_waiting_release": 85,
+    }
+
+    def __init__(self, board):
+        self.board = board
+
+    # Started cards of the board
+    @property
+    def cards(self):
+        return self.board.cards.filter(list__type__in=List.STARTED_CARD_LIST_TYPES).select_related("list").order_by("id")
+
+    # Tasks of all the started cards of the board
+    def get_tasks(self):
+        return self._get_tasks(self.cards)
+
+    # Page of the started cards of the board.
+    # Returns the page and its tasks. Note that each card has as many tasks as members.
+    def get_page(self, page_number, page_size):
+        page = Paginator(self.cards, page_size).page(page_number)
+        return page, list(self._get_tasks(page.object_list))
+
+    # Tasks of some cards, generated in batches
+    def _get_tasks(self, cards):
+        batch = []
+        for card in cards:
+            batch.append(card)
+            if len(batch) == GanttChart.BATCH_SIZE:
+                for task in self._get_batch_tasks(batch):
+                    yield task
+                batch = []
+        if batch:
+            for task in self._get_batch_tasks(batch):
+                yield task
+
+    # Tasks of a batch of cards
+    def _get_batch_tasks(self, cards):
+        card_ids = [card.id for card in cards]
+
+        # First arrival to development of each card
+        first_development_datetime_by_card = dict(
+            CardMovement.objects.filter(card_id__in=card_ids, destination_list__type="development").
+            values("card_id").annotate(first_development_datetime=Min("datetime")).
+            values_list("card_id", "first_development_datetime")
+        )
+
+        # Members of each card
+        member_ids_by_card = {}
+        for card_id, member_id in Card.members.through.objects.filter(card_id__in=card_ids).\
+                order_by("id").values_list("card_id", "member_id"):
+            member_ids_by_card.setdefault(card_id, []).append(member_id)
+        members = {
+            member.id: member
+            for member in Member.objects.filter(
+                id__in={member_id for member_ids in member_ids_by_card.values() for member_id in member_ids}
+            ).select_related("user", "trello_member_profile")
+        }
+
+        # The parent of each card is its oldest blocking card
+        parent_card_by_card = {}
+        blocking_relationships = Card.blocking_cards.through.objects.filter(from_card_id__in=card_ids).\
+            order_by("to_card__creation_datetime", "id").values_list("from_card_id", "to_card_id")
+        for card_id, blocking_card_id in blocking_relationships:
+            parent_card_by_card.setdefault(card_id, blocking_card_id)
+
+        # Cards that depend on (are blocked by) each card
+        dependant_card_ids_by_card = {}
+        for card_id, blocked_card_id in Card.blocking_cards.through.objects.filter(to_card_id__in=card_ids).\
+                order_by("id").values_list("to_card_id", "from_card_id"):
+            dependant_card_ids_by_card.setdefault(card_id, []).append(blocked_card_id)
+
+        for card in cards:
+            # Task start
+            start_datetime = first_development_datetime_by_card.get(card.id) or card.creation_datetime
+
+            # Task end (done cards end on their last arrival to done or their last comment, see Card.end_datetime)
+            if card.due_datetime is not None:
+                end_datetime = card.due_datetime
+            elif card.list.type == "done":
+                end_datetime = card.end_datetime
+            else:
+                end_datetime = start_datetime + timedelta(days=1)
+
+            dependant_card_ids = dependant_card_ids_by_card.get(card.id, [])
+            card_task = {
+                "pID": card.id,
+                "pName": card.short_url,
+                "pStart": start_datetime.strftime("%Y-%m-%d"),
+                "pEnd": end_datetime.strftime("%Y-%m-%d"),
+                "pClass": "gtaskblue",
+                "pLink": reverse("boards:view_card", args=(self.board.id, card.id)),
+                "pMile": 0,
+                "pComp": GanttChart.COMPLETION_PERCENTAGES.get(card.list.type, 100),
+                "pGroup": 1 if dependant_card_ids else 0,
+                "pParent": parent_card_by_card.get(card.id, 0),
+                "pOpen": 0,
+                "pDepend": ",".join(["{0}".format(card_id) for card_id in dependant_card_ids]),
+                "pCaption": card.name,
+                "pNotes": "{0}\\\n{1}".format(card.name, card.description.replace("\n", "\\\n"))
+            }
+
+            for member_id in member_ids_by_card.get(card.id, []):
+                task = dict(card_task)
+                task["pRes"] = members[member_id].external_username
+                yield task
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djanban.apps.boards.card_stats import CardStats
+from djanban.apps.boards.models import Board
+
+
+# Check that the stats stored in the cards are the ones computed from their attachments, blocking cards, movements
+# and comments
+class Command(BaseCommand):
+    help = u'Check the stored stats of the cards of all boards (or of the boards whose ids are passed) ' \
+           u'and fix them if --fix is passed'
+
+    def __init__(self, stdout=None, stderr=None, no_color=False):
+        super(Command, self).__init__(stdout, stderr, no_color)
+
+    def add_arguments(self, parser):
+        parser.add_argument('board_id', nargs='*', type=int)
+        parser.add_argument('--fix', action='store_true', dest='fix', default=False,
+                            help=u'Store the computed stats of the inconsistent cards')
+
+    # Handle de command action
+    def handle(self, *args, **options):
+        board_ids = options.get("board_id")
+        fix = options.get("fix")
+
+        boards = Board.objects.all().order_by("id")
+        if board_ids:
+            boards = boards.filter(id__in=board_ids)
+            missing_board_ids = set(board_ids) - set(boards.values_list("id", flat=True))
+            if missing_board_ids:
+                raise CommandError(u"Board {0} does not exist".format(min(missing_board_ids)))
+
+        num_inconsistent_cards = 0
+        for board in boards:
+            card_stats = CardStats(board.cards.values_list("id", flat=True))
+            inconsistent_card_ids = card_stats.inconsistent_card_ids
+            num_inconsistent_cards += len(inconsistent_card_ids)
+            if not inconsistent_card_ids:
+                continue
+            if fix:
+                card_stats.update()
+                self.stdout.write(self.style.SUCCESS(
+                    u"{0} card(s) of {1} fixed".format(len(inconsistent_card_ids), board.name)
+                ))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    u"{0} card(s) of {1} have inconsistent stats: {2}".format(
+                        len(inconsistent_card_ids), board.name,
+                        u", ".join(str(card_id) for card_id in inconsistent_card_ids)
+                    )
+                ))
+
+        if num_inconsistent_cards == 0:
+            self.stdout.write(self.style.SUCCESS(u"Stats of all cards are consistent"))
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-18 10:17
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0072_auto_20170603_0130'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='cached_charts_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Version of the cached charts'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-18 10:25
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0073_board_cached_charts_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='last_fetched_action_datetime',
+            field=models.DateTimeField(default=None, null=True, verbose_name='Datetime of the last fetched action'),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='last_fetched_action_uuid',
+            field=models.CharField(default=None, max_length=128, null=True, verbose_name='External id of the last fetched action'),
+        ),
+    ]
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-18 11:39
+from __future__ import unicode_literals
+
+import json
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+# Types of the lists where the time of the cards is counted (see List.ACTIVE_LIST_TYPES)
+ACTIVE_LIST_TYPES = ("backlog", "ready_to_develop", "development",
+                     "after_development_in_review", "after_development_waiting_release", "done")
+
+
+# Compute the stats of the existing cards board by board, as CardStats does
+def compute_card_stats(apps, schema):
+    Board = apps.get_model("boards", "Board")
+    Card = apps.get_model("boards", "Card")
+    CardAttachment = apps.get_model("boards", "CardAttachment")
+    CardComment = apps.get_model("boards", "CardComment")
+    CardMovement = apps.get_model("reports", "CardMovement")
+    for board_id in Board.objects.values_list("id", flat=True):
+        cards = Card.objects.filter(board_id=board_id).\
+            values("id", "list__type", "creation_datetime", "last_activity_datetime")
+        number_of_attachments = dict(
+            CardAttachment.objects.filter(card__board_id=board_id).
+            values_list("card_id").annotate(count=Count("id")).order_by()
+        )
+        # A card is blocked if any of its blocking cards is not done
+        blocked_card_ids = set(
+            Card.blocking_cards.through.objects.
+            filter(from_card__board_id=board_id).exclude(to_card__list__type="done").
+            values_list("from_card_id", flat=True)
+        )
+        last_comment_datetimes = dict(
+            CardComment.objects.filter(card__board_id=board_id).
+            values_list("card_id").annotate(max=Max("creation_datetime")).order_by()
+        )
+        movements_by_card = {}
+        movements = CardMovement.objects.filter(card__board_id=board_id).\
+            order_by("datetime", "id").\
+            values_list("id", "card_id", "source_list_id", "destination_list__type", "datetime", "source_list__type")
+        for movement in movements:
+            movements_by_card.setdefault(movement[1], []).append(movement)
+
+        for card in cards:
+            movements = movements_by_card.get(card["id"], [])
+            done_movements = [movement for movement in movements if movement[3] == "done"]
+
+            # End datetime: last arrival to a done list or last comment
+            end_datetimes = [
+                end_datetime for end_datetime in (
+                    max(movement[4] for movement in done_movements) if done_movements else None,
+                    last_comment_datetimes.get(card["id"])
+                )
+                if end_datetime is not None
+            ]
+
+            # Completion datetime: last arrival to a done list of a done card
+            completion_datetime = None
+            if card["list__type"] == "done":
+                completion_datetime = card["last_activity_datetime"]
+                if done_movements:
+                    completion_datetime = max(done_movements, key=lambda movement: movement[0])[4]
+
+            # Time in the active lists the card has left and arrival datetime to the list where the card is being
+            time_in_lists = {}
+            list_arrival_datetime = card["creation_datetime"]
+            for movement in movements:
+                if movement[2] is not None and movement[5] in ACTIVE_LIST_TYPES:
+                    time_in_lists[movement[2]] = time_in_lists.get(movement[2], 0) + \
+                        (movement[4] - list_arrival_datetime).total_seconds()
+                list_arrival_datetime = movement[4]
+            if (movements and movements[-1][3] == "done") or card["list__type"] not in ACTIVE_LIST_TYPES:
+                list_arrival_datetime = None
+
+            Card.objects.filter(id=card["id"]).update(
+                number_of_attachments=number_of_attachments.get(card["id"], 0),
+                is_blocked=card["id"] in blocked_card_ids,
+                end_datetime=max(end_datetimes) if end_datetimes else card["creation_datetime"],
+                completion_datetime=completion_datetime,
+                time_in_lists=json.dumps(time_in_lists, sort_keys=True),
+                list_arrival_datetime=list_arrival_datetime
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0074_board_last_fetched_action'),
+        ('reports', '0014_auto_20170530_1448'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='completion_datetime',
+            field=models.DateTimeField(default=None, null=True, verbose_name='Completion datetime (only for done cards)'),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='end_datetime',
+            field=models.DateTimeField(default=None, null=True, verbose_name='Last arrival to a done list or last comment'),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='is_blocked',
+            field=models.BooleanField(default=False, verbose_name='Is there any other card that blocks this card?'),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='list_arrival_datetime',
+            field=models.DateTimeField(default=None, null=True, verbose_name='Arrival to the current list (if the time in that list is counted)'),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='number_of_attachments',
+            field=models.PositiveIntegerField(default=0, verbose_name='Number of attachments'),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='time_in_lists',
+            field=models.TextField(default='{}', verbose_name='Time (in seconds) this card has passed in each active list it has left (JSON)'),
+        ),
+        migrations.RunPython(compute_card_stats, migrations.RunPython.noop),
+    ]
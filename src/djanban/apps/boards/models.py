@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-import copy
+import json
 import re
 from datetime import timedelta
 from decimal import Decimal
@@ -16,11 +16,16 @@ from django.core.files.base import ContentFile
 from django.db import models, transaction
 from django.db.models import Avg, Sum, Min, Max, F
 from django.db.models.query_utils import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from isoweek import Week
 
-from djanban.apps.dev_times.models import DailySpentTime
-from djanban.apps.niko_niko_calendar.models import DailyMemberMood
+from djanban.apps.base.utils.intervals import date_interval_indices
+from djanban.apps.charts import dependencies
+from djanban.apps.charts.models import ChartDataVersion
+from djanban.apps.dev_times.models import DailySpentTime, DailySpentTimeRollup
+from djanban.apps.niko_niko_calendar.moods import MoodMatrix
 from djanban.apps.notifications.models import Notification
 from djanban.apps.reports.models import CardMovement, CardReview
 from djanban.remote_backends.factory import RemoteBackendConnectorFactory
@@ -62,6 +67,15 @@ class Board(models.Model):
 
     last_fetch_datetime = models.DateTimeField(verbose_name=u"Last fetch datetime", default=None, null=True)
 
+    # Newest action of the board in the last fetch. Next fetches will only fetch the changes made after it.
+    last_fetched_action_uuid = models.CharField(
+        max_length=128, verbose_name=u"External id of the last fetched action", default=None, null=True
+    )
+
+    last_fetched_action_datetime = models.DateTimeField(
+        verbose_name=u"Datetime of the last fetched action", default=None, null=True
+    )
+
     members = models.ManyToManyField("members.Member", verbose_name=u"Members", related_name="boards")
 
     percentage_of_completion = models.DecimalField(
@@ -123,6 +137,10 @@ class Board(models.Model):
     # External or source URL
     url = models.CharField(max_length=255, verbose_name=u"URL of the board", null=True, default=None)
 
+    # Number of times the cached charts of this board have been invalidated.
+    # It is part of the key of the charts in the chart caches.
+    cached_charts_version = models.PositiveIntegerField(verbose_name=u"Version of the cached charts", default=0)
+
     def __unicode__(self):
         return self.name
 
@@ -199,22 +217,38 @@ class Board(models.Model):
         return self.creation_datetime
 
     # Returns an hourly rate or None if this doesn't exist
-    def get_date_hourly_rate(self, date):
-        # Get all hourly rates
-        hourly_rates = self.hourly_rates.all()
-
-        # IF there are no hourly rates, return None
-        if hourly_rates.count() == 0:
-            return None
-
-        for hourly_rate in hourly_rates:
-            # If date is inside the interval defined by the dates of the hourly rate
-            # this hourly rate will be applied in this day
-            if (hourly_rate.end_date and hourly_rate.start_date <= date <= hourly_rate.end_date) or\
-                     date >= hourly_rate.start_date:
-                return hourly_rate
+    # Index of the hourly rates of this board by date
+    @property
+    def hourly_rate_index(self):
+        return date_interval_indices.get("hourly_rates", self.id, lambda: self.hourly_rates.all())
 
-        return None
+    # Hourly rate applied in a date (the first one whose interval contains the date) or None if there is none
+    def get_date_hourly_rate(self, date):
+        return self.hourly_rate_index.get(date)
+
+    # Update the rate amount of the daily spent times of this board according to its current hourly rates and
+    # rebuild the daily spent time rollups of this board (unless rebuild_rollups is False).
+    # There is an UPDATE for each date interval with the same hourly rate (and another one for the dates without
+    # hourly rate).
+    # Returns the number of updated daily spent times.
+    def update_rate_amounts(self, rebuild_rollups=True):
+        date_interval_indices.invalidate("hourly_rates", self.id)
+        num_updated_daily_spent_times = 0
+        with transaction.atomic():
+            segments_condition = Q(pk__in=[])
+            for start_date, end_date, hourly_rate in self.hourly_rate_index.segments:
+                segment_condition = Q(date__gte=start_date)
+                if end_date is not None:
+                    segment_condition &= Q(date__lte=end_date)
+                num_updated_daily_spent_times += self.daily_spent_times.filter(segment_condition).\
+                    update(rate_amount=F("spent_time") * hourly_rate.amount)
+                segments_condition |= segment_condition
+            num_updated_daily_spent_times += self.daily_spent_times.exclude(segments_condition).\
+                update(rate_amount=None)
+        # Rollups are not updated by the UPDATEs
+        if rebuild_rollups:
+            DailySpentTimeRollup.rebuild(board=self)
+        return num_updated_daily_spent_times
 
     # Is the board in downtime?
     @property
@@ -298,8 +332,12 @@ class Board(models.Model):
         if member:
             member_filter["member"] = member
 
-        if label:
-            daily_spent_times_filter["card__labels"] = label
+        # Daily spent time rollups are not grouped by label, so the daily spent times must be summed
+        if not label:
+            daily_spent_times_filter.update(member_filter)
+            return DailySpentTimeRollup.sum(attr, rollups=self.daily_spent_time_rollups, **daily_spent_times_filter)
+
+        daily_spent_times_filter["card__labels"] = label
 
         sum_time = self.daily_spent_times. \
             filter(**daily_spent_times_filter). \
@@ -319,13 +357,10 @@ class Board(models.Model):
         spent_time_on_week_filter = {"date__gte": start_date, "date__lte": end_date}
         if member:
             spent_time_on_week_filter["member"] = member
-        # Filter the daily spent times and sum their spent time
-        spent_time = self.daily_spent_times.filter(**spent_time_on_week_filter).aggregate(sum=Sum("spent_time"))["sum"]
-        # As usual, a None value means 0
-        if spent_time is None:
-            return 0
-        # Otherwise, return the sum of spent times for the given week
-        return spent_time
+        # Filter the daily spent time rollups and sum their spent time
+        return DailySpentTimeRollup.sum(
+            "spent_time", rollups=self.daily_spent_time_rollups, **spent_time_on_week_filter
+        )
 
     # Return the adjusted spent time on a given week of a year
     def get_weekly_adjusted_spent_time(self, week, year, member=None):
@@ -383,23 +418,18 @@ class Board(models.Model):
         end_working_month = end_working_date.month
         end_working_year = end_working_date.year
 
-        # Getting the spent time of that month for each member
-        adjusted_spent_time = 0
-        for member in self.members.filter(is_developer=True):
-            daily_spent_times = self.daily_spent_times.filter(
-                date__month=end_working_month,
-                date__year=end_working_year,
-                member=member
-            )
-            for daily_spent_time in daily_spent_times:
-                adjusted_spent_time += member.adjust_daily_spent_time(daily_spent_time, "spent_time")
-
-        return adjusted_spent_time
+        # Getting the adjusted spent time of that month of the developers
+        return DailySpentTimeRollup.sum(
+            "adjusted_spent_time", rollups=self.daily_spent_time_rollups,
+            date__month=end_working_month, date__year=end_working_year,
+            member__in=self.members.filter(is_developer=True)
+        )
 
     # Return spent time per week
     @property
     def spent_time_by_week(self):
-        return self.daily_spent_times.values('week_of_year').annotate(spent_time=Sum("spent_time")).order_by("week_of_year")
+        return self.daily_spent_time_rollups.values('week_of_year').\
+            annotate(spent_time=Sum("spent_time")).order_by("week_of_year")
 
     # Return the spent time on a given month of a year
     def get_monthly_spent_time(self, month, year, member=None):
@@ -413,10 +443,7 @@ class Board(models.Model):
         spent_time_on_week_filter = {"date__month": month, "date__year": year}
         if member:
             spent_time_on_week_filter["member"] = member
-        dev_time = self.daily_spent_times.filter(**spent_time_on_week_filter).aggregate(sum=Sum(attr))["sum"]
-        if dev_time is None:
-            return 0
-        return dev_time
+        return DailySpentTimeRollup.sum(attr, rollups=self.daily_spent_time_rollups, **spent_time_on_week_filter)
 
     # Returns the spent time.
     # If date parameter is present, computes the spent time on a given date for this board
@@ -433,10 +460,7 @@ class Board(models.Model):
         if member:
             daily_spent_times_filter["member"] = member
 
-        developed_value = self.daily_spent_times.filter(**daily_spent_times_filter).aggregate(sum=Sum("rate_amount"))["sum"]
-        if developed_value is None:
-            return 0
-        return developed_value
+        return DailySpentTimeRollup.sum("rate_amount", rollups=self.daily_spent_time_rollups, **daily_spent_times_filter)
 
     # Returns the adjusted developed value according to the spent time factor defined in each member
     def get_adjusted_developed_value(self, date=None, member=None):
@@ -448,18 +472,12 @@ class Board(models.Model):
             else:
                 daily_spent_times_filter["date"] = date
 
-        adjusted_developed_value = 0
         if member:
             daily_spent_times_filter["member"] = member
 
-        daily_spent_times = self.daily_spent_times.filter(**daily_spent_times_filter)
-        member_dict = {}
-        for daily_spent_time in daily_spent_times:
-            if daily_spent_time.member_id not in member_dict:
-                member_dict[daily_spent_time.member_id] = daily_spent_time.member
-            member = member_dict[daily_spent_time.member_id]
-            adjusted_developed_value += member.adjust_daily_spent_time(daily_spent_time, "rate_amount")
-        return adjusted_developed_value
+        return DailySpentTimeRollup.sum(
+            "adjusted_rate_amount", rollups=self.daily_spent_time_rollups, **daily_spent_times_filter
+        )
 
     # Informs what is the first day the team worked in this project
     def get_working_start_date(self):
@@ -523,35 +541,13 @@ class Board(models.Model):
         members = self.members.filter(is_developer=False)
 
         start_date = self.get_working_start_date()
-        end_date = self.get_working_start_date()
+        end_date = self.get_working_end_date()
         # In case there is no working start date or working start date, it is impossible
         # to compute the mood vale, so we return None
         if start_date is None or end_date is None:
             return None
 
-        date_i = copy.deepcopy(start_date)
-
-        for member in members:
-            member.moods = []
-
-        while date_i <= end_date:
-            for member in members:
-                try:
-                    member_mood_value = member.daily_member_moods.get(date=date_i).mood_value
-                    member.moods.append(member_mood_value)
-                except DailyMemberMood.DoesNotExist:
-                    pass
-            date_i += timedelta(days=1)
-
-        member_mood = []
-        for member in members:
-            if len(member.moods) > 0:
-                member_mood.append(numpy.mean(member.moods))
-
-        if len(member_mood) > 0:
-            self.last_mood_value = numpy.mean(member_mood)
-        else:
-            self.last_mood_value = 0
+        self.last_mood_value = MoodMatrix(members, start_date, end_date).mean()
 
         self.last_time_mood_was_computed = timezone.now()
         self.save()
@@ -607,6 +603,16 @@ class Board(models.Model):
     # Delete all cached charts of this board
     def clean_cached_charts(self):
         self.cached_charts.all().update(is_expired=True)
+        self.increment_cached_charts_version()
+
+    # Invalidate the cached charts of this board that depend on some data domains (see charts.dependencies)
+    def invalidate_cached_charts(self, *domains):
+        ChartDataVersion.increment(self, domains)
+
+    # Make all the charts of this board stored in the chart caches unreachable
+    def increment_cached_charts_version(self):
+        Board.objects.filter(id=self.id).update(cached_charts_version=F("cached_charts_version") + 1)
+        self.cached_charts_version += 1
 
     # Save this board:
     # Assigns a new public_access_code if is not present
@@ -701,18 +707,63 @@ class Card(models.Model):
     lead_time = models.DecimalField(verbose_name=u"Cycle time", decimal_places=4, max_digits=12, default=None,
                                     null=True)
 
+    # Stats computed from the attachments, blocking cards, movements and comments of the card.
+    # They are only stored by update_stats (see boards.card_stats).
+    number_of_attachments = models.PositiveIntegerField(verbose_name=u"Number of attachments", default=0)
+    is_blocked = models.BooleanField(verbose_name=u"Is there any other card that blocks this card?", default=False)
+    end_datetime = models.DateTimeField(
+        verbose_name=u"Last arrival to a done list or last comment", default=None, null=True
+    )
+    completion_datetime = models.DateTimeField(
+        verbose_name=u"Completion datetime (only for done cards)", default=None, null=True
+    )
+    time_in_lists = models.TextField(
+        verbose_name=u"Time (in seconds) this card has passed in each active list it has left (JSON)", default="{}"
+    )
+    list_arrival_datetime = models.DateTimeField(
+        verbose_name=u"Arrival to the current list (if the time in that list is counted)", default=None, null=True
+    )
+
     valuation_comment = models.OneToOneField("boards.CardComment", related_name="valued_card",
                                              blank=True, default=None, null=True)
     labels = models.ManyToManyField("boards.Label", related_name="cards")
     members = models.ManyToManyField("members.Member", related_name="cards")
     blocking_cards = models.ManyToManyField("boards.card", related_name="blocked_cards")
 
+    # Stats stored in the card (see update_stats)
+    STATS_FIELDS = (
+        "number_of_attachments", "is_blocked", "end_datetime", "completion_datetime", "time_in_lists",
+        "list_arrival_datetime"
+    )
+
+    # The list of the card is kept to know if the stats that depend on it must be updated when saving the card
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Card, cls).from_db(db, field_names, values)
+        instance._loaded_list_id = instance.__dict__.get("list_id")
+        return instance
+
+    # Save this card.
+    # Stats of loaded cards are not saved, so saving a card whose stats have been updated after it was loaded
+    # does not overwrite them.
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get("update_fields") is None and\
+                not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in Card.STATS_FIELDS
+            ]
+        super(Card, self).save(*args, **kwargs)
+
+    # Compute again the stats of this card (all of them or only the passed ones) and store them
+    def update_stats(self, stats=None):
+        from djanban.apps.boards.card_stats import ALL_STATS, CardStats
+        CardStats([self.id], stats=stats or ALL_STATS).update(cards=[self])
+
     def get_lead_time(self):
         if not self.is_done:
             return None
-        creation_datetime = self.creation_datetime
-        completion_datetime = self.completion_datetime
-        time_diff = (completion_datetime - creation_datetime)
+        time_diff = (self.completion_datetime - self.creation_datetime)
         return time_diff.total_seconds() / 3600.0
 
     def get_cycle_time(self):
@@ -723,8 +774,7 @@ class Card(models.Model):
                 self.movements.filter(destination_list__type="development").order_by("datetime")[0].datetime
         except IndexError:
             start_development_datetime = self.creation_datetime
-        completion_datetime = self.completion_datetime
-        time_diff = (completion_datetime - start_development_datetime)
+        time_diff = (self.completion_datetime - start_development_datetime)
         return time_diff.total_seconds() / 3600.0
 
     # Get the spent time for this card
@@ -773,54 +823,28 @@ class Card(models.Model):
             return self.movements.filter(type="forward").order_by("datetime")[0].source_list
         return None
 
-    # Get the time this card has passed in each list
+    # Get the time this card has passed in each active list where it has been
     # Returns a dict with pairs list_id, time this card has passed in that list (in seconds)
     @property
     def time_in_each_list(self):
+        # Time in the active lists this card has left
+        time_by_list = {int(list_id): time_in_list for list_id, time_in_list in json.loads(self.time_in_lists).items()}
 
-        time_by_list = {list_.id: 0 for list_ in self.board.active_lists.all()}
-
-        movements = self.movements.order_by("datetime")
-
-        card_last_action_datetime = self.creation_datetime
-
-        #  If there are no changes in the card, all its life has been in its creation list
-        if not movements.exists():
-            card_life_time = (timezone.now() - card_last_action_datetime).total_seconds()
-            time_by_list[self.list_id] += card_life_time
-
-        else:
-            # Changes in card are ordered to get the dates in order
-            last_list = None
-
-            # For each arrival to a list, its datetime will be used to compute the time this card is in
-            # that destination list
-            for movement in movements:
-
-                time_from_last_list_change = (movement.datetime - card_last_action_datetime).total_seconds()
-                time_by_list[movement.source_list_id] += time_from_last_list_change
-
-                # Our last action has been this movement
-                card_last_action_datetime = movement.datetime
-
-                # Store the last list
-                last_list = movement.destination_list
-
-            # Adding the number of seconds the card has been in its last column (until now)
-            # only if the last column is not "Done" column
-            if last_list.type != "done":
-                time_card_has_spent_in_list_until_now = (timezone.now() - card_last_action_datetime).total_seconds()
-                time_by_list[last_list.id] += time_card_has_spent_in_list_until_now\
+        # Adding the number of seconds the card has been in its current list (until now)
+        # only if that list is an active list that is not a "Done" list (or the card has not been moved)
+        if self.list_arrival_datetime is not None:
+            time_by_list[self.list_id] = time_by_list.get(self.list_id, 0) + \
+                (timezone.now() - self.list_arrival_datetime).total_seconds()
 
         return time_by_list
 
     @property
     def time_in_each_list_type(self):
-        list_type_by_id = {list_.id: list_.type for list_ in self.board.active_lists.all()}
         time_by_list_type = {list_type: 0 for list_type in List.LIST_TYPES}
         time_by_list = self.time_in_each_list
-        for list_id, time_in_list in time_by_list.items():
-            time_by_list_type[list_type_by_id[list_id]] +=time_in_list
+        if time_by_list:
+            for list_id, list_type in List.objects.filter(id__in=time_by_list.keys()).values_list("id", "type"):
+                time_by_list_type[list_type] += time_by_list[list_id]
         return time_by_list_type
 
     @property
@@ -858,23 +882,6 @@ class Card(models.Model):
             return first_arrival_to_in_development_datetime
         return self.creation_datetime
 
-    @property
-    def end_datetime(self):
-        last_arrival_to_done_datetime = self.movements.filter(destination_list__type="done").aggregate(max=Max("datetime"))["max"]
-        last_comment_datetime = self.comments.aggregate(max=Max("creation_datetime"))["max"]
-        if last_arrival_to_done_datetime and last_comment_datetime:
-            return max(last_arrival_to_done_datetime, last_comment_datetime)
-        elif last_arrival_to_done_datetime:
-            return last_arrival_to_done_datetime
-        elif last_comment_datetime:
-            return last_comment_datetime
-        return self.creation_datetime
-
-    # Is there any other card that blocks this card?
-    @property
-    def is_blocked(self):
-        return self.blocking_cards.exclude(list__type="done").exists()
-
     # Cards that are blocking this card and are not done
     @property
     def pending_blocking_cards(self):
@@ -895,21 +902,6 @@ class Card(models.Model):
     def backward_movements(self):
         return self.movements.filter(type="backward")
 
-    # Number of attachments
-    @property
-    def number_of_attachments(self):
-        return self.attachments.all().count()
-
-    @property
-    def completion_datetime(self):
-        if self.list.type != "done":
-            raise ValueError(u"This card is not completed")
-        try:
-            return self.movements.filter(destination_list__type="done").order_by("-id")[0].datetime
-        # In case this card is added directly in the "done" list
-        except IndexError:
-            return self.last_activity_datetime
-
     # Update cycle/lead cached time according to movements of this card
     def update_lead_cycle_time(self):
         self.lead_time = self.get_lead_time()
@@ -985,8 +977,8 @@ class Card(models.Model):
         # Notify the movement to members
         Notification.move_card(mover=member, card=self, board=self.board)
 
-        # Delete all cached charts for this board
-        self.board.clean_cached_charts()
+        # Invalidate the cached charts that depend on the lists of the cards
+        self.board.invalidate_cached_charts(dependencies.MOVEMENTS)
 
     # Change the order of this card in the same list it currently is
     @transaction.atomic
@@ -1009,10 +1001,10 @@ class Card(models.Model):
             if value is not None:
                 self.due_datetime = value
                 self.save()
-                connector.set_due_datetime(self, member)
+                connector.set_card_due_datetime(card=self)
             else:
                 self.due_datetime = None
-                self.remove_due_datetime(self, member)
+                connector.remove_card_due_datetime(card=self)
 
         elif attribute == "value":
             self.change_value(member, value)
@@ -1097,8 +1089,8 @@ class Card(models.Model):
 
         comment = self.add_comment(member, comment_content)
 
-        # Delete all cached charts for this board
-        self.board.clean_cached_charts()
+        # Invalidate the cached charts that depend on spent times
+        self.board.invalidate_cached_charts(dependencies.SPENT_TIMES, dependencies.CARDS)
 
     # Add a new blocking card to this card
     @transaction.atomic
@@ -1235,8 +1227,8 @@ class Card(models.Model):
         self.number_of_words_in_comments += len(re.split(r"\s+", content))
         self.save()
 
-        # Delete all cached charts for this board
-        self.board.clean_cached_charts()
+        # Invalidate the cached charts that depend on comments
+        self.board.invalidate_cached_charts(*dependencies.COMMENT_DOMAINS)
 
         # Returning the comment because it can be needed
         return card_comment
@@ -1266,8 +1258,8 @@ class Card(models.Model):
         self.number_of_words_in_comments += len(re.split(r"\s+", new_content))
         self.save()
 
-        # Delete all cached charts for this board
-        self.board.clean_cached_charts()
+        # Invalidate the cached charts that depend on comments
+        self.board.invalidate_cached_charts(*dependencies.COMMENT_DOMAINS)
 
         # Returning the comment because it can be needed
         return comment
@@ -1289,8 +1281,8 @@ class Card(models.Model):
         self.number_of_words_in_comments -= len(re.split(r"\s+", comment.content))
         self.save()
 
-        # Delete all cached charts for this board
-        self.board.clean_cached_charts()
+        # Invalidate the cached charts that depend on comments
+        self.board.invalidate_cached_charts(*dependencies.COMMENT_DOMAINS)
 
     # Update labels of the card
     @transaction.atomic
@@ -1310,8 +1302,8 @@ class Card(models.Model):
                 self.labels.remove(card_label)
                 connector.remove_label_of_card(card=self, label=card_label)
 
-        # Delete all cached charts for this board
-        self.board.clean_cached_charts()
+        # Invalidate the cached charts that depend on labels
+        self.board.invalidate_cached_charts(dependencies.LABELS)
 
     # Update members of the card
     @transaction.atomic
@@ -1331,8 +1323,8 @@ class Card(models.Model):
                 self.members.remove(member_i)
                 connector.remove_member_of_card(card=self, member_to_remove=member_i)
 
-        # Delete all cached charts for this board
-        self.board.clean_cached_charts()
+        # Invalidate the cached charts that depend on members
+        self.board.invalidate_cached_charts(dependencies.MEMBERS)
 
     # Updates the number of movements of this card
     def update_movement_count(self, commit=True):
@@ -1563,10 +1555,10 @@ class CardComment(models.Model):
     # Card comment saving
     def save(self, *args, **kwargs):
         card = self.card
-        earlier_card_comment_exists = card.comments.filter(uuid=self.uuid).exists()
+        earlier_card_comment = card.comments.filter(uuid=self.uuid).first()
+        earlier_card_comment_exists = earlier_card_comment is not None
 
         if earlier_card_comment_exists:
-            earlier_card_comment = card.comments.get(uuid=self.uuid)
             self._save_old(card, earlier_card_comment)
         else:
             self._save_new(card)
@@ -1791,6 +1783,14 @@ class List(models.Model):
                                             help_text=u"Maximum number of cards that should be in this list",
                                             default=None, null=True, blank=True)
 
+    # The type of the list is kept to know if the stats of the cards that depend on it must be updated when saving
+    # the list
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(List, cls).from_db(db, field_names, values)
+        instance._loaded_type = instance.__dict__.get("type")
+        return instance
+
     # Adds a new card
     @transaction.atomic
     def add_card(self, member, name, description="", position="bottom", parent_recurrent_card=None):
@@ -1816,7 +1816,7 @@ class List(models.Model):
         self.save()
 
         connector = RemoteBackendConnectorFactory.factory(member)
-        connector.move_list(list=self, position=position)
+        connector.move_list(list_=self, position=position)
 
     # Moves all cards to other list (destination_list)
     @transaction.atomic
@@ -1994,3 +1994,114 @@ class CardLabelRelationship(models.Model):
             labels_by_card[card_label_relationship.card_id].append(label)
 
         return labels_by_card
+
+
+# Remove the index of the hourly rates of the boards whose hourly rates change
+@receiver(m2m_changed, sender=Board.hourly_rates.through)
+def invalidate_hourly_rate_index_on_change(sender, instance, **kwargs):
+    if isinstance(instance, Board):
+        date_interval_indices.invalidate("hourly_rates", instance.id)
+    else:
+        date_interval_indices.invalidate("hourly_rates")
+
+
+# New boards have no hourly rates (even if a deleted board had their id)
+@receiver(post_save, sender=Board)
+def invalidate_hourly_rate_index_on_creation(sender, instance, created, **kwargs):
+    if created:
+        date_interval_indices.invalidate("hourly_rates", instance.id)
+
+
+# Update the stats of the card of an attachment, movement or comment.
+# If the card object of the instance has been loaded, its stats are also updated in that object.
+# Only the stats that have changed are stored, so when a card is deleted with its attachments, movements and
+# comments, its stats are only read again (and not stored) if they have not changed.
+def _update_related_card_stats(instance, stats):
+    from djanban.apps.boards.card_stats import CardStats
+    card = getattr(instance, instance.__class__.card.cache_name, None)
+    CardStats([instance.card_id], stats=stats).update(cards=[card] if card is not None else [])
+
+
+# Update the number of attachments of a card when an attachment is created or deleted
+@receiver(post_save, sender=CardAttachment)
+@receiver(post_delete, sender=CardAttachment)
+def update_card_stats_on_attachment_change(sender, instance, **kwargs):
+    if kwargs.get("created", True):
+        _update_related_card_stats(instance, stats=("number_of_attachments",))
+
+
+# Update the stats that depend on the movements of a card when a movement is created, changed or deleted
+@receiver(post_save, sender=CardMovement)
+@receiver(post_delete, sender=CardMovement)
+def update_card_stats_on_movement_change(sender, instance, **kwargs):
+    from djanban.apps.boards.card_stats import MOVEMENT_STATS
+    _update_related_card_stats(instance, stats=MOVEMENT_STATS)
+
+
+# Update the end datetime of a card when a comment is created, changed or deleted
+@receiver(post_save, sender=CardComment)
+@receiver(post_delete, sender=CardComment)
+def update_card_stats_on_comment_change(sender, instance, **kwargs):
+    _update_related_card_stats(instance, stats=("end_datetime",))
+
+
+# Update the blocking status of the cards whose blocking cards change
+@receiver(m2m_changed, sender=Card.blocking_cards.through)
+def update_card_stats_on_blocking_card_change(sender, instance, action, reverse, pk_set, **kwargs):
+    from djanban.apps.boards.card_stats import CardStats
+    if action == "pre_clear" and reverse:
+        instance._cleared_blocked_card_ids = list(instance.blocked_cards.values_list("id", flat=True))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            CardStats([instance.id], stats=("is_blocked",)).update(cards=[instance])
+        elif action == "post_clear":
+            CardStats(instance._cleared_blocked_card_ids, stats=("is_blocked",)).update()
+        else:
+            CardStats(pk_set, stats=("is_blocked",)).update()
+
+
+# Update the stats of new cards and the stats that depend on the type of the list of the cards whose list changes
+# (completion and list arrival datetimes, and the blocking status of the cards they block).
+# Note the movement of a card is stored before changing its list (see Card.move), so these stats must be computed
+# again here.
+@receiver(post_save, sender=Card)
+def update_card_stats_on_save(sender, instance, created, **kwargs):
+    from djanban.apps.boards.card_stats import CardStats
+    list_id = instance.__dict__.get("list_id")
+    if created:
+        instance.update_stats()
+    elif list_id != getattr(instance, "_loaded_list_id", list_id):
+        instance.update_stats(stats=("completion_datetime", "list_arrival_datetime"))
+        CardStats(list(instance.blocked_cards.values_list("id", flat=True)), stats=("is_blocked",)).update()
+    instance._loaded_list_id = list_id
+
+
+# Update the stats of the cards that depend on the type of a list when it changes: the cards of the list, the cards
+# they block and the cards that have been moved from or to the list
+@receiver(post_save, sender=List)
+def update_card_stats_on_list_type_change(sender, instance, created, **kwargs):
+    from djanban.apps.boards.card_stats import CardStats
+    list_type = instance.__dict__.get("type")
+    if not created and list_type != getattr(instance, "_loaded_type", list_type):
+        card_ids = set(instance.cards.values_list("id", flat=True))
+        card_ids.update(Card.blocking_cards.through.objects.filter(to_card_id__in=list(card_ids)).
+                        values_list("from_card_id", flat=True))
+        card_ids.update(CardMovement.objects.filter(Q(source_list=instance) | Q(destination_list=instance)).
+                        values_list("card_id", flat=True))
+        CardStats(card_ids).update()
+    instance._loaded_type = list_type
+
+
+# The cards blocked by a card are kept before deleting it because their blocking status could change
+@receiver(pre_delete, sender=Card)
+def keep_blocked_cards_on_delete(sender, instance, **kwargs):
+    instance._deleted_blocked_card_ids = list(instance.blocked_cards.values_list("id", flat=True))
+
+
+# Update the blocking status of the cards that were blocked by a deleted card
+@receiver(post_delete, sender=Card)
+def update_card_stats_on_delete(sender, instance, **kwargs):
+    from djanban.apps.boards.card_stats import CardStats
+    blocked_card_ids = getattr(instance, "_deleted_blocked_card_ids", None)
+    if blocked_card_ids:
+        CardStats(blocked_card_ids, stats=("is_blocked",)).update()
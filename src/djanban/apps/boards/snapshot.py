@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from crequest.middleware import CrequestMiddleware
+from django.db.models import Q
+
+from djanban.apps.boards.models import CardLabelRelationship, CardMemberRelationship
+from djanban.apps.members.models import Member
+
+
+# Lists, labels, members and active cards of a board.
+# Each part of the snapshot is loaded with a fixed number of queries (that does not depend on the size of the
+# board) the first time it is used and kept while the snapshot lives, so views, serializers and template tags
+# that use the same snapshot do not query again for the same objects. Use get_board_snapshot to share a snapshot
+# in the current request.
+class BoardSnapshot(object):
+
+    def __init__(self, board):
+        self.board = board
+        self._lists = None
+        self._labels = None
+        self._members = None
+        self._active_cards = None
+        self._member_ids_by_card = None
+        self._label_ids_by_card = None
+        self._card_members_by_id = None
+
+    # Lists of the board ordered by position (1 query)
+    @property
+    def lists(self):
+        if self._lists is None:
+            self._lists = list(self.board.lists.all().order_by("position"))
+        return self._lists
+
+    # Lists of the board that are not closed nor ignored, ordered by position
+    @property
+    def active_lists(self):
+        return [list_ for list_ in self.lists if list_.type not in ("closed", "ignored")]
+
+    # Informs if this board is ready to be fetched (it has done and development lists)
+    @property
+    def is_ready(self):
+        list_types = {list_.type for list_ in self.lists}
+        return "done" in list_types and "development" in list_types
+
+    # Labels of the board ordered by name (1 query)
+    @property
+    def labels(self):
+        if self._labels is None:
+            self._labels = list(self.board.labels.all().order_by("name"))
+        return self._labels
+
+    # Labels of the board that have a name
+    @property
+    def named_labels(self):
+        return [label for label in self.labels if label.name != ""]
+
+    @property
+    def label_ids(self):
+        return {label.id for label in self.labels}
+
+    # Members of the board ordered by id, with their users, trello profiles and roles (2 queries)
+    @property
+    def members(self):
+        if self._members is None:
+            self._members = list(
+                self.board.members.select_related("user", "trello_member_profile").prefetch_related("roles").
+                order_by("id")
+            )
+        return self._members
+
+    # Cards of the board that are not in closed or ignored lists, ordered by list and position (1 query)
+    @property
+    def active_cards(self):
+        if self._active_cards is None:
+            self._active_cards = list(
+                self.board.cards.exclude(Q(list__type="closed") | Q(list__type="ignored")).order_by("list", "position")
+            )
+        return self._active_cards
+
+    # Active cards of each active list
+    @property
+    def active_cards_by_list(self):
+        active_cards_by_list = {list_.id: [] for list_ in self.active_lists}
+        for card in self.active_cards:
+            active_cards_by_list[card.list_id].append(card)
+        return active_cards_by_list
+
+    # Ids of the members of each card of the board (1 query)
+    @property
+    def member_ids_by_card(self):
+        if self._member_ids_by_card is None:
+            self._member_ids_by_card = BoardSnapshot._get_ids_by_card(
+                CardMemberRelationship.objects.filter(card__board=self.board).order_by("id").
+                values_list("card_id", "member_id")
+            )
+        return self._member_ids_by_card
+
+    # Ids of the labels of each card of the board (1 query)
+    @property
+    def label_ids_by_card(self):
+        if self._label_ids_by_card is None:
+            self._label_ids_by_card = BoardSnapshot._get_ids_by_card(
+                CardLabelRelationship.objects.filter(card__board=self.board).order_by("id").
+                values_list("card_id", "label_id")
+            )
+        return self._label_ids_by_card
+
+    # Members of each card of the board.
+    # Cards can have members that are no longer members of the board. They are read in one additional query.
+    @property
+    def members_by_card(self):
+        if self._card_members_by_id is None:
+            self._card_members_by_id = {member.id: member for member in self.members}
+            missing_member_ids = {
+                member_id
+                for member_ids in self.member_ids_by_card.values() for member_id in member_ids
+                if member_id not in self._card_members_by_id
+            }
+            if missing_member_ids:
+                missing_members = Member.objects.filter(id__in=missing_member_ids).\
+                    select_related("user", "trello_member_profile").prefetch_related("roles")
+                self._card_members_by_id.update({member.id: member for member in missing_members})
+        return {
+            card_id: [self._card_members_by_id[member_id] for member_id in member_ids]
+            for card_id, member_ids in self.member_ids_by_card.items()
+        }
+
+    # Labels of each card of the board
+    @property
+    def labels_by_card(self):
+        labels_by_id = {label.id: label for label in self.labels}
+        return {
+            card_id: [labels_by_id[label_id] for label_id in label_ids]
+            for card_id, label_ids in self.label_ids_by_card.items()
+        }
+
+    @staticmethod
+    def _get_ids_by_card(relationships):
+        ids_by_card = {}
+        for card_id, related_id in relationships:
+            ids_by_card.setdefault(card_id, []).append(related_id)
+        return ids_by_card
+
+
+# Return the snapshot of a board for the current request.
+# The snapshot is memoized in the request, so every caller in the same request shares it. Requests that are not
+# safe (POST, PUT, DELETE...) can change the board, so they get a new snapshot each time.
+# If there is no current request (e.g. management commands), a new snapshot is returned.
+def get_board_snapshot(board, request=None):
+    if request is None:
+        request = CrequestMiddleware.get_request()
+
+    if request is None or request.method not in ("GET", "HEAD"):
+        return BoardSnapshot(board)
+
+    if not hasattr(request, "board_snapshots"):
+        request.board_snapshots = {}
+    if board.id not in request.board_snapshots:
+        request.board_snapshots[board.id] = BoardSnapshot(board)
+    return request.board_snapshots[board.id]
@@ -6,6 +6,7 @@ from crequest.middleware import CrequestMiddleware
 
 from djanban.apps.base.auth import get_user_boards
 from djanban.apps.boards.models import CardComment, List
+from djanban.apps.boards.snapshot import get_board_snapshot
 
 register = template.Library()
 
@@ -22,6 +23,12 @@ def last_comments(number_of_comments=10):
     return CardComment.objects.none()
 
 
+# Return the snapshot of a board shared by the current request
+@register.assignment_tag
+def board_snapshot(board):
+    return get_board_snapshot(board)
+
+
 # Custom filter to get the list type name
 # Return the name of the list type passed as parameter
 def get_list_type_name(list_type):
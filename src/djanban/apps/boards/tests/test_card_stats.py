@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_delete
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from djanban.apps.boards.card_stats import CardStats
+from djanban.apps.boards.models import Board, Card, CardAttachment, CardComment, List
+from djanban.apps.members.models import Member
+from djanban.apps.reports.models import CardMovement
+
+
+# Test of the stats stored in the cards
+class CardStatsTest(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        user = get_user_model().objects.create_user("stats")
+        self.member = Member.objects.create(user=user, is_developer=True)
+        self.board = Board.objects.create(
+            creator=self.member, name="Board name", description="board description", comments="board comments",
+            uuid="stats-board", last_activity_datetime=self.now
+        )
+        self.lists = {
+            list_type: List.objects.create(board=self.board, name=list_type, uuid="list-{0}".format(list_type),
+                                           type=list_type, position=position)
+            for position, list_type in enumerate(("ready_to_develop", "development", "done"))
+        }
+        self.created = self.now - timedelta(days=10)
+        self.cards = [
+            Card.objects.create(
+                board=self.board, list=self.lists["ready_to_develop"], uuid="card-{0}".format(position),
+                name="Card {0}".format(position), description="", position=position,
+                url="https://trello.com/c/{0}".format(position), short_url="https://trello.com/{0}".format(position),
+                creation_datetime=self.created, last_activity_datetime=self.created
+            )
+            for position in range(0, 2)
+        ]
+
+    def _move(self, card, list_type, datetime):
+        CardMovement.objects.create(board=self.board, card=card, type="forward", source_list=card.list,
+                                    destination_list=self.lists[list_type], datetime=datetime)
+        card.list = self.lists[list_type]
+        card.save()
+
+    # Stats are updated when the attachments, blocking cards, movements and comments of the cards change
+    def test_incremental_maintenance(self):
+        card, blocking_card = self.cards
+        self.assertEqual(card.end_datetime, self.created)
+        self.assertEqual(card.list_arrival_datetime, self.created)
+
+        CardAttachment.objects.create(card=card, uuid="attachment", uploader=self.member,
+                                      creation_datetime=self.now)
+        card.blocking_cards.add(blocking_card)
+        self.assertEqual(card.number_of_attachments, 1)
+        self.assertTrue(card.is_blocked)
+
+        self._move(card, "development", self.created + timedelta(days=1))
+        self._move(blocking_card, "done", self.created + timedelta(days=2))
+        CardComment.objects.create(uuid="comment", board=self.board, card=card, author=self.member,
+                                   content="Comment", creation_datetime=self.created + timedelta(days=3))
+
+        card = Card.objects.get(id=card.id)
+        blocking_card = Card.objects.get(id=blocking_card.id)
+        self.assertFalse(card.is_blocked)
+        self.assertEqual(card.end_datetime, self.created + timedelta(days=3))
+        self.assertIsNone(card.completion_datetime)
+        self.assertEqual(blocking_card.completion_datetime, self.created + timedelta(days=2))
+        self.assertIsNone(blocking_card.list_arrival_datetime)
+
+        # Only the time in lists that are not done lists is counted until now
+        time_in_each_list = card.time_in_each_list
+        self.assertEqual(time_in_each_list[self.lists["ready_to_develop"].id], timedelta(days=1).total_seconds())
+        self.assertAlmostEqual(time_in_each_list[self.lists["development"].id], timedelta(days=9).total_seconds(),
+                               delta=60)
+        self.assertEqual(blocking_card.time_in_each_list,
+                         {self.lists["ready_to_develop"].id: timedelta(days=2).total_seconds()})
+        self.assertEqual(blocking_card.time_in_each_list_type["ready_to_develop"], timedelta(days=2).total_seconds())
+
+        # Loaded cards do not overwrite the stats when they are saved
+        card.name = "Card"
+        card.attachments.all().delete()
+        card.save()
+        self.assertEqual(Card.objects.get(id=card.id).number_of_attachments, 0)
+        self.assertEqual(CardStats(Card.objects.values_list("id", flat=True)).inconsistent_card_ids, [])
+
+    # Stats that depend on the type of a list are updated when it changes
+    def test_list_type_change(self):
+        card, blocking_card = self.cards
+        card.blocking_cards.add(blocking_card)
+        self._move(blocking_card, "development", self.created + timedelta(days=1))
+
+        development_list = List.objects.get(id=self.lists["development"].id)
+        development_list.type = "done"
+        development_list.save()
+        self.assertFalse(Card.objects.get(id=card.id).is_blocked)
+        blocking_card = Card.objects.get(id=blocking_card.id)
+        self.assertEqual(blocking_card.completion_datetime, self.created + timedelta(days=1))
+        self.assertIsNone(blocking_card.list_arrival_datetime)
+        self.assertEqual(CardStats(Card.objects.values_list("id", flat=True)).inconsistent_card_ids, [])
+
+    # Time in a list is only counted if the list is active, also when cards are moved from or to non-active lists
+    def test_move_from_and_to_non_active_lists(self):
+        ignored_list = List.objects.create(board=self.board, name="ignored", uuid="list-ignored", type="ignored",
+                                           position=-1)
+        closed_list = List.objects.create(board=self.board, name="closed", uuid="list-closed", type="closed",
+                                          position=3)
+        card = self.cards[0]
+        card.list = ignored_list
+        card.save()
+        card = Card.objects.get(id=card.id)
+        self.assertIsNone(card.list_arrival_datetime)
+
+        card.move(self.member, self.lists["development"], local_move_only=True)
+        card = Card.objects.get(id=card.id)
+        self.assertIsNotNone(card.list_arrival_datetime)
+        self.assertEqual(CardStats([card.id]).inconsistent_card_ids, [])
+
+        card.move(self.member, closed_list, local_move_only=True)
+        card = Card.objects.get(id=card.id)
+        self.assertIsNone(card.list_arrival_datetime)
+        self.assertIn(self.lists["development"].id, card.time_in_each_list)
+        self.assertEqual(CardStats([card.id]).inconsistent_card_ids, [])
+
+    # Stats of a card are still updated after an aborted deletion of the card, and deleted cards unblock their cards
+    def test_card_deletion(self):
+        card, blocking_card = self.cards
+        card.blocking_cards.add(blocking_card)
+        CardAttachment.objects.create(card=card, uuid="attachment", uploader=self.member, creation_datetime=self.now)
+        # The deletion is aborted after the attachments of the card have been deleted
+        def abort_deletion(sender, instance, **kwargs):
+            raise DatabaseError("Aborted deletion")
+        post_delete.connect(abort_deletion, sender=CardAttachment)
+        try:
+            with transaction.atomic():
+                Card.objects.get(id=card.id).delete()
+        except DatabaseError:
+            pass
+        finally:
+            post_delete.disconnect(abort_deletion, sender=CardAttachment)
+
+        CardAttachment.objects.get(uuid="attachment").delete()
+        self.assertEqual(Card.objects.get(id=card.id).number_of_attachments, 0)
+
+        Card.objects.get(id=blocking_card.id).delete()
+        self.assertFalse(Card.objects.get(id=card.id).is_blocked)
+        self.assertEqual(CardStats(Card.objects.values_list("id", flat=True)).inconsistent_card_ids, [])
+
+    # Inconsistent stats are reported and fixed by the check command
+    def test_check_command(self):
+        Card.objects.filter(id=self.cards[0].id).update(number_of_attachments=3, is_blocked=True)
+        stdout = StringIO()
+        call_command("check_card_stats", stdout=stdout)
+        self.assertIn("1 card(s) of Board name have inconsistent stats: {0}".format(self.cards[0].id),
+                      stdout.getvalue())
+
+        call_command("check_card_stats", self.board.id, fix=True, stdout=StringIO())
+        card = Card.objects.get(id=self.cards[0].id)
+        self.assertEqual((card.number_of_attachments, card.is_blocked), (0, False))
+        stdout = StringIO()
+        call_command("check_card_stats", stdout=stdout)
+        self.assertIn("Stats of all cards are consistent", stdout.getvalue())
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from djanban.apps.boards.gantt import GanttChart
+from djanban.apps.boards.models import Board, Card, CardComment, List
+from djanban.apps.members.models import Member, TrelloMemberProfile
+from djanban.apps.reports.models import CardMovement
+
+
+# Test of the gantt chart of a board
+class GanttChartTest(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.members = []
+        for username in ("gantt1", "gantt2"):
+            user = get_user_model().objects.create_user(username)
+            member = Member.objects.create(user=user, is_developer=True)
+            TrelloMemberProfile.objects.create(member=member, trello_id=username, username=username, initials="g")
+            self.members.append(member)
+        self.board = Board.objects.create(
+            creator=self.members[0], name="Board name", description="board description", comments="board comments",
+            uuid="gantt-board", last_activity_datetime=self.now
+        )
+        self.lists = {
+            list_type: List.objects.create(board=self.board, name=list_type, uuid="list-{0}".format(list_type),
+                                           type=list_type, position=position)
+            for position, list_type in enumerate(("ready_to_develop", "development", "done"))
+        }
+
+    def _create_card(self, position, list_type, creation_datetime, members):
+        card = Card.objects.create(
+            board=self.board, list=self.lists[list_type], uuid="card-{0}".format(position),
+            name="Card {0}".format(position), description="Line 1\nLine 2", position=position,
+            url="https://trello.com/c/{0}".format(position), short_url="https://trello.com/{0}".format(position),
+            creation_datetime=creation_datetime, last_activity_datetime=creation_datetime
+        )
+        card.members.add(*members)
+        return card
+
+    def _create_movement(self, card, list_type, datetime):
+        CardMovement.objects.create(board=self.board, card=card, type="forward",
+                                    destination_list=self.lists[list_type], datetime=datetime)
+
+    # Tasks are the same as the ones got from the properties of each card
+    def test_tasks(self):
+        created = self.now - timedelta(days=10)
+        blocking_card = self._create_card(1, "done", created, self.members)
+        self._create_movement(blocking_card, "development", created + timedelta(days=1))
+        self._create_movement(blocking_card, "done", created + timedelta(days=3))
+        CardComment.objects.create(uuid="comment-1", board=self.board, card=blocking_card, author=self.members[0],
+                                   content="Done", creation_datetime=created + timedelta(days=4))
+
+        blocked_card = self._create_card(2, "development", created + timedelta(days=2), [self.members[1]])
+        blocked_card.blocking_cards.add(blocking_card)
+        other_blocked_card = self._create_card(3, "development", created + timedelta(days=2), [self.members[1]])
+        other_blocked_card.blocking_cards.add(blocking_card)
+        due_card = self._create_card(4, "development", created, [self.members[0]])
+        due_card.due_datetime = created + timedelta(days=5)
+        due_card.save()
+        self._create_card(5, "ready_to_develop", created, self.members)
+
+        tasks = list(GanttChart(self.board).get_tasks())
+
+        self.assertEqual(
+            [(task["pID"], task["pRes"]) for task in tasks],
+            [(blocking_card.id, "gantt1"), (blocking_card.id, "gantt2"), (blocked_card.id, "gantt2"),
+             (other_blocked_card.id, "gantt2"), (due_card.id, "gantt1")]
+        )
+        self.assertEqual(tasks[0]["pStart"], blocking_card.start_datetime.strftime("%Y-%m-%d"))
+        self.assertEqual(tasks[0]["pEnd"], blocking_card.end_datetime.strftime("%Y-%m-%d"))
+        self.assertEqual(tasks[0]["pComp"], 100)
+        self.assertEqual(tasks[0]["pGroup"], 1)
+        self.assertEqual(tasks[0]["pDepend"], "{0},{1}".format(blocked_card.id, other_blocked_card.id))
+        self.assertEqual(tasks[0]["pNotes"], "Card 1\\\nLine 1\\\nLine 2")
+        self.assertEqual(tasks[2]["pParent"], blocking_card.id)
+        self.assertEqual(tasks[2]["pComp"], 0)
+        self.assertEqual(tasks[2]["pEnd"], (blocked_card.creation_datetime + timedelta(days=1)).strftime("%Y-%m-%d"))
+        self.assertEqual(tasks[4]["pEnd"], due_card.due_datetime.strftime("%Y-%m-%d"))
+
+        # The number of queries does not depend on the number of cards
+        with self.assertNumQueries(6):
+            list(GanttChart(self.board).get_tasks())
+
+        page, page_tasks = GanttChart(self.board).get_page(2, 2)
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.assertEqual([task["pID"] for task in page_tasks], [other_blocked_card.id, due_card.id])
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from djanban.apps.boards.models import Board, Card, Label, List
+from djanban.apps.boards.snapshot import BoardSnapshot, get_board_snapshot
+from djanban.apps.members.models import Member
+
+
+# Tests of the snapshot of a board shared by a request
+class BoardSnapshotTest(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        user = get_user_model().objects.create_user("snapshot", password="snapshot")
+        self.member = Member.objects.create(user=user, is_developer=True)
+        self.board = Board.objects.create(creator=self.member, name="Board", uuid="snapshot-board",
+                                          last_activity_datetime=now)
+        self.board.members.add(self.member)
+        self.lists = [
+            List.objects.create(board=self.board, name=list_type, uuid="list-{0}".format(list_type), type=list_type,
+                                position=position)
+            for position, list_type in enumerate(("development", "done", "ignored"))
+        ]
+        self.label = Label.objects.create(board=self.board, name="Label", uuid="label", color="red")
+        self.cards = []
+        for position, list_ in enumerate(self.lists):
+            card = Card.objects.create(
+                board=self.board, list=list_, uuid="card-{0}".format(position), name="Card", position=position,
+                url="https://trello.com/c/{0}".format(position), short_url="https://trello.com/{0}".format(position),
+                creation_datetime=now, last_activity_datetime=now
+            )
+            card.labels.add(self.label)
+            card.members.add(self.member)
+            self.cards.append(card)
+
+    # Each part of the snapshot is read once with a fixed number of queries
+    def test_snapshot(self):
+        snapshot = BoardSnapshot(self.board)
+        with self.assertNumQueries(7):
+            self.assertTrue(snapshot.is_ready)
+            self.assertEqual(snapshot.active_lists, self.lists[:2])
+            self.assertEqual(snapshot.named_labels, [self.label])
+            self.assertEqual(snapshot.active_cards_by_list,
+                             {self.lists[0].id: [self.cards[0]], self.lists[1].id: [self.cards[1]]})
+            self.assertEqual(snapshot.members_by_card, {card.id: [self.member] for card in self.cards})
+            self.assertEqual(snapshot.labels_by_card, {card.id: [self.label] for card in self.cards})
+        with self.assertNumQueries(0):
+            snapshot.active_cards_by_list
+            snapshot.members_by_card
+            snapshot.labels_by_card
+
+    # Snapshots are shared in GET requests but not in the ones that can change the board
+    def test_get_board_snapshot(self):
+        request_factory = RequestFactory()
+        get_request = request_factory.get("/")
+        self.assertIs(get_board_snapshot(self.board, get_request), get_board_snapshot(self.board, get_request))
+        post_request = request_factory.post("/")
+        self.assertIsNot(get_board_snapshot(self.board, post_request), get_board_snapshot(self.board, post_request))
+
+    # The number of queries of each request is reported in debug mode
+    @override_settings(DEBUG=True)
+    def test_query_count_header(self):
+        self.client.login(username="snapshot", password="snapshot")
+        response = self.client.get(reverse("api:get_board", args=(self.board.id,)))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response["X-Query-Count"]), 0)
@@ -5,8 +5,6 @@ from __future__ import unicode_literals, absolute_import
 import hashlib
 import time
 
-from datetime import timedelta
-
 import pydenticon
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
@@ -23,7 +21,9 @@ from djanban.apps.base.auth import user_is_member, get_user_boards, user_is_visi
 from djanban.apps.base.decorators import member_required
 from djanban.apps.boards.forms import EditBoardForm, NewBoardForm, NewListForm, LabelForm, EditListForm, \
     SwapListForm, MoveUpListForm, MoveDownListForm
+from djanban.apps.boards.gantt import GanttChart
 from djanban.apps.boards.models import List, Board, Label
+from djanban.apps.boards.snapshot import get_board_snapshot
 from djanban.apps.boards.stats import avg, std_dev
 from djanban.apps.fetch.fetchers.trello.boards import Initializer, BoardFetcher
 from djanban.utils.week import get_week_of_year, get_weeks_of_year_since_one_year_ago
@@ -170,73 +170,7 @@ def view_gantt_chart(request, board_id):
     elif user_is_visitor(request.user, board):
         visitor = request.user
 
-    board_cards = board.cards.filter(list__type__in=List.STARTED_CARD_LIST_TYPES)
-
-    cards = []
-    for board_card in board_cards:
-
-        # Task start
-        start_date = board_card.start_datetime
-        if start_date is None:
-            start_date = board_card.creation_datetime
-
-        # Task end
-        if board_card.due_datetime is not None:
-            end_date = board_card.due_datetime
-        elif board_card.list.type == "done":
-            end_date = board_card.end_datetime
-        else:
-            end_date = start_date + timedelta(days=1)
-
-        # Color of task
-        task_color = "blue"
-
-        # Percentage of completion of the task
-        if board_card.list.type == "development":
-            completion_percentage = 0
-        elif board_card.list.type == "after_development_in_review":
-            completion_percentage = 75
-        elif board_card.list.type == "after_development_waiting_release":
-            completion_percentage = 85
-        else:
-            completion_percentage = 100
-
-        # Parent Task
-        blocking_cards = board_card.blocking_cards.all().order_by("creation_datetime")
-        parent_card = 0
-        if blocking_cards.exists():
-            parent_card = blocking_cards[0].id
-
-        # Dependant tasks
-        blocked_cards = board_card.blocked_cards.all()
-        dependant_cards = ""
-        if blocked_cards.exists():
-            for blocked_card in blocked_cards:
-                dependant_cards += ",".format(blocked_card.id)
-            dependant_cards = dependant_cards[:-1]
-
-        members = board_card.members.all()
-        for member in members:
-            card = {
-                "pID": board_card.id,
-                "pName": "{0}".format(board_card.short_url, member.external_username),
-                "pStart": start_date.strftime("%Y-%m-%d"),
-                "pEnd": end_date.strftime("%Y-%m-%d"),
-                "pClass": "gtask{0}".format(task_color),
-                "pLink": reverse("boards:view_card", args=(board_id, board_card.id)),
-                "pMile": 0,
-                "pRes": member.external_username,
-                "pComp": completion_percentage,
-                "pGroup": 1 if blocked_cards.exists() else 0,
-                "pParent": parent_card,
-                "pOpen": 0,
-                "pDepend": dependant_cards,
-                "pCaption": board_card.name,
-                "pNotes": "{0}\\\n{1}".format(
-                    board_card.name, board_card.description.replace("\n", "\\\n")
-                )
-            }
-            cards.append(card)
+    cards = list(GanttChart(board).get_tasks())
 
     replacements = {
         "board": board,
@@ -300,6 +234,7 @@ def view(request, board_id):
     replacements = {
         "url_prefix": "http://{0}".format(settings.DOMAIN),
         "board": board,
+        "board_snapshot": get_board_snapshot(board, request),
         "next_due_date_cards": next_due_date_cards,
         "requirement": requirement,
         "requirements": requirements,
@@ -605,7 +540,7 @@ def fetch(request, board_id):
         try:
             start_time = time.time()
             board_fetcher = BoardFetcher(board)
-            board_fetcher.fetch(debug=True)
+            board_fetcher.fetch(debug=True, full=True)
             end_time = time.time()
             print("Elapsed time {0} s".format(end_time-start_time))
             replacements["done"] = True
@@ -18,7 +18,7 @@ from djanban.apps.base.decorators import member_required
 from djanban.apps.boards.forms import NewCardForm, WeekSummaryFilterForm
 from djanban.apps.boards.models import List, Board, Card, CardComment, Label, CardAttachment
 from djanban.apps.boards.stats import avg, std_dev
-from djanban.apps.forecasters.serializer import CardSerializer
+from djanban.apps.forecasters.serializer import CardsSerializer
 from djanban.utils.week import get_iso_week_of_year, get_week_of_year
 
 
@@ -298,8 +298,7 @@ def export_detailed_report(request, board_id):
     csv_template = loader.get_template('boards/cards/detailed_report_csv.txt')
     members = board.members.all()
     card_list = []
-    for card in cards:
-        serialized_card = CardSerializer(card, members).serialize()
+    for card, serialized_card in zip(cards, CardsSerializer(cards, members).serialize()):
         serialized_card["id"] = card.id
         card_list.append(serialized_card)
 
@@ -2,17 +2,17 @@
 
 from __future__ import unicode_literals
 
-import copy
-from datetime import timedelta
-
 import pygal
-from django.db.models import Sum
 
+from djanban.apps.charts import dependencies
+from djanban.apps.charts.burndown import BurndownSeries, get_number_of_interruptions_by_date, get_spent_time_by_date
 from djanban.apps.charts.models import CachedChart
-from djanban.apps.dev_environment.models import Interruption
 
 
 # Burndown for the board
+@dependencies.depends_on(
+    dependencies.CARDS, dependencies.SPENT_TIMES, dependencies.INTERRUPTIONS, dependencies.REQUIREMENTS
+)
 def burndown(board, show_interruptions=False):
 
     chart_uuid = "boards.burndown-{0}".format("with_interruptions" if show_interruptions else "without_interruptions")
@@ -32,12 +32,8 @@ def burndown(board, show_interruptions=False):
     # Estimated number of hours
     estimated_number_of_hours = board.estimated_number_of_hours
 
-    # Remaining hours
-    remaining_time = estimated_number_of_hours
-    daily_spent_times = board.daily_spent_times.filter(spent_time__gt=0).distinct().order_by("date")
-
     # Remaining time is needed for making the burndown chart
-    if remaining_time is None:
+    if estimated_number_of_hours is None:
         x_labels = ["Start"]
         burndown_chart.x_labels = x_labels
         return burndown_chart.render_django_response()
@@ -48,39 +44,21 @@ def burndown(board, show_interruptions=False):
     if start_working_date is None or end_working_date is None:
         return burndown_chart.render_django_response()
 
-    # Remaining time values
-    remaining_time_values = [remaining_time]
-
-    # Dates where there is some work in this requirement
-    x_labels = ["Start"]
-    interruptions = []
-
-    date_i = copy.deepcopy(start_working_date)
-    remaining_time_i = copy.deepcopy(remaining_time)
-    while date_i <= end_working_date:
-        daily_spent_times_i = daily_spent_times.filter(date=date_i)
-        spent_time = daily_spent_times_i.aggregate(spent_time_sum=Sum("spent_time"))["spent_time_sum"]
-
-        if spent_time is not None and spent_time > 0:
-            remaining_time_i -= spent_time
-            remaining_time_values.append(remaining_time_i)
-            x_labels.append(date_i.strftime("%Y-%m-%d"))
-
-        # Interruptions
-        if show_interruptions:
-            num_interruptions = Interruption.objects.filter(datetime__date=date_i).count()
-            if num_interruptions > 0:
-                interruptions.append(num_interruptions)
-
-        date_i += timedelta(days=1)
+    # Remaining time after each date with some work in this board
+    burndown_series = BurndownSeries(
+        estimated_number_of_hours, get_spent_time_by_date(board.daily_spent_times.all()),
+        start_working_date, end_working_date
+    )
 
-    burndown_chart.add(u"Initial estimation for {0}".format(board.name), [remaining_time for i in range(0, len(x_labels))])
+    burndown_chart.add(u"Initial estimation for {0}".format(board.name), burndown_series.estimated_time_values)
 
-    burndown_chart.x_labels = x_labels
-    burndown_chart.add(u"Burndown of {0}".format(board.name), remaining_time_values)
+    burndown_chart.x_labels = burndown_series.x_labels
+    burndown_chart.add(u"Burndown of {0}".format(board.name), burndown_series.remaining_time_values)
 
+    # Interruptions of each day with interruptions
     if show_interruptions:
-        burndown_chart.add(u"Interruptions of {0}".format(board.name), interruptions)
+        interruptions = get_number_of_interruptions_by_date(start_working_date, end_working_date)
+        burndown_chart.add(u"Interruptions of {0}".format(board.name), list(interruptions.values()))
 
     chart = CachedChart.make(board=board, uuid=chart_uuid, svg=burndown_chart.render(is_unicode=True))
     return chart.render_django_response()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+from djanban.apps.boards.models import Card
+from djanban.apps.dev_environment.models import Interruption
+
+
+# Burndown series: the remaining time after each date with spent time.
+# Spent times are aggregated by date in only one query, so the remaining time is computed in one pass over the
+# dates with work instead of with a SUM query for each day between the start and end dates.
+class BurndownSeries(object):
+
+    def __init__(self, estimated_time, spent_time_by_date, start_date=None, end_date=None):
+        self.estimated_time = estimated_time
+        self.x_labels = ["Start"]
+        self.remaining_time_values = [estimated_time]
+
+        remaining_time = estimated_time
+        for date, spent_time in spent_time_by_date.items():
+            if (start_date is not None and date < start_date) or (end_date is not None and date > end_date):
+                continue
+            if spent_time is not None and spent_time > 0:
+                remaining_time -= spent_time
+                self.remaining_time_values.append(remaining_time)
+                self.x_labels.append(date.strftime("%Y-%m-%d"))
+
+    # Initial estimation repeated in each one of the points of the chart
+    @property
+    def estimated_time_values(self):
+        return [self.estimated_time for x_label in self.x_labels]
+
+
+# Spent time of each date of some daily spent times (only the positive spent times are added).
+# Returns an OrderedDict with the spent time of each date sorted by date.
+def get_spent_time_by_date(daily_spent_times):
+    spent_times = daily_spent_times.filter(spent_time__gt=0).values("date").\
+        annotate(spent_time_sum=Sum("spent_time")).order_by("date")
+    return OrderedDict((spent_time["date"], spent_time["spent_time_sum"]) for spent_time in spent_times)
+
+
+# Spent time of each date of the cards that are in any requirement of a board.
+# Daily spent times of cards with several requirements are only added once.
+def get_spent_time_by_date_of_all_requirements(board):
+    requirement_cards = Card.objects.filter(requirements__board=board).values("id")
+    return get_spent_time_by_date(board.daily_spent_times.filter(card__in=requirement_cards))
+
+
+# Number of interruptions of each date between two dates (both included) with one grouped query.
+# Returns an OrderedDict with the number of interruptions of each date with interruptions sorted by date.
+def get_number_of_interruptions_by_date(start_date, end_date, interruptions=None):
+    if interruptions is None:
+        interruptions = Interruption.objects.all()
+    interruptions_by_date = interruptions.filter(datetime__date__gte=start_date, datetime__date__lte=end_date).\
+        annotate(date=TruncDate("datetime")).values("date").annotate(count=Count("id")).order_by("date")
+    return OrderedDict(
+        (interruptions_i["date"], interruptions_i["count"]) for interruptions_i in interruptions_by_date
+    )
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Number of seconds a chart that does not belong to a board is valid
+NO_BOARD_CHART_LIFE_IN_SECONDS = 1800
+
+# Key (in the shared cache) of the number of times the charts that do not belong to a board have been invalidated
+NO_BOARD_CHARTS_VERSION_KEY = "charts.no_board_charts_version"
+
+
+# Rendered SVG chart: its content and its content hash (used as ETag and as file name)
+class CachedSvg(object):
+
+    def __init__(self, content, etag=None):
+        if not isinstance(content, bytes):
+            content = content.encode("utf-8")
+        self.content = content
+        self.etag = etag if etag else hashlib.sha1(content).hexdigest()
+
+    @property
+    def size(self):
+        return len(self.content)
+
+
+# Bounded in-process LRU cache of rendered charts.
+# The bound is the sum of the sizes of the SVG contents, not the number of charts.
+class SvgLRUCache(object):
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Return the CachedSvg stored with this key or None if it is not present
+    def get(self, key):
+        with self._lock:
+            cached_svg = self._items.pop(key, None)
+            if cached_svg is None:
+                return None
+            # Reinserting the item makes it the most recently used
+            self._items[key] = cached_svg
+            return cached_svg
+
+    # Store a CachedSvg evicting the least recently used charts if there is no room for it
+    def set(self, key, cached_svg):
+        if cached_svg.size > self.max_size:
+            return
+        with self._lock:
+            old_cached_svg = self._items.pop(key, None)
+            if old_cached_svg is not None:
+                self.size -= old_cached_svg.size
+            while self._items and self.size + cached_svg.size > self.max_size:
+                evicted_key, evicted_cached_svg = self._items.popitem(last=False)
+                self.size -= evicted_cached_svg.size
+            self._items[key] = cached_svg
+            self.size += cached_svg.size
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+# First tier: rendered charts of this process
+memory_cache = SvgLRUCache(settings.CHART_MEMORY_CACHE_MAX_SIZE)
+
+
+# Second tier: shared cache backend (any of the Django cache backends defined in settings.CACHES)
+def get_shared_cache():
+    return caches[settings.CHART_CACHE_ALIAS]
+
+
+# Get a chart from the memory cache or from the shared cache. Return None if it is in none of them.
+def get_svg(key):
+    cached_svg = memory_cache.get(key)
+    if cached_svg is not None:
+        return cached_svg
+    cached_item = get_shared_cache().get(key)
+    if cached_item is None:
+        return None
+    etag, content = cached_item
+    cached_svg = CachedSvg(content, etag=etag)
+    memory_cache.set(key, cached_svg)
+    return cached_svg
+
+
+# Store a chart in both the memory and the shared caches
+def set_svg(key, cached_svg):
+    memory_cache.set(key, cached_svg)
+    get_shared_cache().set(key, (cached_svg.etag, cached_svg.content), settings.CHART_CACHE_TIMEOUT)
+
+
+# Version of the charts that do not belong to a board.
+# It is stored in the shared cache, so all processes see its changes. If it is evicted, the time the charts
+# without board are valid is still bounded by NO_BOARD_CHART_LIFE_IN_SECONDS.
+def get_no_board_charts_version():
+    return get_shared_cache().get(NO_BOARD_CHARTS_VERSION_KEY, 0)
+
+
+# Make all the charts that do not belong to a board stored in the chart caches unreachable
+def increment_no_board_charts_version():
+    shared_cache = get_shared_cache()
+    shared_cache.add(NO_BOARD_CHARTS_VERSION_KEY, 0, None)
+    try:
+        shared_cache.incr(NO_BOARD_CHARTS_VERSION_KEY)
+    # The version has been evicted from the shared cache
+    except ValueError:
+        shared_cache.set(NO_BOARD_CHARTS_VERSION_KEY, 1, None)
+
+
+# Key of a chart.
+# Charts of a board depend on the number of times all its charts have been invalidated and on the versions of
+# the data domains the chart depends on (data_versions), so when any of them changes, old charts are not
+# reachable anymore.
+# Charts without board are only valid during a period of time and while the version of the charts without board
+# does not change.
+def get_key(board, uuid, data_versions=""):
+    if board is None:
+        key_parts = [uuid, get_no_board_charts_version(), int(time.time() // NO_BOARD_CHART_LIFE_IN_SECONDS)]
+    else:
+        key_parts = [uuid, board.id, board.cached_charts_version, data_versions]
+    key_hash = hashlib.sha1("|".join(["{0}".format(key_part) for key_part in key_parts]).encode("utf-8"))
+    return "charts.{0}".format(key_hash.hexdigest())
@@ -3,10 +3,7 @@
 from __future__ import unicode_literals
 
 import copy
-import inspect
-import math
 from datetime import datetime, time, timedelta
-from decimal import Decimal
 
 import numpy
 import pygal
@@ -17,6 +14,9 @@ from django.utils import timezone
 
 from djanban.apps.base.auth import get_user_boards
 from djanban.apps.boards.models import Card, CardComment, Label, List
+from djanban.apps.charts import dependencies
+from djanban.apps.charts.flow import CardFlow, get_date_buckets
+from djanban.apps.charts.metrics import CardMetricDistribution
 from djanban.apps.charts.models import CachedChart
 from djanban.apps.dev_times.models import DailySpentTime
 from djanban.apps.members.models import Member
@@ -24,6 +24,7 @@ from djanban.apps.reports.models import CardMovement
 
 
 # Average card lead time
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS, dependencies.LABELS)
 def avg_lead_time(request, board=None):
 
     # Caching
@@ -66,6 +67,7 @@ def avg_lead_time(request, board=None):
 
 
 # Average card cycle time
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS, dependencies.LABELS)
 def avg_cycle_time(request, board=None):
 
     # Caching
@@ -119,6 +121,9 @@ def avg_cycle_time_by_month(request, board=None):
 
 
 # Average card metric (lead/cycle) by month
+@dependencies.depends_on(
+    dependencies.CARDS, dependencies.MOVEMENTS, dependencies.LABELS, dependencies.SPENT_TIMES
+)
 def _avg_metric_time_by_month(request, board=None, metric="lead"):
     # The metric is only lead or cycle
     if metric != "lead" and metric != "cycle" and metric != "spent_time" and metric != "estimated_time":
@@ -221,6 +226,7 @@ def _avg_metric_time_by_month(request, board=None, metric="lead"):
 
 
 # Average card time in each list
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS)
 def avg_time_by_list(board, workflow=None):
     # Caching
     chart_uuid = "cards.avg_time_by_list-{0}-{1}".format(board.id, workflow.id if workflow else "None")
@@ -249,6 +255,7 @@ def avg_time_by_list(board, workflow=None):
 
 
 # Average card estimated time in each list
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS)
 def avg_std_dev_time_by_list(board, workflow=None):
     # Caching
     chart_uuid = "cards.avg_std_dev_time_by_list-{0}-{1}".format(board.id, workflow.id if workflow else "None")
@@ -277,6 +284,7 @@ def avg_std_dev_time_by_list(board, workflow=None):
 
 
 # List evolution by month
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS)
 def absolute_flow_diagram(board, day_step=1):
 
     # Caching
@@ -301,38 +309,14 @@ def absolute_flow_diagram(board, day_step=1):
 
     # Y-Axis
     lists = board.lists.exclude(type="closed").order_by("position")
-    list_values = {list_.id: [] for list_ in lists}
 
-    x_labels = []
-
-    date_i = copy.deepcopy(start_working_date)
-    local_timezone = pytz.timezone(settings.TIME_ZONE)
-    while date_i <= end_working_date:
-        datetime_i = local_timezone.localize(datetime.combine(date_i, time.min))
-        for list_ in lists:
-            list_id = list_.id
-            # Number of cards that were created in this list before the date
-            num_cards_without_movements = board.cards.filter(
-                list=list_,
-                number_of_forward_movements=0,
-                number_of_backward_movements=0,
-                creation_datetime__lt=datetime_i,
-                creation_datetime__gte=datetime_i-timedelta(days=day_step)
-            ).count()
-
-            # Number of cards that were moved to this list before the date
-            num_cards_moving_to_list = board.card_movements.filter(
-                destination_list=list_,
-                datetime__lt=datetime_i,
-                datetime__gte=datetime_i-timedelta(days=day_step),
-            ).count()
-
-            num_cards = num_cards_moving_to_list + num_cards_without_movements
-            list_values[list_id].append(num_cards)
+    date_buckets = get_date_buckets(start_working_date, end_working_date, day_step)
+    card_flow = CardFlow(boards=[board])
+    list_values = card_flow.absolute_list_values(
+        lists, [datetime_i for date_i, datetime_i in date_buckets], day_step=day_step
+    )
 
-        x_labels.append(u"{0}-{1}-{2}".format(date_i.year, date_i.month, date_i.day))
-
-        date_i += timedelta(days=day_step)
+    x_labels = [u"{0}-{1}-{2}".format(date_i.year, date_i.month, date_i.day) for date_i, datetime_i in date_buckets]
 
     cumulative_chart.x_labels = x_labels
     for list_ in lists:
@@ -344,6 +328,7 @@ def absolute_flow_diagram(board, day_step=1):
 
 
 # Cumulative list evolution by month
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS)
 def cumulative_flow_diagram(board, day_step=1):
 
     # Caching
@@ -374,35 +359,12 @@ def cumulative_flow_diagram(board, day_step=1):
 
     # Y-Axis
     lists = board.lists.exclude(type="closed").order_by("position")
-    list_values = {list_.id: [] for list_ in lists}
 
-    x_labels = []
+    date_buckets = get_date_buckets(start_working_date, end_working_date, day_step)
+    card_flow = CardFlow(boards=[board])
+    list_values = card_flow.cumulative_list_values(lists, [datetime_i for date_i, datetime_i in date_buckets])
 
-    date_i = copy.deepcopy(start_working_date)
-    local_timezone = pytz.timezone(settings.TIME_ZONE)
-    while date_i <= end_working_date:
-        datetime_i = local_timezone.localize(datetime.combine(date_i, time.min))
-        for list_ in lists:
-            list_id = list_.id
-            # Number of cards that were created in this list before the date
-            num_cards_without_movements = board.cards.filter(
-                creation_datetime__lte=datetime_i,
-                list=list_,
-                number_of_forward_movements=0,
-                number_of_backward_movements=0,
-            ).count()
-
-            # Number of cards that were moved to this list before the date
-            num_cards_moving_to_list = board.card_movements.filter(
-                destination_list__position__gte=list_.position,
-                datetime__lt=datetime_i,
-            ).count()
-
-            num_cards = num_cards_moving_to_list + num_cards_without_movements
-            list_values[list_id].append(num_cards)
-
-        x_labels.append(u"{0}-{1}-{2}".format(date_i.year, date_i.month, date_i.day))
-        date_i += timedelta(days=day_step)
+    x_labels = [u"{0}-{1}-{2}".format(date_i.year, date_i.month, date_i.day) for date_i, datetime_i in date_buckets]
 
     cumulative_chart.x_labels = x_labels
     for list_ in lists:
@@ -414,6 +376,7 @@ def cumulative_flow_diagram(board, day_step=1):
 
 
 # Cumulative list type evolution by month
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS)
 def cumulative_list_type_evolution(current_user, board=None, day_step=1):
 
     # Caching
@@ -452,52 +415,17 @@ def cumulative_list_type_evolution(current_user, board=None, day_step=1):
         return cumulative_chart.render_django_response()
 
     # Y-Axis
-    list_type_values = {list_type: [] for list_type in List.LIST_TYPES}
-
-    # Cards of current user boards
-    cards = Card.objects.filter(board__in=boards, is_closed=False)
-
-    # Card movements of current user boards
-    card_movements = CardMovement.objects.filter(board__in=boards, card__is_closed=False)
+    date_buckets = get_date_buckets(start_working_date, end_working_date, day_step)
+    card_flow = CardFlow(boards=boards, only_active_cards=True)
+    list_type_values = card_flow.cumulative_list_type_values([datetime_i for date_i, datetime_i in date_buckets])
 
+    # Only dates with some card are labeled
     x_labels = []
-
-    num_list_types = len(List.LIST_TYPES)
-
-    date_i = copy.deepcopy(start_working_date)
-    local_timezone = pytz.timezone(settings.TIME_ZONE)
-
-    while date_i <= end_working_date:
-        datetime_i = local_timezone.localize(datetime.combine(date_i, time.min))
-        num_total_cards = 0
-        # For each list type, you have to get the number of present cards in that date and the number of cards
-        # that reached that list in that time or before that
-        for list_type_index in range(0, num_list_types):
-            list_type = List.LIST_TYPES[list_type_index]
-
-            # Number of cards that were created in this list before the date
-            num_cards_without_movements = cards.filter(
-                creation_datetime__lte=datetime_i,
-                list__type=list_type,
-                number_of_forward_movements=0,
-                number_of_backward_movements=0
-            ).count()
-
-            # Number of cards that were moved to this list before the date
-            num_cards_moving_to_list = card_movements.filter(
-                destination_list__type__in=List.LIST_TYPES[list_type_index:],
-                datetime__lte=datetime_i
-            ).count()
-
-            num_cards = num_cards_moving_to_list + num_cards_without_movements
-            num_total_cards += num_cards
-            list_type_values[list_type].append(num_cards)
-
+    for date_index, (date_i, datetime_i) in enumerate(date_buckets):
+        num_total_cards = sum([list_type_values[list_type][date_index] for list_type in List.LIST_TYPES])
         if num_total_cards > 0:
             x_labels.append(u"{0}-{1}-{2}".format(date_i.year, date_i.month, date_i.day))
 
-        date_i += timedelta(days=day_step)
-
     cumulative_chart.x_labels = x_labels
     list_types_dict = dict(List.LIST_TYPE_CHOICES)
     for list_type in List.LIST_TYPES:
@@ -510,6 +438,7 @@ def cumulative_list_type_evolution(current_user, board=None, day_step=1):
 
 # Cards-in cards-out
 # Number of cards that are created vs number of cards that are completed along the live of the project
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS)
 def cumulative_card_evolution(current_user, board=None, day_step=1):
 
     # Caching
@@ -557,60 +486,41 @@ def cumulative_card_evolution(current_user, board=None, day_step=1):
     else:
         labels = Label.objects.exclude(name="").filter(board__in=boards).order_by("name")
 
-    # Number of created cards by label
-    created_card_values_by_label = {label.id: [] for label in labels}
+    date_buckets = get_date_buckets(start_working_date, end_working_date, day_step)
+    datetimes = [datetime_i for date_i, datetime_i in date_buckets]
+    card_flow = CardFlow(boards=boards)
 
-    # Number of done cards by label
-    done_card_values_by_label = {label.id: [] for label in labels}
+    # Number of created cards and number of arrivals to done lists before each date
+    created_card_values = card_flow.created_card_values(datetimes)
+    done_card_values = card_flow.done_movement_values(datetimes)
 
-    num_created_card_values = []
-    num_done_card_values = []
-
-    x_labels = []
-
-    date_i = copy.deepcopy(start_working_date)
-    local_timezone = pytz.timezone(settings.TIME_ZONE)
-    while date_i <= end_working_date:
-        #print "{0} <= {1}".format(date_i, end_working_date)
-        datetime_i = local_timezone.localize(datetime.combine(date_i, time.min))
-
-        # Created cards that were created in this list before the date
-        created_cards = Card.objects.filter(creation_datetime__lte=datetime_i, board__in=boards)
-
-        # Number of created cards that were created in this list before the date
-        num_created_cards = created_cards.count()
-
-        # Cards that were moved to this list before the date
-        done_cards = CardMovement.objects.filter(board__in=boards,
-                                                 destination_list__type="done",
-                                                 datetime__lte=datetime_i)
+    # Number of created and done cards by label
+    if board:
+        created_card_values_by_label, done_card_values_by_label = card_flow.label_card_values(labels, datetimes)
 
-        # Number of cards that were moved to this list before the date
-        num_done_cards = done_cards.count()
+    # Only dates when there has been created or terminated any card are shown
+    shown_date_indices = [
+        date_index for date_index in range(len(date_buckets))
+        if created_card_values[date_index] > 0 or done_card_values[date_index] > 0
+    ]
 
-        # When there has been created or terminated any card
-        if num_created_cards > 0 or num_done_cards > 0:
-            num_created_card_values.append(num_created_cards)
-            num_done_card_values.append(num_done_cards)
+    num_created_card_values = [created_card_values[date_index] for date_index in shown_date_indices]
+    num_done_card_values = [done_card_values[date_index] for date_index in shown_date_indices]
 
-            x_labels.append(u"{0}-{1}-{2}".format(date_i.year, date_i.month, date_i.day))
-
-            # Each category filtered by label
-            if board:
-                for label in labels:
-                    # Number of created cards with this label (considered only if there are any)
-                    num_created_cards_with_this_label = label.cards.filter(id__in=created_cards).count()
-                    if num_created_cards_with_this_label == 0:
-                        num_created_cards_with_this_label = None
-                    created_card_values_by_label[label.id].append(num_created_cards_with_this_label)
-
-                    # Number of done cards with this label (considered only if there are any)
-                    num_done_cards_with_this_label = label.cards.filter(id__in=done_cards).count()
-                    if num_done_card_values == 0:
-                        num_done_card_values = None
-                    done_card_values_by_label[label.id].append(num_done_cards_with_this_label)
+    x_labels = []
+    for date_index in shown_date_indices:
+        date_i = date_buckets[date_index][0]
+        x_labels.append(u"{0}-{1}-{2}".format(date_i.year, date_i.month, date_i.day))
 
-        date_i += timedelta(days=day_step)
+    # Each category filtered by label (considered only if there are any)
+    if board:
+        for label in labels:
+            created_card_values_by_label[label.id] = [
+                created_card_values_by_label[label.id][date_index] or None for date_index in shown_date_indices
+            ]
+            done_card_values_by_label[label.id] = [
+                done_card_values_by_label[label.id][date_index] or None for date_index in shown_date_indices
+            ]
 
     # Setting up chart values
     cumulative_chart.x_labels = x_labels
@@ -643,6 +553,7 @@ def value_evolution_by_member(current_user, board=None, day_step=1):
 
 
 # Evolution of developed card value through time
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS, dependencies.MEMBERS)
 def _value_evolution(current_user, board=None, cumulative=False, day_step=1, by_member=False):
     # Caching
     chart_uuid = "cards.value_evolution-{0}-{1}-{2}-{3}".format(
@@ -752,6 +663,7 @@ def _value_evolution(current_user, board=None, cumulative=False, day_step=1, by_
 
 
 # Current age of each card per list in the board
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS)
 def age(board):
     # Caching
     chart_uuid = "cards.age-{0}".format(board.id)
@@ -767,9 +679,17 @@ def age(board):
         x_title="List", y_title="Age (days)"
     )
 
-    for list_ in board.lists.exclude(Q(type="done") | Q(type="closed")).order_by("position"):
-        list_cards = list_.cards.exclude(is_closed=False).order_by("id")
-        cards_age = [card.age.days for card in list_cards]
+    # Creation datetimes of the cards of all lists are read in one query
+    lists = list(board.lists.exclude(Q(type="done") | Q(type="closed")).order_by("position"))
+    creation_datetimes_by_list = {list_.id: [] for list_ in lists}
+    card_creation_datetimes = board.cards.filter(list__in=lists).exclude(is_closed=False).order_by("id").\
+        values_list("list_id", "creation_datetime")
+    for list_id, creation_datetime in card_creation_datetimes:
+        creation_datetimes_by_list[list_id].append(creation_datetime)
+
+    now = timezone.now()
+    for list_ in lists:
+        cards_age = [(now - creation_datetime).days for creation_datetime in creation_datetimes_by_list[list_.id]]
         age_chart.add(list_.name, cards_age)
 
     chart = CachedChart.make(board=board, uuid=chart_uuid, svg=age_chart.render(is_unicode=True))
@@ -777,6 +697,7 @@ def age(board):
 
 
 # Completion histogram for cards
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS)
 def completion_histogram(current_user, board=None, time_metric="lead_time", units="days"):
 
     # Caching
@@ -801,45 +722,27 @@ def completion_histogram(current_user, board=None, time_metric="lead_time", unit
         human_readable=True, x_label_rotation=70, stroke=False,
         x_title=units.capitalize(), y_title="Number of cards completed")
 
+    if units == "days":
+        bucket_width = 24.0
+    elif units == "hours":
+        bucket_width = 1.0
+    else:
+        raise ValueError(u"Unknown units")
+
     if board:
         boards = [board]
     else:
         boards = get_user_boards(current_user)
 
-    cards = Card.objects.filter(board__in=boards, list__type="done")
+    # For each day (or hour) we compute how many cards have been completed in that number of days (or hours)
+    distribution = CardMetricDistribution(Card.objects.filter(board__in=boards, list__type="done"), [time_metric])
 
-    max_time = cards.exclude(is_closed=True).aggregate(max_time=Max(time_metric))["max_time"]
-
-    if max_time is None:
+    open_card_values = distribution.values(time_metric)[~distribution.is_closed]
+    open_card_values = open_card_values[~numpy.isnan(open_card_values)]
+    if open_card_values.size == 0:
         return completion_histogram_chart.render_django_response()
 
-    # For each day we compute how many cards have been completed in that number of days
-    x_labels = []
-    num_card_values = []
-
-    if units == "days":
-        max_time_in_days = int(math.ceil(max_time / Decimal(24.0)))
-
-        for days in range(1, max_time_in_days+1):
-            hours_min = (days-1) * 24.0
-            hours_max = days * 24.0
-            card_filter = {"{0}__gt".format(time_metric): hours_min, "{0}__lte".format(time_metric): hours_max}
-            num_cards = cards.filter(**card_filter).count()
-            if num_cards > 0:
-                x_labels.append(days)
-                num_card_values.append(num_cards)
-
-    elif units == "hours":
-        for hours in range(1, max_time+1):
-            hours_min = (hours - 1)
-            card_filter = {"{0}__gt".format(time_metric): hours_min, "{0}__lte".format(time_metric): hours}
-            num_cards = cards.filter(**card_filter).count()
-            if num_cards > 0:
-                x_labels.append(hours)
-                num_card_values.append(num_cards)
-
-    else:
-        ValueError(u"Unknown units")
+    x_labels, num_card_values = distribution.histogram(time_metric, bucket_width, max_value=open_card_values.max())
 
     completion_histogram_chart.x_labels = x_labels
     completion_histogram_chart.add(units.capitalize(), num_card_values)
@@ -849,13 +752,13 @@ def completion_histogram(current_user, board=None, time_metric="lead_time", unit
 
 
 # Scatterplot comparing the completion time vs. spent/lead/cycle time
-def time_scatterplot(current_user, time_metric_name="Time", board=None,
-                     y_function=lambda card: card.lead_time / Decimal(24) / Decimal(7),
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS, dependencies.SPENT_TIMES)
+def time_scatterplot(current_user, time_metric_name="Time", board=None, metric="lead_time_in_weeks",
                      year=None, month=None):
 
     # Caching
     chart_uuid = "cards.time_scatterplot-{0}-{1}-{2}-{3}-{4}".format(
-        current_user.id, board.id if board else "user-{0}".format(current_user.id), inspect.getsource(y_function).strip(),
+        current_user.id, board.id if board else "user-{0}".format(current_user.id), metric,
         year if year else "None", month if month else "None"
     )
     chart = CachedChart.get(board=board, uuid=chart_uuid)
@@ -873,78 +776,31 @@ def time_scatterplot(current_user, time_metric_name="Time", board=None,
         x_title="Completion date", y_title=time_metric_name
     )
 
-    if board is None:
-        boards = get_user_boards(current_user)
-    else:
-        boards = [board]
-
-    start_working_date = DailySpentTime.objects.filter(board__in=boards).aggregate(start_working_date=Min("date"))[
-        "start_working_date"]
-    end_working_date = DailySpentTime.objects.filter(board__in=boards).aggregate(end_working_date=Max("date"))[
-        "end_working_date"]
-
-    if start_working_date is None or end_working_date is None:
-        return scatterplot.render_django_response()
-
-    month_i = 1
-    end_month = end_working_date.month
-    end_year = end_working_date.year
-
-    if year is not None or month is not None:
-        if year:
-            year_i = int(year)
-            end_year = int(year)
-            if month:
-                month_i = int(month)
-                end_month = int(month)
-    else:
-        month_i = start_working_date.month
-        year_i = start_working_date.year
-
-        end_month = end_working_date.month
-        end_year = end_working_date.year
-
     # Completed cards
-    cards = Card.objects.filter(board__in=boards, is_closed=False, list__type="done").order_by("id")
-
-    i = 0
-    while (year_i == end_year and month_i <= end_month) or year_i < end_year:
-
-        card_values = []
-        cards_by_month = cards.filter(
-            creation_datetime__month=month_i, creation_datetime__year=year_i,
-            last_activity_datetime__month=month_i, last_activity_datetime__year=year_i
-        )
-
-        if cards_by_month.exists():
-            for card in cards_by_month:
-                try:
-                    card_values.append((card.completion_datetime.date(), y_function(card)))
-                # A TypeError is thrown when the y_function can't be computed because some of its parameters
-                # are None. For example if a card is not done, spent_time will be None.
-                except TypeError as e:
-                    pass
-
-            scatterplot.add("{0}-{1}".format(year_i, month_i), card_values)
+    distribution, months = _get_completed_card_metric_distribution_by_month(
+        current_user, board, [metric], year, month, with_completion_datetimes=True
+    )
 
-        month_i += 1
-        i += 1
-        if month_i > 12:
-            month_i = 1
-            year_i += 1
+    values = distribution.values(metric) if distribution else None
+    for year_i, month_i, month_mask in months:
+        card_indices = numpy.flatnonzero(month_mask & distribution.has_value_mask(metric))
+        card_values = [
+            (distribution.completion_datetimes[card_index].date(), values[card_index]) for card_index in card_indices
+        ]
+        scatterplot.add("{0}-{1}".format(year_i, month_i), card_values)
 
     chart = CachedChart.make(board=board, uuid=chart_uuid, svg=scatterplot.render(is_unicode=True))
     return chart.render_django_response()
 
 
 # Time vs. Spent Time
-def time_vs_spent_time(current_user, time_metric_name="Time", board=None,
-                       y_function=lambda card: card.lead_time,
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS, dependencies.SPENT_TIMES)
+def time_vs_spent_time(current_user, time_metric_name="Time", board=None, metric="lead_time",
                        year=None, month=None):
 
     # Caching
     chart_uuid = "cards.time_vs_spent_time-{0}-{1}-{2}-{3}-{4}".format(
-        current_user.id, board.id if board else "user-{0}".format(current_user.id), inspect.getsource(y_function).strip(),
+        current_user.id, board.id if board else "user-{0}".format(current_user.id), metric,
         year if year else "None", month if month else "None"
     )
     chart = CachedChart.get(board=board, uuid=chart_uuid)
@@ -963,78 +819,34 @@ def time_vs_spent_time(current_user, time_metric_name="Time", board=None,
         x_title="Spent time (hours)", y_title=time_metric_name
     )
 
-    if board is None:
-        boards = get_user_boards(current_user)
-    else:
-        boards = [board]
-
-    start_working_date = DailySpentTime.objects.filter(board__in=boards).aggregate(start_working_date=Min("date"))[
-        "start_working_date"]
-    end_working_date = DailySpentTime.objects.filter(board__in=boards).aggregate(end_working_date=Max("date"))[
-        "end_working_date"]
-
-    if start_working_date is None or end_working_date is None:
-        return time_vs_spent_time_chart.render_django_response()
-
-    month_i = 1
-    end_month = end_working_date.month
-    end_year = end_working_date.year
-
-    if year is not None or month is not None:
-        if year:
-            year_i = int(year)
-            end_year = int(year)
-            if month:
-                month_i = int(month)
-                end_month = int(month)
-    else:
-        month_i = start_working_date.month
-        year_i = start_working_date.year
-
-        end_month = end_working_date.month
-        end_year = end_working_date.year
-
     # Completed cards
-    cards = Card.objects.filter(board__in=boards, is_closed=False, list__type="done").order_by("id")
-
-    i = 0
-    while (year_i == end_year and month_i <= end_month) or year_i < end_year:
+    distribution, months = _get_completed_card_metric_distribution_by_month(
+        current_user, board, [metric, "spent_time"], year, month
+    )
 
-        card_values = []
-        cards_by_month = cards.filter(
-            creation_datetime__month=month_i, creation_datetime__year=year_i,
-            last_activity_datetime__month=month_i, last_activity_datetime__year=year_i
+    if distribution:
+        spent_times = distribution.values("spent_time")
+        values = distribution.values(metric)
+    for year_i, month_i, month_mask in months:
+        # Cards without spent time have no point in the chart
+        card_indices = numpy.flatnonzero(
+            month_mask & distribution.has_value_mask(metric) & distribution.has_value_mask("spent_time")
         )
-
-        if cards_by_month.exists():
-            for card in cards_by_month:
-                try:
-                    card_values.append((card.spent_time, y_function(card)))
-                # A TypeError is thrown when the y_function can't be computed because some of its parameters
-                # are None. For example if a card is not done, spent_time will be None.
-                except TypeError:
-                    pass
-
-            time_vs_spent_time_chart.add("{0}-{1}".format(year_i, month_i), card_values)
-
-        month_i += 1
-        i += 1
-        if month_i > 12:
-            month_i = 1
-            year_i += 1
+        card_values = [(spent_times[card_index], values[card_index]) for card_index in card_indices]
+        time_vs_spent_time_chart.add("{0}-{1}".format(year_i, month_i), card_values)
 
     chart = CachedChart.make(board=board, uuid=chart_uuid, svg=time_vs_spent_time_chart.render(is_unicode=True))
     return chart.render_django_response()
 
 
 # Box chart comparing the homogeneity of a time metric
-def time_box(current_user, time_metric_name="Time", board=None,
-             y_function=lambda card: card.lead_time / Decimal(24) / Decimal(7),
+@dependencies.depends_on(dependencies.CARDS, dependencies.MOVEMENTS, dependencies.SPENT_TIMES)
+def time_box(current_user, time_metric_name="Time", board=None, metric="lead_time_in_weeks",
              year=None, month=None):
 
     # Caching
     chart_uuid = "cards.time_box-{0}-{1}-{2}-{3}-{4}".format(
-        current_user.id, board.id if board else "user-{0}".format(current_user.id), inspect.getsource(y_function).strip(),
+        current_user.id, board.id if board else "user-{0}".format(current_user.id), metric,
         year if year else "None", month if month else "None"
     )
     chart = CachedChart.get(board=board, uuid=chart_uuid)
@@ -1052,18 +864,39 @@ def time_box(current_user, time_metric_name="Time", board=None,
         x_title="Completion date", y_title=time_metric_name
     )
 
+    # Completed cards
+    distribution, months = _get_completed_card_metric_distribution_by_month(
+        current_user, board, [metric], year, month
+    )
+
+    for year_i, month_i, month_mask in months:
+        card_values = distribution.values(metric)[month_mask & distribution.has_value_mask(metric)]
+        box_chart.add("{0}-{1}".format(year_i, month_i), card_values.tolist())
+
+    chart = CachedChart.make(board=board, uuid=chart_uuid, svg=box_chart.render(is_unicode=True))
+    return chart.render_django_response()
+
+
+# Metric distribution of the completed cards of the boards of the chart and the months of the chart.
+# Months go from the first month with spent times (or the month and year passed as parameters) to the last one
+# with spent times, but only the months with cards (created and with their last activity in that month) are
+# returned as tuples (year, month, mask of the cards of the month).
+# If there are no spent times, returns (None, []).
+def _get_completed_card_metric_distribution_by_month(current_user, board, metric_names, year=None, month=None,
+                                                     with_completion_datetimes=False):
     if board is None:
         boards = get_user_boards(current_user)
     else:
         boards = [board]
 
-    start_working_date = DailySpentTime.objects.filter(board__in=boards).aggregate(start_working_date=Min("date"))[
-        "start_working_date"]
-    end_working_date = DailySpentTime.objects.filter(board__in=boards).aggregate(end_working_date=Max("date"))[
-        "end_working_date"]
+    working_dates = DailySpentTime.objects.filter(board__in=boards).aggregate(
+        start_working_date=Min("date"), end_working_date=Max("date")
+    )
+    start_working_date = working_dates["start_working_date"]
+    end_working_date = working_dates["end_working_date"]
 
     if start_working_date is None or end_working_date is None:
-        return box_chart.render_django_response()
+        return None, []
 
     month_i = 1
     end_month = end_working_date.month
@@ -1083,40 +916,27 @@ def time_box(current_user, time_metric_name="Time", board=None,
         end_month = end_working_date.month
         end_year = end_working_date.year
 
-    # Completed cards
-    cards = Card.objects.filter(board__in=boards, is_closed=False, list__type="done").order_by("id")
+    distribution = CardMetricDistribution(
+        Card.objects.filter(board__in=boards, is_closed=False, list__type="done"), metric_names,
+        with_completion_datetimes=with_completion_datetimes
+    )
 
-    i = 0
+    months = []
     while (year_i == end_year and month_i <= end_month) or year_i < end_year:
-
-        card_values = []
-        cards_by_month = cards.filter(
-            creation_datetime__month=month_i, creation_datetime__year=year_i,
-            last_activity_datetime__month=month_i, last_activity_datetime__year=year_i
-        )
-
-        if cards_by_month.exists():
-            for card in cards_by_month:
-                try:
-                    card_values.append(y_function(card))
-                # A TypeError is thrown when the y_function can't be computed because some of its parameters
-                # are None. For example if a card is not done, spent_time will be None.
-                except TypeError:
-                    pass
-
-            box_chart.add("{0}-{1}".format(year_i, month_i), card_values)
+        month_mask = distribution.month_mask(year_i, month_i)
+        if month_mask.any():
+            months.append((year_i, month_i, month_mask))
 
         month_i += 1
-        i += 1
         if month_i > 12:
             month_i = 1
             year_i += 1
 
-    chart = CachedChart.make(board=board, uuid=chart_uuid, svg=box_chart.render(is_unicode=True))
-    return chart.render_django_response()
+    return distribution, months
 
 
 # Number of comments chart
+@dependencies.depends_on(dependencies.COMMENTS, dependencies.MEMBERS)
 def number_of_comments(current_user, board=None, card=None):
     # Caching
     chart_uuid = "cards.number_of_comments-{0}-{1}-{2}".format(
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import functools
+import threading
+
+
+# Data domains read by the charts of a board.
+# Each chart declares the domains it depends on and each change of the data of a board invalidates only the charts
+# that depend on the changed domains (see ChartDataVersion).
+
+# Cards and their attributes (name, value, closing, spent and estimated times of the card...)
+CARDS = "cards"
+# Lists of the board, the list each card is in and the movements of the cards between lists
+MOVEMENTS = "movements"
+# Daily spent times
+SPENT_TIMES = "spent_times"
+# Labels and their cards
+LABELS = "labels"
+# Members of the board and of each card
+MEMBERS = "members"
+# Comments of the cards
+COMMENTS = "comments"
+# Interruptions of the members
+INTERRUPTIONS = "interruptions"
+# Noise measurements
+NOISE_MEASUREMENTS = "noise_measurements"
+# Commits of the repositories of the board and their code quality assessments
+COMMITS = "commits"
+# Requirements and their cards
+REQUIREMENTS = "requirements"
+
+DOMAINS = (
+    CARDS, MOVEMENTS, SPENT_TIMES, LABELS, MEMBERS, COMMENTS, INTERRUPTIONS, NOISE_MEASUREMENTS, COMMITS, REQUIREMENTS
+)
+
+# Domains changed by the creation, edition or deletion of a comment.
+# Comments can contain spent/estimated times, card values and requirements of the card.
+COMMENT_DOMAINS = (COMMENTS, SPENT_TIMES, CARDS, REQUIREMENTS)
+
+
+# Domains of the chart function that is being executed in each thread
+_local = threading.local()
+
+
+# Decorator that declares the data domains a chart function depends on.
+# The cached charts got and made while the function is executed depend only on these domains.
+def depends_on(*domains):
+    for domain in domains:
+        if domain not in DOMAINS:
+            raise ValueError(u"Unknown chart data domain {0}".format(domain))
+
+    def decorator(chart_function):
+        @functools.wraps(chart_function)
+        def chart_function_with_domains(*args, **kwargs):
+            domain_stack = _get_domain_stack()
+            domain_stack.append(domains)
+            try:
+                return chart_function(*args, **kwargs)
+            finally:
+                domain_stack.pop()
+
+        chart_function_with_domains.domains = domains
+        return chart_function_with_domains
+
+    return decorator
+
+
+# Domains the chart that is being generated depends on.
+# Charts that do not declare their domains depend on all of them.
+def get_current_domains():
+    domain_stack = _get_domain_stack()
+    if domain_stack:
+        return domain_stack[-1]
+    return DOMAINS
+
+
+def _get_domain_stack():
+    if not hasattr(_local, "domain_stack"):
+        _local.domain_stack = []
+    return _local.domain_stack
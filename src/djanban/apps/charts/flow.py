@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import bisect
+import copy
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.conf import settings
+
+from djanban.apps.boards.models import Card, CardLabelRelationship, List
+from djanban.apps.reports.models import CardMovement
+
+
+# Return the pairs (date, local datetime at the start of that date) between two dates with a step in days
+def get_date_buckets(start_date, end_date, day_step=1):
+    local_timezone = pytz.timezone(settings.TIME_ZONE)
+    buckets = []
+    date_i = copy.deepcopy(start_date)
+    while date_i <= end_date:
+        buckets.append((date_i, local_timezone.localize(datetime.combine(date_i, time.min))))
+        date_i += timedelta(days=day_step)
+    return buckets
+
+
+# Card flow of one or several boards.
+# Card creations and card movements are loaded once and sorted by datetime, so the number of events
+# before (or between) each one of the chart datetimes is obtained with a binary search
+# instead of with a COUNT query for each list and day.
+class CardFlow(object):
+
+    def __init__(self, boards, only_active_cards=False):
+        card_filter = {"board__in": boards}
+        movement_filter = {"board__in": boards}
+        if only_active_cards:
+            card_filter["is_closed"] = False
+            movement_filter["card__is_closed"] = False
+
+        # Lists of the boards
+        self.lists = {
+            list_id: {"position": position, "type": list_type}
+            for list_id, position, list_type in List.objects.filter(board__in=boards).
+            values_list("id", "position", "type")
+        }
+
+        # Creation datetime of all cards and of the cards without movements grouped by their list
+        self.card_creation_datetimes = {}
+        self.creation_datetimes = []
+        self.unmoved_creation_datetimes_by_list = {}
+        cards = Card.objects.filter(**card_filter).values_list(
+            "id", "list_id", "creation_datetime", "number_of_forward_movements", "number_of_backward_movements"
+        )
+        for card_id, list_id, creation_datetime, number_of_forward_movements, number_of_backward_movements in cards:
+            self.card_creation_datetimes[card_id] = creation_datetime
+            self.creation_datetimes.append(creation_datetime)
+            if number_of_forward_movements == 0 and number_of_backward_movements == 0:
+                self.unmoved_creation_datetimes_by_list.setdefault(list_id, []).append(creation_datetime)
+
+        # Datetime of the movements grouped by their destination list.
+        # The first arrival to a done list of each card is also stored.
+        self.movement_datetimes_by_list = {}
+        self.first_done_datetime_by_card = {}
+        movements = CardMovement.objects.filter(**movement_filter).\
+            values_list("card_id", "destination_list_id", "datetime")
+        for card_id, destination_list_id, movement_datetime in movements:
+            self.movement_datetimes_by_list.setdefault(destination_list_id, []).append(movement_datetime)
+            if self.lists[destination_list_id]["type"] == "done":
+                first_done_datetime = self.first_done_datetime_by_card.get(card_id)
+                if first_done_datetime is None or movement_datetime < first_done_datetime:
+                    self.first_done_datetime_by_card[card_id] = movement_datetime
+
+        self.creation_datetimes.sort()
+        for datetimes in self.unmoved_creation_datetimes_by_list.values():
+            datetimes.sort()
+        for datetimes in self.movement_datetimes_by_list.values():
+            datetimes.sort()
+
+        self.unmoved_creation_datetimes_by_list_type = self._group_by_list_type(self.unmoved_creation_datetimes_by_list)
+        self.movement_datetimes_by_list_type = self._group_by_list_type(self.movement_datetimes_by_list)
+
+    # Number of cards without movements created in each list in the day_step days before each datetime
+    # plus the number of cards that were moved to that list in that period
+    def absolute_list_values(self, lists, datetimes, day_step=1):
+        list_values = {list_.id: [] for list_ in lists}
+        for datetime_i in datetimes:
+            start_datetime_i = datetime_i - timedelta(days=day_step)
+            for list_ in lists:
+                num_cards_without_movements = _count_between(
+                    self.unmoved_creation_datetimes_by_list.get(list_.id, []), start_datetime_i, datetime_i
+                )
+                num_cards_moving_to_list = _count_between(
+                    self.movement_datetimes_by_list.get(list_.id, []), start_datetime_i, datetime_i
+                )
+                list_values[list_.id].append(num_cards_moving_to_list + num_cards_without_movements)
+        return list_values
+
+    # Number of cards without movements created in each list until each datetime
+    # plus the number of cards that were moved to that list or to any list after it before that datetime
+    def cumulative_list_values(self, lists, datetimes):
+        list_values = {list_.id: [] for list_ in lists}
+        for datetime_i in datetimes:
+            num_movements_by_position = {}
+            for list_id, movement_datetimes in self.movement_datetimes_by_list.items():
+                position = self.lists[list_id]["position"]
+                num_movements_by_position[position] = \
+                    num_movements_by_position.get(position, 0) + _count_before(movement_datetimes, datetime_i)
+            positions, num_movements_from_position = _suffix_sums(num_movements_by_position)
+
+            for list_ in lists:
+                num_cards_without_movements = _count_until(
+                    self.unmoved_creation_datetimes_by_list.get(list_.id, []), datetime_i
+                )
+                num_cards_moving_to_list = _sum_from(positions, num_movements_from_position, list_.position)
+                list_values[list_.id].append(num_cards_moving_to_list + num_cards_without_movements)
+        return list_values
+
+    # Number of cards without movements created in a list of each type until each datetime
+    # plus the number of cards that were moved to a list of that type or a later type until that datetime
+    def cumulative_list_type_values(self, datetimes):
+        list_type_values = {list_type: [] for list_type in List.LIST_TYPES}
+        for datetime_i in datetimes:
+            num_cards_moving_to_later_list_types = 0
+            for list_type in reversed(List.LIST_TYPES):
+                num_cards_without_movements = _count_until(
+                    self.unmoved_creation_datetimes_by_list_type.get(list_type, []), datetime_i
+                )
+                num_cards_moving_to_later_list_types += _count_until(
+                    self.movement_datetimes_by_list_type.get(list_type, []), datetime_i
+                )
+                list_type_values[list_type].append(num_cards_moving_to_later_list_types + num_cards_without_movements)
+        return list_type_values
+
+    # Number of cards created until each datetime
+    def created_card_values(self, datetimes):
+        return [_count_until(self.creation_datetimes, datetime_i) for datetime_i in datetimes]
+
+    # Number of arrivals to a done list until each datetime
+    def done_movement_values(self, datetimes):
+        done_movement_datetimes = self.movement_datetimes_by_list_type.get("done", [])
+        return [_count_until(done_movement_datetimes, datetime_i) for datetime_i in datetimes]
+
+    # Number of cards of each label created until each datetime and
+    # number of cards of each label that have arrived to a done list until each datetime
+    def label_card_values(self, labels, datetimes):
+        card_ids_by_label = {label.id: [] for label in labels}
+        card_label_relationships = CardLabelRelationship.objects.filter(label__in=labels).\
+            values_list("label_id", "card_id")
+        for label_id, card_id in card_label_relationships:
+            card_ids_by_label[label_id].append(card_id)
+
+        created_card_values_by_label = {}
+        done_card_values_by_label = {}
+        for label in labels:
+            card_ids = [card_id for card_id in card_ids_by_label[label.id] if card_id in self.card_creation_datetimes]
+            creation_datetimes = sorted(self.card_creation_datetimes[card_id] for card_id in card_ids)
+            done_datetimes = sorted(
+                self.first_done_datetime_by_card[card_id]
+                for card_id in card_ids if card_id in self.first_done_datetime_by_card
+            )
+            created_card_values_by_label[label.id] = [
+                _count_until(creation_datetimes, datetime_i) for datetime_i in datetimes
+            ]
+            done_card_values_by_label[label.id] = [
+                _count_until(done_datetimes, datetime_i) for datetime_i in datetimes
+            ]
+        return created_card_values_by_label, done_card_values_by_label
+
+    # Merge the sorted datetimes of each list in a sorted list of datetimes for each list type
+    def _group_by_list_type(self, datetimes_by_list):
+        datetimes_by_list_type = {}
+        for list_id, datetimes in datetimes_by_list.items():
+            datetimes_by_list_type.setdefault(self.lists[list_id]["type"], []).extend(datetimes)
+        for datetimes in datetimes_by_list_type.values():
+            datetimes.sort()
+        return datetimes_by_list_type
+
+
+# Number of sorted values that are strictly less than a value
+def _count_before(sorted_values, value):
+    return bisect.bisect_left(sorted_values, value)
+
+
+# Number of sorted values that are less or equal than a value
+def _count_until(sorted_values, value):
+    return bisect.bisect_right(sorted_values, value)
+
+
+# Number of sorted values in the interval [start_value, end_value)
+def _count_between(sorted_values, start_value, end_value):
+    return bisect.bisect_left(sorted_values, end_value) - bisect.bisect_left(sorted_values, start_value)
+
+
+# Return the sorted positions and, for each one of them, the sum of the values of the greater or equal positions
+def _suffix_sums(value_by_position):
+    positions = sorted(value_by_position.keys())
+    suffix_sums = [0] * len(positions)
+    accumulated_value = 0
+    for index in range(len(positions) - 1, -1, -1):
+        accumulated_value += value_by_position[positions[index]]
+        suffix_sums[index] = accumulated_value
+    return positions, suffix_sums
+
+
+# Sum of the values whose positions are greater or equal than a position
+def _sum_from(positions, suffix_sums, position):
+    index = bisect.bisect_left(positions, position)
+    if index == len(positions):
+        return 0
+    return suffix_sums[index]
@@ -2,58 +2,59 @@
 
 from __future__ import unicode_literals
 
-import copy
-import hashlib
-import inspect
 from datetime import timedelta
 
 import pygal
-from django.db.models import Min, Max, Sum
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
-from django.template.defaultfilters import slugify
 
 from djanban.apps.base.auth import get_user_boards
+from djanban.apps.charts import dependencies
 from djanban.apps.charts.models import CachedChart
 from djanban.apps.dev_environment.models import Interruption
 from djanban.apps.members.models import Member
 
 
+# Measurements of the interruptions shown in the charts: number of interruptions and their spent time
+COUNT = "count"
+SPENT_TIME = "spent_time"
+
+
 # Number of interruptions
 def number_of_interruptions(current_user, board=None):
     chart_title = u"Number of interruptions as of {0}".format(timezone.now())
-    return _number_of_interruptions(current_user, board, chart_title, _interruption_count, incremental=False)
+    return _number_of_interruptions(current_user, board, chart_title, COUNT, incremental=False)
 
 
 # Evolution of the number of interruptions
 def evolution_of_interruptions(current_user, board=None):
     chart_title = u"Evolution of number of interruptions as of {0}".format(timezone.now())
-    return _number_of_interruptions(current_user, board, chart_title, _interruption_count, incremental=True)
+    return _number_of_interruptions(current_user, board, chart_title, COUNT, incremental=True)
 
 
 # Interruption spent time
 def interruption_spent_time(current_user, board=None):
     chart_title = u"Interruption spent time as of {0}".format(timezone.now())
-    return _number_of_interruptions(current_user, board, chart_title, _interruption_spent_time_sum, incremental=False)
+    return _number_of_interruptions(current_user, board, chart_title, SPENT_TIME, incremental=False)
 
 
 # Evolution of the number of interruptions
 def evolution_of_interruption_spent_time(current_user, board=None):
     chart_title = u"Evolution of interruption spent time as of {0}".format(timezone.now())
-    return _number_of_interruptions(current_user, board, chart_title, _interruption_spent_time_sum, incremental=True)
+    return _number_of_interruptions(current_user, board, chart_title, SPENT_TIME, incremental=True)
 
 
 # Number of interruptions base function
-def _number_of_interruptions(current_user, board, chart_title, interruption_measurement, incremental=False):
+@dependencies.depends_on(dependencies.INTERRUPTIONS)
+def _number_of_interruptions(current_user, board, chart_title, measurement, incremental=False):
 
     # Caching
-    chart_uuid = "interruptions.{0}".format(
-        hashlib.sha256("_number_of_interruptions-{0}-{1}-{2}-{3}-{4}".format(
-            current_user.id,
-            board.id if board else "user-{0}".format(current_user.id),
-            inspect.getsource(interruption_measurement),
-            "incremental" if incremental else "absolute",
-            chart_title
-        )).hexdigest()
+    chart_uuid = "interruptions._number_of_interruptions-{0}-{1}-{2}-{3}".format(
+        current_user.id,
+        board.id if board else "user-{0}".format(current_user.id),
+        measurement,
+        "incremental" if incremental else "absolute"
     )
     chart = CachedChart.get(board=board, uuid=chart_uuid)
     if chart:
@@ -65,89 +66,64 @@ def _number_of_interruptions(current_user, board, chart_title, interruption_meas
     interruptions_chart = pygal.Line(title=chart_title, legend_at_bottom=True, print_values=True,
                                      print_zeroes=False, x_label_rotation=65,
                                      human_readable=True)
-
     if incremental:
-        datetime_filter = "datetime__date__lte"
         interruptions_chart.print_values = False
-    else:
-        datetime_filter = "datetime__date"
 
-    interruptions_filter = {}
     if board:
-        interruptions_filter["board"] = board
+        interruptions = Interruption.objects.filter(board=board)
         boards = [board]
     else:
+        interruptions = Interruption.objects.filter(member__in=Member.get_user_team_members(current_user))
         boards = get_user_boards(current_user)
-        interruptions_filter["member__in"] = Member.get_user_team_members(current_user)
 
-    board_values = {board.id: [] for board in boards}
-
-    interruptions = Interruption.objects.filter(**interruptions_filter).order_by("datetime")
-    if not interruptions.exists():
+    daily_measurements = get_daily_measurements(interruptions)
+    if not daily_measurements:
         return interruptions_chart.render_django_response()
 
-    min_datetime = interruptions.aggregate(min_datetime=Min("datetime"))["min_datetime"]
-    max_datetime = interruptions.aggregate(max_datetime=Max("datetime"))["max_datetime"]
-
-    date_i = copy.deepcopy(min_datetime.date())
-    max_date = max_datetime.date() + timedelta(days=2)
-    days = []
-    num_interruptions = []
-    while date_i <= max_date:
-        interruptions_filter = {datetime_filter: date_i}
-        interruptions_on_date = interruptions.filter(**interruptions_filter)
-        interruptions_on_date_value = interruption_measurement(interruptions_on_date)
-
-        # Add only values when there is some interruption in any project
-        if interruptions_on_date_value > 0:
-            days.append(date_i.strftime("%Y-%m-%d"))
-            num_interruptions.append(interruptions_on_date_value)
-
-            if board is None:
-                for board_i in boards:
-                    board_i_interruptions_value = interruption_measurement(interruptions_on_date.filter(board=board_i))
-                    board_values[board_i.id].append(board_i_interruptions_value)
-
-        date_i += timedelta(days=1)
+    # Values of each board are only shown when the chart is not about a board
+    series_ids = [board_i.id for board_i in boards] if board is None else []
+    days, num_interruptions, board_values = get_daily_series(
+        daily_measurements, measurement, incremental, series_attribute="board_id", series_ids=series_ids
+    )
 
     interruptions_chart.add(u"All interruptions", num_interruptions)
-    for board_i in boards:
-        if sum(board_values[board_i.id]) > 0:
-            interruptions_chart.add(board_i.name, board_values[board_i.id])
+    if board is None:
+        for board_i in boards:
+            if sum(board_values[board_i.id]) > 0:
+                interruptions_chart.add(board_i.name, board_values[board_i.id])
 
-    interruptions_chart.x_labels = days
+    interruptions_chart.x_labels = [day.strftime("%Y-%m-%d") for day in days]
 
-    chart = CachedChart.make(board=None, uuid=chart_uuid, svg=interruptions_chart.render(is_unicode=True))
+    chart = CachedChart.make(board=board, uuid=chart_uuid, svg=interruptions_chart.render(is_unicode=True))
     return chart.render_django_response()
 
 
 # Number of interruptions by member
 def number_of_interruptions_by_member(current_user):
     chart_title = u"Number of interruptions by member as of {0}".format(timezone.now())
-    return _number_of_interruptions_by_member(current_user, chart_title, _interruption_count, incremental=False)
+    return _number_of_interruptions_by_member(current_user, chart_title, COUNT, incremental=False)
 
 
 # Evolution of the number of interruptions by member
 def evolution_of_interruptions_by_member(current_user):
     chart_title = u"Evolution of number of interruptions by member as of {0}".format(timezone.now())
-    return _number_of_interruptions_by_member(current_user, chart_title, _interruption_count, incremental=True)
+    return _number_of_interruptions_by_member(current_user, chart_title, COUNT, incremental=True)
 
 
 # Spent time of interruptions by member
 def interruption_spent_time_by_member(current_user):
     chart_title = u"Spent time on interruptions by member as of {0}".format(timezone.now())
-    return _number_of_interruptions_by_member(current_user, chart_title, _interruption_spent_time_sum, incremental=False)
+    return _number_of_interruptions_by_member(current_user, chart_title, SPENT_TIME, incremental=False)
 
 
 # Number of interruptions base function
-def _number_of_interruptions_by_member(current_user, chart_title, interruption_measurement, incremental=False):
+@dependencies.depends_on(dependencies.INTERRUPTIONS, dependencies.MEMBERS)
+def _number_of_interruptions_by_member(current_user, chart_title, measurement, incremental=False):
     # Caching
-    chart_uuid = "interruptions.{0}".format(
-        hashlib.sha256("_number_of_interruptions_by_member-{0}-{1}-{2}".format(
-            current_user.id,
-            inspect.getsource(interruption_measurement),
-            "incremental" if incremental else "absolute"
-        )).hexdigest()
+    chart_uuid = "interruptions._number_of_interruptions_by_member-{0}-{1}-{2}".format(
+        current_user.id,
+        measurement,
+        "incremental" if incremental else "absolute"
     )
     chart = CachedChart.get(board=None, uuid=chart_uuid)
     if chart:
@@ -156,55 +132,29 @@ def _number_of_interruptions_by_member(current_user, chart_title, interruption_m
     interruptions_chart = pygal.Line(title=chart_title, legend_at_bottom=True, print_values=True,
                                      print_zeroes=False, x_label_rotation=65,
                                      human_readable=True)
-
     if incremental:
-        datetime_filter = "datetime__date__lte"
         interruptions_chart.print_values = False
-    else:
-        datetime_filter = "datetime__date"
-
-    interruptions_filter = {}
 
     boards = get_user_boards(current_user)
-    members = Member.objects.filter(boards__in=boards).distinct()
-    member_values = {member.id: [] for member in members}
-    interruptions_filter["member__in"] = members
-
-    interruptions = Interruption.objects.filter(**interruptions_filter).order_by("datetime")
+    members = list(
+        Member.objects.filter(boards__in=boards).distinct().order_by("id").select_related("user", "trello_member_profile")
+    )
 
-    interruptions = Interruption.objects.filter(**interruptions_filter).order_by("datetime")
-    if not interruptions.exists():
+    daily_measurements = get_daily_measurements(Interruption.objects.filter(member__in=members))
+    if not daily_measurements:
         return interruptions_chart.render_django_response()
 
-    min_datetime = interruptions.aggregate(min_datetime=Min("datetime"))["min_datetime"]
-    max_datetime = interruptions.aggregate(max_datetime=Max("datetime"))["max_datetime"]
-
-    date_i = copy.deepcopy(min_datetime.date())
-    max_date = max_datetime.date() + timedelta(days=2)
-    days = []
-    num_interruptions = []
-    while date_i <= max_date:
-        interruptions_filter = {datetime_filter: date_i}
-        interruptions_on_date = interruptions.filter(**interruptions_filter)
-        interruptions_on_date_value = interruption_measurement(interruptions_on_date)
-
-        # Add only values when there is some interruption in any project
-        if interruptions_on_date_value > 0:
-            days.append(date_i.strftime("%Y-%m-%d"))
-            num_interruptions.append(interruptions_on_date_value)
-
-            for member_i in members:
-                member_interruptions_on_date_value = interruption_measurement(interruptions_on_date.filter(member=member_i))
-                member_values[member_i.id].append(member_interruptions_on_date_value)
-
-        date_i += timedelta(days=1)
+    days, num_interruptions, member_values = get_daily_series(
+        daily_measurements, measurement, incremental, series_attribute="member_id",
+        series_ids=[member.id for member in members]
+    )
 
     interruptions_chart.add(u"All interruptions", num_interruptions)
     for member_i in members:
         if sum(member_values[member_i.id]) > 0:
             interruptions_chart.add(member_i.external_username, member_values[member_i.id])
 
-    interruptions_chart.x_labels = days
+    interruptions_chart.x_labels = [day.strftime("%Y-%m-%d") for day in days]
 
     chart = CachedChart.make(board=None, uuid=chart_uuid, svg=interruptions_chart.render(is_unicode=True))
     return chart.render_django_response()
@@ -213,24 +163,23 @@ def _number_of_interruptions_by_member(current_user, chart_title, interruption_m
 # Number of interruptions by month
 def number_of_interruptions_by_month(current_user, board=None):
     chart_title = u"Number of interruptions by month as of {0}".format(timezone.now())
-    return _interruption_measurement_by_month(current_user, chart_title, _interruption_count, board)
+    return _interruption_measurement_by_month(current_user, chart_title, COUNT, board)
 
 
 # Spent time because of interruptions by month
 def interruption_spent_time_by_month(current_user, board=None):
     chart_title = u"Interruption spent time by month as of {0}".format(timezone.now())
-    return _interruption_measurement_by_month(current_user, chart_title, _interruption_spent_time_sum, board)
+    return _interruption_measurement_by_month(current_user, chart_title, SPENT_TIME, board)
 
 
 # Any measurement of interruptions by month
-def _interruption_measurement_by_month(current_user, chart_title, interruption_measurement, board=None):
-
-    chart_uuid = "interruptions.{0}".format(
-        hashlib.sha256("_interruption_measurement_by_month-{0}-{1}-{2}".format(
-            current_user.id,
-            inspect.getsource(interruption_measurement),
-            board.id if board else "username-{0}".format(current_user.id)
-        )).hexdigest()
+@dependencies.depends_on(dependencies.INTERRUPTIONS)
+def _interruption_measurement_by_month(current_user, chart_title, measurement, board=None):
+
+    chart_uuid = "interruptions._interruption_measurement_by_month-{0}-{1}-{2}".format(
+        current_user.id,
+        measurement,
+        board.id if board else "username-{0}".format(current_user.id)
     )
     chart = CachedChart.get(board=board, uuid=chart_uuid)
     if chart:
@@ -239,77 +188,127 @@ def _interruption_measurement_by_month(current_user, chart_title, interruption_m
     if board:
         chart_title += u" for board {0} as of {1}".format(board.name, board.get_human_fetch_datetime())
 
-    interruptions_filter = {}
     if board:
-        interruptions_filter["board"] = board
+        interruptions = Interruption.objects.filter(board=board)
+        boards = [board]
     else:
-        interruptions_filter["member__in"] = Member.get_user_team_members(current_user)
-
-    interruptions = Interruption.objects.filter(**interruptions_filter).order_by("datetime")
+        interruptions = Interruption.objects.filter(member__in=Member.get_user_team_members(current_user))
+        boards = get_user_boards(current_user)
 
     interruptions_chart = pygal.Line(title=chart_title, legend_at_bottom=True, print_values=True,
                                      print_zeroes=False, human_readable=True)
 
-    min_datetime = interruptions.aggregate(min_datetime=Min("datetime"))["min_datetime"]
-    max_datetime = interruptions.aggregate(max_datetime=Min("datetime"))["max_datetime"]
-    if min_datetime is None or max_datetime is None:
+    daily_measurements = get_daily_measurements(interruptions)
+    if not daily_measurements:
         return interruptions_chart.render_django_response()
 
-    datetime_i = copy.deepcopy(min_datetime)
+    months, values, board_values = get_monthly_series(
+        daily_measurements, measurement, series_attribute="board_id", series_ids=[board_i.id for board_i in boards]
+    )
 
-    date_i = datetime_i.date()
-    month_i = date_i.month
-    year_i = date_i.year
+    interruptions_chart.x_labels = [u"{0}-{1}".format(year, month) for year, month in months]
+    interruptions_chart.add(u"All interruptions", values)
+    for board_i in boards:
+        if sum(board_values[board_i.id]) > 0:
+            interruptions_chart.add(board_i.name, board_values[board_i.id])
 
-    last_month = max_datetime.month
-    last_year = max_datetime.year
+    chart = CachedChart.make(board=board, uuid=chart_uuid, svg=interruptions_chart.render(is_unicode=True))
+    return chart.render_django_response()
 
-    if board is None:
-        boards = get_user_boards(current_user)
-    else:
-        boards = [board]
 
-    months = []
-    values = []
-    board_values = {board.id: [] for board in boards}
-    has_board_values = {board.id: False for board in boards }
-
-    while year_i < last_year or year_i == last_year and month_i <= last_month:
-        monthly_interruptions = interruptions.filter(datetime__month=month_i, datetime__year=year_i)
-        monthly_measurement = interruption_measurement(monthly_interruptions)
-        # For each month that have some data, add it to the chart
-        if monthly_measurement > 0:
-            months.append(u"{0}-{1}".format(year_i, month_i))
-            values.append(monthly_measurement)
-            for board in boards:
-                monthly_interruption_measurement = interruption_measurement(monthly_interruptions.filter(board=board))
-                board_values[board.id].append(monthly_interruption_measurement)
-                if monthly_interruption_measurement > 0:
-                    has_board_values[board.id] = True
-
-        month_i += 1
-        if month_i > 12:
-            month_i = 1
-            year_i += 1
-
-    interruptions_chart.x_labels = months
-    interruptions_chart.add(u"All interruptions", values)
-    for board in boards:
-        if has_board_values[board.id]:
-            interruptions_chart.add(board.name, board_values[board.id])
+# Number of interruptions and their spent time grouped by date (in the current time zone), board and member.
+# Returns a list of dicts with the keys date, board_id, member_id, count and spent_time sorted by date.
+def get_daily_measurements(interruptions):
+    return list(
+        interruptions.annotate(date=TruncDate("datetime")).
+        values("date", "board_id", "member_id").
+        annotate(count=Count("id"), spent_time=Sum("spent_time")).
+        order_by("date", "board_id", "member_id")
+    )
 
-    chart = CachedChart.make(board=None, uuid=chart_uuid, svg=interruptions_chart.render(is_unicode=True))
-    return chart.render_django_response()
+
+# Series of a measurement by day.
+# Days go from the first day with interruptions until two days after the last one, but only the days with a
+# positive measurement (a positive accumulated measurement if incremental is True) are included.
+# Returns the days, the total value of each day and the values of each day of each one of the series_ids
+# (ids of boards or members, depending on the series_attribute of the daily measurements).
+def get_daily_series(daily_measurements, measurement, incremental, series_attribute, series_ids):
+    totals_by_date = {}
+    values_by_date = {}
+    for daily_measurement in daily_measurements:
+        date = daily_measurement["date"]
+        value = _get_value(daily_measurement, measurement)
+        totals_by_date[date] = totals_by_date.get(date, 0) + value
+        series_values = values_by_date.setdefault(date, {})
+        series_id = daily_measurement[series_attribute]
+        series_values[series_id] = series_values.get(series_id, 0) + value
+
+    days = []
+    totals = []
+    series = {series_id: [] for series_id in series_ids}
+
+    total = 0
+    series_totals = {series_id: 0 for series_id in series_ids}
+    date_i = daily_measurements[0]["date"]
+    max_date = daily_measurements[-1]["date"] + timedelta(days=2)
+    while date_i <= max_date:
+        series_values = values_by_date.get(date_i, {})
+        if incremental:
+            total += totals_by_date.get(date_i, 0)
+            for series_id in series_ids:
+                series_totals[series_id] += series_values.get(series_id, 0)
+        else:
+            total = totals_by_date.get(date_i, 0)
+            series_totals = {series_id: series_values.get(series_id, 0) for series_id in series_ids}
+
+        # Add only values when there is some interruption in any project
+        if total > 0:
+            days.append(date_i)
+            totals.append(total)
+            for series_id in series_ids:
+                series[series_id].append(series_totals[series_id])
+
+        date_i += timedelta(days=1)
+
+    return days, totals, series
 
 
-# Computes the sum of the spent time of a list of interruptions
-def _interruption_spent_time_sum(interruptions_):
-    sum_spent_time = interruptions_.aggregate(sum_spent_time=Sum("spent_time"))["sum_spent_time"]
-    if sum_spent_time is None:
-        return 0
-    return sum_spent_time
+# Series of a measurement by month.
+# Returns the months (year and month tuples) with a positive measurement, the total value of each one of them
+# and the values of each month of each one of the series_ids.
+def get_monthly_series(daily_measurements, measurement, series_attribute, series_ids):
+    months = []
+    totals = []
+    series = {series_id: [] for series_id in series_ids}
+    for daily_measurement in daily_measurements:
+        month = (daily_measurement["date"].year, daily_measurement["date"].month)
+        if not months or months[-1] != month:
+            months.append(month)
+            totals.append(0)
+            for series_id in series_ids:
+                series[series_id].append(0)
+        value = _get_value(daily_measurement, measurement)
+        totals[-1] += value
+        series_id = daily_measurement[series_attribute]
+        if series_id in series:
+            series[series_id][-1] += value
+
+    # For each month that have some data, add it to the chart
+    positive_month_indices = [month_index for month_index, total in enumerate(totals) if total > 0]
+    return (
+        [months[month_index] for month_index in positive_month_indices],
+        [totals[month_index] for month_index in positive_month_indices],
+        {
+            series_id: [series_values[month_index] for month_index in positive_month_indices]
+            for series_id, series_values in series.items()
+        }
+    )
 
 
-# Count the number of interruptions
-def _interruption_count(interruptions_):
-    return interruptions_.count()
\ No newline at end of file
+# Value of a measurement in a group of interruptions
+def _get_value(daily_measurement, measurement):
+    if measurement == COUNT:
+        return daily_measurement["count"]
+    if measurement == SPENT_TIME:
+        return daily_measurement["spent_time"] or 0
+    raise ValueError(u"Unknown interruption measurement {0}".format(measurement))
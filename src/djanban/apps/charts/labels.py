@@ -11,12 +11,14 @@ from django.utils import timezone
 
 from djanban.apps.base.auth import get_user_boards
 from djanban.apps.boards.models import Card
+from djanban.apps.charts import dependencies
 from djanban.apps.charts.models import CachedChart
 from djanban.apps.dev_times.models import DailySpentTime
 from djanban.utils.week import number_of_weeks_of_year, get_iso_week_of_year, start_of_week_of_year
 
 
 # Average spent times
+@dependencies.depends_on(dependencies.CARDS, dependencies.LABELS, dependencies.SPENT_TIMES)
 def avg_spent_times(request, board=None):
 
     # Caching
@@ -60,6 +62,7 @@ def avg_spent_times(request, board=None):
 
 
 # Average estimated times
+@dependencies.depends_on(dependencies.CARDS, dependencies.LABELS, dependencies.SPENT_TIMES)
 def avg_estimated_times(request, board=None):
 
     # Caching
@@ -123,6 +126,9 @@ def number_of_cards_worked_on_by_week(request, board=None):
 
 
 # Average spent/estimated time by week/month
+@dependencies.depends_on(
+    dependencies.CARDS, dependencies.LABELS, dependencies.SPENT_TIMES
+)
 def _daily_spent_times_by_period(current_user, board=None, time_measurement="spent_time", operation="Avg", period="month"):
 
     # Caching
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+from django.core.management.base import BaseCommand
+
+from djanban.apps.charts.models import CachedChart
+
+
+# Delete the SVG files of the charts that are not referenced by any cached chart
+class Command(BaseCommand):
+    help = u'Delete the SVG chart files that are not used by any cached chart'
+
+    def __init__(self, stdout=None, stderr=None, no_color=False):
+        super(Command, self).__init__(stdout, stderr, no_color)
+
+    # Handle de command action
+    def handle(self, *args, **options):
+        deleted_file_names = CachedChart.delete_orphan_files()
+        for deleted_file_name in deleted_file_names:
+            self.stdout.write(self.style.SUCCESS(u"{0} deleted".format(deleted_file_name)))
+
+        self.stdout.write(
+            self.style.SUCCESS(u"{0} orphan chart file(s) deleted".format(len(deleted_file_names)))
+        )
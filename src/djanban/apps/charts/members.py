@@ -11,6 +11,7 @@ from isoweek import Week
 
 from djanban.apps.base.auth import get_user_boards, user_is_member
 from djanban.apps.boards.models import CardComment, Card
+from djanban.apps.charts import dependencies
 from djanban.apps.charts.models import CachedChart
 from djanban.apps.dev_environment.models import Interruption
 from djanban.apps.dev_times.models import DailySpentTime
@@ -19,6 +20,7 @@ from djanban.utils.week import number_of_weeks_of_year, get_iso_week_of_year
 
 
 # Show a chart with the task movements (backward or forward) by member
+@dependencies.depends_on(dependencies.MOVEMENTS, dependencies.MEMBERS)
 def task_movements_by_member(request, movement_type="forward", board=None):
     if movement_type != "forward" and movement_type != "backward":
         raise ValueError("{0} is not recognized as a valid movement type".format(movement_type))
@@ -57,6 +59,7 @@ def task_movements_by_member(request, movement_type="forward", board=None):
 
 
 # Spent time by week by member
+@dependencies.depends_on(dependencies.SPENT_TIMES, dependencies.MEMBERS)
 def spent_time_by_week(current_user, week_of_year=None, board=None):
     if week_of_year is None:
         now = timezone.now()
@@ -115,6 +118,7 @@ def spent_time_by_week(current_user, week_of_year=None, board=None):
 
 
 # Spent time by weekday by member
+@dependencies.depends_on(dependencies.SPENT_TIMES, dependencies.MEMBERS)
 def avg_spent_time_by_weekday(current_user, board=None):
 
     # Caching
@@ -183,6 +187,9 @@ def avg_spent_time_by_weekday(current_user, board=None):
 
 
 # Evolution of spent time by member
+@dependencies.depends_on(
+    dependencies.SPENT_TIMES, dependencies.MEMBERS, dependencies.INTERRUPTIONS
+)
 def spent_time_by_week_evolution(board, show_interruptions=False):
 
     # Caching
@@ -268,6 +275,7 @@ def spent_time_by_week_evolution(board, show_interruptions=False):
 
 
 # Number of total comments by member for this board or card
+@dependencies.depends_on(dependencies.COMMENTS, dependencies.MEMBERS)
 def number_of_comments(current_user, board=None, card=None):
 
     # Caching
@@ -322,6 +330,7 @@ def number_of_comments(current_user, board=None, card=None):
 
 
 # Number of total cards by member for this board or card
+@dependencies.depends_on(dependencies.CARDS, dependencies.MEMBERS)
 def number_of_cards(current_user, board=None):
 
     # Caching
@@ -371,6 +380,7 @@ def number_of_cards(current_user, board=None):
 
 
 # Spent time by member
+@dependencies.depends_on(dependencies.SPENT_TIMES, dependencies.MEMBERS)
 def spent_time(current_user, board=None):
 
     # Caching
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import numpy
+from django.utils import timezone
+
+
+# Time metric of the cards: a numeric field of the cards (in hours) scaled to the units of the metric
+class CardMetric(object):
+
+    def __init__(self, name, field, scale=1.0):
+        self.name = name
+        self.field = field
+        self.scale = scale
+
+
+# Metrics that can be shown in the charts of the cards. Their names are stable, so they are part of the
+# identifiers of the cached charts.
+CARD_METRICS = OrderedDict((card_metric.name, card_metric) for card_metric in (
+    CardMetric("lead_time", "lead_time"),
+    CardMetric("lead_time_in_days", "lead_time", 1 / 24.0),
+    CardMetric("lead_time_in_weeks", "lead_time", 1 / (24.0 * 7.0)),
+    CardMetric("cycle_time", "cycle_time"),
+    CardMetric("cycle_time_in_days", "cycle_time", 1 / 24.0),
+    CardMetric("cycle_time_in_weeks", "cycle_time", 1 / (24.0 * 7.0)),
+    CardMetric("spent_time", "spent_time"),
+))
+
+
+# Return the metric with a name or raise a ValueError if it does not exist
+def get_card_metric(metric_name):
+    if metric_name not in CARD_METRICS:
+        raise ValueError(u"Time metric {0} not recognized".format(metric_name))
+    return CARD_METRICS[metric_name]
+
+
+# Distribution of the time metrics of some cards.
+# The fields of the metrics of all cards are read in only one query and stored in NumPy arrays (NaN for the cards
+# without a value), so histograms and the series of each month are computed without a query for each bucket or
+# card.
+# Cards are sorted by id.
+class CardMetricDistribution(object):
+
+    def __init__(self, cards, metric_names, with_completion_datetimes=False):
+        self.metrics = [get_card_metric(metric_name) for metric_name in metric_names]
+        fields = sorted({metric.field for metric in self.metrics})
+
+        rows = list(
+            cards.order_by("id").values_list(
+                "id", "is_closed", "creation_datetime", "last_activity_datetime", "completion_datetime", *fields
+            )
+        )
+
+        self.card_ids = numpy.array([row[0] for row in rows], dtype=int)
+        self.is_closed = numpy.array([row[1] for row in rows], dtype=bool)
+        # Months are numbered as year * 12 + month - 1 in the local time zone (as the __month lookups of Django)
+        self.creation_months = numpy.array([_get_month_number(row[2]) for row in rows], dtype=int)
+        self.last_activity_months = numpy.array([_get_month_number(row[3]) for row in rows], dtype=int)
+        self._field_values = {
+            field: numpy.array(
+                [float(row[5 + field_index]) if row[5 + field_index] is not None else numpy.nan for row in rows],
+                dtype=float
+            )
+            for field_index, field in enumerate(fields)
+        }
+
+        # Completion datetime of each card (stored in the done cards, see Card.completion_datetime) or its last
+        # activity datetime if it has no completion datetime
+        self.completion_datetimes = None
+        if with_completion_datetimes:
+            self.completion_datetimes = [row[4] if row[4] is not None else row[3] for row in rows]
+
+    # Values of a metric for each card (NaN for the cards without value)
+    def values(self, metric_name):
+        metric = get_card_metric(metric_name)
+        return self._field_values[metric.field] * metric.scale
+
+    # Number of cards whose value of the metric is in each bucket of bucket_width units.
+    # The bucket n has the values in (bucket_width * (n - 1), bucket_width * n], and only the non-empty
+    # buckets up to max_value (if passed) are returned.
+    # Returns a tuple with the list of bucket numbers and the list of number of cards of each one.
+    def histogram(self, metric_name, bucket_width, max_value=None, mask=None):
+        values = self.values(metric_name)
+        if mask is not None:
+            values = values[mask]
+        values = values[~numpy.isnan(values)]
+        values = values[values > 0]
+        bucket_width = float(bucket_width)
+        if max_value is not None:
+            values = values[values <= numpy.ceil(max_value / bucket_width) * bucket_width]
+        if values.size == 0:
+            return [], []
+        buckets = numpy.ceil(values / bucket_width).astype(int)
+        counts = numpy.bincount(buckets)
+        non_empty_buckets = numpy.flatnonzero(counts)
+        return non_empty_buckets.tolist(), counts[non_empty_buckets].tolist()
+
+    # Mask of the cards that were created and had their last activity in a month
+    def month_mask(self, year, month):
+        month_number = year * 12 + month - 1
+        return (self.creation_months == month_number) & (self.last_activity_months == month_number)
+
+    # Mask of the cards that have a value of a metric
+    def has_value_mask(self, metric_name):
+        return ~numpy.isnan(self.values(metric_name))
+
+
+# Number of the month of a datetime in the current time zone
+def _get_month_number(datetime_):
+    if timezone.is_aware(datetime_):
+        datetime_ = timezone.localtime(datetime_)
+    return datetime_.year * 12 + datetime_.month - 1
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-18 10:54
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boards', '0074_board_last_fetched_action'),
+        ('charts', '0008_auto_20170530_1354'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChartDataVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=32, verbose_name='Data domain')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Version')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chart_data_versions', to='boards.Board', verbose_name='Board')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cachedchart',
+            name='data_versions',
+            field=models.CharField(blank=True, default='', help_text='Version of each of the data domains this chart depends on', max_length=256, verbose_name='Versions of the data of the board when the chart was created'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='chartdataversion',
+            unique_together=set([('board', 'domain')]),
+        ),
+    ]
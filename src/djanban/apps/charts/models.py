@@ -2,21 +2,34 @@
 
 from __future__ import unicode_literals
 
+import os
 import random
 from datetime import timedelta
 
-import shortuuid
 from django.core.files.base import ContentFile
-from django.db import models
-from django.db.models import Q
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q, F
 from django.utils import timezone
 from crequest.middleware import CrequestMiddleware
 
+from djanban.apps.charts import cache, dependencies
+
 
 # Each one of the SVG charts of this platform
 class CachedChart(models.Model):
     FORCE_UPDATE_GET_PARAM_NAME = "update"
 
+    # Directory (relative to the storage root) where the SVG files are stored.
+    # Files are named after the hash of their content, so equal charts share the same file.
+    SVG_DIRECTORY = "charts"
+
+    # Legacy SVG files were stored in the root directory and named after the chart uuid, that always starts with
+    # the name of the chart module
+    LEGACY_FILE_NAME_PREFIXES = (
+        "boards.", "cards.", "interruptions.", "labels.", "members.", "noise_measurements.", "repositories.",
+        "requirements."
+    )
+
     creation_datetime = models.DateTimeField(verbose_name=u"Creation datetime")
 
     uuid = models.CharField(max_length=2048, verbose_name=u"Chart view name",
@@ -28,77 +41,225 @@ class CachedChart(models.Model):
 
     is_expired = models.BooleanField(verbose_name=u"Is this cache item expired?", default=False)
 
-    # Gets a chart or False if the cached chart does not exists and must be created
+    data_versions = models.CharField(
+        verbose_name=u"Versions of the data of the board when the chart was created", max_length=256, default="",
+        blank=True, help_text=u"Version of each of the data domains this chart depends on"
+    )
+
+    # Gets a chart or False if the cached chart does not exists and must be created.
+    # Charts of a board are valid while the data domains they depend on (see dependencies.depends_on) do not change.
     @staticmethod
     def get(board, uuid):
         # CachedChart update can be forced passing a GET parameter that would be evaluated to True
         current_request = CrequestMiddleware.get_request()
-        force_update_param_value = current_request.GET.get(CachedChart.FORCE_UPDATE_GET_PARAM_NAME)
-        if force_update_param_value:
-            return False
+        if current_request is not None:
+            force_update_param_value = current_request.GET.get(CachedChart.FORCE_UPDATE_GET_PARAM_NAME)
+            if force_update_param_value:
+                return False
+
+        # First, try to get the chart from the in-memory caches
+        data_versions = ChartDataVersion.get_data_versions(board, dependencies.get_current_domains())
+        cache_key = cache.get_key(board, uuid, data_versions)
+        cached_svg = cache.get_svg(cache_key)
+        if cached_svg is not None:
+            return CachedChart.render_svg_response(cached_svg)
 
         # Otherwise, try to get the CachedChart and if is old or it doesn't exist, return False
         try:
-            chart = CachedChart._get(board=board, uuid=uuid)
-            return chart.render_django_response()
+            chart = CachedChart._get(board=board, uuid=uuid, data_versions=data_versions)
+            cached_svg = chart.cached_svg
+            cache.set_svg(cache_key, cached_svg)
+            return CachedChart.render_svg_response(cached_svg)
         except CachedChart.DoesNotExist:
             return False
         except CachedChart.MultipleObjectsReturned:
             CachedChart.expire(board=board, uuid=uuid)
             return False
+        # The file of the chart has been removed
+        except (IOError, OSError):
+            CachedChart.expire(board=board, uuid=uuid)
+            return False
 
+    # Charts of a board are valid until their data changes.
+    # In case there is no board, the charts are cached during 30 minutes with a random delay to avoid
+    # having all charts loading at the same time
     @staticmethod
     def chart_life_datetime_limit(board=None):
         if board:
-            return board.last_activity_datetime
-        # In case there is no board, the charts are cached during 30 minutes with a random delay to avoid
-        # having all charts loading at the same time
+            return None
         life_of_this_cache_chart_in_seconds = 1800 + random.randint(0, 600)
         return timezone.now() - timedelta(seconds=life_of_this_cache_chart_in_seconds)
 
     # Get an existing CachedChart
     @staticmethod
-    def _get(board, uuid):
-        return CachedChart.objects.get(
-            board=board, uuid=uuid, is_expired=False,
-            creation_datetime__gte=CachedChart.chart_life_datetime_limit(board)
-        )
+    def _get(board, uuid, data_versions):
+        charts = CachedChart.objects.filter(board=board, uuid=uuid, is_expired=False, data_versions=data_versions)
+        life_datetime_limit = CachedChart.chart_life_datetime_limit(board)
+        if life_datetime_limit is not None:
+            charts = charts.filter(creation_datetime__gte=life_datetime_limit)
+        return charts.get()
 
     # Create a new cached chart
     @staticmethod
     def make(board, uuid, svg):
+        data_versions = ChartDataVersion.get_data_versions(board, dependencies.get_current_domains())
+
         # Select old cached chart and if it exists, update it
+        old_chart_filter = Q(is_expired=True) | ~Q(data_versions=data_versions)
         life_datetime_limit = CachedChart.chart_life_datetime_limit(board)
+        if life_datetime_limit is not None:
+            old_chart_filter |= Q(creation_datetime__lt=life_datetime_limit)
         try:
-            chart_cache = CachedChart.objects.get(
-                Q(creation_datetime__lt=life_datetime_limit)|Q(is_expired=True), board=board, uuid=uuid
-            )
+            chart_cache = CachedChart.objects.get(old_chart_filter, board=board, uuid=uuid)
         # There shouldn't be two charts with the same signature
         except CachedChart.MultipleObjectsReturned:
-            CachedChart.objects.filter(
-                Q(creation_datetime__lt=life_datetime_limit)|Q(is_expired=True), board=board, uuid=uuid
-            ).delete()
+            CachedChart.objects.filter(old_chart_filter, board=board, uuid=uuid).delete()
             chart_cache = CachedChart(board=board, uuid=uuid)
 
         # If there is no old chart, create a new one
         except CachedChart.DoesNotExist:
             chart_cache = CachedChart(board=board, uuid=uuid)
 
+        # The SVG file is named after its content, so if it already exists there is no need to write it again
+        cached_svg = cache.CachedSvg(svg)
+        svg_file_name = "{0}/{1}.svg".format(CachedChart.SVG_DIRECTORY, cached_svg.etag)
+        if not chart_cache.svg.storage.exists(svg_file_name):
+            svg_file_name = chart_cache.svg.storage.save(svg_file_name, ContentFile(cached_svg.content))
+        chart_cache.svg.name = svg_file_name
+
         chart_cache.is_expired = False
+        chart_cache.data_versions = data_versions
         chart_cache.creation_datetime = timezone.now()
-        chart_cache.svg.save("{0}".format(uuid, shortuuid.uuid()), ContentFile(svg))
         chart_cache.save()
+
+        chart_cache._cached_svg = cached_svg
+        cache.set_svg(cache.get_key(board, uuid, data_versions), cached_svg)
         return chart_cache
 
     @staticmethod
     def expire(uuid, board=None):
         CachedChart.objects.filter(uuid=uuid, board=board).update(is_expired=True)
+        CachedChart._increment_cache_version(board)
 
     @staticmethod
     def expire_all(board=None):
         CachedChart.objects.filter(board=board).update(is_expired=True)
+        CachedChart._increment_cache_version(board)
+
+    # Charts in memory and shared caches are not reachable once the cache version of their board
+    # (or the version of the charts without board) has changed
+    @staticmethod
+    def _increment_cache_version(board):
+        if board is not None:
+            board.increment_cached_charts_version()
+        else:
+            cache.increment_no_board_charts_version()
+
+    # Delete the SVG files that are not referenced by any cached chart.
+    # Legacy files (the ones stored before the files were named after their content) are in the root directory
+    # of the storage and are named after the chart uuid, so only the files that start with the name of a chart
+    # module are considered there.
+    # Return the names of the deleted files.
+    @staticmethod
+    def delete_orphan_files(storage=None):
+        if storage is None:
+            storage = CachedChart._meta.get_field("svg").storage
+        referenced_file_names = set(CachedChart.objects.values_list("svg", flat=True))
+        deleted_file_names = []
+
+        directories, root_file_names = storage.listdir("")
+        for file_name in root_file_names:
+            if file_name.startswith(CachedChart.LEGACY_FILE_NAME_PREFIXES) and file_name not in referenced_file_names:
+                storage.delete(file_name)
+                deleted_file_names.append(file_name)
+
+        if storage.exists(CachedChart.SVG_DIRECTORY):
+            directories, file_names = storage.listdir(CachedChart.SVG_DIRECTORY)
+            for file_name in file_names:
+                svg_file_name = "{0}/{1}".format(CachedChart.SVG_DIRECTORY, file_name)
+                if svg_file_name not in referenced_file_names:
+                    storage.delete(svg_file_name)
+                    deleted_file_names.append(svg_file_name)
+        return deleted_file_names
+
+    # Content of this chart
+    @property
+    def cached_svg(self):
+        if not hasattr(self, "_cached_svg"):
+            etag = None
+            # Content-addressed files are named after the hash of their content
+            if self.svg.name.startswith(CachedChart.SVG_DIRECTORY + "/"):
+                etag = os.path.splitext(os.path.basename(self.svg.name))[0]
+            self.svg.open("rb")
+            try:
+                self._cached_svg = cache.CachedSvg(self.svg.read(), etag=etag)
+            finally:
+                self.svg.close()
+        return self._cached_svg
 
     # Render a django response
     def render_django_response(self):
-        from django.http import HttpResponse
-        return HttpResponse(self.svg.read(), content_type='image/svg+xml')
\ No newline at end of file
+        return CachedChart.render_svg_response(self.cached_svg)
+
+    # Render a django response for a SVG content.
+    # If the client already has this content (its ETag matches), a 304 Not Modified response is returned.
+    @staticmethod
+    def render_svg_response(cached_svg):
+        from django.http import HttpResponse, HttpResponseNotModified
+        etag = '"{0}"'.format(cached_svg.etag)
+        current_request = CrequestMiddleware.get_request()
+        if current_request is not None:
+            if_none_match = current_request.META.get("HTTP_IF_NONE_MATCH", "")
+            if etag in [client_etag.strip() for client_etag in if_none_match.split(",")]:
+                response = HttpResponseNotModified()
+                response["ETag"] = etag
+                return response
+        response = HttpResponse(cached_svg.content, content_type='image/svg+xml')
+        response["ETag"] = etag
+        return response
+
+
+# Version of each one of the data domains of a board (see dependencies).
+# Each change in a domain increments its version, so the charts that depend on it are not valid anymore.
+class ChartDataVersion(models.Model):
+
+    board = models.ForeignKey("boards.Board", verbose_name=u"Board", related_name="chart_data_versions")
+
+    domain = models.CharField(verbose_name=u"Data domain", max_length=32)
+
+    version = models.PositiveIntegerField(verbose_name=u"Version", default=0)
+
+    class Meta:
+        unique_together = (("board", "domain"),)
+
+    # Versions of some domains of a board as a string (e.g. "cards:3|movements:1")
+    @staticmethod
+    def get_data_versions(board, domains):
+        if board is None:
+            return ""
+        versions = dict(
+            ChartDataVersion.objects.filter(board=board, domain__in=domains).values_list("domain", "version")
+        )
+        return "|".join(["{0}:{1}".format(domain, versions.get(domain, 0)) for domain in sorted(domains)])
+
+    # Increment the versions of some domains of a board
+    @staticmethod
+    def increment(board, domains):
+        domains = set(domains)
+        updated = ChartDataVersion.objects.filter(board=board, domain__in=domains).update(version=F("version") + 1)
+        if updated == len(domains):
+            return
+        # Domains whose version has never been incremented
+        existing_domains = ChartDataVersion.objects.filter(board=board, domain__in=domains).\
+            values_list("domain", flat=True)
+        new_domains = domains.difference(existing_domains)
+        try:
+            with transaction.atomic():
+                ChartDataVersion.objects.bulk_create([
+                    ChartDataVersion(board=board, domain=domain, version=1) for domain in new_domains
+                ])
+        # Other process has created some of them
+        except IntegrityError:
+            for domain in new_domains:
+                ChartDataVersion.objects.get_or_create(board=board, domain=domain)
+            ChartDataVersion.objects.filter(board=board, domain__in=new_domains).update(version=F("version") + 1)
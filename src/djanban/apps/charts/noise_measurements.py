@@ -11,6 +11,7 @@ from django.db.models import Min, Max, Avg
 from django.utils import timezone
 
 from djanban.apps.base.auth import get_user_boards
+from djanban.apps.charts import dependencies
 from djanban.apps.charts.models import CachedChart
 from djanban.apps.dev_environment.models import NoiseMeasurement
 
@@ -19,6 +20,7 @@ from djanban.apps.dev_environment.models import NoiseMeasurement
 from djanban.apps.members.models import Member
 
 
+@dependencies.depends_on(dependencies.NOISE_MEASUREMENTS)
 def noise_level(current_user):
 
     # Caching
@@ -66,6 +68,7 @@ def noise_level(current_user):
 
 
 # Average, min and max noise level per hour
+@dependencies.depends_on(dependencies.NOISE_MEASUREMENTS)
 def noise_level_per_hour(current_user):
     # Caching
     chart_uuid = "noise_measurements.noise_level_per_hour-{0}".format(current_user.id)
@@ -109,6 +112,7 @@ def noise_level_per_hour(current_user):
 
 
 # Average, min and max noise level per weekday
+@dependencies.depends_on(dependencies.NOISE_MEASUREMENTS)
 def noise_level_per_weekday(current_user):
     # Caching
     chart_uuid = "noise_measurements.noise_level_per_weekday-{0}".format(current_user.id)
@@ -153,6 +157,7 @@ def noise_level_per_weekday(current_user):
 
 
 # Subjective noise level
+@dependencies.depends_on(dependencies.NOISE_MEASUREMENTS)
 def subjective_noise_level(current_user, month=None, year=None):
 
     # Caching
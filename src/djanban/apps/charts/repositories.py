@@ -5,6 +5,7 @@ import pygal
 from django.db.models import Min, Max, Sum
 from django.utils import timezone
 
+from djanban.apps.charts import dependencies
 from djanban.apps.charts.models import CachedChart
 from djanban.apps.repositories.models import PylintMessage, PhpMdMessage
 
@@ -28,6 +29,7 @@ def number_of_code_errors_per_loc(grouped_by, board, repository, language="pytho
 
 
 # Return the number of PHP/Python code errors by commit
+@dependencies.depends_on(dependencies.COMMITS)
 def _number_of_code_errors_by_commit(board, repository=None, language="python", per_loc=False):
 
     # Caching
@@ -100,6 +102,7 @@ def _number_of_code_errors_by_commit(board, repository=None, language="python",
 
 
 # Return the number of PHP/Python code errors by month
+@dependencies.depends_on(dependencies.COMMITS)
 def _number_of_code_errors_by_month(board, repository=None, language="python", per_loc=False):
     # Caching
     chart_uuid = "repositories._number_of_code_errors_by_month-{0}-{1}-{2}-{3}".format(
@@ -2,13 +2,12 @@
 
 from __future__ import unicode_literals
 
-import copy
-from datetime import timedelta
-
 import pygal
 from django.db.models import Sum
 
-
+from djanban.apps.charts import dependencies
+from djanban.apps.charts.burndown import BurndownSeries, get_spent_time_by_date, \
+    get_spent_time_by_date_of_all_requirements
 from djanban.apps.charts.models import CachedChart
 
 
@@ -20,6 +19,9 @@ def burndown(board, requirement=None):
 
 
 # Burndown for a particular requirement
+@dependencies.depends_on(
+    dependencies.CARDS, dependencies.SPENT_TIMES, dependencies.REQUIREMENTS
+)
 def _requirement_burndown(board, requirement):
     # Caching
     chart_uuid = "requirements._requirement_burndown-{0}".format(requirement.id)
@@ -39,11 +41,8 @@ def _requirement_burndown(board, requirement):
     # Estimated number of hours
     estimated_number_of_hours = requirement.estimated_number_of_hours
 
-    # Remaining hours
-    remaining_time = estimated_number_of_hours
-    daily_spent_times = board.daily_spent_times.filter(
-        card__requirements=requirement, spent_time__gt=0
-    ).order_by("date")
+    # Daily spent times of the cards of this requirement
+    daily_spent_times = board.daily_spent_times.filter(card__requirements=requirement)
 
     # Start working date in this board
     start_working_date = board.get_working_start_date()
@@ -55,33 +54,23 @@ def _requirement_burndown(board, requirement):
     if end_working_date is None:
         return burndown_chart.render_django_response()
 
-    # Remaining time values
-    remaining_time_values = [remaining_time]
-
-    # Dates where there is some work in this requirement
-    x_labels = ["Start"]
+    # Remaining time after each date with some work in this requirement
+    burndown_series = BurndownSeries(
+        estimated_number_of_hours, get_spent_time_by_date(daily_spent_times), start_working_date, end_working_date
+    )
 
-    date_i = copy.deepcopy(start_working_date)
-    remaining_time_i = copy.deepcopy(remaining_time)
-    while date_i <= end_working_date:
-        spent_time = daily_spent_times.filter(date=date_i).aggregate(
-            spent_time_sum=Sum("spent_time")
-        )["spent_time_sum"]
-        if spent_time is not None and spent_time > 0:
-            remaining_time_i -= spent_time
-            remaining_time_values.append(remaining_time_i)
-            x_labels.append(date_i.strftime("%Y-%m-%d"))
-        date_i += timedelta(days=1)
-
-    burndown_chart.add(u"Initial estimation for {0}".format(requirement.code), [remaining_time for i in range(0, len(x_labels))])
-    burndown_chart.x_labels = x_labels
-    burndown_chart.add(u"Burndown of {0}".format(requirement.code), remaining_time_values)
+    burndown_chart.add(u"Initial estimation for {0}".format(requirement.code), burndown_series.estimated_time_values)
+    burndown_chart.x_labels = burndown_series.x_labels
+    burndown_chart.add(u"Burndown of {0}".format(requirement.code), burndown_series.remaining_time_values)
 
     chart = CachedChart.make(board=board, uuid=chart_uuid, svg=burndown_chart.render(is_unicode=True))
     return chart.render_django_response()
 
 
 # Burndown for all requirements
+@dependencies.depends_on(
+    dependencies.CARDS, dependencies.SPENT_TIMES, dependencies.REQUIREMENTS
+)
 def _burndown_by_requirement(board):
 
     # Caching
@@ -100,12 +89,6 @@ def _burndown_by_requirement(board):
     # Estimated number of hours
     estimated_number_of_hours = board.requirements.aggregate(estimated_number_of_hours=Sum("estimated_number_of_hours"))["estimated_number_of_hours"]
 
-    # Remaining hours
-    remaining_time = estimated_number_of_hours
-    daily_spent_times = board.daily_spent_times.filter(
-        card__requirements__board=board, spent_time__gt=0
-    ).distinct().order_by("date")
-
     # Start working date in this board
     start_working_date = board.get_working_start_date()
     if start_working_date is None:
@@ -116,27 +99,15 @@ def _burndown_by_requirement(board):
     if end_working_date is None:
         return burndown_chart.render_django_response()
 
-    # Remaining time values
-    remaining_time_values = [remaining_time]
-
-    # Dates where there is some work in this requirement
-    x_labels = ["Start"]
-
-    date_i = copy.deepcopy(start_working_date)
-    remaining_time_i = copy.deepcopy(remaining_time)
-    while date_i <= end_working_date:
-        spent_time = daily_spent_times.filter(date=date_i).aggregate(
-            spent_time_sum=Sum("spent_time")
-        )["spent_time_sum"]
-        if spent_time is not None and spent_time > 0:
-            remaining_time_i -= spent_time
-            remaining_time_values.append(remaining_time_i)
-            x_labels.append(date_i.strftime("%Y-%m-%d"))
-        date_i += timedelta(days=1)
-
-    burndown_chart.add(u"{0} requirements estimation".format(board.name), [remaining_time for i in range(0, len(x_labels))])
-    burndown_chart.x_labels = x_labels
-    burndown_chart.add(u"Burndown according to {0} requirements".format(board.name), remaining_time_values)
+    # Remaining time after each date with some work in the requirements of this board
+    burndown_series = BurndownSeries(
+        estimated_number_of_hours, get_spent_time_by_date_of_all_requirements(board),
+        start_working_date, end_working_date
+    )
+
+    burndown_chart.add(u"{0} requirements estimation".format(board.name), burndown_series.estimated_time_values)
+    burndown_chart.x_labels = burndown_series.x_labels
+    burndown_chart.add(u"Burndown according to {0} requirements".format(board.name), burndown_series.remaining_time_values)
 
     chart = CachedChart.make(board=board, uuid=chart_uuid, svg=burndown_chart.render(is_unicode=True))
     return chart.render_django_response()
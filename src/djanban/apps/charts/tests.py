@@ -0,0 +1,629 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+
+import pytz
+from crequest.middleware import CrequestMiddleware
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.utils import timezone
+
+from djanban.apps.boards.models import Board, Card, Label, List
+from djanban.apps.charts import boards, cache, cards, dependencies, interruptions, requirements
+from djanban.apps.charts.burndown import BurndownSeries, get_number_of_interruptions_by_date, get_spent_time_by_date, \
+    get_spent_time_by_date_of_all_requirements
+from djanban.apps.charts.flow import CardFlow, get_date_buckets
+from djanban.apps.charts.metrics import CardMetricDistribution
+from djanban.apps.charts.models import CachedChart, ChartDataVersion
+from djanban.apps.dev_environment.models import Interruption
+from djanban.apps.dev_times.models import DailySpentTime
+from djanban.apps.members.models import Member
+from djanban.apps.reports.models import CardMovement
+from djanban.apps.requirements.models import Requirement
+
+
+# Test for the card flow engine used in the flow charts
+class CardFlowTest(TestCase):
+
+    # Creates a board with cards moving through its lists
+    def setUp(self):
+        user = get_user_model().objects.create_user('test')
+        self.member = Member.objects.create(user=user, is_developer=True)
+        self.board = Board.objects.create(
+            creator=self.member, name="Board name", description="board description", comments="board comments"
+        )
+
+        self.lists = []
+        list_types = List.ACTIVE_LIST_TYPES + ("closed",)
+        for list_index, list_type in enumerate(list_types):
+            list_i = List.objects.create(
+                board=self.board, name="{0} list".format(list_type), uuid="list-{0}".format(list_index),
+                type=list_type, position=list_index
+            )
+            self.lists.append(list_i)
+
+        self.labels = [
+            Label.objects.create(board=self.board, name="Bug", color="red", uuid="label-0"),
+            Label.objects.create(board=self.board, name="Feature", color="green", uuid="label-1")
+        ]
+
+        self.start_datetime = datetime(2017, 3, 20, 10, 30, tzinfo=pytz.utc)
+        for card_index in range(0, 18):
+            creation_datetime = self.start_datetime + timedelta(hours=13 * card_index)
+            card = Card.objects.create(
+                board=self.board, list=self.lists[0], name="Card {0}".format(card_index),
+                uuid="card-{0}".format(card_index), url="url-{0}".format(card_index),
+                short_url="short-url-{0}".format(card_index), description="", position=card_index,
+                is_closed=(card_index % 7 == 6),
+                creation_datetime=creation_datetime, last_activity_datetime=creation_datetime
+            )
+            card.labels.add(self.labels[card_index % 2])
+
+            # Each card moves forward some lists (and some of them move backward once)
+            number_of_movements = card_index % 6
+            movement_datetime = creation_datetime
+            source_list_index = 0
+            for movement_index in range(0, number_of_movements):
+                movement_datetime += timedelta(hours=11 + card_index)
+                if movement_index == 2 and card_index % 4 == 0:
+                    destination_list_index = source_list_index - 1
+                    movement_type = "backward"
+                else:
+                    destination_list_index = min(source_list_index + 1, len(List.ACTIVE_LIST_TYPES) - 1)
+                    movement_type = "forward"
+                CardMovement.objects.create(
+                    board=self.board, card=card, type=movement_type, member=self.member,
+                    source_list=self.lists[source_list_index], destination_list=self.lists[destination_list_index],
+                    datetime=movement_datetime
+                )
+                source_list_index = destination_list_index
+
+            card.list = self.lists[source_list_index]
+            card.last_activity_datetime = movement_datetime
+            card.update_movement_count(commit=False)
+            card.save()
+
+        self.lists = List.objects.filter(board=self.board).exclude(type="closed").order_by("position")
+
+    def _date_buckets(self, day_step):
+        return get_date_buckets(date(2017, 3, 19), date(2017, 4, 6), day_step)
+
+    # The absolute flow values are the same as counting the cards and movements of each list in each period
+    def test_absolute_list_values(self):
+        for day_step in (1, 3):
+            datetimes = [datetime_i for date_i, datetime_i in self._date_buckets(day_step)]
+            list_values = CardFlow(boards=[self.board]).absolute_list_values(self.lists, datetimes, day_step)
+            for list_ in self.lists:
+                expected_values = []
+                for datetime_i in datetimes:
+                    num_cards_without_movements = self.board.cards.filter(
+                        list=list_, number_of_forward_movements=0, number_of_backward_movements=0,
+                        creation_datetime__lt=datetime_i, creation_datetime__gte=datetime_i-timedelta(days=day_step)
+                    ).count()
+                    num_cards_moving_to_list = self.board.card_movements.filter(
+                        destination_list=list_,
+                        datetime__lt=datetime_i, datetime__gte=datetime_i-timedelta(days=day_step),
+                    ).count()
+                    expected_values.append(num_cards_moving_to_list + num_cards_without_movements)
+                self.assertEqual(list_values[list_.id], expected_values)
+
+    # The cumulative flow values are the same as counting the cards and movements until each date
+    def test_cumulative_list_values(self):
+        datetimes = [datetime_i for date_i, datetime_i in self._date_buckets(1)]
+        list_values = CardFlow(boards=[self.board]).cumulative_list_values(self.lists, datetimes)
+        for list_ in self.lists:
+            expected_values = []
+            for datetime_i in datetimes:
+                num_cards_without_movements = self.board.cards.filter(
+                    creation_datetime__lte=datetime_i, list=list_,
+                    number_of_forward_movements=0, number_of_backward_movements=0,
+                ).count()
+                num_cards_moving_to_list = self.board.card_movements.filter(
+                    destination_list__position__gte=list_.position, datetime__lt=datetime_i,
+                ).count()
+                expected_values.append(num_cards_moving_to_list + num_cards_without_movements)
+            self.assertEqual(list_values[list_.id], expected_values)
+
+    # The cumulative list type values only take into account the cards that are not closed
+    def test_cumulative_list_type_values(self):
+        datetimes = [datetime_i for date_i, datetime_i in self._date_buckets(2)]
+        list_type_values = CardFlow(boards=[self.board], only_active_cards=True).\
+            cumulative_list_type_values(datetimes)
+        cards = Card.objects.filter(board=self.board, is_closed=False)
+        card_movements = CardMovement.objects.filter(board=self.board, card__is_closed=False)
+        for list_type_index, list_type in enumerate(List.LIST_TYPES):
+            expected_values = []
+            for datetime_i in datetimes:
+                num_cards_without_movements = cards.filter(
+                    creation_datetime__lte=datetime_i, list__type=list_type,
+                    number_of_forward_movements=0, number_of_backward_movements=0
+                ).count()
+                num_cards_moving_to_list = card_movements.filter(
+                    destination_list__type__in=List.LIST_TYPES[list_type_index:], datetime__lte=datetime_i
+                ).count()
+                expected_values.append(num_cards_moving_to_list + num_cards_without_movements)
+            self.assertEqual(list_type_values[list_type], expected_values)
+
+    # Created cards, arrivals to done lists and both of them by label
+    def test_card_evolution_values(self):
+        datetimes = [datetime_i for date_i, datetime_i in self._date_buckets(1)]
+        card_flow = CardFlow(boards=[self.board])
+        created_card_values_by_label, done_card_values_by_label = card_flow.label_card_values(self.labels, datetimes)
+        self.assertEqual(
+            card_flow.created_card_values(datetimes),
+            [Card.objects.filter(board=self.board, creation_datetime__lte=datetime_i).count() for datetime_i in datetimes]
+        )
+        self.assertEqual(
+            card_flow.done_movement_values(datetimes),
+            [
+                CardMovement.objects.filter(
+                    board=self.board, destination_list__type="done", datetime__lte=datetime_i
+                ).count()
+                for datetime_i in datetimes
+            ]
+        )
+        for label in self.labels:
+            self.assertEqual(
+                created_card_values_by_label[label.id],
+                [label.cards.filter(creation_datetime__lte=datetime_i).count() for datetime_i in datetimes]
+            )
+            self.assertEqual(
+                done_card_values_by_label[label.id],
+                [
+                    label.cards.filter(
+                        movements__destination_list__type="done", movements__datetime__lte=datetime_i
+                    ).distinct().count()
+                    for datetime_i in datetimes
+                ]
+            )
+
+
+# Test for the in-memory LRU cache of rendered charts
+class SvgLRUCacheTest(TestCase):
+
+    # The least recently used charts are evicted when there is no room for a new one
+    def test_eviction(self):
+        lru_cache = cache.SvgLRUCache(max_size=10)
+        lru_cache.set("a", cache.CachedSvg("aaaa"))
+        lru_cache.set("b", cache.CachedSvg("bbbb"))
+        # Getting "a" makes "b" the least recently used chart
+        self.assertEqual(lru_cache.get("a").content, b"aaaa")
+        lru_cache.set("c", cache.CachedSvg("cccc"))
+        self.assertIsNone(lru_cache.get("b"))
+        self.assertEqual(lru_cache.get("a").content, b"aaaa")
+        self.assertEqual(lru_cache.get("c").content, b"cccc")
+        self.assertEqual(lru_cache.size, 8)
+        # Charts bigger than the cache are not stored
+        lru_cache.set("d", cache.CachedSvg("d" * 11))
+        self.assertIsNone(lru_cache.get("d"))
+        self.assertEqual(len(lru_cache), 2)
+
+
+# Test for the cached charts
+class CachedChartTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        cache.memory_cache.clear()
+        cache.get_shared_cache().clear()
+
+        user = get_user_model().objects.create_user('test')
+        self.member = Member.objects.create(user=user, is_developer=True)
+        self.board = Board.objects.create(
+            creator=self.member, name="Board name", description="board description", comments="board comments",
+            last_activity_datetime=timezone.now() - timedelta(days=1)
+        )
+        CrequestMiddleware.set_request(RequestFactory().get("/"))
+
+    def tearDown(self):
+        CrequestMiddleware.del_request()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    # The key of a chart does not change unless the board changes or its charts are invalidated
+    def test_key(self):
+        key = cache.get_key(self.board, "cards.age-1")
+        self.assertEqual(key, cache.get_key(Board.objects.get(id=self.board.id), "cards.age-1"))
+        self.assertNotEqual(key, cache.get_key(self.board, "cards.age-2"))
+        self.board.clean_cached_charts()
+        self.assertNotEqual(key, cache.get_key(self.board, "cards.age-1"))
+        self.assertEqual(Board.objects.get(id=self.board.id).cached_charts_version, 1)
+
+    # Charts are served from the caches reading only the versions of their data and with an ETag
+    def test_get(self):
+        self.assertFalse(CachedChart.get(board=self.board, uuid="cards.age-1"))
+        chart = CachedChart.make(board=self.board, uuid="cards.age-1", svg="<svg>age</svg>")
+        etag = chart.render_django_response()["ETag"]
+
+        with self.assertNumQueries(1):
+            response = CachedChart.get(board=self.board, uuid="cards.age-1")
+        self.assertEqual(response.content, b"<svg>age</svg>")
+        self.assertEqual(response["ETag"], etag)
+
+        # Once the memory caches are empty, the chart is read from the database
+        cache.memory_cache.clear()
+        cache.get_shared_cache().clear()
+        with self.assertNumQueries(2):
+            response = CachedChart.get(board=self.board, uuid="cards.age-1")
+        self.assertEqual(response.content, b"<svg>age</svg>")
+
+        # Invalidated charts are not returned
+        self.board.clean_cached_charts()
+        self.assertFalse(CachedChart.get(board=self.board, uuid="cards.age-1"))
+
+    # Changes in the data of a board only invalidate the charts that depend on the changed data
+    def test_dependencies(self):
+
+        @dependencies.depends_on(dependencies.MOVEMENTS)
+        def movements_chart(board):
+            return CachedChart.get(board=board, uuid="movements") or\
+                CachedChart.make(board=board, uuid="movements", svg="<svg>movements</svg>")
+
+        @dependencies.depends_on(dependencies.SPENT_TIMES, dependencies.MEMBERS)
+        def spent_times_chart(board):
+            return CachedChart.get(board=board, uuid="spent_times") or\
+                CachedChart.make(board=board, uuid="spent_times", svg="<svg>spent times</svg>")
+
+        for chart_function in (movements_chart, spent_times_chart):
+            self.assertIsInstance(chart_function(self.board), CachedChart)
+            self.assertIsInstance(chart_function(self.board), HttpResponse)
+
+        self.board.invalidate_cached_charts(dependencies.SPENT_TIMES)
+        self.assertIsInstance(movements_chart(self.board), HttpResponse)
+        self.assertIsInstance(spent_times_chart(self.board), CachedChart)
+
+        # Charts are still valid when they are read from database
+        cache.memory_cache.clear()
+        cache.get_shared_cache().clear()
+        self.assertIsInstance(movements_chart(self.board), HttpResponse)
+        self.assertIsInstance(spent_times_chart(self.board), HttpResponse)
+        self.assertEqual(CachedChart.objects.filter(board=self.board).count(), 2)
+
+        # Charts that do not declare their domains depend on all of them
+        CachedChart.make(board=self.board, uuid="cards.age-1", svg="<svg>age</svg>")
+        self.board.invalidate_cached_charts(dependencies.COMMENTS)
+        self.assertFalse(CachedChart.get(board=self.board, uuid="cards.age-1"))
+
+    # A client that already has the chart receives a 304 Not Modified response
+    def test_not_modified(self):
+        chart = CachedChart.make(board=self.board, uuid="cards.age-1", svg="<svg>age</svg>")
+        etag = chart.render_django_response()["ETag"]
+        CrequestMiddleware.set_request(RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag))
+        response = CachedChart.get(board=self.board, uuid="cards.age-1")
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    # Equal charts share their file and files of replaced charts are deleted by the orphan sweeper
+    def test_delete_orphan_files(self):
+        first_chart = CachedChart.make(board=self.board, uuid="cards.age-1", svg="<svg>age</svg>")
+        second_chart = CachedChart.make(board=self.board, uuid="cards.age-2", svg="<svg>age</svg>")
+        self.assertEqual(first_chart.svg.name, second_chart.svg.name)
+        self.assertEqual(CachedChart.delete_orphan_files(), [])
+
+        self.board.clean_cached_charts()
+        replaced_chart = CachedChart.make(board=self.board, uuid="cards.age-1", svg="<svg>new age</svg>")
+        self.assertEqual(replaced_chart.id, first_chart.id)
+        self.assertEqual(CachedChart.delete_orphan_files(), [])
+
+        CachedChart.make(board=self.board, uuid="cards.age-2", svg="<svg>new age</svg>")
+        self.assertEqual(CachedChart.delete_orphan_files(), [first_chart.svg.name])
+        self.assertTrue(replaced_chart.svg.storage.exists(replaced_chart.svg.name))
+
+        # Legacy files were named after the chart uuid and stored in the root directory
+        storage = replaced_chart.svg.storage
+        legacy_file_name = storage.save("cards.age-3", ContentFile(b"<svg>legacy age</svg>"))
+        other_file_name = storage.save("avatar.png", ContentFile(b"avatar"))
+        self.assertEqual(CachedChart.delete_orphan_files(), [legacy_file_name])
+        self.assertTrue(storage.exists(other_file_name))
+
+    # Charts without board are evicted from the memory and shared caches when they are expired
+    def test_no_board_eviction(self):
+        CachedChart.make(board=None, uuid="noise_measurements.noise_level-1", svg="<svg>noise</svg>")
+        self.assertTrue(CachedChart.get(board=None, uuid="noise_measurements.noise_level-1"))
+        CachedChart.expire(board=None, uuid="noise_measurements.noise_level-1")
+        self.assertFalse(CachedChart.get(board=None, uuid="noise_measurements.noise_level-1"))
+
+
+# Test for the interruption charts
+class InterruptionChartsTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        cache.memory_cache.clear()
+        cache.get_shared_cache().clear()
+
+        self.user = get_user_model().objects.create_user('test')
+        self.member = Member.objects.create(user=self.user, is_developer=True)
+        self.boards = []
+        for board_index in range(0, 2):
+            board = Board.objects.create(
+                creator=self.member, name="Board {0}".format(board_index), uuid="board-{0}".format(board_index),
+                last_activity_datetime=timezone.now(),
+                description="", comments=""
+            )
+            board.members.add(self.member)
+            self.boards.append(board)
+
+        # Interruptions of the first board on May 1st and 2nd and of the second board on May 2nd and June 3rd
+        for board, day, spent_time in ((0, date(2017, 5, 1), 1), (0, date(2017, 5, 2), 2),
+                                       (1, date(2017, 5, 2), None), (1, date(2017, 6, 3), 4)):
+            Interruption.objects.create(
+                board=self.boards[board], member=self.member, spent_time=spent_time,
+                datetime=datetime(day.year, day.month, day.day, 12, 0, tzinfo=pytz.utc)
+            )
+        CrequestMiddleware.set_request(RequestFactory().get("/"))
+
+    def tearDown(self):
+        CrequestMiddleware.del_request()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    # Daily series are computed from only one grouped query
+    def test_daily_series(self):
+        board_ids = [board.id for board in self.boards]
+        with self.assertNumQueries(1):
+            daily_measurements = interruptions.get_daily_measurements(Interruption.objects.all())
+
+        days, totals, board_values = interruptions.get_daily_series(
+            daily_measurements, interruptions.COUNT, False, series_attribute="board_id", series_ids=board_ids
+        )
+        self.assertEqual(days, [date(2017, 5, 1), date(2017, 5, 2), date(2017, 6, 3)])
+        self.assertEqual(totals, [1, 2, 1])
+        self.assertEqual(board_values, {board_ids[0]: [1, 1, 0], board_ids[1]: [0, 1, 1]})
+
+        days, totals, board_values = interruptions.get_daily_series(
+            daily_measurements, interruptions.SPENT_TIME, True, series_attribute="board_id", series_ids=board_ids
+        )
+        self.assertEqual(len(days), 36)
+        self.assertEqual(totals[0:2], [1, 3])
+        self.assertEqual(totals[-1], 7)
+        self.assertEqual(board_values[board_ids[1]][-1], 4)
+
+    # Monthly series group the daily measurements by month
+    def test_monthly_series(self):
+        daily_measurements = interruptions.get_daily_measurements(Interruption.objects.all())
+        months, totals, board_values = interruptions.get_monthly_series(
+            daily_measurements, interruptions.SPENT_TIME, series_attribute="board_id",
+            series_ids=[board.id for board in self.boards]
+        )
+        self.assertEqual(months, [(2017, 5), (2017, 6)])
+        self.assertEqual(totals, [3, 4])
+        self.assertEqual(board_values, {self.boards[0].id: [3, 0], self.boards[1].id: [0, 4]})
+
+    # The cache key of the charts only depends on their parameters, so the second time they are served from cache
+    def test_cache_key(self):
+        board = self.boards[0]
+        for _ in range(0, 2):
+            interruptions.number_of_interruptions(self.user, board)
+            interruptions.evolution_of_interruption_spent_time(self.user)
+            interruptions.interruption_spent_time_by_month(self.user, board)
+        self.assertEqual(
+            sorted(CachedChart.objects.values_list("board_id", "uuid")),
+            sorted([
+                (board.id, "interruptions._number_of_interruptions-{0}-{1}-count-absolute".format(
+                    self.user.id, board.id)),
+                (None, "interruptions._number_of_interruptions-{0}-user-{0}-spent_time-incremental".format(
+                    self.user.id)),
+                (board.id, "interruptions._interruption_measurement_by_month-{0}-spent_time-{1}".format(
+                    self.user.id, board.id)),
+            ])
+        )
+        with self.assertNumQueries(1):
+            interruptions.number_of_interruptions(self.user, board)
+
+    # New and deleted interruptions invalidate the interruption charts of their board
+    def test_invalidation(self):
+        board = self.boards[0]
+        interruptions.number_of_interruptions(self.user, board)
+        data_versions = CachedChart.objects.get(board=board).data_versions
+        interruption = Interruption.objects.create(board=board, member=self.member,
+                                                   datetime=datetime(2017, 5, 3, 12, 0, tzinfo=pytz.utc))
+        interruptions.number_of_interruptions(self.user, board)
+        new_data_versions = CachedChart.objects.get(board=board).data_versions
+        self.assertNotEqual(new_data_versions, data_versions)
+
+        interruption.delete()
+        self.assertNotEqual(
+            ChartDataVersion.get_data_versions(board, [dependencies.INTERRUPTIONS]), new_data_versions
+        )
+
+
+# Test for the distributions of the time metrics of the cards used in the card charts
+class CardMetricDistributionTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        cache.memory_cache.clear()
+        cache.get_shared_cache().clear()
+
+        self.user = get_user_model().objects.create_user('test')
+        self.member = Member.objects.create(user=self.user, is_developer=True)
+        self.board = Board.objects.create(
+            creator=self.member, name="Board name", description="board description", comments="board comments",
+            last_activity_datetime=timezone.now()
+        )
+        self.board.members.add(self.member)
+        self.lists = {
+            list_type: List.objects.create(board=self.board, name=list_type, uuid="list-{0}".format(list_type),
+                                           type=list_type, position=position)
+            for position, list_type in enumerate(("development", "done"))
+        }
+
+        # Done cards created in May and June with lead times from a few hours to several weeks
+        self.cards = []
+        for card_index, (day, lead_time, spent_time) in enumerate(((date(2017, 5, 2), 5, 1), (date(2017, 5, 10), 24, 2),
+                                                                   (date(2017, 5, 20), 30, None),
+                                                                   (date(2017, 6, 3), 400, 8),
+                                                                   (date(2017, 6, 4), None, 3))):
+            creation_datetime = datetime(day.year, day.month, day.day, 12, 0, tzinfo=pytz.utc)
+            card = Card.objects.create(
+                board=self.board, list=self.lists["done"], uuid="card-{0}".format(card_index),
+                name="Card {0}".format(card_index), url="url-{0}".format(card_index),
+                short_url="short-url-{0}".format(card_index), position=card_index,
+                creation_datetime=creation_datetime, last_activity_datetime=creation_datetime + timedelta(hours=1),
+                lead_time=lead_time, cycle_time=lead_time, spent_time=spent_time
+            )
+            self.cards.append(card)
+        CardMovement.objects.create(
+            board=self.board, card=self.cards[0], type="forward", source_list=self.lists["development"],
+            destination_list=self.lists["done"], member=self.member,
+            datetime=self.cards[0].creation_datetime + timedelta(minutes=30)
+        )
+        DailySpentTime.objects.create(
+            board=self.board, card=self.cards[0], member=self.member, description="Task", date=date(2017, 5, 2),
+            day_of_year=122, week_of_year=18, weekday=2, spent_time=1
+        )
+        DailySpentTime.objects.create(
+            board=self.board, card=self.cards[3], member=self.member, description="Task", date=date(2017, 6, 3),
+            day_of_year=154, week_of_year=22, weekday=6, spent_time=8
+        )
+        CrequestMiddleware.set_request(RequestFactory().get("/"))
+
+    def tearDown(self):
+        CrequestMiddleware.del_request()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    # The metrics of all cards are read at once and histograms have the same buckets as counting each bucket
+    def test_histogram(self):
+        with self.assertNumQueries(1):
+            distribution = CardMetricDistribution(
+                Card.objects.filter(board=self.board), ["lead_time_in_days", "spent_time"],
+                with_completion_datetimes=True
+            )
+        self.assertEqual(distribution.histogram("lead_time", 24), ([1, 2, 17], [2, 1, 1]))
+        self.assertEqual(distribution.histogram("lead_time", 24, max_value=30), ([1, 2], [2, 1]))
+        self.assertEqual(distribution.histogram("lead_time", 1, max_value=5), ([5], [1]))
+        self.assertEqual(distribution.values("lead_time_in_days")[1], 1)
+        self.assertEqual(distribution.has_value_mask("spent_time").tolist(), [True, True, False, True, True])
+        self.assertEqual(distribution.month_mask(2017, 5).tolist(), [True, True, True, False, False])
+        self.assertEqual(distribution.completion_datetimes[0], self.cards[0].creation_datetime + timedelta(minutes=30))
+        self.assertEqual(distribution.completion_datetimes[1], self.cards[1].last_activity_datetime)
+
+    # The number of queries of the histogram does not depend on the maximum lead time of the cards and the cache
+    # identifiers of the charts are based on the name of the metric
+    def test_charts(self):
+        with self.assertNumQueries(6):
+            cards.completion_histogram(self.user, self.board, "lead_time", "hours")
+        cards.time_box(self.user, "Lead time", self.board, metric="lead_time_in_weeks")
+        cards.time_scatterplot(self.user, "Lead time", self.board, metric="lead_time_in_weeks")
+        cards.time_vs_spent_time(self.user, "Lead time", self.board, metric="lead_time_in_days")
+        self.assertEqual(
+            sorted(CachedChart.objects.values_list("uuid", flat=True)),
+            sorted([
+                "cards.completion_histogram-{0}-lead_time-hours".format(self.board.id),
+                "cards.time_box-{0}-{1}-lead_time_in_weeks-None-None".format(self.user.id, self.board.id),
+                "cards.time_scatterplot-{0}-{1}-lead_time_in_weeks-None-None".format(self.user.id, self.board.id),
+                "cards.time_vs_spent_time-{0}-{1}-lead_time_in_days-None-None".format(self.user.id, self.board.id),
+            ])
+        )
+
+
+# Test for the burndown series of boards and requirements
+class BurndownSeriesTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        cache.memory_cache.clear()
+        cache.get_shared_cache().clear()
+
+        user = get_user_model().objects.create_user('test')
+        self.member = Member.objects.create(user=user, is_developer=True)
+        self.board = Board.objects.create(
+            creator=self.member, name="Board name", description="board description", comments="board comments",
+            estimated_number_of_hours=30, last_activity_datetime=timezone.now()
+        )
+        list_ = List.objects.create(board=self.board, name="development", uuid="list", type="development", position=0)
+        self.cards = []
+        for card_index in range(0, 2):
+            card = Card.objects.create(
+                board=self.board, list=list_, uuid="card-{0}".format(card_index), name="Card {0}".format(card_index),
+                url="url-{0}".format(card_index), short_url="short-url-{0}".format(card_index), position=card_index,
+                creation_datetime=timezone.now(), last_activity_datetime=timezone.now()
+            )
+            self.cards.append(card)
+
+        # The first card is in both requirements
+        self.requirements = []
+        for requirement_index in range(0, 2):
+            requirement = Requirement.objects.create(
+                board=self.board, code="R{0}".format(requirement_index), name="Requirement",
+                estimated_number_of_hours=20
+            )
+            requirement.cards.add(self.cards[0])
+            self.requirements.append(requirement)
+
+        # Work on the first and last day of several months and a day without spent time in the middle
+        for card, day, spent_time in ((0, date(2017, 1, 2), 2), (1, date(2017, 1, 2), 3), (0, date(2017, 2, 15), 0),
+                                      (0, date(2017, 6, 30), 4)):
+            DailySpentTime.objects.create(
+                board=self.board, card=self.cards[card], member=self.member, description="Task", date=day,
+                day_of_year=day.timetuple().tm_yday, week_of_year=day.isocalendar()[1], weekday=day.isoweekday(),
+                spent_time=spent_time
+            )
+        for day in (date(2017, 1, 2), date(2017, 1, 2), date(2017, 3, 1)):
+            Interruption.objects.create(
+                board=self.board, member=self.member,
+                datetime=datetime(day.year, day.month, day.day, 12, 0, tzinfo=pytz.utc)
+            )
+        CrequestMiddleware.set_request(RequestFactory().get("/"))
+
+    def tearDown(self):
+        CrequestMiddleware.del_request()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    # Spent times are grouped by date in one query whatever the number of days between the first and last ones
+    def test_board_series(self):
+        with self.assertNumQueries(1):
+            spent_time_by_date = get_spent_time_by_date(self.board.daily_spent_times.all())
+        burndown_series = BurndownSeries(30, spent_time_by_date)
+        self.assertEqual(burndown_series.x_labels, ["Start", "2017-01-02", "2017-06-30"])
+        self.assertEqual(burndown_series.remaining_time_values, [30, 25, 21])
+        self.assertEqual(burndown_series.estimated_time_values, [30, 30, 30])
+
+        burndown_series = BurndownSeries(30, spent_time_by_date, end_date=date(2017, 3, 1))
+        self.assertEqual(burndown_series.remaining_time_values, [30, 25])
+
+    # Spent times of cards in several requirements are only added once
+    def test_requirement_series(self):
+        with self.assertNumQueries(1):
+            spent_time_by_date = get_spent_time_by_date_of_all_requirements(self.board)
+        self.assertEqual(list(spent_time_by_date.keys()), [date(2017, 1, 2), date(2017, 6, 30)])
+        self.assertEqual(list(spent_time_by_date.values()), [2, 4])
+
+    # Interruptions are counted by date in one query
+    def test_interruptions(self):
+        with self.assertNumQueries(1):
+            interruptions_by_date = get_number_of_interruptions_by_date(date(2017, 1, 1), date(2017, 2, 28))
+        self.assertEqual(list(interruptions_by_date.items()), [(date(2017, 1, 2), 2)])
+
+    # The number of queries of the burndown charts does not depend on the number of working days
+    def test_charts(self):
+        with self.assertNumQueries(11):
+            response = boards.burndown(self.board, show_interruptions=True)
+        self.assertIn("Interruptions of Board name", response.content.decode("utf-8"))
+        requirements.burndown(self.board)
+        requirements.burndown(self.board, self.requirements[0])
+        self.assertEqual(
+            sorted(CachedChart.objects.values_list("uuid", flat=True)),
+            sorted([
+                "boards.burndown-with_interruptions",
+                "requirements._burndown_by_requirement-{0}".format(self.board.id),
+                "requirements._requirement_burndown-{0}".format(self.requirements[0].id),
+            ])
+        )
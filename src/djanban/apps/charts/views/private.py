@@ -6,7 +6,6 @@ import datetime
 
 import pygal
 from pygal.style import DefaultStyle
-from decimal import Decimal
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from isoweek import Week
@@ -360,17 +359,17 @@ def interruption_spent_time(request, board_id=None):
 def time_scatterplot(request, time_metric, board_id=None, year=None, month=None):
     board = _get_user_board_or_none(request, board_id)
     if time_metric == "lead_time":
-        y_function = lambda card: card.lead_time/Decimal(24)/Decimal(7)
+        metric = "lead_time_in_weeks"
         time_metric_name = "Lead time (in weeks)"
     elif time_metric == "cycle_time":
-        y_function = lambda card: card.cycle_time / Decimal(24) / Decimal(7)
+        metric = "cycle_time_in_weeks"
         time_metric_name = "Cycle time (in weeks)"
     elif time_metric == "spent_time":
-        y_function = lambda card: card.spent_time
+        metric = "spent_time"
         time_metric_name = "Spent time (in days)"
     else:
         raise ValueError(u"Time metric {0} not recognized".format(time_metric))
-    return cards.time_scatterplot(request.user, time_metric_name, board, y_function=y_function, year=year, month=month)
+    return cards.time_scatterplot(request.user, time_metric_name, board, metric=metric, year=year, month=month)
 
 
 # Scatterplot comparing the completion date vs. some time metric
@@ -378,17 +377,17 @@ def time_scatterplot(request, time_metric, board_id=None, year=None, month=None)
 def time_box(request, time_metric, board_id=None, year=None, month=None):
     board = _get_user_board_or_none(request, board_id)
     if time_metric == "lead_time":
-        y_function = lambda card: card.lead_time/Decimal(24)/Decimal(7)
+        metric = "lead_time_in_weeks"
         time_metric_name = "Lead time (in weeks)"
     elif time_metric == "cycle_time":
-        y_function = lambda card: card.cycle_time/Decimal(24)/Decimal(7)
+        metric = "cycle_time_in_weeks"
         time_metric_name = "Cycle time (in weeks)"
     elif time_metric == "spent_time":
-        y_function = lambda card: card.spent_time
+        metric = "spent_time"
         time_metric_name = "Spent time (days)"
     else:
         raise ValueError(u"Time metric {0} not recognized".format(time_metric))
-    return cards.time_box(request.user, time_metric_name, board, y_function=y_function, year=year, month=month)
+    return cards.time_box(request.user, time_metric_name, board, metric=metric, year=year, month=month)
 
 
 # Completion histogram
@@ -417,15 +416,14 @@ def completion_histogram(request, board_id="all", time_metric="lead_time", units
 def time_vs_spent_time(request, time_metric, board_id=None, year=None, month=None):
     board = _get_user_board_or_none(request, board_id)
     if time_metric == "lead_time":
-        y_function = lambda card: card.lead_time/Decimal(24)
+        metric = "lead_time_in_days"
         time_metric_name = "Lead time (days)"
     elif time_metric == "cycle_time":
-        y_function = lambda card: card.cycle_time/Decimal(24)
+        metric = "cycle_time_in_days"
         time_metric_name = "Cycle time (days)"
     else:
         raise ValueError(u"Time metric {0} not recognized".format(time_metric))
-    return cards.time_vs_spent_time(request.user, time_metric_name, board,
-                                    y_function=y_function, year=year, month=month)
+    return cards.time_vs_spent_time(request.user, time_metric_name, board, metric=metric, year=year, month=month)
 
 
 # Card age per list box chart
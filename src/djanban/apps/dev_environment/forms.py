@@ -6,7 +6,6 @@ from django.forms import models
 from django import forms
 from django.utils import timezone
 
-from djanban.apps.charts.models import CachedChart
 from djanban.apps.dev_environment.models import Interruption, NoiseMeasurement
 
 
@@ -21,7 +20,6 @@ class NewInterruptionForm(models.ModelForm):
         if commit:
             self.instance.datetime = timezone.now()
             self.instance.save()
-            CachedChart.objects.filter(uuid__startswith="interruptions").delete()
         return self.instance
 
 
@@ -40,7 +38,6 @@ class NewNoiseMeasurementForm(models.ModelForm):
         if commit:
             self.instance.datetime = timezone.now()
             self.instance.save()
-            CachedChart.objects.filter(uuid__startswith="noise_measurement").delete()
         return self.instance
 
 
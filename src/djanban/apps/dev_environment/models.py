@@ -3,6 +3,10 @@
 from __future__ import unicode_literals
 
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from djanban.apps.charts import dependencies
 
 
 # An interruption of one team member
@@ -36,6 +40,13 @@ class Interruption(models.Model):
 
     comments = models.TextField(verbose_name=u"Other comments about the interruption", default="", blank=True)
 
+    # The board of the interruption is kept to invalidate its charts if the interruption is moved to other board
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Interruption, cls).from_db(db, field_names, values)
+        instance._loaded_board_id = instance.__dict__.get("board_id")
+        return instance
+
 
 # A noise measurement
 class NoiseMeasurement(models.Model):
@@ -57,3 +68,21 @@ class NoiseMeasurement(models.Model):
                                 default="", blank=True)
 
 
+# Invalidate the interruption charts of the board (or boards) of an interruption when it changes
+@receiver(post_save, sender=Interruption)
+@receiver(post_delete, sender=Interruption)
+def invalidate_interruption_charts(sender, instance, **kwargs):
+    from djanban.apps.boards.models import Board
+    board_ids = {instance.board_id, getattr(instance, "_loaded_board_id", None)}.difference([None])
+    for board in Board.objects.filter(id__in=board_ids):
+        board.invalidate_cached_charts(dependencies.INTERRUPTIONS)
+    instance._loaded_board_id = instance.board_id
+
+
+# Invalidate the noise measurement charts of the boards of the member that took a noise measurement.
+# Charts that are not about a board (as the noise level charts) are only valid for a period of time.
+@receiver(post_save, sender=NoiseMeasurement)
+@receiver(post_delete, sender=NoiseMeasurement)
+def invalidate_noise_measurement_charts(sender, instance, **kwargs):
+    for board in instance.member.boards.all():
+        board.invalidate_cached_charts(dependencies.NOISE_MEASUREMENTS)
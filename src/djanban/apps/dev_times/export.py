@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import csv
+from collections import namedtuple
+
+import six
+from django.utils import formats
+
+from djanban.apps.members.models import Member, SpentTimeFactor
+
+
+# Buffer that returns the written value instead of storing it, used to get the lines written by csv.writer
+class _EchoBuffer(object):
+    def write(self, value):
+        return value
+
+
+# Export daily spent times to CSV.
+# The daily spent times are read with an iterator of tuples and written one line at a time, so the exporter can
+# be used with a StreamingHttpResponse to export any number of daily spent times with constant memory.
+class DailySpentTimeCsvExporter(object):
+
+    HEADER = (
+        "Board", "Member", "Week", "Weekday", "Day of year", "Date", "Description", "Card", "Spent time",
+        "Adjusted spent time", "Estimated time", "Difference", "Rate amount", "Adjusted rate amount"
+    )
+
+    FIELDS = (
+        "board__name", "member_id", "week_of_year", "weekday", "day_of_year", "date", "description",
+        "card__short_url", "spent_time", "adjusted_spent_time", "estimated_time", "diff_time", "rate_amount"
+    )
+
+    # Values used to adjust the rate amount of a daily spent time
+    RateAmount = namedtuple("RateAmount", "date rate_amount")
+
+    def __init__(self, daily_spent_times, delimiter=";"):
+        self.daily_spent_times = daily_spent_times
+        self.delimiter = delimiter
+
+    # Lines of the CSV file
+    def __iter__(self):
+        writer = csv.writer(_EchoBuffer(), delimiter=str(self.delimiter))
+        yield writer.writerow(DailySpentTimeCsvExporter._encode(self.HEADER))
+
+        member_ids = self.daily_spent_times.order_by().values("member_id").distinct()
+
+        # Members and spent time factors are loaded once
+        usernames_by_member = {
+            member.id: member.external_username
+            for member in Member.objects.filter(id__in=member_ids).select_related("user", "trello_member_profile")
+        }
+        spent_time_factors_by_member = {}
+        for spent_time_factor in SpentTimeFactor.objects.filter(member_id__in=member_ids).order_by("id"):
+            spent_time_factors_by_member.setdefault(spent_time_factor.member_id, []).append(spent_time_factor)
+
+        for values in self.daily_spent_times.values_list(*self.FIELDS).iterator():
+            (board_name, member_id, week_of_year, weekday, day_of_year, date, description, card_short_url,
+             spent_time, adjusted_spent_time, estimated_time, diff_time, rate_amount) = values
+
+            adjusted_rate_amount = None
+            if rate_amount is not None:
+                adjusted_rate_amount = Member.adjust_daily_spent_time_from_spent_time_factors(
+                    DailySpentTimeCsvExporter.RateAmount(date=date, rate_amount=rate_amount),
+                    spent_time_factors=spent_time_factors_by_member.get(member_id, []),
+                    attribute="rate_amount"
+                )
+
+            row = (
+                board_name, usernames_by_member.get(member_id, ""), week_of_year, weekday, day_of_year,
+                formats.date_format(date), description, card_short_url or "",
+                DailySpentTimeCsvExporter._format_decimal(spent_time),
+                DailySpentTimeCsvExporter._format_decimal(adjusted_spent_time),
+                DailySpentTimeCsvExporter._format_decimal(estimated_time),
+                DailySpentTimeCsvExporter._format_decimal(diff_time),
+                DailySpentTimeCsvExporter._format_decimal(rate_amount),
+                DailySpentTimeCsvExporter._format_decimal(adjusted_rate_amount),
+            )
+            yield writer.writerow(DailySpentTimeCsvExporter._encode(row))
+
+    # Whole content of the CSV file (used for email attachments)
+    @property
+    def content(self):
+        if six.PY2:
+            return b"".join(self)
+        return "".join(self)
+
+    # Decimal values are written with two decimal places
+    @staticmethod
+    def _format_decimal(value):
+        if value is None:
+            return ""
+        return "{0:.2f}".format(value)
+
+    # The csv module of Python 2 only writes byte strings
+    @staticmethod
+    def _encode(row):
+        if six.PY2:
+            return [six.text_type(value).encode("utf-8") for value in row]
+        return row
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djanban.apps.boards.models import Board
+from djanban.apps.dev_times.models import DailySpentTimeRollup
+
+
+# Compute again the daily spent time rollups from the daily spent times
+class Command(BaseCommand):
+    help = u'Rebuild the daily spent time rollups of all boards (or of the boards whose ids are passed)'
+
+    def __init__(self, stdout=None, stderr=None, no_color=False):
+        super(Command, self).__init__(stdout, stderr, no_color)
+
+    def add_arguments(self, parser):
+        parser.add_argument('board_id', nargs='*', type=int)
+
+    # Handle de command action
+    def handle(self, *args, **options):
+        board_ids = options.get("board_id")
+
+        # No boards passed: all rollups are rebuilt at once
+        if not board_ids:
+            num_rollups = DailySpentTimeRollup.rebuild()
+            self.stdout.write(self.style.SUCCESS(u"{0} daily spent time rollup(s) created".format(num_rollups)))
+            return
+
+        for board_id in board_ids:
+            try:
+                board = Board.objects.get(id=board_id)
+            except Board.DoesNotExist:
+                raise CommandError(u"Board {0} does not exist".format(board_id))
+            num_rollups = DailySpentTimeRollup.rebuild(board=board)
+            self.stdout.write(
+                self.style.SUCCESS(u"{0} daily spent time rollup(s) created for {1}".format(num_rollups, board.name))
+            )
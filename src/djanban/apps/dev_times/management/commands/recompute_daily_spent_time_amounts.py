@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djanban.apps.boards.models import Board
+from djanban.apps.dev_times.models import DailySpentTimeRollup
+from djanban.apps.members.models import Member
+
+
+# Compute again the rate amounts and the adjusted spent times of the daily spent times (e.g. after changing the
+# hourly rates or the spent time factors)
+class Command(BaseCommand):
+    help = u'Recompute the rate amounts and adjusted spent times of the daily spent times of all boards ' \
+           u'(or of the boards whose ids are passed)'
+
+    def __init__(self, stdout=None, stderr=None, no_color=False):
+        super(Command, self).__init__(stdout, stderr, no_color)
+
+    def add_arguments(self, parser):
+        parser.add_argument('board_id', nargs='*', type=int)
+
+    # Handle de command action
+    def handle(self, *args, **options):
+        board_ids = options.get("board_id")
+
+        if board_ids:
+            boards = []
+            for board_id in board_ids:
+                try:
+                    boards.append(Board.objects.get(id=board_id))
+                except Board.DoesNotExist:
+                    raise CommandError(u"Board {0} does not exist".format(board_id))
+            members = Member.objects.filter(daily_spent_times__board__in=boards).distinct()
+        else:
+            boards = Board.objects.all()
+            members = Member.objects.all()
+
+        # Rate amounts are updated with an UPDATE for each interval of the hourly rates of each board
+        for board in boards:
+            num_daily_spent_times = board.update_rate_amounts(rebuild_rollups=False)
+            self.stdout.write(
+                self.style.SUCCESS(u"{0} rate amount(s) recomputed for {1}".format(num_daily_spent_times, board.name))
+            )
+
+        # Adjusted spent times are updated with an UPDATE for each member
+        for member in members:
+            member.update_adjusted_spent_times(rebuild_rollups=False)
+            self.stdout.write(
+                self.style.SUCCESS(u"Adjusted spent times recomputed for {0}".format(member.external_username))
+            )
+
+        # Rollups are rebuilt once (the rollups of the members include all the rollups of their boards)
+        if board_ids:
+            num_rollups = sum(DailySpentTimeRollup.rebuild(member=member) for member in members)
+        else:
+            num_rollups = DailySpentTimeRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(u"{0} daily spent time rollup(s) created".format(num_rollups)))
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-18 10:22
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+from djanban.utils.week import get_iso_week_of_year
+
+
+SUMMED_ATTRIBUTES = ("spent_time", "adjusted_spent_time", "estimated_time", "rate_amount")
+
+
+# Compute the rollups of the existing daily spent times (as DailySpentTimeRollup.rebuild does).
+# The rate amount of each rollup is adjusted by the spent time factor of its member applied in its date.
+def rebuild_daily_spent_time_rollups(apps, schema):
+    DailySpentTime = apps.get_model("dev_times", "DailySpentTime")
+    DailySpentTimeRollup = apps.get_model("dev_times", "DailySpentTimeRollup")
+    SpentTimeFactor = apps.get_model("members", "SpentTimeFactor")
+
+    spent_time_factors_by_member = {}
+    for spent_time_factor in SpentTimeFactor.objects.order_by("id"):
+        spent_time_factors_by_member.setdefault(spent_time_factor.member_id, []).append(spent_time_factor)
+
+    daily_sums = DailySpentTime.objects.\
+        values("board_id", "member_id", "date").\
+        annotate(
+            number_of_daily_spent_times=Count("id"),
+            **{"sum_{0}".format(attribute): Sum(attribute) for attribute in SUMMED_ATTRIBUTES}
+        ).\
+        order_by("board_id", "member_id", "date")
+
+    rollups = []
+    for sums in daily_sums:
+        rollup = DailySpentTimeRollup(
+            board_id=sums["board_id"], member_id=sums["member_id"], date=sums["date"],
+            week_of_year=get_iso_week_of_year(sums["date"]),
+            number_of_daily_spent_times=sums["number_of_daily_spent_times"]
+        )
+        for attribute in SUMMED_ATTRIBUTES:
+            setattr(rollup, attribute, sums["sum_{0}".format(attribute)])
+        if rollup.rate_amount is not None:
+            rollup.adjusted_rate_amount = rollup.rate_amount
+            for spent_time_factor in spent_time_factors_by_member.get(sums["member_id"], []):
+                start_date = spent_time_factor.start_date
+                end_date = spent_time_factor.end_date
+                if (start_date is None and end_date is None) or (start_date <= rollup.date and end_date is None) or \
+                        (start_date <= rollup.date <= end_date):
+                    rollup.adjusted_rate_amount = rollup.rate_amount * spent_time_factor.factor
+                    break
+        rollups.append(rollup)
+
+    DailySpentTimeRollup.objects.bulk_create(rollups, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0023_auto_20170519_1715'),
+        ('boards', '0073_board_cached_charts_version'),
+        ('dev_times', '0010_auto_20170530_1701'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySpentTimeRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date of the time measurements')),
+                ('week_of_year', models.CharField(max_length=16, verbose_name='Week number of the time measurements')),
+                ('number_of_daily_spent_times', models.PositiveIntegerField(default=0, verbose_name='Number of daily spent times')),
+                ('spent_time', models.DecimalField(decimal_places=4, default=None, max_digits=12, null=True, verbose_name='Spent time for this day')),
+                ('adjusted_spent_time', models.DecimalField(decimal_places=4, default=None, max_digits=12, null=True, verbose_name='Adjusted spent time for this day')),
+                ('estimated_time', models.DecimalField(decimal_places=4, default=None, max_digits=12, null=True, verbose_name='Estimated time for this day')),
+                ('rate_amount', models.DecimalField(decimal_places=4, default=None, max_digits=12, null=True, verbose_name='Rate amount for this day')),
+                ('adjusted_rate_amount', models.DecimalField(decimal_places=4, default=None, max_digits=12, null=True, verbose_name='Adjusted rate amount for this day')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_spent_time_rollups', to='boards.Board', verbose_name='Board')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_spent_time_rollups', to='members.Member', verbose_name='Member')),
+            ],
+            options={
+                'verbose_name': 'Daily spent time rollup',
+                'verbose_name_plural': 'Daily spent time rollups',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyspenttimerollup',
+            unique_together=set([('board', 'member', 'date')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='dailyspenttimerollup',
+            index_together=set([('member', 'date'), ('board', 'date', 'member')]),
+        ),
+        migrations.RunPython(rebuild_daily_spent_time_rollups, migrations.RunPython.noop),
+    ]
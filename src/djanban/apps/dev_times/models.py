@@ -5,7 +5,11 @@ from __future__ import unicode_literals
 from decimal import Decimal
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Sum, Count
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
 from djanban.utils.week import get_iso_week_of_year
 
 
@@ -48,6 +52,19 @@ class DailySpentTime(models.Model):
                                     decimal_places=4, max_digits=12,
                                     default=None, null=True)
 
+    # Keep the rollup key of the daily spent times loaded from database to know what rollup to update
+    # if its board, member or date changes
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(DailySpentTime, cls).from_db(db, field_names, values)
+        instance._loaded_rollup_key = instance.rollup_key
+        return instance
+
+    # Key of the daily spent time rollup this daily spent time is summed in
+    @property
+    def rollup_key(self):
+        return self.__dict__.get("board_id"), self.__dict__.get("member_id"), self.__dict__.get("date")
+
     @property
     def day(self):
         return self.date.day
@@ -120,10 +137,8 @@ class DailySpentTime(models.Model):
 
         # Rate amount computation
         hourly_rate = board.get_date_hourly_rate(date)
-        if hourly_rate:
-            if daily_spent_time.rate_amount is None:
-                daily_spent_time.rate_amount = 0
-            daily_spent_time.rate_amount += hourly_rate.amount
+        if spent_time is not None and hourly_rate is not None:
+            daily_spent_time.rate_amount = spent_time * hourly_rate.amount
 
         # Saving the daily spent time
         daily_spent_time.save()
@@ -205,4 +220,156 @@ class DailySpentTime(models.Model):
         else:
             self.adjusted_spent_time = self.member.adjust_spent_time(self.spent_time, self.date)
         DailySpentTime.objects.filter(id=self.id).update(adjusted_spent_time=self.adjusted_spent_time)
+        DailySpentTimeRollup.update(board_id=self.board_id, member_id=self.member_id, date=self.date)
+
+
+# Sums of the daily spent times of a member in a board in a date.
+# Spent times of a board or of a member in a period of time are computed adding one rollup per day and member
+# instead of all the daily spent times of that period.
+class DailySpentTimeRollup(models.Model):
+
+    class Meta:
+        verbose_name = u"Daily spent time rollup"
+        verbose_name_plural = u"Daily spent time rollups"
+        unique_together = (
+            ("board", "member", "date"),
+        )
+        index_together = (
+            ("member", "date"),
+            ("board", "date", "member"),
+        )
+
+    # Attributes of the daily spent times that are summed in the rollups
+    SUMMED_ATTRIBUTES = ("spent_time", "adjusted_spent_time", "estimated_time", "rate_amount")
+
+    board = models.ForeignKey("boards.Board", verbose_name=u"Board", related_name="daily_spent_time_rollups")
+    member = models.ForeignKey("members.Member", verbose_name=u"Member", related_name="daily_spent_time_rollups")
+    date = models.DateField(verbose_name="Date of the time measurements")
+    week_of_year = models.CharField(verbose_name="Week number of the time measurements", max_length=16)
+
+    number_of_daily_spent_times = models.PositiveIntegerField(verbose_name=u"Number of daily spent times", default=0)
 
+    spent_time = models.DecimalField(verbose_name=u"Spent time for this day",
+                                     decimal_places=4, max_digits=12, default=None, null=True)
+
+    adjusted_spent_time = models.DecimalField(verbose_name=u"Adjusted spent time for this day",
+                                              decimal_places=4, max_digits=12, default=None, null=True)
+
+    estimated_time = models.DecimalField(verbose_name=u"Estimated time for this day",
+                                         decimal_places=4, max_digits=12, default=None, null=True)
+
+    rate_amount = models.DecimalField(verbose_name=u"Rate amount for this day",
+                                      decimal_places=4, max_digits=12, default=None, null=True)
+
+    adjusted_rate_amount = models.DecimalField(verbose_name=u"Adjusted rate amount for this day",
+                                               decimal_places=4, max_digits=12, default=None, null=True)
+
+    # Sum an attribute of the rollups that comply with a filter. As usual, a None value means 0
+    @staticmethod
+    def sum(attribute, rollups=None, **rollup_filter):
+        if rollups is None:
+            rollups = DailySpentTimeRollup.objects.all()
+        sum_value = rollups.filter(**rollup_filter).aggregate(sum=Sum(attribute))["sum"]
+        if sum_value is None:
+            return 0
+        return sum_value
+
+    # Update the rollup of a member in a board in a date with its current daily spent times
+    @staticmethod
+    def update(board_id, member_id, date):
+        rollup_filter = {"board_id": board_id, "member_id": member_id, "date": date}
+        sums = DailySpentTime.objects.filter(**rollup_filter).aggregate(
+            number_of_daily_spent_times=Count("id"),
+            **{"sum_{0}".format(attribute): Sum(attribute) for attribute in DailySpentTimeRollup.SUMMED_ATTRIBUTES}
+        )
+
+        # If there are no daily spent times, there is no rollup
+        if sums["number_of_daily_spent_times"] == 0:
+            DailySpentTimeRollup.objects.filter(**rollup_filter).delete()
+            return None
+
+        from djanban.apps.members.models import SpentTimeFactor
+        spent_time_factors = SpentTimeFactor.objects.filter(member_id=member_id)
+        rollup = DailySpentTimeRollup._factory(board_id, member_id, date, sums, spent_time_factors)
+        rollup_values = {
+            field.name: getattr(rollup, field.name) for field in DailySpentTimeRollup._meta.concrete_fields
+            if field.name not in ("id", "board", "member", "date")
+        }
+        rollup, created = DailySpentTimeRollup.objects.update_or_create(defaults=rollup_values, **rollup_filter)
+        return rollup
+
+    # Recompute all the rollups (of a board and/or a member if they are passed).
+    # Return the number of rollups created.
+    @staticmethod
+    def rebuild(board=None, member=None):
+        from djanban.apps.members.models import SpentTimeFactor
+
+        rollup_filter = {}
+        if board is not None:
+            rollup_filter["board"] = board
+        if member is not None:
+            rollup_filter["member"] = member
+
+        daily_sums = DailySpentTime.objects.filter(**rollup_filter).\
+            values("board_id", "member_id", "date").\
+            annotate(
+                number_of_daily_spent_times=Count("id"),
+                **{"sum_{0}".format(attribute): Sum(attribute) for attribute in DailySpentTimeRollup.SUMMED_ATTRIBUTES}
+            ).\
+            order_by("board_id", "member_id", "date")
+
+        spent_time_factors_by_member = {}
+        spent_time_factor_filter = {"member": member} if member is not None else {}
+        for spent_time_factor in SpentTimeFactor.objects.filter(**spent_time_factor_filter):
+            spent_time_factors_by_member.setdefault(spent_time_factor.member_id, []).append(spent_time_factor)
+
+        rollups = [
+            DailySpentTimeRollup._factory(
+                sums["board_id"], sums["member_id"], sums["date"], sums,
+                spent_time_factors_by_member.get(sums["member_id"], [])
+            )
+            for sums in daily_sums
+        ]
+
+        with transaction.atomic():
+            DailySpentTimeRollup.objects.filter(**rollup_filter).delete()
+            DailySpentTimeRollup.objects.bulk_create(rollups, batch_size=500)
+        return len(rollups)
+
+    # Create a rollup (without saving it) from the sums of its daily spent times
+    @staticmethod
+    def _factory(board_id, member_id, date, sums, spent_time_factors):
+        from djanban.apps.members.models import Member
+        rollup = DailySpentTimeRollup(
+            board_id=board_id, member_id=member_id, date=date, week_of_year=get_iso_week_of_year(date),
+            number_of_daily_spent_times=sums["number_of_daily_spent_times"]
+        )
+        for attribute in DailySpentTimeRollup.SUMMED_ATTRIBUTES:
+            setattr(rollup, attribute, sums["sum_{0}".format(attribute)])
+        # All the daily spent times of the rollup have the same date, so the same spent time factor is applied
+        if rollup.rate_amount is not None:
+            rollup.adjusted_rate_amount = Member.adjust_daily_spent_time_from_spent_time_factors(
+                rollup, spent_time_factors, attribute="rate_amount"
+            )
+        return rollup
+
+
+# Update the daily spent time rollups when a daily spent time is saved
+@receiver(post_save, sender=DailySpentTime)
+def update_daily_spent_time_rollups_on_save(sender, instance, **kwargs):
+    rollup_key = instance.rollup_key
+    loaded_rollup_key = getattr(instance, "_loaded_rollup_key", None)
+    DailySpentTimeRollup.update(*rollup_key)
+    if loaded_rollup_key is not None and loaded_rollup_key != rollup_key:
+        DailySpentTimeRollup.update(*loaded_rollup_key)
+    instance._loaded_rollup_key = rollup_key
+
+
+# Update the daily spent time rollups when a daily spent time is deleted.
+# When a board or a member is deleted, their rollups are deleted before their daily spent times (rollups have no
+# signal receivers, so they are deleted with one query), so there is no need to compute them again.
+@receiver(post_delete, sender=DailySpentTime)
+def update_daily_spent_time_rollups_on_delete(sender, instance, **kwargs):
+    board_id, member_id, date = getattr(instance, "_loaded_rollup_key", instance.rollup_key)
+    if DailySpentTimeRollup.objects.filter(board_id=board_id, member_id=member_id, date=date).exists():
+        DailySpentTimeRollup.update(board_id, member_id, date)
@@ -7,13 +7,42 @@ import datetime
 from django.db.models import Sum
 
 from djanban.apps.base.auth import get_user_boards
-from djanban.apps.dev_times.models import DailySpentTime
+from djanban.apps.boards.snapshot import get_board_snapshot
+from djanban.apps.dev_times.models import DailySpentTime, DailySpentTimeRollup
+from djanban.apps.members.models import Member
 
 register = template.Library()
 
 
 @register.assignment_tag
 def get_daily_spent_times(current_user, member=None, start_date=None, end_date=None, week=None, board=None, label=None):
+    daily_spent_time_filter = _get_daily_spent_time_filter(
+        current_user, member, start_date, end_date, week, board, label
+    )
+
+    # Daily Spent Times
+    daily_spent_times = DailySpentTime.objects.filter(**daily_spent_time_filter).order_by("-date")
+
+    return daily_spent_times
+
+
+# Return the daily spent time rollups that comply with the filter, so the totals can be computed summing
+# one rollup by member and day. As rollups are not grouped by label, if the label is passed,
+# the daily spent times are returned.
+@register.assignment_tag
+def get_daily_spent_time_rollups(current_user, member=None, start_date=None, end_date=None, week=None, board=None,
+                                 label=None):
+    daily_spent_time_filter = _get_daily_spent_time_filter(
+        current_user, member, start_date, end_date, week, board, label
+    )
+    if "card__labels" in daily_spent_time_filter:
+        return DailySpentTime.objects.filter(**daily_spent_time_filter)
+    return DailySpentTimeRollup.objects.filter(**daily_spent_time_filter)
+
+
+# Return the filter of the daily spent times given the parameters of the daily spent time tags
+def _get_daily_spent_time_filter(current_user, member=None, start_date=None, end_date=None, week=None, board=None,
+                                 label=None):
     daily_spent_time_filter = {}
 
     # Member filter
@@ -37,13 +66,10 @@ def get_daily_spent_times(current_user, member=None, start_date=None, end_date=N
         daily_spent_time_filter["board_id"] = board.id
 
     # Label
-    if label and board and board.labels.filter(id=label.id).exists():
-        daily_spent_time_filter["card__labels"] = board.labels.get(id=label.id)
+    if label and board and label.id in get_board_snapshot(board).label_ids:
+        daily_spent_time_filter["card__labels"] = label
 
-    # Daily Spent Times
-    daily_spent_times = DailySpentTime.objects.filter(**daily_spent_time_filter).order_by("-date")
-
-    return daily_spent_times
+    return daily_spent_time_filter
 
 
 @register.filter
@@ -63,11 +89,15 @@ def total_value_amount(daily_spent_times):
 
 @register.filter
 def total_adjusted_spent_time(daily_spent_times):
+    if daily_spent_times.model is DailySpentTimeRollup:
+        return _rollup_attribute_sum(daily_spent_times, attribute="adjusted_spent_time")
     return _adjusted_daily_spent_time_attribute_sum(daily_spent_times, attribute="spent_time")
 
 
 @register.filter
 def total_adjusted_value_amount(daily_spent_times):
+    if daily_spent_times.model is DailySpentTimeRollup:
+        return _rollup_attribute_sum(daily_spent_times, attribute="adjusted_rate_amount")
     return _adjusted_daily_spent_time_attribute_sum(daily_spent_times, attribute="rate_amount")
 
 
@@ -80,19 +110,14 @@ def total_time_difference(daily_spent_times):
     return None
 
 
-# Return the value of the sum adjusted for each member
-def _adjusted_daily_spent_time_attribute_sum(daily_spent_times, attribute="spent_time"):
-    adjusted_value_sum = 0
-    member_dict = {}
-    for daily_spent_time in daily_spent_times:
-        if not daily_spent_time.member_id in member_dict:
-            member_dict[daily_spent_time.member_id] = daily_spent_time.member
-
-        member = member_dict[daily_spent_time.member_id]
+# Return the sum of an attribute of the daily spent time rollups (0 if there are none)
+def _rollup_attribute_sum(daily_spent_time_rollups, attribute):
+    return DailySpentTimeRollup.sum(attribute, rollups=daily_spent_time_rollups)
 
-        adjusted_value_sum += member.adjust_daily_spent_time(daily_spent_time, attribute)
 
-    return adjusted_value_sum
+# Return the value of the sum adjusted for each member
+def _adjusted_daily_spent_time_attribute_sum(daily_spent_times, attribute="spent_time"):
+    return Member.sum_adjusted_daily_spent_times(daily_spent_times, attribute=attribute)
 
 
 # Converts a (possibly) date string in Y-m-d format into a date object
@@ -1,3 +1,316 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import csv
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from djanban.apps.base.utils.intervals import DateIntervalIndexCache
+from djanban.apps.boards.models import Board, Card, List
+from djanban.apps.dev_times.export import DailySpentTimeCsvExporter
+from djanban.apps.dev_times.models import DailySpentTime, DailySpentTimeRollup
+from djanban.apps.hourly_rates.models import HourlyRate
+from djanban.apps.members.models import Member, SpentTimeFactor
+
+
+# Test for the daily spent time rollups
+class DailySpentTimeRollupTest(TestCase):
+
+    def setUp(self):
+        self.members = []
+        for username in ("first", "second"):
+            user = get_user_model().objects.create_user(username)
+            self.members.append(Member.objects.create(user=user, is_developer=True))
+        self.board = Board.objects.create(
+            creator=self.members[0], name="Board name", description="board description", comments="board comments"
+        )
+        self.board.members.add(*self.members)
+        SpentTimeFactor.objects.create(
+            member=self.members[1], start_date=date(2017, 5, 8), end_date=date(2017, 5, 12), factor=Decimal("0.5")
+        )
+        self.start_date = date(2017, 5, 1)
+        for day in range(0, 20):
+            for member_index, member in enumerate(self.members):
+                for spent_time in (Decimal("1.5"), Decimal(day % 3)):
+                    self._add_daily_spent_time(
+                        member, self.start_date + timedelta(days=day), spent_time, rate_amount=spent_time * 10
+                    )
+
+    def _add_daily_spent_time(self, member, date_, spent_time, rate_amount=None):
+        return DailySpentTime.objects.create(
+            board=self.board, member=member, description="Task", date=date_,
+            day_of_year=date_.strftime("%j"), week_of_year=date_.isocalendar()[1], weekday=date_.strftime("%w"),
+            spent_time=spent_time, adjusted_spent_time=member.adjust_spent_time(spent_time, date_),
+            estimated_time=spent_time + 1, rate_amount=rate_amount
+        )
+
+    # Check that the rollups have the sums of the daily spent times
+    def _assert_rollups_are_consistent(self):
+        daily_sums = DailySpentTime.objects.values("board_id", "member_id", "date").\
+            annotate(sum_spent_time=Sum("spent_time"), sum_estimated_time=Sum("estimated_time")).\
+            order_by("board_id", "member_id", "date")
+        rollups = DailySpentTimeRollup.objects.order_by("board_id", "member_id", "date")
+        self.assertEqual(
+            [(sums["board_id"], sums["member_id"], sums["date"], sums["sum_spent_time"], sums["sum_estimated_time"])
+             for sums in daily_sums],
+            [(rollup.board_id, rollup.member_id, rollup.date, rollup.spent_time, rollup.estimated_time)
+             for rollup in rollups]
+        )
+
+    # Rollups are updated when daily spent times are created, changed or deleted
+    def test_incremental_maintenance(self):
+        self._assert_rollups_are_consistent()
+
+        daily_spent_time = DailySpentTime.objects.filter(member=self.members[0], date=self.start_date)[0]
+        daily_spent_time.spent_time = Decimal("7")
+        daily_spent_time.save()
+        self._assert_rollups_are_consistent()
+
+        # Moving a daily spent time to another date updates both rollups
+        daily_spent_time.date = date(2017, 6, 1)
+        daily_spent_time.save()
+        self._assert_rollups_are_consistent()
+        self.assertEqual(DailySpentTimeRollup.objects.get(date=date(2017, 6, 1)).spent_time, Decimal("7"))
+
+        daily_spent_time.delete()
+        self._assert_rollups_are_consistent()
+        self.assertFalse(DailySpentTimeRollup.objects.filter(date=date(2017, 6, 1)).exists())
+
+        DailySpentTime.objects.filter(member=self.members[1], date=self.start_date).delete()
+        self._assert_rollups_are_consistent()
+
+    # Deleting a card updates each one of the rollups of its daily spent times once and deleting a member does not
+    # update its rollups (they are deleted with it)
+    def test_cascade_deletion(self):
+        now = timezone.now()
+        card = Card.objects.create(
+            board=self.board, list=List.objects.create(board=self.board, name="List", uuid="list"), uuid="card",
+            name="Card", description="", position=1, url="url", short_url="short-url", creation_datetime=now,
+            last_activity_datetime=now
+        )
+        DailySpentTime.objects.filter(date__lte=self.start_date + timedelta(days=1)).update(card=card)
+        with CaptureQueriesContext(connection) as context:
+            card.delete()
+        self._assert_rollups_are_consistent()
+        # Only the rollups of the two members in the two dates are computed again
+        self.assertEqual(len([query for query in context.captured_queries if '"sum_spent_time"' in query["sql"]]), 4)
+
+        with CaptureQueriesContext(connection) as context:
+            self.members[1].delete()
+        self._assert_rollups_are_consistent()
+        self.assertEqual(len([query for query in context.captured_queries if '"sum_spent_time"' in query["sql"]]), 0)
+
+        # Aborted deletions do not prevent the next deletions from updating the rollups
+        try:
+            with transaction.atomic():
+                Member.objects.get(id=self.members[0].id).delete()
+                raise DatabaseError("Aborted deletion")
+        except DatabaseError:
+            pass
+        DailySpentTime.objects.filter(member=self.members[0]).order_by("id")[0].delete()
+        self._assert_rollups_are_consistent()
+
+    # Board and member spent times computed from the rollups are the sums of their daily spent times
+    def test_board_and_member_spent_times(self):
+        date_interval = (date(2017, 5, 3), date(2017, 5, 16))
+        daily_spent_times = DailySpentTime.objects.filter(date__gte=date_interval[0], date__lte=date_interval[1])
+
+        def raw_sum(attribute, **daily_spent_time_filter):
+            return daily_spent_times.filter(**daily_spent_time_filter).aggregate(sum=Sum(attribute))["sum"]
+
+        self.assertEqual(self.board.get_spent_time(date_interval), raw_sum("spent_time"))
+        self.assertEqual(self.board.get_adjusted_spent_time(date_interval), raw_sum("adjusted_spent_time"))
+        self.assertEqual(self.board.get_developed_value(date_interval), raw_sum("rate_amount"))
+        self.assertEqual(
+            self.board.get_weekly_spent_time(19, 2017, self.members[1]),
+            DailySpentTime.objects.filter(member=self.members[1], date__gte=date(2017, 5, 8),
+                                          date__lte=date(2017, 5, 12)).aggregate(sum=Sum("spent_time"))["sum"]
+        )
+        self.assertEqual(
+            self.members[1].get_monthly_adjusted_spent_time(5, 2017),
+            DailySpentTime.objects.filter(member=self.members[1]).aggregate(sum=Sum("adjusted_spent_time"))["sum"]
+        )
+        self.assertEqual(self.board.get_spent_time(date(2016, 1, 1)), 0)
+
+        # Adjusted rate amounts apply the spent time factor of each day
+        adjusted_rate_amount = 0
+        for daily_spent_time in daily_spent_times.filter(member=self.members[1]):
+            adjusted_rate_amount += self.members[1].adjust_daily_spent_time(daily_spent_time, "rate_amount")
+        self.assertEqual(
+            self.board.get_adjusted_developed_value(date_interval, member=self.members[1]), adjusted_rate_amount
+        )
+
+    # Rebuilding the rollups gives the same rollups and updating the spent time factors updates the rollups
+    def test_rebuild(self):
+        rollup_values = list(DailySpentTimeRollup.objects.order_by("board_id", "member_id", "date").values_list(
+            "date", "spent_time", "adjusted_spent_time", "rate_amount", "adjusted_rate_amount"
+        ))
+        self.assertEqual(DailySpentTimeRollup.rebuild(), len(rollup_values))
+        self.assertEqual(
+            list(DailySpentTimeRollup.objects.order_by("board_id", "member_id", "date").values_list(
+                "date", "spent_time", "adjusted_spent_time", "rate_amount", "adjusted_rate_amount"
+            )),
+            rollup_values
+        )
+
+        SpentTimeFactor.objects.create(member=self.members[0], start_date=self.start_date, factor=Decimal("2"))
+        self.members[0].update_adjusted_spent_times()
+        self.assertEqual(
+            self.members[0].get_adjusted_spent_time(board=self.board), 2 * self.members[0].get_spent_time()
+        )
+
+    # Adjusted sums computed by the database are the same as adjusting each daily spent time
+    def test_sum_adjusted_daily_spent_times(self):
+        SpentTimeFactor.objects.create(
+            member=self.members[1], start_date=date(2017, 5, 15), end_date=None, factor=Decimal("1.25")
+        )
+        daily_spent_times = DailySpentTime.objects.filter(date__gte=date(2017, 5, 5)).order_by("-date")
+        for attribute in ("spent_time", "rate_amount"):
+            expected_sum = 0
+            for daily_spent_time in daily_spent_times:
+                expected_sum += daily_spent_time.member.adjust_daily_spent_time(daily_spent_time, attribute)
+            with self.assertNumQueries(2):
+                adjusted_sum = Member.sum_adjusted_daily_spent_times(daily_spent_times, attribute)
+            self.assertEqual(adjusted_sum, expected_sum)
+        self.assertEqual(Member.sum_adjusted_daily_spent_times(DailySpentTime.objects.none()), 0)
+
+    # The CSV export has a line for each daily spent time with its rate amount adjusted by the spent time factors
+    def test_csv_export(self):
+        daily_spent_times = DailySpentTime.objects.filter(member=self.members[1]).order_by("date", "id")
+        with self.assertNumQueries(3):
+            lines = list(DailySpentTimeCsvExporter(daily_spent_times))
+        self.assertEqual(len(lines), daily_spent_times.count() + 1)
+
+        rows = list(csv.reader(lines, delimiter=str(";")))
+        self.assertEqual(rows[0][-1], "Adjusted rate amount")
+        for row, daily_spent_time in zip(rows[1:], daily_spent_times):
+            adjusted_rate_amount = self.members[1].adjust_daily_spent_time(daily_spent_time, "rate_amount")
+            self.assertEqual(row[1], self.members[1].external_username)
+            self.assertEqual(Decimal(row[8]), daily_spent_time.spent_time)
+            self.assertEqual(Decimal(row[-1]), adjusted_rate_amount.quantize(Decimal("0.01")))
+
+
+# Test for the date indices of the hourly rates and the spent time factors
+class DateIntervalIndexTest(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user("first")
+        self.member = Member.objects.create(user=user, is_developer=True)
+        self.board = Board.objects.create(
+            creator=self.member, name="Board name", description="board description", comments="board comments"
+        )
+        self.board.members.add(self.member)
+        # An open rate since May and a rate for some days of May that overlaps the first one
+        self.board.hourly_rates.add(
+            HourlyRate.objects.create(creator=self.member, name="Standard", start_date=date(2017, 5, 1),
+                                      amount=Decimal("10")),
+            HourlyRate.objects.create(creator=self.member, name="Discount", start_date=date(2017, 5, 10),
+                                      end_date=date(2017, 5, 12), amount=Decimal("5")),
+        )
+        SpentTimeFactor.objects.create(
+            member=self.member, start_date=date(2017, 5, 8), end_date=date(2017, 5, 12), factor=Decimal("0.5")
+        )
+        self.start_date = date(2017, 4, 28)
+        for day in range(0, 20):
+            date_ = self.start_date + timedelta(days=day)
+            DailySpentTime.objects.create(
+                board=self.board, member=self.member, description="Task", date=date_,
+                day_of_year=date_.strftime("%j"), week_of_year=date_.isocalendar()[1], weekday=date_.strftime("%w"),
+                spent_time=Decimal("2"), estimated_time=Decimal("2")
+            )
+
+    # The hourly rate and spent time factor of a date are the ones of the first interval that contains the date and
+    # they are loaded once until they change
+    def test_lookups(self):
+        with self.assertNumQueries(1):
+            hourly_rates = [self.board.get_date_hourly_rate(date(2017, 5, day)) for day in (1, 10, 12, 13)]
+            self.assertIsNone(self.board.get_date_hourly_rate(date(2017, 4, 30)))
+        self.assertEqual([hourly_rate.name for hourly_rate in hourly_rates],
+                         ["Standard", "Standard", "Standard", "Standard"])
+        self.assertEqual(
+            [(start_date, end_date, hourly_rate.name)
+             for start_date, end_date, hourly_rate in self.board.hourly_rate_index.segments],
+            [(date(2017, 5, 1), None, "Standard")]
+        )
+
+        # Changing the hourly rates of the board invalidates its index
+        HourlyRate.objects.filter(name="Standard").update(start_date=date(2017, 5, 11))
+        self.board.hourly_rates.remove(self.board.hourly_rates.get(name="Discount"))
+        self.board.hourly_rates.add(
+            HourlyRate.objects.create(creator=self.member, name="Discount", start_date=date(2017, 5, 10),
+                                      end_date=date(2017, 5, 12), amount=Decimal("5"))
+        )
+        self.assertEqual(
+            [self.board.get_date_hourly_rate(date(2017, 5, day)).name for day in (10, 11, 12, 13)],
+            ["Discount", "Discount", "Discount", "Standard"]
+        )
+
+        with self.assertNumQueries(1):
+            adjusted_spent_times = [self.member.adjust_spent_time(Decimal("2"), date(2017, 5, day))
+                                    for day in (7, 8, 12, 13)]
+        self.assertEqual(adjusted_spent_times, [Decimal("2"), Decimal("1"), Decimal("1"), Decimal("2")])
+        SpentTimeFactor.objects.create(member=self.member, start_date=date(2017, 5, 13), factor=Decimal("2"))
+        self.assertEqual(self.member.adjust_spent_time(Decimal("2"), date(2017, 5, 13)), Decimal("4"))
+
+    # Indices are invalidated in other processes through the versions stored in the shared cache
+    def test_invalidation_in_other_processes(self):
+        process_indices = DateIntervalIndexCache(timeout=3600)
+        other_process_indices = DateIntervalIndexCache(timeout=3600)
+        get_hourly_rates = lambda: self.board.hourly_rates.all()
+        with self.assertNumQueries(1):
+            index = process_indices.get("hourly_rates", self.board.id, get_hourly_rates)
+            self.assertIs(process_indices.get("hourly_rates", self.board.id, get_hourly_rates), index)
+
+        other_process_indices.invalidate("hourly_rates", self.board.id)
+        new_index = process_indices.get("hourly_rates", self.board.id, get_hourly_rates)
+        self.assertIsNot(new_index, index)
+        index = new_index
+        self.assertIs(process_indices.get("hourly_rates", self.board.id, get_hourly_rates), index)
+
+        other_process_indices.invalidate("hourly_rates")
+        self.assertIsNot(process_indices.get("hourly_rates", self.board.id, get_hourly_rates), index)
+
+    # Rate amounts and adjusted spent times are recomputed with an UPDATE for each interval and the rollups are
+    # rebuilt
+    def test_recompute_command(self):
+        HourlyRate.objects.filter(name="Discount").update(start_date=date(2017, 4, 30))
+        call_command("recompute_daily_spent_time_amounts", self.board.id, stdout=StringIO())
+
+        daily_spent_times = DailySpentTime.objects.filter(board=self.board).order_by("date")
+        self.assertEqual(
+            [daily_spent_time.rate_amount for daily_spent_time in daily_spent_times],
+            [None, None] + [Decimal("10")] * 13 + [Decimal("20")] * 5
+        )
+        self.assertEqual(
+            [daily_spent_time.adjusted_spent_time for daily_spent_time in daily_spent_times],
+            [Decimal("2")] * 10 + [Decimal("1")] * 5 + [Decimal("2")] * 5
+        )
+        self.assertEqual(self.board.get_developed_value((self.start_date, date(2017, 5, 31))), Decimal("230"))
+
+        # The command does not rebuild the rollups of each board and member, but the rollups it rebuilds at the end
+        # are the same ones
+        rollup_values = list(DailySpentTimeRollup.objects.order_by("board_id", "member_id", "date").values_list(
+            "date", "spent_time", "adjusted_spent_time", "rate_amount", "adjusted_rate_amount"
+        ))
+        DailySpentTimeRollup.rebuild()
+        self.assertEqual(
+            list(DailySpentTimeRollup.objects.order_by("board_id", "member_id", "date").values_list(
+                "date", "spent_time", "adjusted_spent_time", "rate_amount", "adjusted_rate_amount"
+            )),
+            rollup_values
+        )
 
-# Create your tests here.
+        # Updating the rate amounts of a board also rebuilds its rollups
+        HourlyRate.objects.filter(name="Standard").update(amount=Decimal("20"))
+        self.board.update_rate_amounts()
+        self.assertEqual(self.board.get_developed_value((self.start_date, date(2017, 5, 31))), Decimal("330"))
@@ -12,12 +12,12 @@ from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 from django.contrib.auth.decorators import login_required
 from django.db.models import Sum, Q
-from django.http.response import HttpResponse, Http404, JsonResponse
+from django.http.response import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from django.template import loader
 
 from djanban.apps.base.auth import get_user_boards, user_is_member
 from djanban.apps.boards.models import Label, Board
+from djanban.apps.dev_times.export import DailySpentTimeCsvExporter
 from djanban.apps.dev_times.models import DailySpentTime
 from djanban.apps.members.models import Member
 from django.template.loader import get_template
@@ -41,7 +41,7 @@ def view_daily_spent_times(request):
 # Export daily spent report in CSV format
 @login_required
 def export_daily_spent_times(request):
-    spent_times = _get_daily_spent_times_from_request(request)
+    spent_times = _get_daily_spent_times_from_request(request, group_by_month=False)
 
     # Start and end date of the interval of the spent times that will be exported
     start_date = spent_times["start_date"]
@@ -57,17 +57,11 @@ def export_daily_spent_times(request):
         board = spent_times["board"]
         name_str = (u"{0}-".format(board.name)).lower()
 
-    # Creation of the HTTP response
-    response = HttpResponse(content_type='text/csv')
+    # Creation of the HTTP response. The CSV lines are sent as they are generated.
+    response = StreamingHttpResponse(DailySpentTimeCsvExporter(spent_times["all"]), content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="{0}export-daily-spent-times-from-{1}-to-{2}.csv"'.format(
         name_str, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
     )
-
-    csv_template = loader.get_template('daily_spent_times/csv.txt')
-    replacements = {
-        'spent_times': spent_times["all"],
-    }
-    response.write(csv_template.render(replacements))
     return response
 
 
@@ -167,7 +161,7 @@ def send_daily_spent_times(request):
     txt_message = get_template("daily_spent_times/emails/send_daily_spent_times.txt").render(replacements)
     html_message = get_template("daily_spent_times/emails/send_daily_spent_times.html").render(replacements)
 
-    csv_report = get_template('daily_spent_times/csv.txt').render({"spent_times": daily_spent_times})
+    csv_report = DailySpentTimeCsvExporter(daily_spent_times).content
     csv_file_name = "custom_report_for_{0}.csv".format(recipient_email)
 
     try:
@@ -270,7 +264,7 @@ def _get_daily_spent_times_replacements(request):
 
 
 # Return the daily spent times from a request
-def _get_daily_spent_times_from_request(request):
+def _get_daily_spent_times_from_request(request, group_by_month=True):
     current_user = request.user
     selected_member = None
     if request.GET.get("member_id"):
@@ -289,14 +283,16 @@ def _get_daily_spent_times_from_request(request):
     spent_times = _get_daily_spent_times_queryset(
         current_user, selected_member,
         request.GET.get("start_date"), request.GET.get("end_date"), request.GET.get('week'),
-        label_id=label_id, multiboard_id=multiboard_id
+        label_id=label_id, multiboard_id=multiboard_id, group_by_month=group_by_month
     )
 
     return spent_times
 
 
-# Return the filtered queryset and the replacements given the GET parameters
-def _get_daily_spent_times_queryset(current_user, selected_member, start_date_, end_date_, week, multiboard_id, label_id):
+# Return the filtered queryset and the replacements given the GET parameters.
+# If group_by_month is False, the sums of the daily spent times of each month are not computed.
+def _get_daily_spent_times_queryset(current_user, selected_member, start_date_, end_date_, week, multiboard_id, label_id,
+                                    group_by_month=True):
     daily_spent_time_filter = {}
 
     # Member filter
@@ -362,7 +358,7 @@ def _get_daily_spent_times_queryset(current_user, selected_member, start_date_,
             end_date = daily_spent_times[0].date
 
         date_i = datetime.date(start_date.year, start_date.month, 1)
-        while date_i <= end_date:
+        while group_by_month and date_i <= end_date:
             month_index = date_i.month
             year = date_i.year
             month_name = calendar.month_name[month_index]
@@ -418,14 +414,4 @@ def _adjusted_spent_time_sum(daily_spent_times):
 
 # Computes the adjusted spent time according to the factor each member has
 def _adjusted_daily_spent_time_attribute_sum(daily_spent_times, attribute="spent_time"):
-    adjusted_value_sum = 0
-    member_dict = {}
-    for daily_spent_time in daily_spent_times:
-        if not daily_spent_time.member_id in member_dict:
-            member_dict[daily_spent_time.member_id] = daily_spent_time.member
-
-        member = member_dict[daily_spent_time.member_id]
-
-        adjusted_value_sum += member.adjust_daily_spent_time(daily_spent_time, attribute)
-
-    return adjusted_value_sum
+    return Member.sum_adjusted_daily_spent_times(daily_spent_times, attribute=attribute)
@@ -9,6 +9,11 @@ from io import open
 from djanban.apps.boards.models import CardComment
 
 
+# Raised when a board is already being fetched
+class FetchLockError(AssertionError):
+    pass
+
+
 class Fetcher(object):
     FETCH_LOCK_FILE_PATH = u"/tmp/django-trello-stats-fetch-board-{0}-lock.txt"
 
@@ -31,7 +36,7 @@ class Fetcher(object):
         fetch_lock_file_path = Fetcher.FETCH_LOCK_FILE_PATH.format(self.board.id)
         # Check if lock file exists. If it exists, warn the fetch method
         if os.path.isfile(fetch_lock_file_path):
-            raise AssertionError("Lock file {0} already exists".format(fetch_lock_file_path))
+            raise FetchLockError("Lock file {0} already exists".format(fetch_lock_file_path))
 
         # Creates a new lock file
         with open(fetch_lock_file_path, 'w', encoding="utf-8") as lock_file:
@@ -3,7 +3,10 @@
 from __future__ import unicode_literals, absolute_import
 
 
+from datetime import datetime
+
 import dateutil.parser
+import pytz
 import shortuuid
 from django.db import transaction
 from django.utils import timezone
@@ -200,6 +203,10 @@ class BoardFetcher(Fetcher):
     # Date format of the actions and comments
     DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
 
+    # Maximum number of changed cards whose actions are fetched card by card in a delta fetch.
+    # If there are more changed cards, the actions of the whole board are fetched.
+    DELTA_FETCH_MAX_CARDS = 50
+
     # Create a fetcher from a board
     def __init__(self, board, debug=True):
         super(BoardFetcher, self).__init__(board)
@@ -210,21 +217,37 @@ class BoardFetcher(Fetcher):
         self.trello_board.fetch()
         self.debug = debug
 
-    # Fetch data of this board
-    def fetch(self, debug=False):
+    # Fetch data of this board.
+    # If this board has been fetched before, only the cards that have changed since the last fetched action
+    # are fetched (delta fetch) unless a full fetch is requested.
+    def fetch(self, debug=False, full=False):
         self._start_fetch()
 
         try:
+            # The newest action is gotten before fetching the cards, so the changes made while this board is being
+            # fetched will be fetched again in the next fetch
+            newest_actions = self.trello_board.fetch_actions("all", 1)
+
             with transaction.atomic():
-                self._truncate()
-                self._fetch_labels()
-                self._fetch_cards(debug=debug)
-                self._create_card_reports()
+                if full or self.board.last_fetched_action_datetime is None:
+                    self._truncate()
+                    self._fetch_labels()
+                    self._fetch_cards(debug=debug)
+                    board_has_changed = True
+                else:
+                    board_has_changed = self._fetch_changed_cards(debug=debug)
+
+                if board_has_changed:
+                    self._create_card_reports()
 
                 if self.board.url != self.trello_board.url:
                     self.board.url = self.trello_board.url
                 self.board.last_fetch_datetime = timezone.now()
-                self.board.last_activity_datetime = self.board.last_fetch_datetime
+                if board_has_changed:
+                    self.board.last_activity_datetime = self.board.last_fetch_datetime
+                if newest_actions:
+                    self.board.last_fetched_action_uuid = newest_actions[0]["id"]
+                    self.board.last_fetched_action_datetime = BoardFetcher._get_action_datetime(newest_actions[0])
                 self.board.save()
 
         except Exception as e:
@@ -250,6 +273,65 @@ class BoardFetcher(Fetcher):
         card_fetcher = CardFetcher(self, trello_cards, trello_movements_by_card, trello_comments_by_card)
         self.cards = card_fetcher.fetch()
 
+    # Fetch the cards that have changed since the last fetched action and delete the cards that are not
+    # in Trello anymore. Return True if there has been any change in this board.
+    def _fetch_changed_cards(self, debug=False):
+        new_actions = self._fetch_new_trello_actions()
+        changed_card_uuids = {
+            action["data"]["card"]["id"] for action in new_actions if "card" in action.get("data", {})
+        }
+
+        # All cards are fetched (this is only one request for each 1000 cards) to know which ones are new and
+        # which ones have been deleted
+        trello_cards = self._fetch_trello_cards()
+        trello_card_uuids = [trello_card.id for trello_card in trello_cards]
+        card_uuids = set(self.board.cards.values_list("uuid", flat=True))
+        changed_trello_cards = [
+            trello_card for trello_card in trello_cards
+            if trello_card.id in changed_card_uuids or trello_card.id not in card_uuids
+        ]
+        deleted_card_uuids = card_uuids.difference(trello_card_uuids)
+
+        self.cards = []
+        if not new_actions and not changed_trello_cards and not deleted_card_uuids:
+            return False
+
+        self._truncate()
+        self._fetch_labels()
+
+        # Statistics of the cards need all their movements, not only the new ones
+        if len(changed_trello_cards) > BoardFetcher.DELTA_FETCH_MAX_CARDS:
+            trello_movements_by_card = self._fetch_trello_card_movements_by_card()
+            trello_comments_by_card = self._fetch_trello_comments_by_card()
+        else:
+            trello_movements_by_card = {}
+            trello_comments_by_card = {}
+            for trello_card in changed_trello_cards:
+                trello_movements_by_card[trello_card.id] = self._fetch_trello_card_actions(
+                    trello_card.id, action_filter="updateCard:idList"
+                )
+                trello_comments_by_card[trello_card.id] = self._fetch_trello_card_actions(
+                    trello_card.id, action_filter="commentCard"
+                )
+
+        card_fetcher = CardFetcher(
+            self, changed_trello_cards, trello_movements_by_card, trello_comments_by_card,
+            trello_card_uuids=trello_card_uuids
+        )
+        self.cards = card_fetcher.fetch()
+        return True
+
+    # Return the actions of the board made after the last fetched action.
+    # Trello includes the action given as since parameter in the result, so it is discarded to avoid
+    # considering this board as changed when there are no new actions.
+    def _fetch_new_trello_actions(self):
+        if self.board.last_fetched_action_uuid:
+            since = self.board.last_fetched_action_uuid
+        else:
+            since = BoardFetcher._get_date_str(self.board.last_fetched_action_datetime)
+        actions = self._fetch_trello_actions(action_filter="all", since=since)
+        return [action for action in actions if action["id"] != self.board.last_fetched_action_uuid]
+
     # Fetch the card repots of this board
     def _create_card_reports(self, debug=False):
 
@@ -340,40 +422,69 @@ class BoardFetcher(Fetcher):
 
     # Return the actions of the board grouped by the uuid of each card
     def _fetch_trello_actions_by_card(self, action_filter, limit=1000, debug=False):
+        unique_actions = self._fetch_trello_actions(action_filter, limit=limit)
+
+        # Group actions by card
+        actions_by_card = {}
+        for action in unique_actions:
+            card_uuid = action[u"data"][u"card"][u"id"]
+            if card_uuid not in actions_by_card:
+                actions_by_card[card_uuid] = []
+            actions_by_card[card_uuid].append(action)
+
+        # Return the actions grouped by card
+        return actions_by_card
+
+    # Return the actions of the board (only those after since, if it is passed)
+    def _fetch_trello_actions(self, action_filter, since=None, limit=1000):
+        return BoardFetcher._fetch_paginated_actions(
+            lambda before: self.trello_board.fetch_actions(action_filter, limit, before=before, since=since),
+            limit
+        )
+
+    # Return all the actions of a card
+    def _fetch_trello_card_actions(self, card_uuid, action_filter, limit=1000):
+        def fetch_card_actions(before):
+            query_params = {"filter": action_filter, "limit": limit}
+            if before:
+                query_params["before"] = before
+            return self.trello_client.fetch_json("/cards/{0}/actions".format(card_uuid), query_params=query_params)
+        return BoardFetcher._fetch_paginated_actions(fetch_card_actions, limit)
+
+    # Fetch actions with a function that is called with the before parameter as long as there are more actions
+    @staticmethod
+    def _fetch_paginated_actions(fetch_actions, limit):
         # Fetch as long as there is a result
         actions = []
         must_retry = True
 
         # We will be making request from the earliest to the oldest actions, so we will use before parameter
-        # while since is always None
-        since = None
         before = None
 
-        # While there are more than 1000 actions, make another request for the previous 1000 actions
+        # While there are more than limit actions, make another request for the previous actions
         while must_retry:
-            actions_i = self.trello_board.fetch_actions(action_filter, limit, before=before, since=since)
+            actions_i = fetch_actions(before)
             actions += actions_i
             must_retry = len(actions_i) == limit
             if must_retry:
-                # We get the maximum date of these actions and use it to paginate,
-                # asking Trello to give us the actions since that date
+                # We get the minimum date of these actions and use it to paginate,
+                # asking Trello to give us the actions before that date
                 before = BoardFetcher._get_before_str_from_actions(actions_i)
 
         # There should be no need to assure uniqueness of the actions but it's better to be sure that
         # we have no repeated actions
         actions_dict = {action["id"]: action for action in actions}
-        unique_actions = actions_dict.values()
+        return actions_dict.values()
 
-        # Group actions by card
-        actions_by_card = {}
-        for action in unique_actions:
-            card_uuid = action[u"data"][u"card"][u"id"]
-            if card_uuid not in actions_by_card:
-                actions_by_card[card_uuid] = []
-            actions_by_card[card_uuid].append(action)
+    # Datetime of an action (dates are in UTC)
+    @staticmethod
+    def _get_action_datetime(action):
+        return datetime.strptime(action["date"], '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=pytz.UTC)
 
-        # Return the actions grouped by card
-        return actions_by_card
+    # Format a datetime as the date parameters of Trello API
+    @staticmethod
+    def _get_date_str(datetime_):
+        return datetime_.astimezone(pytz.UTC).strftime(BoardFetcher.DATE_FORMAT)[:-3] + "Z"
 
     # Get the since parameter based on the actions we've got. That is, get the max date of the actions and prepare
     # the since parameter adding one microsecond to that date
@@ -12,6 +12,7 @@ from django.core.exceptions import MultipleObjectsReturned
 from trello import ResourceUnavailable
 
 from djanban.apps.base.utils.datetime import localize_if_needed
+from djanban.apps.boards.card_stats import CardStats
 from djanban.apps.boards.models import Card, CardComment, CardAttachment
 from djanban.apps.members.models import Member, TrelloMemberProfile
 from djanban.apps.reports.models import CardMovement
@@ -20,8 +21,14 @@ from djanban.apps.reports.models import CardMovement
 # Fetch a card
 class CardFetcher(object):
 
-    # Create the card fetcher
-    def __init__(self, board_fetcher, trello_cards, trello_movements_by_card, trello_comments_by_card, debug=False):
+    # Number of objects created in each query
+    BATCH_SIZE = 500
+
+    # Create the card fetcher.
+    # If trello_card_uuids (uuids of all the cards of the board in Trello) is passed, trello_cards can be
+    # only the changed cards and only the cards that are not in trello_card_uuids will be deleted.
+    def __init__(self, board_fetcher, trello_cards, trello_movements_by_card, trello_comments_by_card, debug=False,
+                 trello_card_uuids=None):
         self.board_fetcher = board_fetcher
         self.board = board_fetcher.board
         self.trello_cycle_dict = {list_.uuid: True for list_ in self.board_fetcher.cycle_lists}
@@ -40,158 +47,245 @@ class CardFetcher(object):
         # We are going to mark all current cards as deletable cards. Only the cards that are present in trello.com
         # will be gotten out. Cards that are not in trello.com are assumed to be deleted so they will be here and
         # will be deleted when all the card fetching process is completed.
-        self.deleted_cards_dict = {card.uuid : card for card in self.board.cards.all()}
+        deleted_cards = self.board.cards.all()
+        if trello_card_uuids is not None:
+            deleted_cards = deleted_cards.exclude(uuid__in=trello_card_uuids)
+        self.deleted_cards_dict = {card.uuid: card for card in deleted_cards}
 
         # Updated cards gotten from trello.com
         self.cards = []
 
-    # Fetch and create a card
+    # Fetch and create the cards.
+    # Lists, members and the existing cards, attachments, comments and movements are loaded at once and compared
+    # with the data of Trello, so only the new objects are created (in batches) and only the changed ones are saved.
     def fetch(self):
 
-        card_dict = {}
-
-        # Definition of the work each thread must do
-        # that is the fetch of some cards
         for trello_card in self.trello_cards:
-            must_retry = True
-            while must_retry:
-                try:
-                    card_i = self._create(trello_card)
-                    if self.debug:
-                        print(u"{0} done".format(card_i.uuid))
-                    must_retry = False
-                    card_dict[card_i.uuid] = card_i
-                except ResourceUnavailable:
-                    must_retry = True
-
-        self.cards = card_dict.values()
-
-        # Deletion of cards that are not present in trello
-        for deleted_card_uuid, deleted_card in self.deleted_cards_dict.items():
-            deleted_card.delete()
+            trello_card.actions = self.trello_movements_by_card.get(trello_card.id, [])
+            trello_card._comments = self.trello_comments_by_card.get(trello_card.id, [])
 
-        # Card movements
-        for card in self.cards:
-            movements = self.trello_movements_by_card.get(card.uuid)
-            if movements:
-                # For each card movement, we update its values if needed
-                for movement in movements:
-                    # Check if movement occurs inside the board. Those movements that happen outside the board
-                    # that is from/to a list of other board are ignored.
-                    # Your users are encouraged to DON'T DO THAT.
-                    source_list_exists = self.board.lists.filter(uuid=movement["data"]["listBefore"]["id"])
-                    destination_list_exists = self.board.lists.filter(uuid=movement["data"]["listAfter"]["id"])
-                    if not source_list_exists or not destination_list_exists:
-                        continue
+            # Time a card is in a list
+            self._init_trello_card_stats_by_list(trello_card)
 
-                    source_list = self.board.lists.get(uuid=movement["data"]["listBefore"]["id"])
-                    destination_list = self.board.lists.get(uuid=movement["data"]["listAfter"]["id"])
-                    movement_type = "forward"
-                    if destination_list.position < source_list.position:
-                        movement_type = "backward"
-
-                    # Dates are in UTC
-                    movement_datetime = datetime.strptime(movement["date"], '%Y-%m-%dT%H:%M:%S.%fZ').\
-                        replace(tzinfo=pytz.UTC)
-
-                    # Only create card movements that don't exist
-                    try:
-                        CardMovement.objects.get(board=self.board, card=card, type=movement_type,
-                                                 source_list=source_list, destination_list=destination_list,
-                                                 datetime=movement_datetime,
-                                                 member__trello_member_profile__trello_id=movement["idMemberCreator"])
-
-                    except CardMovement.DoesNotExist:
-                        try:
-                            member = self.board.members.get(trello_member_profile__trello_id=movement["idMemberCreator"])
-                        except Member.DoesNotExist:
-                            member = Member.objects.get(trello_member_profile__trello_id=movement["idMemberCreator"])
-
-                        card_movement = CardMovement(board=self.board, card=card, type=movement_type,
-                                                     source_list=source_list, destination_list=destination_list,
-                                                     datetime=movement_datetime, member=member)
-                        card_movement.save()
+            self._init_trello_card_stats(trello_card)
 
-                card.update_lead_cycle_time()
+        self._init_members()
 
-        return self.cards
+        # Creates the Card objects
+        self.cards = self._create_cards()
 
-    # Create a card from a Trello Card
-    def _create(self, trello_card):
-        trello_card.actions = self.trello_movements_by_card.get(trello_card.id, [])
-        trello_card._comments = self.trello_comments_by_card.get(trello_card.id, [])
+        # Members, attachments and comments of the cards
+        self._update_card_members()
+        self._create_attachments()
+        self._create_comments()
 
-        # Time a card is in a list
-        self._init_trello_card_stats_by_list(trello_card)
+        for card in self.cards:
+            # There is some bug in Django that needs to be resolved in the OneToOne relationships
+            if not hasattr(card, "valuation_comment"):
+                card.valuation_comment = None
 
-        self._init_trello_card_stats(trello_card)
+            card.update_spent_estimated_time()
+            if self.debug:
+                print(u"{0} done".format(card.uuid))
 
-        # Creates the Card object
-        card = self._create_from_trello_card(trello_card)
+        # Deletion of cards that are not present in trello
+        for deleted_card_uuid, deleted_card in self.deleted_cards_dict.items():
+            deleted_card.delete()
 
-        # Create attachments
-        CardFetcher._create_attachments(card)
+        # Card movements
+        self._create_movements()
 
-        # Creation of the comments
-        CardFetcher._create_comments(card)
+        # Stats of the cards (attachments and movements are created in bulk, so they have not been updated)
+        CardStats([card.id for card in self.cards]).update(cards=self.cards)
 
-        # There is some bug in Django that needs to be resolved in the OneToOne relationships
-        if not hasattr(card, "valuation_comment"):
-            card.valuation_comment = None
+        # Lead and cycle times depend on the completion datetime of the cards
+        for card in self.cards:
+            if self.trello_movements_by_card.get(card.uuid):
+                card.update_lead_cycle_time()
 
-        card.update_spent_estimated_time()
+        return self.cards
 
-        return card
+    # Load the members referenced by the Trello data (members of cards, comment authors, uploaders and movers)
+    def _init_members(self):
+        trello_member_ids = set()
+        for trello_card in self.trello_cards:
+            trello_member_ids.update(trello_card.idMembers)
+            trello_member_ids.update(comment["idMemberCreator"] for comment in trello_card.comments)
+            trello_member_ids.update(movement["idMemberCreator"] for movement in trello_card.actions)
+            trello_member_ids.update(
+                trello_attachment["idMember"] for trello_attachment in self._get_trello_attachments(trello_card)
+                if "idMember" in trello_attachment
+            )
+
+        trello_member_profiles = TrelloMemberProfile.objects.\
+            filter(trello_id__in=trello_member_ids, member__isnull=False).\
+            select_related("member")
+        self.member_dict = {
+            trello_member_profile.trello_id: trello_member_profile.member
+            for trello_member_profile in trello_member_profiles
+        }
+
+        # Authors of the comments that are not members anymore are created
+        for trello_card in self.trello_cards:
+            for comment in trello_card.comments:
+                if comment["idMemberCreator"] not in self.member_dict:
+                    self.member_dict[comment["idMemberCreator"]] = CardFetcher._create_deleted_member(comment)
 
-    # Create attachments of the card
+    # Create a member for the author of a comment that does not exist anymore
     @staticmethod
-    def _create_attachments(card):
-        card_attachments = []
-        card_deleted_attachments = {attachment.uuid: attachment for attachment in card.attachments.all()}
-        member_dict = {}
-
-        for trello_attachment in card.trello_card.attachments:
-            uuid = trello_attachment["id"]
-
-            try:
-                trello_member_id = trello_attachment["idMember"]
-                if trello_member_id not in member_dict:
-                    member_dict[trello_member_id] = Member.objects.get(trello_member_profile__trello_id=trello_member_id)
-                uploader = member_dict[trello_member_id]
-            except Member.DoesNotExist:
-                uploader = card.creator
-
-            trello_attachment_creation_date = dateparser.parse(trello_attachment["date"])
+    def _create_deleted_member(comment):
+        deleted_member = Member()
+        deleted_member.save()
+        try:
+            trello_member_profile = TrelloMemberProfile.objects.get(
+                trello_id=comment["idMemberCreator"],
+                username=comment["memberCreator"]["username"],
+                initials=comment["memberCreator"]["initials"]
+            )
+        except TrelloMemberProfile.DoesNotExist:
+            trello_member_profile = TrelloMemberProfile(
+                member=deleted_member,
+                trello_id=comment["idMemberCreator"],
+                username=comment["memberCreator"]["username"],
+                initials=comment["memberCreator"]["initials"]
+            )
+
+        trello_member_profile.member = deleted_member
+        trello_member_profile.save()
+        return deleted_member
+
+    # Attachments of a Trello card (they could need a request to Trello)
+    @staticmethod
+    def _get_trello_attachments(trello_card):
+        while True:
             try:
-                card_attachment = card.attachments.get(uuid=uuid)
-                # If there has been any change in the file or even the URL has changed
-                if card_attachment.creation_datetime != trello_attachment_creation_date or\
-                        card_attachment.external_file_name != trello_attachment["url"]:
+                return trello_card.attachments
+            except ResourceUnavailable:
+                pass
+
+    # Card creation.
+    # Existing cards are updated but not saved, they will be saved when updating their spent and estimated times.
+    def _create_cards(self):
+        list_dict = {list_.uuid: list_ for list_ in self.lists}
+        cards = []
+        new_cards = []
+        for trello_card in self.trello_cards:
+            list_ = list_dict[trello_card.idList]
+            card = self.deleted_cards_dict.pop(trello_card.id, None)
+            if card is not None:
+                card.name = trello_card.name
+                card.url = trello_card.url
+                card.short_url = trello_card.short_url
+                card.description = trello_card.desc
+                card.is_closed = trello_card.closed
+                card.position = trello_card.pos
+                card.list = list_
+            else:
+                card = Card(uuid=trello_card.id, name=trello_card.name, url=trello_card.url,
+                            short_url=trello_card.short_url, description=trello_card.desc,
+                            is_closed=trello_card.closed, position=trello_card.pos, board=self.board, list=list_)
+                new_cards.append(card)
+
+            # Update card dates if needed
+            if trello_card.due_date:
+                card.due_datetime = localize_if_needed(trello_card.due_date)
+            else:
+                card.due_datetime = None
+            card.creation_datetime = localize_if_needed(trello_card.created_date)
+            card.last_activity_datetime = localize_if_needed(trello_card.dateLastActivity)
+
+            # Store the trello card data for ease of use
+            card.trello_card = trello_card
+
+            # Times
+            card.lead_time = trello_card.lead_time
+            card.cycle_time = trello_card.cycle_time
+
+            cards.append(card)
+
+        # New cards are created in batches and their ids are loaded afterwards
+        # (bulk_create does not set them in all database backends)
+        if new_cards:
+            Card.objects.bulk_create(new_cards, batch_size=CardFetcher.BATCH_SIZE)
+            new_card_ids = dict(
+                self.board.cards.filter(uuid__in=[card.uuid for card in new_cards]).values_list("uuid", "id")
+            )
+            for card in new_cards:
+                card.id = new_card_ids[card.uuid]
+
+        return cards
+
+    # Members of the cards are the members of the card in Trello and the authors of its comments
+    def _update_card_members(self):
+        CardMember = Card.members.through
+        card_ids = [card.id for card in self.cards]
+        current_member_ids_by_card = {}
+        for card_id, member_id in CardMember.objects.filter(card_id__in=card_ids).values_list("card_id", "member_id"):
+            current_member_ids_by_card.setdefault(card_id, set()).add(member_id)
+
+        new_card_members = []
+        for card in self.cards:
+            trello_card = card.trello_card
+            trello_member_ids = list(trello_card.idMembers) + \
+                [comment["idMemberCreator"] for comment in trello_card.comments]
+            member_ids = {
+                self.member_dict[trello_member_id].id for trello_member_id in trello_member_ids
+                if trello_member_id in self.member_dict
+            }
+            current_member_ids = current_member_ids_by_card.get(card.id, set())
+            removed_member_ids = current_member_ids.difference(member_ids)
+            if removed_member_ids:
+                CardMember.objects.filter(card_id=card.id, member_id__in=removed_member_ids).delete()
+            new_card_members += [
+                CardMember(card_id=card.id, member_id=member_id)
+                for member_id in member_ids.difference(current_member_ids)
+            ]
+        CardMember.objects.bulk_create(new_card_members, batch_size=CardFetcher.BATCH_SIZE)
+
+    # Create attachments of the cards
+    def _create_attachments(self):
+        card_deleted_attachments = {
+            attachment.uuid: attachment
+            for attachment in CardAttachment.objects.filter(card__in=[card.id for card in self.cards])
+        }
+        new_card_attachments = []
+
+        for card in self.cards:
+            for trello_attachment in CardFetcher._get_trello_attachments(card.trello_card):
+                uuid = trello_attachment["id"]
+                trello_attachment_creation_date = localize_if_needed(dateparser.parse(trello_attachment["date"]))
+
+                card_attachment = card_deleted_attachments.pop(uuid, None)
+                if card_attachment is not None:
+                    # If there has been any change in the file or even the URL has changed
+                    if card_attachment.creation_datetime != trello_attachment_creation_date or\
+                            card_attachment.external_file_name != trello_attachment["url"]:
+                        card_attachment.file = None
+                        card_attachment.external_file_name = trello_attachment["name"]
+                        card_attachment.external_file_url = trello_attachment["url"]
+                        card_attachment.creation_datetime = trello_attachment_creation_date
+                        card_attachment.save()
+                else:
+                    uploader = self.member_dict.get(trello_attachment.get("idMember"), self.board.creator)
+                    card_attachment = CardAttachment(uuid=uuid, card=card, uploader=uploader)
                     card_attachment.file = None
                     card_attachment.external_file_name = trello_attachment["name"]
                     card_attachment.external_file_url = trello_attachment["url"]
-                del card_deleted_attachments[uuid]
-            except CardAttachment.DoesNotExist:
-                card_attachment = CardAttachment(uuid=uuid, card=card, uploader=uploader)
-                card_attachment.file = None
-                card_attachment.external_file_name = trello_attachment["name"]
-                card_attachment.external_file_url = trello_attachment["url"]
+                    card_attachment.creation_datetime = trello_attachment_creation_date
+                    new_card_attachments.append(card_attachment)
 
-            card_attachments.append(card_attachment)
-
-            card_attachment.creation_datetime = localize_if_needed(trello_attachment_creation_date)
-            card_attachment.save()
+        CardAttachment.objects.bulk_create(new_card_attachments, batch_size=CardFetcher.BATCH_SIZE)
 
         # Delete all card attachments that are not present in trello.com
-        for attachment_uuid, attachment in card_deleted_attachments.items():
-            attachment.delete()
-
-        return card_attachments
+        if card_deleted_attachments:
+            CardAttachment.objects.filter(
+                id__in=[attachment.id for attachment in card_deleted_attachments.values()]
+            ).delete()
 
-    # Create comments of the card
-    @staticmethod
-    def _create_comments(card):
-        card_comments = []
+    # Create comments of the cards.
+    # Comments are saved one by one because saving a comment could create spent times, reviews, notifications...
+    # but only the new and the changed ones are saved.
+    def _create_comments(self):
 
         # {u'type': u'commentCard', u'idMemberCreator': u'56e2ac8e14e4eda06ac6b8fd',
         #  u'memberCreator': {u'username': u'diegoj5', u'fullName': u'Diego J.', u'initials': u'DJ',
@@ -201,129 +295,119 @@ class CardFetcher(object):
         #            u'board': {u'id': u'5717fb368199521a139712f0', u'name': u'Test', u'shortLink': u'2CGPEnM2'},
         #            u'card': {u'idShort': 6, u'id': u'57180ae1ed24b1cff7f8da7c', u'name': u'Por todas',
         #                      u'shortLink': u'bnK3c1jF'}}, u'id': u'57180b7e25abc60313461aaf'}
-        member_dict = {}
-
         local_timezone = pytz.timezone(settings.TIME_ZONE)
 
-        card_deleted_comments = {comment.uuid: comment for comment in card.comments.all()}
-
-        # Create each one of the comments
-        for comment in card.trello_card.comments:
+        comments_by_card = {}
+        for comment in CardComment.objects.filter(card__in=[card.id for card in self.cards]):
+            comments_by_card.setdefault(comment.card_id, {})[comment.uuid] = comment
 
-            # Author of the comment loaded using memoization
-            trello_member_id = comment["idMemberCreator"]
-            if trello_member_id not in member_dict:
+        for card in self.cards:
+            card_deleted_comments = comments_by_card.get(card.id, {})
+
+            # Create each one of the comments
+            for comment in card.trello_card.comments:
+                # Comment uuid
+                uuid = comment["id"]
+
+                # Comment content
+                content = comment["data"]["text"]
+
+                card_comment = card_deleted_comments.pop(uuid, None)
+                if card_comment is not None:
+                    is_unchanged = card_comment.content == content
+                    card_comment.card = card
+                    card_comment.content = content
+                else:
+                    is_unchanged = False
+                    # Comment creation datetime
+                    comment_naive_creation_datetime = datetime.strptime(comment["date"], '%Y-%m-%dT%H:%M:%S.%fZ')
+                    comment_creation_datetime = local_timezone.localize(comment_naive_creation_datetime)
+                    card_comment = CardComment(uuid=uuid, card=card, board=card.board,
+                                               author=self.member_dict[comment["idMemberCreator"]],
+                                               creation_datetime=comment_creation_datetime, content=content)
+
+                # Check if comment has a blocking card.
+                # The blocking card could have been fetched after the comment, so it is checked even if the comment
+                # has not changed (the card is only looked for if the comment is a blocking comment).
                 try:
-                    member_dict[trello_member_id] = Member.objects.get(trello_member_profile__trello_id=comment["idMemberCreator"])
-                # If the member doesn't exist, create it
-                except Member.DoesNotExist as e:
-                    deleted_member = Member()
-                    deleted_member.save()
-                    try:
-                        trello_member_profile = TrelloMemberProfile.objects.get(
-                            trello_id=comment["idMemberCreator"],
-                            username=comment["memberCreator"]["username"],
-                            initials=comment["memberCreator"]["initials"]
-                        )
-                    except TrelloMemberProfile.DoesNotExist:
-                        trello_member_profile = TrelloMemberProfile(
-                            member=deleted_member,
-                            trello_id=comment["idMemberCreator"],
-                            username=comment["memberCreator"]["username"],
-                            initials=comment["memberCreator"]["initials"]
-                        )
-
-                    trello_member_profile.member = deleted_member
-                    trello_member_profile.save()
-
-                    member_dict[trello_member_id] = deleted_member
-
-            author = member_dict[trello_member_id]
-
-            # Comment uuid
-            uuid = comment["id"]
-
-            # Comment content
-            content = comment["data"]["text"]
-
-            # Comment creation datetime
-            comment_naive_creation_datetime = datetime.strptime(comment["date"], '%Y-%m-%dT%H:%M:%S.%fZ')
-            comment_creation_datetime = local_timezone.localize(comment_naive_creation_datetime)
-
-            # Creation of the card comment
-            try:
-                card_comment = card.comments.get(uuid=uuid)
-                card_comment.content = content
-                card_comment.blocking_card = None
-                del card_deleted_comments[uuid]
-            except CardComment.DoesNotExist:
-                card_comment = CardComment(uuid=uuid, card=card, board=card.board, author=author,
-                                           creation_datetime=comment_creation_datetime, content=content)
-
-            #print "{0} {1} {2}".format(card.name, card_comment.content, card_comment.creation_datetime)
-
-            # Check if comment has a blocking card
-            blocking_card = card_comment.blocking_card_from_content
-            if blocking_card:
-                card_comment.blocking_card = blocking_card
-
-            card_comment.save()
+                    blocking_card = card_comment.blocking_card_from_content
+                # The blocking card is not in this board, so unchanged comments are kept as they are
+                except Card.DoesNotExist:
+                    if is_unchanged:
+                        continue
+                    raise
+                blocking_card_id = blocking_card.id if blocking_card else None
 
-            # Create card comment list
-            card_comments.append(card_comment)
+                # Unchanged comments are not saved again
+                if is_unchanged and card_comment.blocking_card_id == blocking_card_id:
+                    continue
 
-        # Delete all card comments that are not present in trello.com
-        for comment_uuid, comment in card_deleted_comments.items():
-            comment.delete()
+                card_comment.blocking_card = blocking_card
+                card_comment.save()
 
-        for trello_member_id, member in member_dict.items():
-            if not card.members.filter(trello_member_profile__trello_id=trello_member_id).exists():
-                card.members.add(member)
+            # Delete all card comments that are not present in trello.com
+            for comment_uuid, comment in card_deleted_comments.items():
+                comment.delete()
 
-        return card_comments
+    # Create the card movements that don't exist
+    def _create_movements(self):
+        list_dict = {list_.uuid: list_ for list_ in self.lists}
 
-    # Card creation
-    def _create_from_trello_card(self, trello_card):
-        list_ = self.board.lists.get(uuid=trello_card.idList)
+        existing_movements = set(
+            CardMovement.objects.filter(board=self.board).
+            values_list("card_id", "type", "source_list_id", "destination_list_id", "datetime", "member_id")
+        )
 
-        try:
-            card = self.board.cards.get(uuid=trello_card.id)
-            card.name = trello_card.name
-            card.url = trello_card.url
-            card.short_url = trello_card.short_url
-            card.description = trello_card.desc
-            card.is_closed = trello_card.closed
-            card.position = trello_card.pos
-            card.list = list_
-            del self.deleted_cards_dict[card.uuid]
-        except Card.DoesNotExist:
-            card = Card(uuid=trello_card.id, name=trello_card.name, url=trello_card.url,
-                        short_url=trello_card.short_url, description=trello_card.desc, is_closed=trello_card.closed,
-                        position=trello_card.pos, board=self.board, list=list_)
-
-        # Update card dates if needed
-        if trello_card.due_date:
-            card.due_datetime = localize_if_needed(trello_card.due_date)
-        else:
-            card.due_datetime = None
-        card.creation_datetime = localize_if_needed(trello_card.created_date)
-        card.last_activity_datetime = localize_if_needed(trello_card.dateLastActivity)
-
-        # Store the trello card data for ease of use
-        card.trello_card = trello_card
-
-        # Times
-        card.lead_time = trello_card.lead_time
-        card.cycle_time = trello_card.cycle_time
-
-        card.save()
-
-        # Members
-        card.members.clear()
-        for trello_member_id in trello_card.idMembers:
-            card.members.add(Member.objects.get(trello_member_profile__trello_id=trello_member_id))
-
-        return card
+        new_card_movements = []
+        for card in self.cards:
+            movements = self.trello_movements_by_card.get(card.uuid)
+            if not movements:
+                continue
+
+            for movement in movements:
+                # Check if movement occurs inside the board. Those movements that happen outside the board
+                # that is from/to a list of other board are ignored.
+                # Your users are encouraged to DON'T DO THAT.
+                source_list = list_dict.get(movement["data"]["listBefore"]["id"])
+                destination_list = list_dict.get(movement["data"]["listAfter"]["id"])
+                if source_list is None or destination_list is None:
+                    continue
+
+                movement_type = "forward"
+                if destination_list.position < source_list.position:
+                    movement_type = "backward"
+
+                # Dates are in UTC
+                movement_datetime = datetime.strptime(movement["date"], '%Y-%m-%dT%H:%M:%S.%fZ').\
+                    replace(tzinfo=pytz.UTC)
+
+                member = self.member_dict.get(movement["idMemberCreator"])
+
+                # Only create card movements that don't exist
+                member_id = member.id if member else None
+                movement_key = (card.id, movement_type, source_list.id, destination_list.id, movement_datetime)
+                if movement_key + (member_id,) in existing_movements:
+                    continue
+
+                # Movements of members that were not in the platform were stored without member
+                if member_id is not None and movement_key + (None,) in existing_movements:
+                    CardMovement.objects.filter(
+                        board=self.board, card=card, type=movement_type, source_list=source_list,
+                        destination_list=destination_list, datetime=movement_datetime, member__isnull=True
+                    ).update(member=member)
+                    existing_movements.remove(movement_key + (None,))
+                    existing_movements.add(movement_key + (member_id,))
+                    continue
+
+                existing_movements.add(movement_key + (member_id,))
+
+                new_card_movements.append(
+                    CardMovement(board=self.board, card=card, type=movement_type,
+                                 source_list=source_list, destination_list=destination_list,
+                                 datetime=movement_datetime, member=member)
+                )
+
+        CardMovement.objects.bulk_create(new_card_movements, batch_size=CardFetcher.BATCH_SIZE)
 
     # Initialize this card stats
     def _init_trello_card_stats(self, trello_card):
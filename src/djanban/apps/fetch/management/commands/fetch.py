@@ -4,7 +4,6 @@ from __future__ import unicode_literals, absolute_import
 
 import os
 import time
-import traceback
 from datetime import datetime, timedelta
 from io import open
 
@@ -15,6 +14,7 @@ from django.utils import timezone
 
 from djanban.apps.base.email import warn_administrators
 from djanban.apps.fetch.fetchers.trello.boards import Initializer, BoardFetcher
+from djanban.apps.fetch.scheduler import BoardFetchScheduler, BoardFetchResult
 from djanban.apps.members.models import Member
 
 
@@ -23,15 +23,27 @@ class Command(BaseCommand):
 
     FETCH_LOCK_FILE_PATH = u"/tmp/django-trello-stats-fetch-lock.txt"
 
+    # Number of boards fetched at the same time
+    DEFAULT_NUM_WORKERS = 4
+
     def __init__(self, stdout=None, stderr=None, no_color=False):
         super(Command, self).__init__(stdout, stderr, no_color)
         self.members = []
         self.fetched_boards = {}
+        self.full = False
         self.start_time = None
         self.end_time = None
 
     def add_arguments(self, parser):
         parser.add_argument('member_trello_username', nargs='*', type=str, default=False)
+        parser.add_argument(
+            '--full', action='store_true', dest='full', default=False,
+            help=u'Fetch all the data of the boards instead of only the changes since their last fetch'
+        )
+        parser.add_argument(
+            '--workers', type=int, dest='workers', default=Command.DEFAULT_NUM_WORKERS,
+            help=u'Number of boards fetched at the same time'
+        )
 
     def start(self):
         self.start_time = time.time()
@@ -106,92 +118,74 @@ class Command(BaseCommand):
                                      message=error_message)
             raise AssertionError(error_message)
 
-        fetch_ok = True
+        self.full = options.get("full", False)
 
-        # For each selected member,
-        # make two retries to the fetch procsess
+        # Boards of the selected members that are ready to be fetched
+        boards = []
         for member in self.members:
             if member.is_initialized:
-                self.stdout.write(
-                    self.style.SUCCESS(u"# Fetching {0} boards".format(member.external_username))
-                )
-                try:
-                    self.fetch_member_boards(member)
-                    member.fetch_ok = True
-                    self.stdout.write(
-                        self.style.SUCCESS(u"All boards of {0} fetched successfully".format(member.external_username))
-                    )
-                # If after two retries the exception persists, warn the administrators
-                except Exception as e:
-                    fetch_ok = True
-                    member.fetch_ok = False
-                    traceback_stack = traceback.format_exc()
-                    warn_administrators(
-                        subject=u"Unable to fetch boards",
-                        message=u"We tried initializing the boards but it didn't work out. {0}".format(traceback_stack)
+                boards += self.get_member_boards(member)
+
+        # Boards are fetched in parallel
+        scheduler = BoardFetchScheduler(
+            self.fetch_board, num_workers=options.get("workers", Command.DEFAULT_NUM_WORKERS), max_attempts=2
+        )
+        results = scheduler.fetch(boards)
+        failed_results = []
+        for result in results:
+            self.fetched_boards[result.board.id] = result.is_ok
+            if result.is_ok:
+                self.stdout.write(self.style.SUCCESS(
+                    u"Board {0} fetched successfully in {1:.2f} s ({2} attempt(s))".format(
+                        result.board.name, result.elapsed_time, result.number_of_attempts
                     )
+                ))
+            elif result.status == BoardFetchResult.LOCKED:
+                self.stdout.write(self.style.WARNING(
+                    u"Board {0} is being fetched by other process".format(result.board.name)
+                ))
+            else:
+                failed_results.append(result)
+                error_message = u"Error when fetching boards. Board {0} fetch failed. Exception {1}.".format(
+                    result.board.name, result.exception
+                )
+                # Warn the administrators messaging them the traceback and show the error on stdout
+                warn_administrators(subject=error_message, message=result.traceback)
+                self.stdout.write(self.style.ERROR(error_message))
+
+        if len(failed_results) > 0:
+            self.stdout.write(self.style.ERROR(u"There are {0} boards whose fetch failed".format(len(failed_results))))
+            for failed_result in failed_results:
+                self.stdout.write(
+                    self.style.ERROR(u" - {0} ({1:.2f} s)".format(failed_result.board, failed_result.elapsed_time)))
 
         self.end()
 
-        if fetch_ok:
-            self.stdout.write(self.style.SUCCESS(u"All boards of {0} members fetched successfully {1}".format(
-                self.members.count(), self.elapsed_time()))
-            )
+        self.stdout.write(self.style.SUCCESS(u"{0} of {1} boards of {2} members fetched successfully {3}".format(
+            len(results) - len(failed_results), len(results), self.members.count(), self.elapsed_time()))
+        )
 
-    # Fetch boards
-    def fetch_member_boards(self, member):
-        # For each board that is ready and belongs to this member, fetch it
-        boards = list(member.created_boards.filter(has_to_be_fetched=True, is_archived=False))
-        failed_boards = []
-        while len(boards) > 0:
-            board = boards.pop()
+    # Boards of a member that are ready to be fetched
+    def get_member_boards(self, member):
+        boards = []
+        for board in member.created_boards.filter(has_to_be_fetched=True, is_archived=False):
             # Shouldn't be needed because we are getting the boards by creator, but in case
             # we add this check in case we change the method of getting boards in a future
-            if board.id not in self.fetched_boards:
-                if board.is_ready():
-                    try:
-                        self.stdout.write(self.style.SUCCESS(u"Board {0} is ready".format(board.name)))
-                        self.fetch_board(member, board)
-                        self.stdout.write(self.style.SUCCESS(u"Board {0} fetched successfully".format(board.name)))
-                        # Mark this board as fetched
-                        self.fetched_boards[board.id] = True
-                    except Exception as e:
-                        import traceback
-                        traceback.print_exc()
-                        error_message = u"Error when fetching boards. Board {0} fetch failed. Exception {1}.".format(
-                            board.name, e
-                        )
-                        initializer = Initializer(member, debug=False)
-                        initializer.init(board.uuid)
-                        # Warn the administrators messaging them the traceback and show the error on stdout
-                        warn_administrators(subject=error_message, message=traceback.format_exc())
-                        self.stdout.write(self.style.ERROR(error_message))
-                        # Re-add the failed board to the last of the board list
-                        failed_boards.append(board)
-                else:
-                    self.stdout.write(self.style.ERROR(u"Board {0} is not ready".format(board.name)))
-            else:
+            if board.id in self.fetched_boards:
                 self.stdout.write(self.style.WARNING(u"Board {0} has already been fetched".format(board.name)))
-
-        if len(failed_boards) > 0:
-            self.stdout.write(self.style.ERROR(u"There are {0} boards whose fetch failed".format(len(failed_boards))))
-            for failed_board in failed_boards:
-                self.stdout.write(
-                    self.style.ERROR(u" - {0}".format(failed_board)))
-
-    # Fetch one board
-    def fetch_board(self, member, board):
-        num_retries = 0
-        while num_retries < 2:
-            try:
-                num_retries += 1
-                board_fetcher = BoardFetcher(board)
-                board_fetcher.fetch(debug=False)
-            except Exception as e:
-                if num_retries < 2:
-                    # Initialize board if needed
-                    initializer = Initializer(member, debug=False)
-                    initializer.init(board.uuid)
-                else:
-                    raise e
-
+            elif board.is_ready():
+                self.stdout.write(self.style.SUCCESS(u"Board {0} is ready".format(board.name)))
+                self.fetched_boards[board.id] = False
+                boards.append(board)
+            else:
+                self.stdout.write(self.style.ERROR(u"Board {0} is not ready".format(board.name)))
+        return boards
+
+    # Fetch one board. This is called from the worker threads of the scheduler.
+    def fetch_board(self, board, attempt):
+        # If the first fetch fails, the board is initialized and fully fetched again
+        if attempt > 1:
+            initializer = Initializer(board.creator, debug=False)
+            initializer.init(board.uuid)
+        board_fetcher = BoardFetcher(board, debug=False)
+        board_fetcher.fetch(debug=False, full=self.full or attempt > 1)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+from django.db import connection
+from six.moves import queue
+
+from djanban.apps.fetch.fetchers.base import FetchLockError
+
+
+# Result of the fetch of a board
+class BoardFetchResult(object):
+    OK = "ok"
+    FAILED = "failed"
+    LOCKED = "locked"
+
+    def __init__(self, board):
+        self.board = board
+        self.status = None
+        self.number_of_attempts = 0
+        # Time spent fetching this board (sum of all the attempts) in seconds
+        self.elapsed_time = 0.0
+        self.exception = None
+        self.traceback = None
+
+    @property
+    def is_ok(self):
+        return self.status == BoardFetchResult.OK
+
+
+# Fetches several boards in parallel with a pool of worker threads.
+# Boards with more recent activity are fetched first. Boards whose fetch fails are fetched again after waiting
+# an increasing amount of time (backoff). Boards that are being fetched by other process are skipped.
+# fetch_board is a callable that receives the board and the number of the attempt (starting by 1)
+# and fetches the board.
+class BoardFetchScheduler(object):
+
+    def __init__(self, fetch_board, num_workers=4, max_attempts=2, backoff=5.0):
+        self.fetch_board = fetch_board
+        self.num_workers = max(1, num_workers)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._pending_jobs = queue.PriorityQueue()
+        self._finished_jobs = queue.Queue()
+        self._job_counter = itertools.count()
+
+    # Fetch the boards and return the BoardFetchResult of each one of them in the order they were finished
+    def fetch(self, boards):
+        boards = BoardFetchScheduler.sort_by_priority(boards)
+        results = []
+        if not boards:
+            return results
+
+        for priority, board in enumerate(boards):
+            self._add_job(priority, BoardFetchResult(board))
+
+        workers = [
+            threading.Thread(target=self._work, name="board-fetcher-{0}".format(worker_index))
+            for worker_index in range(0, min(self.num_workers, len(boards)))
+        ]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+
+        # Boards whose fetch has failed, waiting to be fetched again: (time when it will be fetched again, job)
+        retries = []
+        num_running_jobs = len(boards)
+        while num_running_jobs > 0:
+            # Wait for a finished job or for the next retry to be ready
+            timeout = None
+            if retries:
+                timeout = max(0, retries[0][0] - time.time())
+            try:
+                priority, result = self._finished_jobs.get(timeout=timeout)
+                if result.status == BoardFetchResult.FAILED and result.number_of_attempts < self.max_attempts:
+                    retry_time = time.time() + self.backoff * 2 ** (result.number_of_attempts - 1)
+                    heapq.heappush(retries, (retry_time, next(self._job_counter), priority, result))
+                else:
+                    results.append(result)
+                    num_running_jobs -= 1
+            except queue.Empty:
+                pass
+
+            # Send the boards that are ready to be fetched again to the workers
+            while retries and retries[0][0] <= time.time():
+                retry_time, job_index, priority, result = heapq.heappop(retries)
+                self._add_job(priority, result)
+
+        # Stop the workers
+        for worker in workers:
+            self._pending_jobs.put((float("inf"), next(self._job_counter), None))
+        for worker in workers:
+            worker.join()
+
+        return results
+
+    # Sort the boards by their priority: boards with more recent activity are fetched first,
+    # boards without activity are fetched at the end
+    @staticmethod
+    def sort_by_priority(boards):
+        boards_with_activity = sorted(
+            [board for board in boards if board.last_activity_datetime is not None],
+            key=lambda board: board.last_activity_datetime, reverse=True
+        )
+        boards_without_activity = [board for board in boards if board.last_activity_datetime is None]
+        return boards_with_activity + boards_without_activity
+
+    def _add_job(self, priority, result):
+        self._pending_jobs.put((priority, next(self._job_counter), result))
+
+    # Fetch boards until there are no more boards to fetch
+    def _work(self):
+        try:
+            while True:
+                priority, job_index, result = self._pending_jobs.get()
+                if result is None:
+                    return
+                self._fetch(result)
+                self._finished_jobs.put((priority, result))
+        finally:
+            # Each thread has its own database connection
+            connection.close()
+
+    # Fetch a board storing the status of the fetch in its result
+    def _fetch(self, result):
+        result.number_of_attempts += 1
+        start_time = time.time()
+        try:
+            self.fetch_board(result.board, result.number_of_attempts)
+            result.status = BoardFetchResult.OK
+            result.exception = None
+            result.traceback = None
+        except FetchLockError as e:
+            result.status = BoardFetchResult.LOCKED
+            result.exception = e
+        except Exception as e:
+            result.status = BoardFetchResult.FAILED
+            result.exception = e
+            result.traceback = traceback.format_exc()
+        finally:
+            result.elapsed_time += time.time() - start_time
@@ -1,3 +1,283 @@
-from django.test import TestCase
+# -*- coding: utf-8 -*-
 
-# Create your tests here.
+from __future__ import unicode_literals
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from djanban.apps.boards.models import Board, CardAttachment, CardComment
+from djanban.apps.fetch.fetchers.base import FetchLockError
+from djanban.apps.fetch.fetchers.trello.boards import BoardFetcher
+from djanban.apps.fetch.fetchers.trello.cards import CardFetcher
+from djanban.apps.members.models import Member, TrelloMemberProfile
+from djanban.apps.reports.models import CardMovement
+from djanban.apps.fetch.scheduler import BoardFetchScheduler, BoardFetchResult
+
+
+# Test for the helpers used to fetch the actions of the boards
+class BoardFetcherActionsTest(SimpleTestCase):
+
+    # Actions are fetched page by page using the date of the oldest action of each page
+    def test_fetch_paginated_actions(self):
+        actions = [
+            {"id": "action-{0}".format(i), "date": "2017-05-{0:02d}T10:00:00.000Z".format(30 - i)} for i in range(0, 7)
+        ]
+        befores = []
+
+        def fetch_actions(before):
+            befores.append(before)
+            if before is None:
+                return actions[:3]
+            oldest_index = [action["date"] for action in actions].index(before)
+            return actions[oldest_index:oldest_index + 3]
+
+        fetched_actions = BoardFetcher._fetch_paginated_actions(fetch_actions, limit=3)
+        self.assertEqual(sorted(action["id"] for action in fetched_actions), [action["id"] for action in actions])
+        self.assertEqual(befores, [None, "2017-05-28T10:00:00.000Z", "2017-05-26T10:00:00.000Z",
+                                   "2017-05-24T10:00:00.000Z"])
+
+    # Datetimes of actions and date parameters of the API are in UTC
+    def test_dates(self):
+        action_datetime = BoardFetcher._get_action_datetime({"date": "2017-05-30T10:15:20.123Z"})
+        self.assertEqual(action_datetime, datetime(2017, 5, 30, 10, 15, 20, 123000, tzinfo=pytz.UTC))
+        local_datetime = action_datetime.astimezone(pytz.timezone("Europe/Madrid"))
+        self.assertEqual(BoardFetcher._get_date_str(local_datetime), "2017-05-30T10:15:20.123Z")
+
+    # Delta fetches ask for the actions since the last fetched action and discard it
+    def test_fetch_new_actions(self):
+        last_action = {"id": "action-1", "date": "2017-05-30T10:00:00.000Z"}
+        new_action = {"id": "action-2", "date": "2017-05-30T11:00:00.000Z"}
+        sinces = []
+
+        class FakeTrelloBoard(object):
+            def fetch_actions(self, action_filter, limit, before=None, since=None):
+                sinces.append(since)
+                return [new_action, last_action] if len(sinces) == 1 else [last_action]
+
+        board_fetcher = BoardFetcher.__new__(BoardFetcher)
+        board_fetcher.trello_board = FakeTrelloBoard()
+        board_fetcher.board = namedtuple("FakeBoard", ["last_fetched_action_uuid", "last_fetched_action_datetime"])(
+            last_action["id"], BoardFetcher._get_action_datetime(last_action)
+        )
+        self.assertEqual(board_fetcher._fetch_new_trello_actions(), [new_action])
+        self.assertEqual(board_fetcher._fetch_new_trello_actions(), [])
+        self.assertEqual(sinces, ["action-1", "action-1"])
+
+
+# Test for the card fetcher, that creates, updates and deletes the cards and its related objects in batches
+class CardFetcherTest(TestCase):
+
+    # Fake Trello card with the attributes used by the CardFetcher
+    class FakeTrelloCard(object):
+        def __init__(self, uuid, list_uuid, member_uuids, attachments):
+            self.id = uuid
+            self.name = "Card {0}".format(uuid)
+            self.url = "https://trello.com/c/{0}".format(uuid)
+            self.short_url = self.url
+            self.desc = "Description of {0}".format(uuid)
+            self.closed = False
+            self.pos = 1
+            self.idList = list_uuid
+            self.idMembers = member_uuids
+            self.due_date = None
+            self.created_date = datetime(2017, 5, 1, tzinfo=pytz.UTC)
+            self.dateLastActivity = datetime(2017, 5, 2, tzinfo=pytz.UTC)
+            self.attachments = attachments
+
+        @property
+        def comments(self):
+            return self._comments
+
+        def get_stats_by_list(self, lists, **kwargs):
+            return {list_.id: {"time": 0, "forward_moves": 0, "backward_moves": 0} for list_ in lists}
+
+    FakeBoardFetcher = namedtuple("FakeBoardFetcher", "board lists cycle_lists lead_lists")
+
+    def setUp(self):
+        self.members = []
+        for username in ("first", "second"):
+            user = get_user_model().objects.create_user(username)
+            member = Member.objects.create(user=user, is_developer=True)
+            TrelloMemberProfile.objects.create(
+                member=member, trello_id="trello-{0}".format(username), username=username, initials=username[0]
+            )
+            self.members.append(member)
+        self.board = Board.objects.create(
+            creator=self.members[0], name="Board name", description="board description", comments="board comments"
+        )
+        self.board.members.add(*self.members)
+        for position, list_type in enumerate(("ready_to_develop", "development", "done")):
+            self.board.lists.create(name=list_type, uuid="list-{0}".format(list_type), type=list_type,
+                                    position=position)
+
+    @staticmethod
+    def _action(uuid, member_uuid, date_str, data):
+        return {"id": uuid, "idMemberCreator": member_uuid, "date": date_str, "data": data,
+                "memberCreator": {"username": member_uuid, "initials": member_uuid[0]}}
+
+    @staticmethod
+    def _attachment(uuid, member_uuid):
+        return {"id": uuid, "idMember": member_uuid, "date": "2017-05-01T10:00:00.000Z", "name": uuid,
+                "url": "https://trello.com/{0}".format(uuid)}
+
+    def _fetch(self, trello_cards, movements_by_card, comments_by_card):
+        lists = self.board.lists.order_by("position")
+        board_fetcher = CardFetcherTest.FakeBoardFetcher(
+            board=self.board, lists=lists, cycle_lists=lists.filter(type="development"), lead_lists=lists
+        )
+        return CardFetcher(board_fetcher, trello_cards, movements_by_card, comments_by_card).fetch()
+
+    def test_fetch(self):
+        trello_cards = [
+            CardFetcherTest.FakeTrelloCard(
+                "card-1", "list-development", ["trello-first"], [self._attachment("attachment-1", "trello-first")]
+            ),
+            CardFetcherTest.FakeTrelloCard(
+                "card-2", "list-done", [],
+                [self._attachment("attachment-2", "trello-second"), self._attachment("attachment-3", "unknown")]
+            ),
+        ]
+        movements_by_card = {
+            "card-2": [
+                self._action("movement-1", "trello-second", "2017-05-01T12:00:00.000Z",
+                             {"listBefore": {"id": "list-development"}, "listAfter": {"id": "list-done"}}),
+                self._action("movement-2", "trello-second", "2017-05-01T13:00:00.000Z",
+                             {"listBefore": {"id": "list-of-other-board"}, "listAfter": {"id": "list-done"}}),
+            ]
+        }
+        comments_by_card = {
+            "card-1": [self._action("comment-1", "trello-second", "2017-05-01T11:00:00.000Z", {"text": "Hello"}),
+                       self._action("comment-2", "trello-deleted", "2017-05-01T11:30:00.000Z", {"text": "Bye"})]
+        }
+
+        cards = self._fetch(trello_cards, movements_by_card, comments_by_card)
+        self.assertEqual(sorted(card.uuid for card in cards), ["card-1", "card-2"])
+        self.assertTrue(all(card.id is not None for card in cards))
+
+        card_1 = self.board.cards.get(uuid="card-1")
+        self.assertEqual(card_1.list.type, "development")
+        self.assertEqual(card_1.members.count(), 3)
+        self.assertEqual(sorted(card_1.comments.values_list("uuid", flat=True)), ["comment-1", "comment-2"])
+        self.assertEqual(
+            sorted(CardAttachment.objects.filter(card__board=self.board).values_list("uuid", "uploader_id")),
+            [("attachment-1", self.members[0].id), ("attachment-2", self.members[1].id),
+             ("attachment-3", self.members[0].id)]
+        )
+        self.assertEqual(CardMovement.objects.filter(board=self.board, member=self.members[1]).count(), 1)
+
+        # Fetching again the same data doesn't create duplicates.
+        # Removed comments, attachments, card members and cards are deleted and changed comments are updated.
+        trello_cards[0].idMembers = []
+        trello_cards[0].attachments = []
+        comments_by_card["card-1"] = comments_by_card["card-1"][:1]
+        comments_by_card["card-1"][0]["data"]["text"] = "Hello again"
+        cards = self._fetch(trello_cards[:1], movements_by_card, comments_by_card)
+        self.assertEqual([card.uuid for card in cards], ["card-1"])
+        self.assertEqual(self.board.cards.count(), 1)
+        self.assertEqual(list(card_1.members.all()), [self.members[1]])
+        self.assertEqual(list(CardComment.objects.values_list("uuid", "content")), [("comment-1", "Hello again")])
+        self.assertFalse(CardAttachment.objects.exists())
+        self.assertFalse(CardMovement.objects.exists())
+
+        # Movements are not duplicated
+        self._fetch(trello_cards, movements_by_card, comments_by_card)
+        self._fetch(trello_cards, movements_by_card, comments_by_card)
+        self.assertEqual(CardMovement.objects.filter(board=self.board).count(), 1)
+
+    # Blocking cards of unchanged comments are resolved again and movements stored without member are completed
+    # when their member is in the platform
+    def test_refetch(self):
+        trello_cards = [
+            CardFetcherTest.FakeTrelloCard("card-1", "list-development", [], []),
+            CardFetcherTest.FakeTrelloCard("card-2", "list-development", [], []),
+        ]
+        movements_by_card = {
+            "card-2": [
+                self._action("movement-1", "trello-third", "2017-05-01T12:00:00.000Z",
+                             {"listBefore": {"id": "list-ready_to_develop"}, "listAfter": {"id": "list-development"}}),
+            ]
+        }
+        comments_by_card = {
+            "card-1": [self._action("comment-1", "trello-first", "2017-05-01T11:00:00.000Z",
+                                    {"text": "Blocked by https://trello.com/c/card-2"})]
+        }
+        self._fetch(trello_cards, movements_by_card, comments_by_card)
+        card_2 = self.board.cards.get(uuid="card-2")
+        self.assertEqual(CardComment.objects.get(uuid="comment-1").blocking_card, card_2)
+        self.assertIsNone(CardMovement.objects.get(card=card_2).member)
+
+        CardComment.objects.filter(uuid="comment-1").update(blocking_card=None)
+        third_member = Member.objects.create(user=get_user_model().objects.create_user("third"), is_developer=True)
+        TrelloMemberProfile.objects.create(member=third_member, trello_id="trello-third", username="third",
+                                           initials="t")
+        self._fetch(trello_cards, movements_by_card, comments_by_card)
+        self.assertEqual(CardComment.objects.get(uuid="comment-1").blocking_card, card_2)
+        self.assertEqual(list(CardMovement.objects.filter(card=card_2).values_list("member_id", flat=True)),
+                         [third_member.id])
+
+
+# Test for the scheduler that fetches several boards in parallel
+class BoardFetchSchedulerTest(SimpleTestCase):
+
+    FakeBoard = namedtuple("FakeBoard", "id name last_activity_datetime")
+
+    def setUp(self):
+        now = datetime(2017, 6, 1, tzinfo=pytz.UTC)
+        self.boards = [
+            BoardFetchSchedulerTest.FakeBoard(
+                id=board_index, name="Board {0}".format(board_index),
+                last_activity_datetime=now - timedelta(days=board_index) if board_index != 2 else None
+            )
+            for board_index in range(0, 6)
+        ]
+        self.lock = threading.Lock()
+        self.attempts = []
+        self.num_running_fetches = 0
+        self.max_num_running_fetches = 0
+
+    # Fake fetch: board 3 fails the first time, board 4 always fails and board 5 is being fetched by other process
+    def _fetch_board(self, board, attempt):
+        with self.lock:
+            self.attempts.append((board.id, attempt))
+            self.num_running_fetches += 1
+            self.max_num_running_fetches = max(self.max_num_running_fetches, self.num_running_fetches)
+        try:
+            time.sleep(0.02)
+            if board.id == 3 and attempt == 1 or board.id == 4:
+                raise ValueError("Trello is not available")
+            if board.id == 5:
+                raise FetchLockError("Lock file already exists")
+        finally:
+            with self.lock:
+                self.num_running_fetches -= 1
+
+    # Boards with more recent activity go first and boards without activity go last
+    def test_sort_by_priority(self):
+        sorted_boards = BoardFetchScheduler.sort_by_priority(list(reversed(self.boards)))
+        self.assertEqual([board.id for board in sorted_boards], [0, 1, 3, 4, 5, 2])
+
+    # Boards are fetched in parallel, failed boards are retried and locked boards are skipped
+    def test_fetch(self):
+        scheduler = BoardFetchScheduler(self._fetch_board, num_workers=3, max_attempts=2, backoff=0.01)
+        results = {result.board.id: result for result in scheduler.fetch(self.boards)}
+
+        self.assertEqual(sorted(results.keys()), [board.id for board in self.boards])
+        self.assertEqual(self.max_num_running_fetches, 3)
+        self.assertEqual([attempt for attempt in self.attempts if attempt[1] == 1][:3], [(0, 1), (1, 1), (3, 1)])
+        for board_id in (0, 1, 2):
+            self.assertTrue(results[board_id].is_ok)
+            self.assertEqual(results[board_id].number_of_attempts, 1)
+        self.assertTrue(results[3].is_ok)
+        self.assertEqual(results[3].number_of_attempts, 2)
+        self.assertEqual(results[4].status, BoardFetchResult.FAILED)
+        self.assertEqual(results[4].number_of_attempts, 2)
+        self.assertIsInstance(results[4].exception, ValueError)
+        self.assertEqual(results[5].status, BoardFetchResult.LOCKED)
+        self.assertEqual(results[5].number_of_attempts, 1)
+        self.assertGreater(results[3].elapsed_time, 0)
@@ -7,7 +7,7 @@ import shortuuid
 from crequest.middleware import CrequestMiddleware
 from django.conf import settings
 from django.core.files import File
-from django.db import models, transaction
+from django.db import models
 
 import statsmodels.api as sm
 from django.db.models import Q
@@ -15,7 +15,7 @@ from django.utils import timezone
 
 from djanban.apps.base.auth import get_user_boards
 from djanban.apps.boards.models import Card
-from djanban.apps.forecasters.serializer import CardSerializer
+from djanban.apps.forecasters.registry import model_registry
 from djanban.apps.members.models import Member
 
 
@@ -37,7 +37,8 @@ class Forecaster(models.Model):
     last_updater = models.ForeignKey("members.Member", verbose_name=u"Member", related_name="updated_forecasters")
     last_update_datetime = models.DateTimeField(verbose_name=u"Last update datetime")
 
-    # Retrieve the RegressionResults statsmodels object from database
+    # Retrieve the RegressionResults statsmodels object from database.
+    # Use model_registry to make predictions, as it keeps the compiled model in memory.
     def get_regression_results(self):
         return sm.load(self.results_file.path)
 
@@ -99,32 +100,25 @@ class Forecaster(models.Model):
     # Make an estimation of a card
     # Returns the estimated spent time of this card according to this forecaster's model
     def estimate_spent_time(self, card):
-        if not hasattr(self, "_regression_results"):
-            self._regression_results = self.get_regression_results()
-        prediction = self._regression_results.predict([self._get_card_data(card)])
-        estimated_spent_time = float(prediction)
-        return estimated_spent_time
+        return self.estimate_spent_times([card])[0]
+
+    # Make an estimation of several cards at once
+    # Returns a list with the estimated spent time of each card according to this forecaster's model
+    def estimate_spent_times(self, cards):
+        return model_registry.estimate_spent_times(self, cards)
 
     # Make a forecast of a card
     # Returns a Forecast object with the estimated spent time of this card according to this forecaster's model
     def make_forecast(self, card):
+        return self.make_forecasts([card])[0]
 
-        # If Forecast object exists, return it
-        try:
-            return Forecast.objects.get(forecaster=self, card=card, last_update_datetime__gte=self.last_update_datetime)
-        # Otherwise,
-        except Forecast.DoesNotExist:
-            # Try getting an old forecast and updating it if it exists
-            try:
-                forecast = Forecast.objects.get(forecaster=self, card=card)
-            # If it doesn't exist, create a new one
-            except Forecast.DoesNotExist:
-                forecast = Forecast(forecaster=self, card=card)
-
-            forecast.last_update_datetime = timezone.now()
-            forecast.estimated_spent_time = self.estimate_spent_time(card)
-            forecast.save()
-        return forecast
+    # Make the forecasts of several cards
+    # Returns a list with the Forecast object of each card. Only the forecasts that are older than this
+    # forecaster are computed again and all of them are estimated at once.
+    def make_forecasts(self, cards):
+        cards = list(cards)
+        forecasts = model_registry.predict(cards, [self])
+        return [forecasts[(self.id, card.id)] for card in cards]
 
     # Set last_update datetime when saving a Forecaster
     def save(self, *args, **kwargs):
@@ -144,13 +138,6 @@ class Forecaster(models.Model):
         )
         return forecasters
 
-    # Serialize card data
-    def _get_card_data(self, card):
-        members = card.board.members.all()
-        serializer = CardSerializer(card, members)
-        return serializer.serialize()
-
-
 # Estimation of spent time for a card
 class Forecast(models.Model):
     class Meta:
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import sys
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+
+import numpy
+import pandas as pd
+import patsy
+import statsmodels.api as sm
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, Value, When
+from django.utils import timezone
+
+from djanban.apps.forecasters.serializer import CardsSerializer
+
+
+# Regression model of a forecaster reduced to what is needed to make predictions: the design information of the
+# formula (used to build the design matrix from the data of the cards) and the fitted coefficients.
+# All the regression models of the forecasters are linear, so predictions are the product of both.
+class CompiledModel(object):
+
+    def __init__(self, design_info, coefficients):
+        self.design_info = design_info
+        self.coefficients = numpy.asarray(coefficients, dtype=float)
+
+    # Compile a statsmodels results object
+    @staticmethod
+    def from_regression_results(results):
+        design_info = results.model.data.design_info
+        coefficients = pd.Series(results.params).reindex(design_info.column_names).values
+        return CompiledModel(design_info, coefficients)
+
+    # Approximate size of the model in bytes
+    @property
+    def size(self):
+        return self.coefficients.nbytes + sum(
+            sys.getsizeof(column_name) for column_name in self.design_info.column_names
+        )
+
+    # Names of the variables of the formula
+    @property
+    def variable_names(self):
+        return [factor.name() for factor in self.design_info.factor_infos.keys()]
+
+    # Predict the spent times of the cards whose serialized data is passed (a list of dicts or a DataFrame).
+    # Cards of different boards have different member columns, so the member columns a card lacks are filled
+    # with 0 (the member does not work in the card) and a missing value raises an error instead of dropping the
+    # row of its card, which would shift the predictions of the following cards.
+    def predict(self, cards_data):
+        data_frame = pd.DataFrame(cards_data).reindex(columns=self.variable_names).fillna(0)
+        design_matrix = patsy.build_design_matrices(
+            [self.design_info], data_frame, NA_action=patsy.NAAction(on_NA="raise"), return_type="matrix"
+        )[0]
+        return numpy.dot(numpy.asarray(design_matrix), self.coefficients)
+
+
+# Compiled regression models of the forecasters shared by all the requests of this process.
+# Models are identified by the forecaster and its last update datetime, so updated forecasters are loaded
+# again. The least recently used models are evicted when the total size of the models exceeds max_size bytes.
+class ModelRegistry(object):
+
+    BATCH_SIZE = 500
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Return the compiled model of a forecaster, unpickling its regression results only if it is not in the registry
+    def get(self, forecaster):
+        key = (forecaster.id, forecaster.last_update_datetime)
+        with self._lock:
+            if key in self._models:
+                compiled_model = self._models.pop(key)
+                self._models[key] = compiled_model
+                return compiled_model
+
+        compiled_model = CompiledModel.from_regression_results(sm.load(forecaster.results_file.path))
+
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = compiled_model
+                self.size += compiled_model.size
+                self._evict()
+        return compiled_model
+
+    # Remove all the models of the registry
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self.size = 0
+
+    def __contains__(self, forecaster):
+        return (forecaster.id, forecaster.last_update_datetime) in self._models
+
+    def __len__(self):
+        return len(self._models)
+
+    # Delete the least recently used models until the registry fits in its maximum size.
+    # The most recently used model is always kept.
+    def _evict(self):
+        while self.size > self.max_size and len(self._models) > 1:
+            key, compiled_model = self._models.popitem(last=False)
+            self.size -= compiled_model.size
+
+    # Estimate the spent time of the cards with a forecaster.
+    # The data of the cards can be passed if it has already been serialized.
+    def estimate_spent_times(self, forecaster, cards, cards_data=None):
+        cards = list(cards)
+        if not cards:
+            return []
+        if cards_data is None:
+            cards_data = CardsSerializer(cards).serialize()
+        estimates = [float(prediction) for prediction in self.get(forecaster).predict(cards_data)]
+        assert len(estimates) == len(cards)
+        return estimates
+
+    # Make the forecasts of several cards with several forecasters.
+    # The cards are serialized only once and only the forecasts that are older than their forecasters are computed
+    # again. New forecasts are created and outdated forecasts are updated in bulk.
+    # Returns a dict with the Forecast object of each forecaster id and card id.
+    def predict(self, cards, forecasters):
+        from djanban.apps.forecasters.models import Forecast
+
+        cards = list(cards)
+        forecasters = list(forecasters)
+        forecasts = {}
+        for forecast in Forecast.objects.filter(forecaster__in=forecasters, card__in=[card.id for card in cards]):
+            forecasts[(forecast.forecaster_id, forecast.card_id)] = forecast
+
+        now = timezone.now()
+        cards_data = None
+        new_forecasts = []
+        updated_forecasts = []
+        for forecaster in forecasters:
+            outdated_card_indices = [
+                card_index for card_index, card in enumerate(cards)
+                if (forecaster.id, card.id) not in forecasts or
+                forecasts[(forecaster.id, card.id)].last_update_datetime < forecaster.last_update_datetime
+            ]
+            if outdated_card_indices:
+                if cards_data is None:
+                    cards_data = CardsSerializer(cards).serialize()
+                estimated_spent_times = self.estimate_spent_times(
+                    forecaster, [cards[card_index] for card_index in outdated_card_indices],
+                    [cards_data[card_index] for card_index in outdated_card_indices]
+                )
+                for card_index, estimated_spent_time in zip(outdated_card_indices, estimated_spent_times):
+                    card = cards[card_index]
+                    forecast = forecasts.get((forecaster.id, card.id))
+                    if forecast is None:
+                        forecast = Forecast(forecaster=forecaster, card=card)
+                        forecasts[(forecaster.id, card.id)] = forecast
+                        new_forecasts.append(forecast)
+                    else:
+                        updated_forecasts.append(forecast)
+                    forecast.last_update_datetime = now
+                    forecast.estimated_spent_time = Decimal(estimated_spent_time).quantize(Decimal("1.0000"))
+
+            # Forecasts are serialized with their forecasters
+            for card in cards:
+                forecasts[(forecaster.id, card.id)].forecaster = forecaster
+
+        if new_forecasts or updated_forecasts:
+            with transaction.atomic():
+                Forecast.objects.bulk_create(new_forecasts, batch_size=ModelRegistry.BATCH_SIZE)
+                # Only some databases (PostgreSQL) set the ids of the objects created in bulk
+                if any(forecast.id is None for forecast in new_forecasts):
+                    forecast_ids = Forecast.objects.filter(
+                        forecaster__in=forecasters, card__in=[card.id for card in cards]
+                    ).values_list("forecaster_id", "card_id", "id")
+                    for forecaster_id, card_id, forecast_id in forecast_ids:
+                        forecasts[(forecaster_id, card_id)].id = forecast_id
+                for batch_start in range(0, len(updated_forecasts), ModelRegistry.BATCH_SIZE):
+                    batch = updated_forecasts[batch_start:batch_start + ModelRegistry.BATCH_SIZE]
+                    Forecast.objects.filter(id__in=[forecast.id for forecast in batch]).update(
+                        estimated_spent_time=Case(
+                            *[When(id=forecast.id, then=Value(forecast.estimated_spent_time)) for forecast in batch],
+                            output_field=DecimalField(decimal_places=4, max_digits=12)
+                        ),
+                        last_update_datetime=now
+                    )
+        return forecasts
+
+
+# Registry of this process
+model_registry = ModelRegistry(max_size=settings.FORECASTER_MODEL_REGISTRY_MAX_SIZE)
@@ -7,7 +7,7 @@ import statsmodels.formula.api as smf
 
 from djanban.apps.boards.models import List
 from djanban.apps.forecasters.models import Forecaster
-from djanban.apps.forecasters.serializer import CardSerializer
+from djanban.apps.forecasters.serializer import CardSerializer, CardsSerializer
 
 
 # Regression models that exist in this module
@@ -83,8 +83,8 @@ class Regressor(object):
 
     # Convert all the cards in a Panda DataFrame
     def _get_data_frame(self):
-        data_dict = [self._get_card_data(card) for card in self.cards]
-        df = pd.DataFrame(data_dict)
+        serializer = CardsSerializer(self.cards, self.members)
+        df = pd.DataFrame(serializer.serialize())
         df.convert_objects(convert_numeric=True)
         return df
 
@@ -3,7 +3,14 @@ from __future__ import unicode_literals
 
 import re
 from decimal import Decimal
-from djanban.apps.boards.models import List
+
+from django.db.models import Count
+from django.utils import timezone
+
+from djanban.apps.boards.models import List, Card, Board
+from djanban.apps.dev_times.models import DailySpentTime
+from djanban.apps.members.models import Member
+from djanban.apps.reports.models import CardMovement
 
 
 # Card serializer used in the DataFrame creation
@@ -14,8 +21,107 @@ class CardSerializer(object):
         self.members = members
 
     def serialize(self):
-        card = self.card
-        card_age_in_seconds_decimal = Decimal(card.age_in_board.seconds / 3600.0).quantize(Decimal("1.000"))
+        return CardsSerializer([self.card], self.members).serialize()[0]
+
+
+# Serializer of several cards used in the DataFrame creation.
+# The data of the cards is loaded with a fixed number of grouped queries for each batch of cards
+# instead of several queries for each card.
+class CardsSerializer(object):
+
+    # Number of cards whose data is loaded in each batch of queries
+    BATCH_SIZE = 500
+
+    # If members is None, each card has a column for each member of its board
+    def __init__(self, cards, members=None):
+        self.cards = cards
+        self.members = list(members) if members is not None else None
+        self.now = timezone.now()
+        self._board_end_datetimes = {}
+        self._board_usernames = {}
+        self._list_types = {}
+        self._active_list_ids_by_board = {}
+
+    # Return a list with the data of each card (in the same order as the cards)
+    def serialize(self):
+        member_usernames = None
+        if self.members is not None:
+            member_usernames = [member.external_username for member in self.members]
+
+        cards_data = []
+        batch = []
+        for card in self.cards:
+            batch.append(card)
+            if len(batch) == CardsSerializer.BATCH_SIZE:
+                cards_data += self._serialize_batch(batch, member_usernames)
+                batch = []
+        if batch:
+            cards_data += self._serialize_batch(batch, member_usernames)
+        return cards_data
+
+    # Serialize a batch of cards
+    def _serialize_batch(self, cards, member_usernames):
+        card_ids = [card.id for card in cards]
+        self._load_boards({card.board_id for card in cards})
+
+        num_time_measurements_by_card = dict(
+            DailySpentTime.objects.filter(card_id__in=card_ids).values("card_id").
+            annotate(count=Count("id")).values_list("card_id", "count")
+        )
+
+        num_blocking_cards_by_card = dict(
+            Card.blocking_cards.through.objects.filter(from_card_id__in=card_ids).values("from_card_id").
+            annotate(count=Count("id")).values_list("from_card_id", "count")
+        )
+
+        member_ids_by_card = {}
+        for card_id, member_id in Card.members.through.objects.filter(card_id__in=card_ids).\
+                values_list("card_id", "member_id"):
+            member_ids_by_card.setdefault(card_id, []).append(member_id)
+        usernames_by_member = CardsSerializer._get_usernames_by_member(
+            {member_id for member_ids in member_ids_by_card.values() for member_id in member_ids}
+        )
+
+        label_colors_by_card = {}
+        for card_id, color in Card.labels.through.objects.filter(card_id__in=card_ids).\
+                values_list("card_id", "label__color"):
+            label_colors_by_card.setdefault(card_id, []).append(color)
+
+        movements_by_card = {}
+        movements = CardMovement.objects.filter(card_id__in=card_ids).order_by("card_id", "datetime").\
+            values_list("card_id", "type", "source_list_id", "destination_list_id", "datetime")
+        for card_id, movement_type, source_list_id, destination_list_id, movement_datetime in movements:
+            movements_by_card.setdefault(card_id, []).append(
+                (movement_type, source_list_id, destination_list_id, movement_datetime)
+            )
+
+        cards_data = []
+        for card in cards:
+            card_data = self._serialize_card(
+                card,
+                num_time_measurements=num_time_measurements_by_card.get(card.id, 0),
+                num_blocking_cards=num_blocking_cards_by_card.get(card.id, 0),
+                member_usernames=[usernames_by_member[member_id] for member_id in member_ids_by_card.get(card.id, [])],
+                label_colors=label_colors_by_card.get(card.id, []),
+                movements=movements_by_card.get(card.id, [])
+            )
+            # Columns of the members
+            if member_usernames is not None:
+                usernames = member_usernames
+            else:
+                usernames = self._board_usernames[card.board_id]
+            for username in usernames:
+                if username not in card_data:
+                    card_data[username] = 0
+            cards_data.append(card_data)
+
+        return cards_data
+
+    # Serialize a card given its related data
+    def _serialize_card(self, card, num_time_measurements, num_blocking_cards, member_usernames, label_colors,
+                        movements):
+        age_in_board = self._board_end_datetimes[card.board_id] - card.creation_datetime
+        card_age_in_seconds_decimal = Decimal(age_in_board.seconds / 3600.0).quantize(Decimal("1.000"))
         card_age_in_seconds = float(card_age_in_seconds_decimal)
         num_forward_movements = 0
         if card_age_in_seconds > 0:
@@ -33,43 +139,41 @@ class CardSerializer(object):
         description_num_words = len(re.split(r"\s+", card.description))
         card_data = {
             "card_spent_time": float(card.spent_time) if card.spent_time else 0,
-            "num_time_measurements": card.daily_spent_times.count(),
+            "num_time_measurements": num_time_measurements,
             "card_age": card_age_in_seconds,
             "num_forward_movements": num_forward_movements,
             "num_backward_movements": num_backward_movements,
             "num_comments": card.number_of_comments,
             "num_comment_words": card.number_of_words_in_comments,
-            "num_blocking_cards": card.blocking_cards.count(),
+            "num_blocking_cards": num_blocking_cards,
             "card_value": float(card.value) if card.value else 0,
             "name_length": len(card.name),
             "name_num_words": name_num_words,
             "description_length": len(card.description),
             "description_num_words": description_num_words,
             "num_mentioned_members": card.number_of_mentioned_members,
-            "num_members": card.members.count(),
-            "num_labels": card.labels.count(),
-            "has_red_label": 1 if card.labels.filter(color="red") else 0,
-            "has_orange_label": 1 if card.labels.filter(color="orange") else 0,
-            "has_yellow_label": 1 if card.labels.filter(color="yellow") else 0
+            "num_members": len(member_usernames),
+            "num_labels": len(label_colors),
+            "has_red_label": 1 if "red" in label_colors else 0,
+            "has_orange_label": 1 if "orange" in label_colors else 0,
+            "has_yellow_label": 1 if "yellow" in label_colors else 0
         }
 
         # Member that work in this card
-        for card_member in card.members.all():
-            card_data[card_member.external_username] = 1
-        for member in self.members:
-            if member.external_username not in card_data:
-                card_data[member.external_username] = 0
+        for member_username in member_usernames:
+            card_data[member_username] = 1
 
-        # Creation list type
+        # Creation list type (source list of the first forward movement)
         for list_type in List.ACTIVE_LIST_TYPES:
             card_data["creation_list_type_{0}".format(list_type)] = 0
 
-        creation_list = card.creation_list
-        if creation_list:
-            card_data["creation_list_type_{0}".format(creation_list.type)] = 1
+        forward_movements = [movement for movement in movements if movement[0] == "forward"]
+        if forward_movements and forward_movements[0][1] is not None:
+            creation_list_type = self._list_types[forward_movements[0][1]]
+            card_data["creation_list_type_{0}".format(creation_list_type)] = 1
 
         # Time per list type
-        time_per_list_type = card.time_in_each_list_type
+        time_per_list_type = self._get_time_in_each_list_type(card, movements)
         for list_type in List.ACTIVE_LIST_TYPES:
             if list_type in time_per_list_type:
                 card_data["time_in_list_type_{0}".format(list_type)] = time_per_list_type[list_type]
@@ -77,3 +181,68 @@ class CardSerializer(object):
                 card_data["time_in_list_type_{0}".format(list_type)] = 0
 
         return card_data
+
+    # Time this card has passed in each list type (see Card.time_in_each_list and Card.time_in_each_list_type)
+    def _get_time_in_each_list_type(self, card, movements):
+        time_by_list = {list_id: 0 for list_id in self._active_list_ids_by_board[card.board_id]}
+
+        card_last_action_datetime = card.creation_datetime
+
+        #  If there are no changes in the card, all its life has been in its creation list
+        if not movements:
+            if card.list_id in time_by_list:
+                time_by_list[card.list_id] += (self.now - card_last_action_datetime).total_seconds()
+
+        else:
+            last_list_id = None
+            for movement_type, source_list_id, destination_list_id, movement_datetime in movements:
+                if source_list_id in time_by_list:
+                    time_by_list[source_list_id] += (movement_datetime - card_last_action_datetime).total_seconds()
+                card_last_action_datetime = movement_datetime
+                last_list_id = destination_list_id
+
+            # Adding the number of seconds the card has been in its last column (until now)
+            # only if the last column is not "Done" column
+            if self._list_types.get(last_list_id) != "done" and last_list_id in time_by_list:
+                time_by_list[last_list_id] += (self.now - card_last_action_datetime).total_seconds()
+
+        time_by_list_type = {list_type: 0 for list_type in List.LIST_TYPES}
+        for list_id, time_in_list in time_by_list.items():
+            time_by_list_type[self._list_types[list_id]] += time_in_list
+        return time_by_list_type
+
+    # Load the data of the boards that have not been loaded yet
+    def _load_boards(self, board_ids):
+        new_board_ids = [board_id for board_id in board_ids if board_id not in self._board_end_datetimes]
+        if not new_board_ids:
+            return
+
+        for board in Board.objects.filter(id__in=new_board_ids):
+            self._board_end_datetimes[board.id] = board.end_datetime
+            self._active_list_ids_by_board[board.id] = []
+
+        for list_id, board_id, list_type in List.objects.filter(board_id__in=new_board_ids).\
+                values_list("id", "board_id", "type"):
+            self._list_types[list_id] = list_type
+            if list_type not in ("closed", "ignored"):
+                self._active_list_ids_by_board[board_id].append(list_id)
+
+        # Members of the boards are only needed when there is not a fixed list of members
+        if self.members is None:
+            member_ids_by_board = {board_id: [] for board_id in new_board_ids}
+            for board_id, member_id in Board.members.through.objects.filter(board_id__in=new_board_ids).\
+                    values_list("board_id", "member_id"):
+                member_ids_by_board[board_id].append(member_id)
+            usernames_by_member = CardsSerializer._get_usernames_by_member(
+                {member_id for member_ids in member_ids_by_board.values() for member_id in member_ids}
+            )
+            for board_id, member_ids in member_ids_by_board.items():
+                self._board_usernames[board_id] = [usernames_by_member[member_id] for member_id in member_ids]
+
+    # External usernames of the members
+    @staticmethod
+    def _get_usernames_by_member(member_ids):
+        if not member_ids:
+            return {}
+        members = Member.objects.filter(id__in=member_ids).select_related("user", "trello_member_profile")
+        return {member.id: member.external_username for member in members}
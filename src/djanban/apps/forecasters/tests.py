@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy
+import pandas as pd
+import pytz
+import statsmodels.formula.api as smf
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from djanban.apps.boards.models import Board, Card, Label, List
+from djanban.apps.forecasters.models import Forecast, Forecaster
+from djanban.apps.forecasters.registry import CompiledModel, ModelRegistry
+from djanban.apps.forecasters.serializer import CardsSerializer
+from djanban.apps.members.models import Member
+from djanban.apps.reports.models import CardMovement
+
+
+# Cards used to build and use the forecasters
+class ForecasterCardsTestCase(TestCase):
+
+    def setUp(self):
+        self.members = []
+        for username in ("first", "second", "third"):
+            user = get_user_model().objects.create_user(username)
+            self.members.append(Member.objects.create(user=user, is_developer=True))
+        self.board = Board.objects.create(
+            creator=self.members[0], name="Board name", description="board description", comments="board comments"
+        )
+        self.board.members.add(*self.members[:2])
+        self.lists = [
+            self.board.lists.create(name=list_type, uuid="list-{0}".format(list_type), type=list_type,
+                                    position=position)
+            for position, list_type in enumerate(("ready_to_develop", "development", "done"))
+        ]
+        red_label = Label.objects.create(board=self.board, name="Urgent", uuid="label-red", color="red")
+        yellow_label = Label.objects.create(board=self.board, name="Later", uuid="label-yellow", color="yellow")
+
+        start_datetime = datetime(2017, 5, 1, 9, tzinfo=pytz.UTC)
+        for card_index in range(0, 6):
+            card = Card.objects.create(
+                board=self.board, list=self.lists[card_index % 3], uuid="card-{0}".format(card_index),
+                name="Card number {0}".format(card_index), url="url-{0}".format(card_index),
+                short_url="short-url-{0}".format(card_index), description="Description of the card",
+                position=card_index, creation_datetime=start_datetime + timedelta(hours=card_index),
+                last_activity_datetime=start_datetime, spent_time=card_index, value=card_index % 2,
+                number_of_forward_movements=card_index % 3
+            )
+            card.members.add(*self.members[:card_index % 4])
+            card.labels.add(*[red_label, yellow_label][:card_index % 3])
+            for movement_index in range(0, card_index % 3):
+                CardMovement.objects.create(
+                    board=self.board, card=card, type="forward", source_list=self.lists[movement_index],
+                    destination_list=self.lists[movement_index + 1], member=self.members[0],
+                    datetime=card.creation_datetime + timedelta(hours=movement_index + 1)
+                )
+            card.daily_spent_times.create(
+                board=self.board, member=self.members[0], description="Task", date=start_datetime.date(),
+                day_of_year=1, week_of_year=1, weekday=1, spent_time=1
+            )
+        self.cards = list(self.board.cards.order_by("id"))
+        self.cards[0].blocking_cards.add(self.cards[1], self.cards[2])
+
+
+# Test for the serialization of the cards used to build and use the forecasters
+class CardsSerializerTest(ForecasterCardsTestCase):
+
+    # Data of a card computed from the properties of the card
+    def _get_expected_card_data(self, card, members):
+        expected_card_data = {
+            "num_time_measurements": card.daily_spent_times.count(),
+            "num_blocking_cards": card.blocking_cards.count(),
+            "num_members": card.members.count(),
+            "num_labels": card.labels.count(),
+            "has_red_label": 1 if card.is_red else 0,
+            "has_yellow_label": 1 if card.is_yellow else 0,
+            "card_age": float(round(card.age_in_board.seconds / 3600.0, 3)),
+        }
+        for member in members:
+            expected_card_data[member.external_username] = 1 if card.members.filter(id=member.id).exists() else 0
+        creation_list = card.creation_list
+        for list_type in List.ACTIVE_LIST_TYPES:
+            expected_card_data["creation_list_type_{0}".format(list_type)] = \
+                1 if creation_list and creation_list.type == list_type else 0
+        for list_type, time_in_list_type in card.time_in_each_list_type.items():
+            if list_type in List.ACTIVE_LIST_TYPES:
+                expected_card_data["time_in_list_type_{0}".format(list_type)] = time_in_list_type
+        return expected_card_data
+
+    def test_serialize(self):
+        members = self.board.members.select_related("user", "trello_member_profile")
+        with self.assertNumQueries(12):
+            cards_data = CardsSerializer(self.cards, members).serialize()
+        self.assertEqual(len(cards_data), len(self.cards))
+        for card, card_data in zip(self.cards, cards_data):
+            expected_card_data = self._get_expected_card_data(card, members)
+            for key, expected_value in expected_card_data.items():
+                # Time in each list type of the cards is computed until now, so it changes while the test runs
+                if key.startswith("time_in_list_type_"):
+                    self.assertAlmostEqual(card_data[key], expected_value, delta=1, msg=key)
+                else:
+                    self.assertEqual(card_data[key], expected_value, msg=key)
+            # Members of the cards that are not in the members passed to the serializer are also columns
+            if card.members.filter(id=self.members[2].id).exists():
+                self.assertEqual(card_data[self.members[2].external_username], 1)
+
+        # Without a list of members, the members of the board of each card are used
+        for card_data in CardsSerializer(self.cards).serialize():
+            self.assertIn(self.members[0].external_username, card_data)
+            self.assertIn(self.members[1].external_username, card_data)
+
+
+# Test for the registry of compiled regression models
+class ModelRegistryTest(ForecasterCardsTestCase):
+
+    def setUp(self):
+        super(ModelRegistryTest, self).setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.cards_data = pd.DataFrame(CardsSerializer(self.cards).serialize())
+        self.results = smf.ols("card_spent_time ~ card_age + num_members + has_red_label", data=self.cards_data).fit()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def _create_forecaster(self, name):
+        results_path = os.path.join(self.media_root, "{0}.pickle".format(name))
+        self.results.save(results_path)
+        forecaster = Forecaster(board=self.board, name=name, model="OLS", formula=self.results.model.formula,
+                                last_updater=self.members[0])
+        with open(results_path, "rb") as results_file:
+            forecaster.results_file.save("{0}-results.pickle".format(name), File(results_file))
+        return forecaster
+
+    # Predictions of the compiled model are the same as the ones of statsmodels
+    def test_predict(self):
+        forecaster = self._create_forecaster("forecaster")
+        registry = ModelRegistry(max_size=1024 * 1024)
+        compiled_model = registry.get(forecaster)
+        self.assertIs(registry.get(forecaster), compiled_model)
+        numpy.testing.assert_allclose(compiled_model.predict(self.cards_data), self.results.predict(self.cards_data))
+
+        forecasts = registry.predict(self.cards, [forecaster])
+        self.assertEqual(Forecast.objects.filter(forecaster=forecaster).count(), len(self.cards))
+        self.assertTrue(all(forecast.id is not None for forecast in forecasts.values()))
+        for card, prediction in zip(self.cards, self.results.predict(self.cards_data)):
+            self.assertAlmostEqual(float(forecasts[(forecaster.id, card.id)].estimated_spent_time), prediction, places=3)
+
+        # Up to date forecasts are not computed again, outdated ones are updated in bulk
+        with self.assertNumQueries(1):
+            registry.predict(self.cards, [forecaster])
+        Forecast.objects.filter(card=self.cards[0]).update(last_update_datetime=timezone.now() - timedelta(days=1))
+        Forecast.objects.filter(card=self.cards[0]).update(estimated_spent_time=0)
+        registry.predict(self.cards, [forecaster])
+        self.assertAlmostEqual(float(Forecast.objects.get(card=self.cards[0]).estimated_spent_time),
+                               forecasts[(forecaster.id, self.cards[0].id)].estimated_spent_time, places=3)
+
+    # Member columns a card lacks (e.g. cards of other boards) are filled with 0 instead of dropping its row
+    def test_predict_missing_member_columns(self):
+        results = smf.ols("card_spent_time ~ card_age + first", data=self.cards_data).fit()
+        compiled_model = CompiledModel.from_regression_results(results)
+        cards_data = self.cards_data.to_dict("records")
+        del cards_data[0]["first"]
+        expected_cards_data = self.cards_data.copy()
+        expected_cards_data.loc[0, "first"] = 0
+        predictions = compiled_model.predict(cards_data)
+        self.assertEqual(len(predictions), len(cards_data))
+        numpy.testing.assert_allclose(predictions, results.predict(expected_cards_data))
+
+    # Least recently used models are evicted and updated forecasters are loaded again
+    def test_eviction(self):
+        forecasters = [self._create_forecaster("forecaster{0}".format(index)) for index in range(3)]
+        registry = ModelRegistry(max_size=1)
+        for forecaster in forecasters:
+            registry.get(forecaster)
+        self.assertEqual(len(registry), 1)
+        self.assertIn(forecasters[2], registry)
+
+        forecasters[2].save()
+        self.assertNotIn(forecasters[2], registry)
@@ -89,8 +89,8 @@ def test_forecaster(request, forecaster_id):
             test_cards = forecaster.test_cards
             total_error = 0
             test_card_errors = []
-            for test_card in test_cards:
-                test_card_estimated_spent_time = float(forecaster.estimate_spent_time(test_card))
+            test_card_estimated_spent_times = forecaster.estimate_spent_times(test_cards)
+            for test_card, test_card_estimated_spent_time in zip(test_cards, test_card_estimated_spent_times):
                 test_card.estimated_spent_time = Decimal(test_card_estimated_spent_time).quantize(Decimal('1.000'))
                 test_card.diff = test_card.spent_time - test_card.estimated_spent_time
                 test_card.error = abs(test_card.diff)
@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from djanban.apps.base.utils.intervals import date_interval_indices
 
 
 # Billing rate per hour
@@ -32,3 +36,10 @@ class HourlyRate(models.Model):
 
     # def overlaps(self, hourly_rate):
     #     return (self.start_date >= hourly_rate.start_date and self.end_date >= hourly_rate.start_date)
+
+
+# Remove the indices of hourly rates of all boards when an hourly rate changes
+@receiver(post_save, sender=HourlyRate)
+@receiver(post_delete, sender=HourlyRate)
+def invalidate_hourly_rate_indices(sender, instance, **kwargs):
+    date_interval_indices.invalidate("hourly_rates")
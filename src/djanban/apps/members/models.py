@@ -13,11 +13,14 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files import File
 from django.db import models
-from django.db.models import Sum, Avg, Q, Count
+from django.db.models import Sum, Avg, Q, Count, F, Case, When, Value, DecimalField
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from isoweek import Week
 
 from djanban.apps.base.auth import get_user_boards, get_member_boards, user_is_administrator
+from djanban.apps.base.utils.intervals import date_interval_indices
 
 
 class Member(models.Model):
@@ -65,19 +68,21 @@ class Member(models.Model):
     def __init__(self, *args, **kwargs):
         super(Member, self).__init__(*args, **kwargs)
 
+    # Index of the spent time factors of this member by date
+    @property
+    def spent_time_factor_index(self):
+        return date_interval_indices.get(
+            "spent_time_factors", self.id, lambda: self.spent_time_factors.all().order_by("id")
+        )
+
     # Adjust spent time
     def adjust_spent_time(self, spent_time, date):
         # Check to what spent time factor belongs this spent time according to the date
         # in case the date is in any spent time factor interval, apply that factor to
         # the spent time
-        spent_time_factors = self.spent_time_factors.all()
-        for spent_time_factor in spent_time_factors:
-            if (spent_time_factor.start_date is None and spent_time_factor.end_date is None) or\
-                    (spent_time_factor.start_date <= date and spent_time_factor.end_date is None) or \
-                    (spent_time_factor.start_date <= date <= spent_time_factor.end_date):
-
-                adjusted_value = spent_time * spent_time_factor.factor
-                return adjusted_value
+        spent_time_factor = self.spent_time_factor_index.get(date)
+        if spent_time_factor is not None:
+            return spent_time * spent_time_factor.factor
 
         # In case there is no date interval which date belongs to, return the spent time
         return spent_time
@@ -113,6 +118,36 @@ class Member(models.Model):
 
         return adjusted_value
 
+    # SQL expression of an attribute of the daily spent times adjusted by the spent time factors of their members.
+    # There is a condition for each spent time factor (checked in the same order as in
+    # adjust_daily_spent_time_from_spent_time_factors), so the database computes the adjusted values
+    # without loading the daily spent times.
+    @staticmethod
+    def get_adjusted_daily_spent_time_expression(spent_time_factors, attribute="spent_time"):
+        output_field = DecimalField(decimal_places=4, max_digits=20)
+        conditions = []
+        for spent_time_factor in spent_time_factors:
+            condition = Q(member_id=spent_time_factor.member_id)
+            if spent_time_factor.start_date is not None:
+                condition &= Q(date__gte=spent_time_factor.start_date)
+            if spent_time_factor.end_date is not None:
+                condition &= Q(date__lte=spent_time_factor.end_date)
+            factor = Value(spent_time_factor.factor, output_field=output_field)
+            conditions.append(When(condition, then=F(attribute) * factor))
+        return Case(*conditions, default=F(attribute), output_field=output_field)
+
+    # Sum of an attribute of the daily spent times adjusted by the spent time factors of their members
+    @staticmethod
+    def sum_adjusted_daily_spent_times(daily_spent_times, attribute="spent_time"):
+        member_ids = daily_spent_times.order_by().values("member_id").distinct()
+        spent_time_factors = SpentTimeFactor.objects.filter(member_id__in=member_ids).order_by("id")
+        adjusted_value_sum = daily_spent_times.aggregate(
+            sum=Sum(Member.get_adjusted_daily_spent_time_expression(spent_time_factors, attribute))
+        )["sum"]
+        if adjusted_value_sum is None:
+            return 0
+        return adjusted_value_sum
+
     # A native member is one that has no Trello profile
     @property
     def is_native(self):
@@ -332,21 +367,30 @@ class Member(models.Model):
 
         return self._sum_adjusted_spent_time_from_filter(spent_time_on_month_filter)
 
-    # Returns the sum of this member's number of spent time for the daily spent filter passed as parameter
+    # Returns the sum of this member's number of spent time for the daily spent filter passed as parameter.
+    # Daily spent time rollups have the same date and board fields than daily spent times.
     def _sum_spent_time_from_filter(self, daily_spent_time_filter):
-        daily_spent_times = self.daily_spent_times.filter(**daily_spent_time_filter)
-        return Member._sum_spent_time(daily_spent_times)
+        daily_spent_time_rollups = self.daily_spent_time_rollups.filter(**daily_spent_time_filter)
+        return Member._sum_spent_time(daily_spent_time_rollups)
 
     # Returns the sum of this member's number of adjusted spent time for the daily spent filter passed as parameter
     def _sum_adjusted_spent_time_from_filter(self, daily_spent_time_filter):
-        daily_spent_times = self.daily_spent_times.filter(**daily_spent_time_filter)
-        spent_time_factors = self.spent_time_factors.all()
-        adjusted_spent_time_sum = 0
-        for daily_spent_time in daily_spent_times:
-            adjusted_spent_time_sum += self.adjust_daily_spent_time(
-                daily_spent_time, attribute="spent_time", spent_time_factors=spent_time_factors
-            )
-        return adjusted_spent_time_sum
+        adjusted_spent_time = self.daily_spent_time_rollups.filter(**daily_spent_time_filter).\
+            aggregate(sum=Sum("adjusted_spent_time"))["sum"]
+        if adjusted_spent_time is None:
+            return 0
+        return adjusted_spent_time
+
+    # Update the adjusted spent time of the daily spent times of this member according to its spent time factors
+    # and rebuild its daily spent time rollups (unless rebuild_rollups is False)
+    def update_adjusted_spent_times(self, rebuild_rollups=True):
+        from djanban.apps.dev_times.models import DailySpentTimeRollup
+        spent_time_factors = self.spent_time_factors.all().order_by("id")
+        self.daily_spent_times.update(
+            adjusted_spent_time=Member.get_adjusted_daily_spent_time_expression(spent_time_factors, "spent_time")
+        )
+        if rebuild_rollups:
+            DailySpentTimeRollup.rebuild(member=self)
 
     # Returns the number of hours this member has develop given a filter
     @staticmethod
@@ -604,4 +648,18 @@ class TrelloMemberProfile(models.Model):
     def user(self):
         if self.member:
             return self.member.user
-        return None
\ No newline at end of file
+        return None
+
+
+# New members have no spent time factors (even if a deleted member had their id)
+@receiver(post_save, sender=Member)
+def invalidate_spent_time_factor_index_on_creation(sender, instance, created, **kwargs):
+    if created:
+        date_interval_indices.invalidate("spent_time_factors", instance.id)
+
+
+# Remove the index of spent time factors of a member when one of them changes
+@receiver(post_save, sender=SpentTimeFactor)
+@receiver(post_delete, sender=SpentTimeFactor)
+def invalidate_spent_time_factor_index(sender, instance, **kwargs):
+    date_interval_indices.invalidate("spent_time_factors", instance.member_id)
@@ -115,5 +115,4 @@ def delete(request, member_id, spent_time_factor_id):
 
 # Update spent time factors for this member
 def _update_spent_time_factors(member):
-    for daily_spent_time in member.daily_spent_times.all():
-        daily_spent_time.update_adjusted_spent_time()
+    member.update_adjusted_spent_times()
@@ -14,6 +14,8 @@ class DailyMemberMood(models.Model):
         ("sad", ":-(")
     )
 
+    MOOD_VALUES = {"normal": 0, "happy": 1, "sad": -1}
+
     member = models.ForeignKey("members.Member", verbose_name=u"Member", related_name="daily_member_moods")
 
     date = models.DateField(verbose_name="Date of mood measurement")
@@ -23,10 +25,6 @@ class DailyMemberMood(models.Model):
 
     @property
     def mood_value(self):
-        if self.mood == "normal":
-            return 0
-        if self.mood == "happy":
-            return 1
-        if self.mood == "sad":
-            return -1
+        if self.mood in DailyMemberMood.MOOD_VALUES:
+            return DailyMemberMood.MOOD_VALUES[self.mood]
         raise ValueError(u"This choice does not exist")
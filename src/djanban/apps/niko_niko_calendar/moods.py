@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+import numpy
+
+from djanban.apps.niko_niko_calendar.models import DailyMemberMood
+
+
+# Moods of some members in a range of dates.
+# The mood measurements are read in only one query and stored in a dense matrix with a row for each member and a
+# column for each day between start_date and end_date. Days without a measurement of a member are NaN.
+# If start_date or end_date are not passed, the dates of the first and last measurements are used.
+class MoodMatrix(object):
+
+    def __init__(self, members, start_date=None, end_date=None):
+        self.members = list(members)
+        member_indices = {member.id: member_index for member_index, member in enumerate(self.members)}
+
+        daily_member_moods = DailyMemberMood.objects.filter(member_id__in=list(member_indices.keys()))
+        if start_date is not None:
+            daily_member_moods = daily_member_moods.filter(date__gte=start_date)
+        if end_date is not None:
+            daily_member_moods = daily_member_moods.filter(date__lte=end_date)
+        daily_member_moods = list(daily_member_moods.values_list("member_id", "date", "mood"))
+
+        if daily_member_moods:
+            if start_date is None:
+                start_date = min(date for member_id, date, mood in daily_member_moods)
+            if end_date is None:
+                end_date = max(date for member_id, date, mood in daily_member_moods)
+
+        self.start_date = start_date
+        self.end_date = end_date
+
+        number_of_days = (end_date - start_date).days + 1 if daily_member_moods else 0
+        self.dates = [start_date + timedelta(days=day_index) for day_index in range(number_of_days)]
+
+        self.values = numpy.full((len(self.members), number_of_days), numpy.nan)
+        self.moods = numpy.full((len(self.members), number_of_days), "", dtype=object)
+        for member_id, date, mood in daily_member_moods:
+            member_index = member_indices[member_id]
+            day_index = (date - start_date).days
+            self.values[member_index, day_index] = DailyMemberMood.MOOD_VALUES[mood]
+            self.moods[member_index, day_index] = mood
+
+    # Is there a measurement for each member and day?
+    @property
+    def is_measured(self):
+        return ~numpy.isnan(self.values)
+
+    # Mean mood value of each member (NaN for members without measurements)
+    def member_means(self):
+        number_of_measurements = self.is_measured.sum(axis=1)
+        sums = numpy.nansum(self.values, axis=1)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            return numpy.where(number_of_measurements > 0, sums / number_of_measurements, numpy.nan)
+
+    # Mean of the mood of the members that have measurements (0 if there are no measurements)
+    def mean(self):
+        member_means = self.member_means()
+        member_means = member_means[~numpy.isnan(member_means)]
+        if member_means.size == 0:
+            return 0
+        return float(member_means.mean())
+
+    # Indices of the days that have at least one mood measurement
+    def _measured_day_indices(self):
+        return numpy.flatnonzero(self.is_measured.any(axis=0))
+
+    # Dates that have at least one mood measurement
+    @property
+    def measured_dates(self):
+        return [self.dates[day_index] for day_index in self._measured_day_indices()]
+
+    # Rows of the niko-niko calendar: a tuple for each member with the member and its moods (an empty string when
+    # there is no measurement) in each measured date
+    @property
+    def calendar_rows(self):
+        measured_day_indices = self._measured_day_indices()
+        return [
+            (member, list(self.moods[member_index, measured_day_indices]))
+            for member_index, member in enumerate(self.members)
+        ]
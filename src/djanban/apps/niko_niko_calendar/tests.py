@@ -1,3 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import datetime
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from djanban.apps.members.models import Member
+from djanban.apps.niko_niko_calendar.models import DailyMemberMood
+from djanban.apps.niko_niko_calendar.moods import MoodMatrix
+
+
+# Tests of the aggregation of the moods of the members
+class MoodMatrixTest(TestCase):
+
+    def setUp(self):
+        self.members = [
+            Member.objects.create(user=get_user_model().objects.create_user(username), is_developer=False)
+            for username in ("happy_member", "sad_member", "silent_member")
+        ]
+        self.start_date = datetime.date(2017, 5, 1)
+        moods = [
+            (self.members[0], 0, "happy"), (self.members[0], 1, "normal"), (self.members[0], 3, "happy"),
+            (self.members[1], 3, "sad")
+        ]
+        for member, day_index, mood in moods:
+            DailyMemberMood.objects.create(
+                member=member, date=self.start_date + datetime.timedelta(days=day_index), mood=mood
+            )
+
+    # Moods are read in one query and averaged by member and by board
+    def test_means(self):
+        with self.assertNumQueries(1):
+            mood_matrix = MoodMatrix(self.members)
+        self.assertEqual(len(mood_matrix.dates), 4)
+        member_means = mood_matrix.member_means()
+        self.assertAlmostEqual(member_means[0], 2.0 / 3.0)
+        self.assertEqual(member_means[1], -1)
+        self.assertNotEqual(member_means[2], member_means[2])
+        self.assertAlmostEqual(mood_matrix.mean(), (2.0 / 3.0 - 1) / 2)
+        self.assertEqual(MoodMatrix(self.members[2:]).mean(), 0)
+
+    # The calendar only has the dates with measurements
+    def test_calendar_rows(self):
+        mood_matrix = MoodMatrix(self.members, start_date=self.start_date + datetime.timedelta(days=1))
+        self.assertEqual(mood_matrix.measured_dates,
+                         [self.start_date + datetime.timedelta(days=1), self.start_date + datetime.timedelta(days=3)])
+        self.assertEqual(mood_matrix.calendar_rows, [
+            (self.members[0], ["normal", "happy"]), (self.members[1], ["", "sad"]), (self.members[2], ["", ""])
+        ])
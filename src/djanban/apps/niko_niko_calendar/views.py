@@ -2,11 +2,7 @@
 
 from __future__ import unicode_literals
 
-import copy
-
-from datetime import timedelta
 from django.contrib.auth.decorators import login_required
-from django.db.models import Max, Min
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
 
@@ -18,6 +14,7 @@ from djanban.apps.base.decorators import member_required
 from djanban.apps.members.models import Member
 from djanban.apps.niko_niko_calendar.forms import NewDailyMemberMoodForm
 from djanban.apps.niko_niko_calendar.models import DailyMemberMood
+from djanban.apps.niko_niko_calendar.moods import MoodMatrix
 
 
 # Show the niko-niko calendar. List the mood of the team.
@@ -30,19 +27,13 @@ def view_calendar(request):
     boards = get_user_boards(request.user)
     members = Member.objects.filter(boards__in=boards).distinct().filter(is_developer=True).order_by("id")
 
-    min_date = DailyMemberMood.objects.filter(member__in=members).aggregate(min_date=Min("date"))["min_date"]
-    max_date = DailyMemberMood.objects.filter(member__in=members).aggregate(max_date=Max("date"))["max_date"]
-
-    dates = []
-    if min_date and max_date:
-        date_i = copy.deepcopy(min_date)
-        while date_i <= max_date:
-            # Only add date when there are mood measurements
-            if DailyMemberMood.objects.filter(date=date_i, member__in=members).exists():
-                dates.append(date_i)
-            date_i += timedelta(days=1)
+    # Moods of all members are read at once and only dates with mood measurements are shown
+    mood_matrix = MoodMatrix(members)
 
-    replacements = {"member": member, "members": members, "dates": dates}
+    replacements = {
+        "member": member, "members": members, "dates": mood_matrix.measured_dates,
+        "mood_rows": mood_matrix.calendar_rows
+    }
     return render(request, "niko_niko_calendar/calendar.html", replacements)
 
 
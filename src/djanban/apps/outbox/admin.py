@@ -0,0 +1,6 @@
+from django.contrib import admin
+
+# Register your models here.
+from djanban.apps.outbox.models import RemoteOperation
+
+admin.site.register(RemoteOperation)
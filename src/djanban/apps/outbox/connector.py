@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+import inspect
+
+from djanban.apps.outbox.models import RemoteOperation
+
+
+# Connector that defers the operations of other connector (usually a TrelloConnector) using an outbox.
+# Operations whose result is not needed locally are stored as RemoteOperation objects in the same
+# transaction as the local changes, and are sent later by the RemoteOperationWorker (see
+# process_remote_operations command), so the user does not wait for the remote API.
+# Operations that return data needed locally (the ids of the new remote objects) are sent immediately.
+class OutboxConnector(object):
+
+    # Operations that are sent later by the worker
+    DEFERRED_OPERATIONS = (
+        "add_member", "remove_member",
+        "move_list", "edit_list",
+        "order_card", "move_card", "move_list_cards",
+        "delete_attachment_of_card", "delete_comment_of_card",
+        "add_label_to_card", "remove_label_of_card",
+        "add_member_to_card", "remove_member_of_card",
+        "set_card_name", "set_card_description", "set_card_is_closed",
+        "set_card_due_datetime", "remove_card_due_datetime",
+    )
+
+    def __init__(self, member, connector):
+        self.member = member
+        self.connector = connector
+
+    def __getattr__(self, name):
+        if name in OutboxConnector.DEFERRED_OPERATIONS:
+            return self._get_deferred_operation(name)
+        # Operations that are not deferred are called directly
+        return getattr(self.connector, name)
+
+    # Return a function with the same signature as the operation of the connector that enqueues it
+    def _get_deferred_operation(self, operation_name):
+        # The signature is got from the class because connector objects can wrap their operations
+        operation = getattr(type(self.connector), operation_name)
+
+        def enqueue_operation(*args, **kwargs):
+            parameters = inspect.getcallargs(operation, self.connector, *args, **kwargs)
+            parameters.pop("self")
+            RemoteOperation.enqueue(member=self.member, operation=operation_name, parameters=parameters)
+
+        return enqueue_operation
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from djanban.apps.base.email import warn_administrators
+from djanban.apps.outbox.worker import RemoteOperationWorker
+
+
+# Send the pending operations of the remote backend (Trello).
+# Only one instance of this command should be running at the same time.
+class Command(BaseCommand):
+    help = u'Send the pending remote backend operations'
+
+    # Seconds between each processing of the pending operations when running in loop mode
+    DEFAULT_SLEEP = 5
+
+    def __init__(self, stdout=None, stderr=None, no_color=False):
+        super(Command, self).__init__(stdout, stderr, no_color)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true', dest='loop', default=False,
+            help=u'Keep processing the pending operations until the process is stopped'
+        )
+        parser.add_argument(
+            '--sleep', type=float, dest='sleep', default=Command.DEFAULT_SLEEP,
+            help=u'Seconds between each processing of the pending operations in loop mode'
+        )
+
+    # Handle de command action
+    def handle(self, *args, **options):
+        worker = RemoteOperationWorker()
+        while True:
+            self.process(worker)
+            if not options.get("loop"):
+                break
+            time.sleep(options.get("sleep", Command.DEFAULT_SLEEP))
+
+    # Process the pending operations once
+    def process(self, worker):
+        result = worker.process()
+
+        for operation in result.failed_operations:
+            error_message = u"Remote operation {0} of board {1} failed after {2} attempts".format(
+                operation.operation, operation.board.name, operation.number_of_attempts
+            )
+            warn_administrators(subject=error_message, message=operation.last_error)
+            self.stdout.write(self.style.ERROR(error_message))
+
+        for operation in result.retried_operations:
+            self.stdout.write(self.style.WARNING(
+                u"Remote operation {0} of board {1} will be retried on {2}".format(
+                    operation.operation, operation.board.name, operation.next_attempt_datetime.isoformat()
+                )
+            ))
+
+        if result.done_operations:
+            self.stdout.write(self.style.SUCCESS(
+                u"{0} remote operations sent successfully".format(len(result.done_operations))
+            ))
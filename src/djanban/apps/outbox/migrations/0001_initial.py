@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2017-05-25 10:49
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('members', '0023_auto_20170519_1715'),
+        ('boards', '0074_board_last_fetched_action'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RemoteOperation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(max_length=64, verbose_name='Connector operation')),
+                ('parameters', models.TextField(default='{}', verbose_name='Parameters of the operation (JSON)')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16, verbose_name='Status')),
+                ('number_of_attempts', models.PositiveIntegerField(default=0, verbose_name='Number of attempts')),
+                ('creation_datetime', models.DateTimeField(auto_now_add=True, verbose_name='Creation datetime')),
+                ('last_attempt_datetime', models.DateTimeField(default=None, null=True, verbose_name='Last attempt datetime')),
+                ('next_attempt_datetime', models.DateTimeField(default=None, null=True, verbose_name='Next attempt datetime')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Last error')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='remote_operations', to='boards.Board', verbose_name='Board')),
+                ('card', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='remote_operations', to='boards.Card', verbose_name='Card')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='remote_operations', to='members.Member', verbose_name='Member whose credentials are used')),
+            ],
+            options={
+                'verbose_name': 'remote operation',
+                'verbose_name_plural': 'remote operations',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='remoteoperation',
+            index_together=set([('status', 'next_attempt_datetime'), ('board', 'status', 'id')]),
+        ),
+    ]
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import models
+from django.db.models import Model
+from django.utils import timezone
+
+
+# Operation on the remote backend (Trello) that has been applied locally and is pending of being sent.
+# Operations of a board are sent in the same order they were made by the RemoteOperationWorker.
+class RemoteOperation(models.Model):
+
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+
+    # Operations that replace a previous pending operation of the same card
+    # if there are only operations of this type between them
+    COALESCIBLE_OPERATIONS = ("move_card", "order_card")
+
+    board = models.ForeignKey("boards.Board", verbose_name=u"Board", related_name="remote_operations",
+                              on_delete=models.CASCADE)
+    member = models.ForeignKey("members.Member", verbose_name=u"Member whose credentials are used",
+                               related_name="remote_operations", on_delete=models.CASCADE)
+    card = models.ForeignKey("boards.Card", verbose_name=u"Card", related_name="remote_operations",
+                             null=True, default=None, blank=True, on_delete=models.SET_NULL)
+    operation = models.CharField(verbose_name=u"Connector operation", max_length=64)
+    parameters = models.TextField(verbose_name=u"Parameters of the operation (JSON)", default="{}")
+    status = models.CharField(verbose_name=u"Status", max_length=16, choices=STATUS_CHOICES, default="pending")
+    number_of_attempts = models.PositiveIntegerField(verbose_name=u"Number of attempts", default=0)
+    creation_datetime = models.DateTimeField(verbose_name=u"Creation datetime", auto_now_add=True)
+    last_attempt_datetime = models.DateTimeField(verbose_name=u"Last attempt datetime", null=True, default=None)
+    next_attempt_datetime = models.DateTimeField(verbose_name=u"Next attempt datetime", null=True, default=None)
+    last_error = models.TextField(verbose_name=u"Last error", default="", blank=True)
+
+    class Meta:
+        verbose_name = u"remote operation"
+        verbose_name_plural = u"remote operations"
+        index_together = (
+            ("board", "status", "id"),
+            ("status", "next_attempt_datetime"),
+        )
+
+    def __unicode__(self):
+        return u"{0} of board {1} ({2})".format(self.operation, self.board_id, self.status)
+
+    def __str__(self):
+        return self.__unicode__()
+
+    # Enqueue an operation of the remote backend given the keyword arguments of the connector method.
+    # If the operation moves or orders a card and the last pending operations of the board are
+    # moves or orders of the same card, the equivalent pending operation is updated instead of
+    # adding a new one, because only the last position of the card matters.
+    @staticmethod
+    def enqueue(member, operation, parameters):
+        board = RemoteOperation._get_board(parameters)
+        card = parameters.get("card")
+        serialized_parameters = serialize_parameters(parameters)
+        if operation in RemoteOperation.COALESCIBLE_OPERATIONS and card is not None:
+            trailing_operations = RemoteOperation.objects.select_for_update().\
+                filter(board=board, status="pending").order_by("-id")
+            for trailing_operation in trailing_operations:
+                # Operations that have already been tried are not modified
+                if trailing_operation.card_id != card.id or trailing_operation.number_of_attempts > 0 or\
+                        trailing_operation.operation not in RemoteOperation.COALESCIBLE_OPERATIONS:
+                    break
+                if trailing_operation.operation == operation:
+                    trailing_operation.parameters = serialized_parameters
+                    trailing_operation.save(update_fields=["parameters"])
+                    return trailing_operation
+
+        return RemoteOperation.objects.create(
+            board=board, member=member, card=card, operation=operation, parameters=serialized_parameters
+        )
+
+    # Board affected by the operation
+    @staticmethod
+    def _get_board(parameters):
+        if "board" in parameters:
+            return parameters["board"]
+        for parameter_name in ("card", "list_", "edited_list", "source_list"):
+            if parameter_name in parameters:
+                return parameters[parameter_name].board
+        raise ValueError(u"The board of the operation cannot be determined")
+
+    # Parameters of the operation with the model instances loaded
+    @property
+    def kwargs(self):
+        return deserialize_parameters(self.parameters)
+
+    # Inform if this operation can be sent now
+    def is_due(self, now=None):
+        if now is None:
+            now = timezone.now()
+        return self.next_attempt_datetime is None or self.next_attempt_datetime <= now
+
+    # Mark this operation as sent.
+    # If its parameters have been replaced by a coalesced operation while it was being sent,
+    # the operation is kept pending (so the new parameters are sent) and False is returned.
+    def mark_as_done(self):
+        now = timezone.now()
+        num_updated_operations = RemoteOperation.objects.filter(id=self.id, parameters=self.parameters).update(
+            status="done", number_of_attempts=self.number_of_attempts + 1, last_attempt_datetime=now,
+            next_attempt_datetime=None, last_error=""
+        )
+        self.refresh_from_db()
+        return num_updated_operations == 1
+
+    # Mark a failed attempt of sending this operation.
+    # If max_attempts have been made, the operation is marked as failed and will not be retried.
+    # Otherwise it is retried after an exponential backoff (in seconds).
+    def mark_attempt_as_failed(self, error, max_attempts, backoff):
+        now = timezone.now()
+        self.number_of_attempts += 1
+        self.last_attempt_datetime = now
+        self.last_error = error
+        if self.number_of_attempts >= max_attempts:
+            self.status = "failed"
+            self.next_attempt_datetime = None
+        else:
+            self.next_attempt_datetime = now + timedelta(seconds=backoff * 2 ** self.number_of_attempts)
+        self.save()
+
+
+# Serialize the parameters of a connector operation as JSON.
+# Model instances are serialized as references (model label, primary key and uuid).
+def serialize_parameters(parameters):
+    serialized_parameters = {}
+    for name, value in parameters.items():
+        if isinstance(value, Model):
+            value = {"model": value._meta.label, "pk": value.pk, "uuid": getattr(value, "uuid", None)}
+        serialized_parameters[name] = value
+    return json.dumps(serialized_parameters, sort_keys=True)
+
+
+# Load the parameters of a connector operation.
+# Referenced objects are loaded from database. If they have been deleted (for example, the attachment
+# of a delete_attachment_of_card operation) an unsaved instance with the same primary key and uuid is used.
+def deserialize_parameters(serialized_parameters):
+    parameters = {}
+    for name, value in json.loads(serialized_parameters).items():
+        if isinstance(value, dict) and "model" in value:
+            model = apps.get_model(value["model"])
+            instance = model.objects.filter(pk=value["pk"]).first()
+            if instance is None:
+                instance = model(pk=value["pk"])
+                if value["uuid"] is not None and any(field.name == "uuid" for field in model._meta.fields):
+                    instance.uuid = value["uuid"]
+            value = instance
+        parameters[name] = value
+    return parameters
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from djanban.apps.boards.models import Board, Card, List
+from djanban.apps.members.models import Member, TrelloMemberProfile
+from djanban.apps.outbox.connector import OutboxConnector
+from djanban.apps.outbox.models import RemoteOperation
+from djanban.apps.outbox.worker import RemoteOperationWorker
+from djanban.remote_backends.factory import RemoteBackendConnectorFactory
+from djanban.remote_backends.fake.connector import FakeConnector
+
+
+# Tests of the remote operations outbox
+class RemoteOperationTest(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user("outbox")
+        self.member = Member.objects.create(user=user, is_developer=True)
+        TrelloMemberProfile.objects.create(member=self.member, trello_id="trello-outbox", username="outbox", initials="o")
+        self.board = Board.objects.create(
+            creator=self.member, name="Board name", description="board description", comments="board comments"
+        )
+        self.lists = [
+            List.objects.create(board=self.board, name="List {0}".format(position), uuid="list-{0}".format(position),
+                                type="development", position=position)
+            for position in (1, 2)
+        ]
+        now = timezone.now()
+        self.cards = [
+            Card.objects.create(board=self.board, list=self.lists[0], uuid="card-{0}".format(position),
+                                name="Card {0}".format(position), description="", position=position,
+                                url="https://trello.com/c/{0}".format(position),
+                                short_url="https://trello.com/{0}".format(position),
+                                creation_datetime=now, last_activity_datetime=now)
+            for position in (1, 2)
+        ]
+        self.calls = []
+        self.connector = OutboxConnector(self.member, FakeConnector(self.member, self.calls))
+
+    # Get a worker whose connectors record the calls in self.calls
+    def _get_worker(self, number_of_failures=0, max_attempts=3):
+        fake_connector = FakeConnector(self.member, self.calls, number_of_failures=number_of_failures)
+        return RemoteOperationWorker(lambda member: fake_connector, max_attempts=max_attempts, backoff=10)
+
+    # Members paired with Trello use the outbox only if it is enabled
+    def test_factory(self):
+        self.assertNotIsInstance(RemoteBackendConnectorFactory.factory(self.member), OutboxConnector)
+        with override_settings(REMOTE_BACKEND_OUTBOX_ENABLED=True):
+            self.assertIsInstance(RemoteBackendConnectorFactory.factory(self.member), OutboxConnector)
+            self.assertNotIsInstance(RemoteBackendConnectorFactory.factory(self.member, deferred=False),
+                                     OutboxConnector)
+
+    # Consecutive moves and orders of the same card are coalesced
+    def test_coalescing(self):
+        card = self.cards[0]
+        self.connector.order_card(card=card, position=10)
+        self.connector.move_card(card=card, destination_list=self.lists[1])
+        self.connector.order_card(card=card, position=20)
+        self.connector.set_card_name(card=card)
+        self.connector.order_card(card=card, position=30)
+        self.connector.move_card(card, self.lists[0])
+
+        self.assertEqual(self.calls, [])
+        operations = list(RemoteOperation.objects.filter(board=self.board).order_by("id"))
+        self.assertEqual(
+            [operation.operation for operation in operations],
+            ["order_card", "move_card", "set_card_name", "order_card", "move_card"]
+        )
+        self.assertEqual(operations[0].kwargs["position"], 20)
+        self.assertEqual(operations[3].kwargs["position"], 30)
+        self.assertEqual(operations[4].kwargs["destination_list"], self.lists[0])
+
+    # Operations are sent in order with the objects loaded from database
+    def test_ordered_replay(self):
+        self.connector.set_card_name(card=self.cards[0])
+        self.connector.move_card(card=self.cards[1], destination_list=self.lists[1])
+        self.connector.move_list(list_=self.lists[1], position=5)
+
+        result = self._get_worker().process()
+
+        self.assertEqual(len(result.done_operations), 3)
+        self.assertEqual(
+            self.calls,
+            [("set_card_name", {"card": self.cards[0]}),
+             ("move_card", {"card": self.cards[1], "destination_list": self.lists[1]}),
+             ("move_list", {"list_": self.lists[1], "position": 5})]
+        )
+        self.assertFalse(RemoteOperation.objects.filter(status="pending").exists())
+
+    # A failed operation is retried after a backoff and blocks the next operations of its board
+    def test_retry(self):
+        self.connector.set_card_name(card=self.cards[0])
+        self.connector.set_card_description(card=self.cards[0])
+
+        result = self._get_worker(number_of_failures=1).process()
+
+        self.assertEqual(len(result.retried_operations), 1)
+        self.assertEqual(self.calls, [])
+        operation = RemoteOperation.objects.order_by("id")[0]
+        self.assertEqual(operation.status, "pending")
+        self.assertEqual(operation.number_of_attempts, 1)
+        self.assertGreater(operation.next_attempt_datetime, timezone.now() + timedelta(seconds=19))
+
+        # The operation is not retried until its backoff has passed
+        worker = self._get_worker()
+        self.assertEqual(len(worker.process().done_operations), 0)
+        RemoteOperation.objects.filter(id=operation.id).update(next_attempt_datetime=timezone.now())
+        self.assertEqual(len(worker.process().done_operations), 2)
+        self.assertEqual([call[0] for call in self.calls], ["set_card_name", "set_card_description"])
+
+    # An operation that fails max_attempts times is marked as failed and the next operations are sent
+    def test_failure(self):
+        self.connector.set_card_name(card=self.cards[0])
+        self.connector.set_card_description(card=self.cards[0])
+
+        result = self._get_worker(number_of_failures=1, max_attempts=1).process()
+
+        self.assertEqual(len(result.failed_operations), 1)
+        self.assertIn("Remote backend is not available", result.failed_operations[0].last_error)
+        self.assertEqual([call[0] for call in self.calls], ["set_card_description"])
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+import traceback
+
+from django.conf import settings
+from django.utils import timezone
+
+from djanban.apps.outbox.models import RemoteOperation
+
+
+# Result of processing the pending remote operations
+class RemoteOperationWorkerResult(object):
+
+    def __init__(self):
+        self.done_operations = []
+        self.failed_operations = []
+        self.retried_operations = []
+
+
+# Sends the pending remote operations to the remote backend.
+# Operations of each board are sent in the order they were enqueued: if an operation fails, the following
+# operations of its board wait until it is sent or it has failed max_attempts times.
+# Only one worker process is expected to be running.
+class RemoteOperationWorker(object):
+
+    def __init__(self, connector_factory=None, max_attempts=None, backoff=None):
+        if connector_factory is None:
+            connector_factory = RemoteOperationWorker._get_remote_connector
+        self.connector_factory = connector_factory
+        self.max_attempts = max_attempts if max_attempts is not None else settings.REMOTE_OPERATION_MAX_ATTEMPTS
+        self.backoff = backoff if backoff is not None else settings.REMOTE_OPERATION_BACKOFF
+        self._connectors = {}
+
+    # Process the pending operations of all the boards
+    def process(self):
+        result = RemoteOperationWorkerResult()
+        board_ids = RemoteOperation.objects.filter(status="pending").\
+            order_by("board_id").values_list("board_id", flat=True).distinct()
+        for board_id in board_ids:
+            self.process_board(board_id, result)
+        return result
+
+    # Process the pending operations of a board in order
+    def process_board(self, board_id, result):
+        now = timezone.now()
+        pending_operations = RemoteOperation.objects.filter(board_id=board_id, status="pending").\
+            select_related("member", "member__trello_member_profile").order_by("id")
+        for operation in pending_operations:
+            # The rest of the operations of the board wait for this operation to be retried
+            if not operation.is_due(now):
+                return
+            if not self.send(operation, result):
+                return
+
+    # Send an operation to the remote backend. Returns True if the next operations of the board can be sent
+    def send(self, operation, result):
+        try:
+            connector = self._get_connector(operation.member)
+            getattr(connector, operation.operation)(**operation.kwargs)
+        except Exception:
+            operation.mark_attempt_as_failed(traceback.format_exc(), self.max_attempts, self.backoff)
+            if operation.status == "failed":
+                result.failed_operations.append(operation)
+                return True
+            result.retried_operations.append(operation)
+            return False
+
+        if operation.mark_as_done():
+            result.done_operations.append(operation)
+            return True
+        # The operation was updated while it was being sent, so it has to be sent again
+        return self.send(operation, result)
+
+    # Connector of a member (connectors are reused for all the operations of the same member)
+    def _get_connector(self, member):
+        if member.id not in self._connectors:
+            self._connectors[member.id] = self.connector_factory(member)
+        return self._connectors[member.id]
+
+    # Connector that sends the operations to the remote backend of the member
+    @staticmethod
+    def _get_remote_connector(member):
+        from djanban.remote_backends.factory import RemoteBackendConnectorFactory
+        return RemoteBackendConnectorFactory.factory(member, deferred=False)
@@ -11,6 +11,7 @@ from django.template.loader import get_template
 from django.utils import timezone
 
 from djanban.apps.base.email import warn_administrators
+from djanban.apps.dev_times.export import DailySpentTimeCsvExporter
 from djanban.apps.dev_times.models import DailySpentTime
 from djanban.apps.members.models import Member
 from djanban.apps.niko_niko_calendar.models import DailyMemberMood
@@ -99,7 +100,7 @@ class Command(daily_report.Command):
 
         subject = "[Djanban][DevReports] Daily development report of {0}".format(date.strftime("%Y-%m-%d"))
 
-        csv_report = get_template('daily_spent_times/csv.txt').render({"spent_times": daily_spent_times})
+        csv_report = DailySpentTimeCsvExporter(daily_spent_times).content
 
         message = EmailMultiAlternatives(subject, txt_message, settings.EMAIL_HOST_USER, [developer_member.user.email])
         message.attach_alternative(html_message, "text/html")
@@ -10,6 +10,7 @@ from django.template.loader import get_template
 from django.utils import timezone
 
 from djanban.apps.boards.models import Board
+from djanban.apps.dev_times.export import DailySpentTimeCsvExporter
 from djanban.apps.members.models import Member
 from djanban.apps.reports.models import ReportRecipient
 from djanban.utils.week import get_iso_week_of_year, start_of_week_of_year, end_of_week_of_year
@@ -87,7 +88,7 @@ class ReportCommand(BaseCommand):
         txt_message = get_template(txt_template_path).render(replacements)
         html_message = get_template(html_template_path).render(replacements)
 
-        csv_report = get_template('daily_spent_times/csv.txt').render({"spent_times": daily_spent_times})
+        csv_report = DailySpentTimeCsvExporter(daily_spent_times).content
 
         message = EmailMultiAlternatives(subject, txt_message, settings.EMAIL_HOST_USER, [report_recipient.email])
         message.attach_alternative(html_message, "text/html")
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import hashlib
+from io import open
+
+from djanban.apps.repositories.models import AnalyzerResult
+
+
+# Results of an analyzer for some files.
+# The results of the files whose contents have been analyzed before with the same version and configuration of
+# the analyzer are read from the stored AnalyzerResult objects. The rest of the files are analyzed by the
+# function analyze, that receives their paths and must return a dict with the result of each one of them.
+# Results must be serializable to JSON and their "path" keys are always the paths of the analyzed files.
+# Returns a dict with the result of each file path.
+def get_results(tool, tool_version, configuration, file_paths, analyze):
+    file_hashes = {file_path: get_file_hash(file_path) for file_path in file_paths}
+    stored_results = AnalyzerResult.get_results(tool, tool_version, configuration, set(file_hashes.values()))
+
+    results = {}
+    new_file_paths = []
+    for file_path in file_paths:
+        file_hash = file_hashes[file_path]
+        if file_hash in stored_results:
+            results[file_path] = _set_path(stored_results[file_hash], file_path)
+        else:
+            new_file_paths.append(file_path)
+
+    if new_file_paths:
+        new_results = analyze(new_file_paths)
+        AnalyzerResult.store_results(
+            tool, tool_version, configuration,
+            {file_hashes[file_path]: result for file_path, result in new_results.items()}
+        )
+        results.update(new_results)
+
+    return results
+
+
+# SHA-1 of the contents of a file
+def get_file_hash(file_path):
+    file_hash = hashlib.sha1()
+    with open(file_path, "rb") as file_:
+        for chunk in iter(lambda: file_.read(64 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+# Replace the paths of a stored result (files with the same contents can have different paths)
+def _set_path(result, file_path):
+    if isinstance(result, list):
+        return [_set_path(result_item, file_path) for result_item in result]
+    if isinstance(result, dict) and "path" in result:
+        return dict(result, path=file_path)
+    return result
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import multiprocessing
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from djanban.apps.repositories.checkout import GitCommandError, run_git
+from djanban.apps.repositories.cloc import Cloc
+from djanban.apps.repositories.models import Commit, CommitFile, PhpMdMessage, PylintMessage
+from djanban.apps.repositories.phpmd import PhpDirectoryAnalyzer, PhpMdAnalyzer
+from djanban.apps.repositories.pylinter import PythonDirectoryAnalyzer, Pylinter
+
+
+# Incremental assessment of the code quality of a commit.
+# The files that have not changed since the previous assessed commit of the repository (same path and same git blob)
+# reuse the results of that commit. The rest of the files are counted with only one cloc execution and are
+# assessed by pylint or phpmd in a pool of processes (only the files whose contents have not been analyzed before,
+# see AnalyzerResult).
+# The commit must be checked out in working_path (by default, the working copy of the repository) before running
+# the assessment. Stored paths are always relative to the working copy of the repository.
+class CommitAssessor(object):
+
+    PYTHON = "python"
+    PHP = "php"
+
+    def __init__(self, commit, working_path=None, processes=None):
+        self.commit = commit
+        self.repository = commit.repository
+        self.repository_path = self.repository.repository_path
+        self.working_path = working_path or self.repository_path
+        self.processes = processes or settings.CODE_QUALITY_ASSESSMENT_PROCESSES
+        self.previous_commit = self._get_previous_commit()
+        self.number_of_reused_files = 0
+        self.number_of_analyzed_files = 0
+
+    def run(self):
+        # Source code files of the commit and files of the previous commit that can be reused
+        files = self._get_files()
+        reusable_files = self._get_reusable_files(files)
+        new_paths = [path for path in files.keys() if path not in reusable_files]
+
+        # Lines of code and code quality messages of the new files
+        cloc_results = {}
+        messages_by_path = {}
+        if new_paths:
+            Cloc.assert_existence()
+            cloc_results = Cloc.count_files([self._get_working_file_path(path) for path in new_paths])
+            messages_by_path = self._run_analyzers(files, new_paths)
+
+        # Only the storage of the results is done in a transaction
+        with transaction.atomic():
+            self.commit.files.all().delete()
+            self.commit.phpmd_messages.all().delete()
+            self.commit.pylint_messages.all().delete()
+
+            self._create_reused_files(files, reusable_files)
+            self._create_new_files(files, new_paths, cloc_results, messages_by_path)
+
+            # Mark the commit as already assessed
+            self.commit.has_been_assessed = True
+            self.commit.assessment_datetime = timezone.now()
+            self.commit.save()
+
+    # Last assessed commit of the repository that was created before this one (or the first assessed one if
+    # there is none)
+    def _get_previous_commit(self):
+        assessed_commits = Commit.objects.filter(repository=self.repository, has_been_assessed=True).\
+            exclude(id=self.commit.id)
+        previous_commit = assessed_commits.filter(creation_datetime__lte=self.commit.creation_datetime).\
+            order_by("-creation_datetime").first()
+        if previous_commit is None:
+            previous_commit = assessed_commits.order_by("creation_datetime").first()
+        return previous_commit
+
+    # Non-empty Python and PHP files of the commit.
+    # Returns a dict with the language and the blob hash of each file indexed by its path in the repository.
+    def _get_files(self):
+        files = {}
+        tree = self._git("ls-tree", "-r", "-z", self.commit.commit)
+        for tree_entry in tree.split("\0"):
+            if not tree_entry:
+                continue
+            entry_attributes, path = tree_entry.split("\t", 1)
+            mode, entry_type, blob_hash = entry_attributes.split(" ")
+            if entry_type != "blob":
+                continue
+            filename = os.path.basename(path)
+            if PythonDirectoryAnalyzer.is_python_file(filename):
+                language = CommitAssessor.PYTHON
+            elif PhpDirectoryAnalyzer.is_php_file(filename):
+                language = CommitAssessor.PHP
+            else:
+                continue
+            file_path = self._get_working_file_path(path)
+            if os.path.isfile(file_path) and os.path.getsize(file_path) > 0:
+                files[path] = {"language": language, "blob_hash": blob_hash}
+        return files
+
+    # Files of the previous commit whose results can be reused, indexed by their path in the repository.
+    # Files changed since the previous commit are always assessed again and the rest of them are reused only
+    # if their blob has not changed.
+    def _get_reusable_files(self, files):
+        if self.previous_commit is None:
+            return {}
+
+        changed_paths = self._get_changed_paths()
+        reusable_files = {}
+        for previous_file in self.previous_commit.files.exclude(blob_hash=""):
+            path = self._get_repository_path(previous_file.path)
+            if path in files and path not in changed_paths and files[path]["blob_hash"] == previous_file.blob_hash:
+                reusable_files[path] = previous_file
+        return reusable_files
+
+    # Paths of the files changed since the previous commit
+    def _get_changed_paths(self):
+        try:
+            diff = self._git("diff", "--name-only", "-z", self.previous_commit.commit, self.commit.commit)
+        except GitCommandError:
+            # The previous commit is not in the repository anymore, so only the blob hashes are compared
+            return set()
+        return {path for path in diff.split("\0") if path}
+
+    # Assess the new files in a pool of processes.
+    # Returns the messages of each file indexed by its path in the repository.
+    def _run_analyzers(self, files, new_paths):
+        python_file_paths = [
+            self._get_working_file_path(path) for path in new_paths if files[path]["language"] == CommitAssessor.PYTHON
+        ]
+        php_file_paths = [
+            self._get_working_file_path(path) for path in new_paths if files[path]["language"] == CommitAssessor.PHP
+        ]
+
+        pool = multiprocessing.Pool(processes=self.processes)
+        try:
+            messages_by_file_path = Pylinter.lint_files(python_file_paths, pool=pool)
+            if php_file_paths:
+                messages_by_file_path.update(PhpMdAnalyzer.analyze_files(php_file_paths, pool=pool))
+        finally:
+            pool.close()
+            pool.join()
+        return {
+            file_path[len(self.working_path) + 1:]: messages for file_path, messages in messages_by_file_path.items()
+        }
+
+    # Copy the files of the previous commit that have not changed and their messages
+    def _create_reused_files(self, files, reusable_files):
+        if not reusable_files:
+            return
+
+        CommitFile.objects.bulk_create([
+            CommitFile(
+                board=self.commit.board, repository=self.repository, commit=self.commit,
+                language=previous_file.language, path=self._get_file_path(path),
+                blob_hash=previous_file.blob_hash, blank_lines=previous_file.blank_lines,
+                commented_lines=previous_file.commented_lines, lines_of_code=previous_file.lines_of_code
+            )
+            for path, previous_file in reusable_files.items()
+        ])
+        commit_file_ids = self._get_commit_file_ids()
+        commit_file_id_by_previous_id = {
+            previous_file.id: commit_file_ids[self._get_file_path(path)]
+            for path, previous_file in reusable_files.items()
+        }
+        previous_file_ids = list(commit_file_id_by_previous_id.keys())
+
+        pylint_messages = []
+        for previous_message in PylintMessage.objects.filter(commit=self.previous_commit,
+                                                             commit_file_id__in=previous_file_ids):
+            pylint_messages.append(PylintMessage(
+                board=self.commit.board, repository=self.repository, commit=self.commit,
+                commit_file_id=commit_file_id_by_previous_id[previous_message.commit_file_id],
+                path=previous_message.path, type=previous_message.type, message=previous_message.message,
+                message_symbolic_name=previous_message.message_symbolic_name, line=previous_message.line,
+                column=previous_message.column, object=previous_message.object
+            ))
+        PylintMessage.objects.bulk_create(pylint_messages)
+
+        phpmd_messages = []
+        for previous_message in PhpMdMessage.objects.filter(commit=self.previous_commit,
+                                                            commit_file_id__in=previous_file_ids):
+            phpmd_messages.append(PhpMdMessage(
+                board=self.commit.board, repository=self.repository, commit=self.commit,
+                commit_file_id=commit_file_id_by_previous_id[previous_message.commit_file_id],
+                path=previous_message.path, message=previous_message.message, rule=previous_message.rule,
+                ruleset=previous_message.ruleset, begin_line=previous_message.begin_line,
+                end_line=previous_message.end_line
+            ))
+        PhpMdMessage.objects.bulk_create(phpmd_messages)
+
+        self.number_of_reused_files = len(reusable_files)
+
+    # Create the assessed files and their messages
+    def _create_new_files(self, files, new_paths, cloc_results, messages_by_path):
+        commit_files = []
+        for path in new_paths:
+            cloc_result = cloc_results.get(self._get_working_file_path(path))
+            # Files not recognized by cloc are ignored
+            if cloc_result is None:
+                continue
+            commit_files.append(CommitFile(
+                board=self.commit.board, repository=self.repository, commit=self.commit,
+                language=cloc_result["language"], path=self._get_file_path(path), blob_hash=files[path]["blob_hash"],
+                blank_lines=cloc_result["blank_lines"], commented_lines=cloc_result["commented_lines"],
+                lines_of_code=cloc_result["lines_of_code"]
+            ))
+        if not commit_files:
+            return
+        CommitFile.objects.bulk_create(commit_files)
+        commit_file_ids = self._get_commit_file_ids()
+
+        pylint_messages = []
+        phpmd_messages = []
+        for commit_file in commit_files:
+            commit_file_id = commit_file_ids[commit_file.path]
+            path = self._get_repository_path(commit_file.path)
+            for message in messages_by_path.get(path, []):
+                if files[path]["language"] == CommitAssessor.PYTHON:
+                    pylint_messages.append(PylintMessage(
+                        board=self.commit.board, repository=self.repository, commit=self.commit,
+                        commit_file_id=commit_file_id, path=commit_file.path, type=message["type"],
+                        message=message["message"], message_symbolic_name=message["symbol"], line=message["line"],
+                        column=message["column"], object=message["obj"]
+                    ))
+                else:
+                    phpmd_messages.append(PhpMdMessage(
+                        board=self.commit.board, repository=self.repository, commit=self.commit,
+                        commit_file_id=commit_file_id, path=commit_file.path, rule=message["rule"],
+                        ruleset=message["ruleset"], message=message["message"], begin_line=message["begin_line"],
+                        end_line=message["end_line"]
+                    ))
+        PylintMessage.objects.bulk_create(pylint_messages)
+        PhpMdMessage.objects.bulk_create(phpmd_messages)
+
+        self.number_of_analyzed_files = len(commit_files)
+
+    # Ids of the files of the commit indexed by their path (bulk_create does not set the ids in all databases)
+    def _get_commit_file_ids(self):
+        return dict(self.commit.files.values_list("path", "id"))
+
+    # Path of a file of the repository in the file system
+    def _get_file_path(self, path):
+        return u"{0}/{1}".format(self.repository_path, path)
+
+    # Path of a file of the repository in the directory where the commit is checked out
+    def _get_working_file_path(self, path):
+        return u"{0}/{1}".format(self.working_path, path)
+
+    # Path of a file in the repository
+    def _get_repository_path(self, file_path):
+        return file_path[len(self.repository_path) + 1:]
+
+    # Run a git command in the repository directory and return its output
+    def _git(self, *args):
+        return run_git(args, cwd=self.working_path)
+
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import contextlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+
+
+# Error of a git command
+class GitCommandError(Exception):
+
+    def __init__(self, subcommand, return_code, stdout, stderr):
+        # The arguments of the command are not included because they can contain the credentials of the repository
+        super(GitCommandError, self).__init__(
+            u"git {0} failed with exit code {1}: {2}".format(subcommand, return_code, stderr.strip())
+        )
+        self.subcommand = subcommand
+        self.return_code = return_code
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+# Run a git command (without a shell) and return its standard output.
+# Raises GitCommandError if the command fails.
+def run_git(args, cwd=None):
+    process = subprocess.Popen(["git"] + list(args), cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    stdout = stdout.decode("utf-8", "replace")
+    stderr = stderr.decode("utf-8", "replace")
+    if process.returncode != 0:
+        raise GitCommandError(args[0], process.returncode, stdout, stderr)
+    return stdout
+
+
+# Checkouts of the commits of a git repository (GitHubPublicRepository or GitLabRepository).
+# A bare mirror of the remote repository is kept for each repository and is fetched only once by each manager.
+# Each commit is checked out in its own temporary worktree of the mirror, so checkouts do not modify a shared
+# working copy and several commits can be checked out at the same time.
+class CheckoutManager(object):
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.has_been_fetched = False
+
+    # Path of the bare mirror of the repository
+    @property
+    def mirror_path(self):
+        return u"{0}mirrors/{1}.git".format(settings.TMP_DIR, self.repository.id)
+
+    # Path of the directory where the worktrees are created
+    @property
+    def worktrees_path(self):
+        return u"{0}worktrees".format(settings.TMP_DIR)
+
+    # Clone the mirror of the repository or fetch its changes if it already exists.
+    # Changes are only fetched the first time this method is called.
+    def fetch(self):
+        if self.has_been_fetched:
+            return
+        if os.path.exists(self.mirror_path):
+            run_git(["remote", "update", "--prune"], cwd=self.mirror_path)
+        else:
+            mirror_parent_path = os.path.dirname(self.mirror_path)
+            if not os.path.exists(mirror_parent_path):
+                os.makedirs(mirror_parent_path)
+            run_git(["clone", "--mirror", self.repository.clone_url, self.mirror_path])
+        self.has_been_fetched = True
+
+    # Context manager that checks out a commit in a temporary worktree and returns its path.
+    # The worktree is deleted when the context is exited.
+    @contextlib.contextmanager
+    def checkout(self, commit):
+        self.fetch()
+        if not os.path.exists(self.worktrees_path):
+            os.makedirs(self.worktrees_path)
+        worktree_parent_path = tempfile.mkdtemp(prefix="commit-", dir=self.worktrees_path)
+        worktree_path = os.path.join(worktree_parent_path, commit)
+        try:
+            run_git(["worktree", "add", "--detach", worktree_path, commit], cwd=self.mirror_path)
+            yield worktree_path
+        finally:
+            shutil.rmtree(worktree_parent_path, ignore_errors=True)
+            run_git(["worktree", "prune"], cwd=self.mirror_path)
@@ -1,8 +1,11 @@
 import os
 import subprocess
+import tempfile
 
 from bs4 import BeautifulSoup
 
+from djanban.apps.repositories import analyzer_results
+
 
 # Cloc wrapper
 class Cloc(object):
@@ -19,6 +22,20 @@ class Cloc(object):
 
         return ClocResult(self.file_path, self.stdout)
 
+    # Count the lines of code of several files running cloc only for the files whose contents have not been
+    # counted before. Returns a dict with the result of each file path.
+    @staticmethod
+    def count_files(file_paths):
+        return analyzer_results.get_results(
+            "cloc", Cloc.get_version(), "", file_paths,
+            lambda new_file_paths: MultipleFileCloc(new_file_paths).run()
+        )
+
+    # Version of the cloc installed in this system
+    @staticmethod
+    def get_version():
+        return subprocess.check_output(["cloc", "--version"]).decode("utf-8").strip()
+
     # Asserts that cloc is installed in this system
     @staticmethod
     def assert_existence():
@@ -53,3 +70,43 @@ class ClocResult(object):
     def __getitem__(self, key):
         return self.data[key]
 
+
+
+# Cloc wrapper that counts the lines of several files with only one execution of cloc
+class MultipleFileCloc(object):
+
+    def __init__(self, file_paths):
+        self.file_paths = file_paths
+
+    def run(self):
+        # The files are passed in a list file to avoid exceeding the maximum length of the command line
+        with tempfile.NamedTemporaryFile(suffix=".txt") as list_file:
+            list_file.write("\n".join(self.file_paths).encode("utf-8"))
+            list_file.flush()
+            # Identical files are counted too, as each one of them has its own CommitFile
+            cloc_command = ["cloc", "--by-file", "--skip-uniqueness", "--xml", "--quiet",
+                            "--list-file={0}".format(list_file.name)]
+            self.stdout = subprocess.check_output(cloc_command)
+
+        return MultipleFileClocResult(self.stdout)
+
+
+# Result of a by-file cloc execution: a dict with the results of each file, indexed by file path
+class MultipleFileClocResult(dict):
+    def __init__(self, stdout):
+        super(MultipleFileClocResult, self).__init__()
+        self.stdout = stdout
+        self._init_results()
+
+    # Initialize results
+    def _init_results(self):
+        bs = BeautifulSoup(self.stdout, "html.parser")
+        for file_cloc in bs.find_all("file"):
+            self[file_cloc["name"]] = {
+                "path": file_cloc["name"],
+                "language": file_cloc["language"],
+                "number_of_files": 1,
+                "blank_lines": file_cloc["blank"],
+                "commented_lines": file_cloc["comment"],
+                "lines_of_code": file_cloc["code"],
+            }
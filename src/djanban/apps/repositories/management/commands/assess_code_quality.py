@@ -15,8 +15,10 @@ from django.utils import timezone
 
 from djanban.apps.base.email import warn_administrators
 from djanban.apps.boards.models import Board
+from djanban.apps.charts import dependencies
 from djanban.apps.fetch.fetchers.trello import BoardFetcher, Initializer
 from djanban.apps.members.models import Member
+from djanban.apps.repositories.checkout import CheckoutManager
 
 
 # Make sure you are running this command on a shell that contains the path of the virtualenv
@@ -105,8 +107,11 @@ class Command(BaseCommand):
                 )))
                 for repository in repositories:
                     self.stdout.write(self.style.SUCCESS(u"Repository {0}".format(repository.name)))
-                    repository.checkout()
-                    commits = repository.commits.filter(has_been_assessed=False)
+                    # The repository is fetched only once and each commit is checked out in its own worktree
+                    checkout_manager = CheckoutManager(repository.derived_object)
+                    checkout_manager.fetch()
+                    # Older commits are assessed first, so each commit can reuse the results of the previous one
+                    commits = repository.commits.filter(has_been_assessed=False).order_by("creation_datetime")
                     self.stdout.write(
                         self.style.SUCCESS(
                             u"Repository {0} is checked out successfully and has {1} commits:".format(
@@ -115,8 +120,11 @@ class Command(BaseCommand):
                         )
                     )
                     for commit in commits:
-                        commit.assess_code_quality()
+                        commit_assessor = commit.assess_code_quality(checkout_manager)
                         self.stdout.write(self.style.SUCCESS(u"- Commit {0}".format(commit.commit)))
+                        self.stdout.write(self.style.SUCCESS(u"  - Analyzed files {0}, reused files {1}".format(
+                            commit_assessor.number_of_analyzed_files, commit_assessor.number_of_reused_files
+                        )))
                         self.stdout.write(self.style.SUCCESS(u"  - PHPMD Messages {0}".format(commit.phpmd_messages.count())))
                         self.stdout.write(self.style.SUCCESS(u"  - Pylint Messages {0}".format(commit.pylint_messages.count())))
 
@@ -124,6 +132,9 @@ class Command(BaseCommand):
                         repository.name, commits.count()))
                     )
 
+                # Invalidate the cached charts of the code quality of the commits of this board
+                board.invalidate_cached_charts(dependencies.COMMITS)
+
             checkout_ok = True
 
         # If after two retries the exception persists, warn the administrators
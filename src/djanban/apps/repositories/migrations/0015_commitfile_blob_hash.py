@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-18 11:03
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositories', '0014_auto_20161006_0143'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commitfile',
+            name='blob_hash',
+            field=models.CharField(blank=True, default='', max_length=40, verbose_name='Hash of the git blob of the file'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-18 11:07
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repositories', '0015_commitfile_blob_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyzerResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tool', models.CharField(max_length=32, verbose_name='Analyzer')),
+                ('tool_version', models.CharField(max_length=256, verbose_name='Version of the analyzer')),
+                ('configuration', models.CharField(max_length=256, verbose_name='Configuration of the analyzer')),
+                ('file_hash', models.CharField(max_length=40, verbose_name='SHA-1 of the contents of the analyzed file')),
+                ('result', models.TextField(verbose_name='Result of the analyzer (JSON)')),
+                ('size', models.PositiveIntegerField(verbose_name='Size of the result')),
+                ('creation_datetime', models.DateTimeField(verbose_name='Creation datetime')),
+                ('last_access_datetime', models.DateTimeField(verbose_name='Last access datetime')),
+            ],
+            options={
+                'verbose_name': 'analyzer result',
+                'verbose_name_plural': 'analyzer results',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='analyzerresult',
+            unique_together=set([('tool', 'tool_version', 'configuration', 'file_hash')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='analyzerresult',
+            index_together=set([('last_access_datetime', 'id')]),
+        ),
+    ]
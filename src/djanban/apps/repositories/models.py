@@ -2,7 +2,7 @@
 
 from __future__ import unicode_literals
 
-import subprocess
+import json
 
 from datetime import datetime
 import gitlab
@@ -12,12 +12,13 @@ import os
 
 import pytz
 from django.contrib.contenttypes.models import ContentType
-from django.db import models, transaction
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.db.models import Sum
 from django.conf import settings
 from django.utils import timezone
 
-from djanban.apps.repositories.phpmd import PhpDirectoryAnalyzer
-from djanban.apps.repositories.pylinter import PythonDirectoryAnalyzer
+from djanban.apps.repositories.checkout import CheckoutManager, run_git
 
 
 # Repository
@@ -90,7 +91,7 @@ class GitRepository(object):
         raise NotImplementedError(u"Do not use this class, inherit from it")
 
     @property
-    def clone_command(self):
+    def clone_url(self):
         raise NotImplementedError(u"Do not use this class, inherit from it")
 
     # Delete the repository
@@ -99,8 +100,13 @@ class GitRepository(object):
             os.removedirs(self.repository_path)
             super(GitRepository, self).delete()
 
-    # Checkout a repository
+    # Checkout a repository in its working copy.
+    # Changes are fetched from the remote repository to the mirror of the repository (see CheckoutManager) and
+    # the working copy is updated from this mirror.
     def _checkout(self, commit=None):
+        checkout_manager = CheckoutManager(self)
+        checkout_manager.fetch()
+
         # Create namespace directory if needed
         repository_namespace = self.namespace_path
         if not os.path.exists(repository_namespace):
@@ -109,30 +115,15 @@ class GitRepository(object):
         # Create directory inside userspace if needed
         repository_dir = self.repository_path
         if not os.path.exists(repository_dir):
-            clone_result = subprocess.Popen(self.clone_command, shell=True, stdout=subprocess.PIPE)
-            clone_stdout = clone_result.stdout.read()
-            print(clone_stdout)
-            if clone_result.stderr:
-                clone_stderr = clone_result.stderr.read()
-                print(clone_stderr)
+            run_git(["clone", checkout_manager.mirror_path, repository_dir])
+        else:
+            run_git(["remote", "set-url", "origin", checkout_manager.mirror_path], cwd=repository_dir)
 
         # Pull all changes
-        pull_command = "cd {0} && git fetch --all && cd -".format(repository_dir)
-        pull_result = subprocess.Popen(pull_command, shell=True, stdout=subprocess.PIPE)
-        pull_stdout = pull_result.stdout.read()
-        print(pull_stdout)
-        if pull_result.stderr:
-            pull_stderr = pull_result.stderr.read()
-            print(pull_stderr)
+        run_git(["fetch", "--all"], cwd=repository_dir)
 
         if commit:
-            checkout_command = "cd {0} && git checkout {1} && cd -".format(repository_dir, commit)
-            checkout_result = subprocess.Popen(checkout_command, shell=True, stdout=subprocess.PIPE)
-            checkout_stdout = checkout_result.stdout.read()
-            print(checkout_stdout)
-            if checkout_result.stderr:
-                checkout_stderr = checkout_result.stderr.read()
-                print(checkout_stderr)
+            run_git(["checkout", commit], cwd=repository_dir)
 
 
 # GitHub profile for integration of that VCS
@@ -162,9 +153,8 @@ class GitHubPublicRepository(Repository, GitRepository):
         return u"{0}{1}".format(settings.TMP_DIR, self.username)
 
     @property
-    def clone_command(self):
-        repository_dir = self.repository_path
-        return "git clone https://github.com/{0}/{1}.git {2}".format(self.username, self.name, repository_dir)
+    def clone_url(self):
+        return "https://github.com/{0}/{1}.git".format(self.username, self.name)
 
     def checkout(self, commit=False):
         self._checkout(commit)
@@ -226,13 +216,10 @@ class GitLabRepository(Repository, GitRepository):
         return u"{0}{1}".format(settings.TMP_DIR, self.project_userspace)
 
     @property
-    def clone_command(self):
-        repository_dir = self.repository_path
-        clone_command = "git clone https://{0}:{1}@{2}/{3}/{4}.git {5}".format(
-            self.username, self.password, self.url.replace("http://", ""), self.project_userspace, self.project_name,
-            repository_dir
+    def clone_url(self):
+        return "https://{0}:{1}@{2}/{3}/{4}.git".format(
+            self.username, self.password, self.url.replace("http://", ""), self.project_userspace, self.project_name
         )
-        return clone_command
 
     def checkout(self, commit=False):
         self._checkout(commit)
@@ -291,32 +278,22 @@ class Commit(models.Model):
         repository = self.repository
         repository.checkout(self.commit)
 
-    @transaction.atomic
-    def assess_code_quality(self):
-        # Deletion of current commit files and Pylint and PHP-md messages
-        self.files.all().delete()
-        self.phpmd_messages.all().delete()
-        self.pylint_messages.all().delete()
-
-        # Checkout of this commit
-        self.checkout()
+    # Assess the code quality of this commit reusing the results of the previous assessed commit for the
+    # files that have not changed (see CommitAssessor). Returns the assessor, with the number of reused and
+    # analyzed files.
+    # The commit is checked out in a temporary worktree by the checkout_manager of the repository. Pass the same
+    # manager when assessing several commits so the repository is fetched only once.
+    def assess_code_quality(self, checkout_manager=None):
+        from djanban.apps.repositories.assessment import CommitAssessor
 
-        project_file_path = self.repository.repository_path
+        if checkout_manager is None:
+            checkout_manager = CheckoutManager(self.repository.derived_object)
 
-        # Analysis of the PHP code in the repository
-        dir_phpmd_analyzer = PhpDirectoryAnalyzer(project_file_path)
-        results = dir_phpmd_analyzer.run()
-        PhpMdMessage.create_all(self, results)
-
-        # Analysis of the Python code in the repository
-        dir_pylinter = PythonDirectoryAnalyzer(project_file_path)
-        pylinter_results = dir_pylinter.run()
-        PylintMessage.create_all(self, pylinter_results)
-
-        # Mark the commit as already assessed
-        self.has_been_assessed = True
-        self.assessment_datetime = timezone.now()
-        self.save()
+        # Checkout of this commit
+        with checkout_manager.checkout(self.commit) as working_path:
+            commit_assessor = CommitAssessor(self, working_path=working_path)
+            commit_assessor.run()
+        return commit_assessor
 
 
 # Each one of the files of this commit
@@ -336,6 +313,8 @@ class CommitFile(models.Model):
 
     path = models.CharField(verbose_name=u"File", max_length=512)
 
+    blob_hash = models.CharField(verbose_name=u"Hash of the git blob of the file", max_length=40, default="", blank=True)
+
     blank_lines = models.PositiveIntegerField(verbose_name=u"Number of blank lines in this file")
 
     commented_lines = models.PositiveIntegerField(verbose_name=u"Number of commented lines")
@@ -501,3 +480,136 @@ class PylintMessage(models.Model):
         for pylinter_result in pylinter_results:
             PylintMessage.create_from_dict(board, repository, commit, pylinter_result)
 
+
+# Result of an analyzer (cloc, pylint, phpmd) for some file contents.
+# Results are shared by all files with the same contents, so the analyzers are not run again for the files
+# that have not changed between commits.
+class AnalyzerResult(models.Model):
+
+    # Maximum number of results that are read or deleted with each query
+    BATCH_SIZE = 500
+
+    # Key of the counter of the size of the stored results in the cache
+    STORED_SIZE_CACHE_KEY = "repositories.analyzer_results.stored_size"
+
+    class Meta:
+        verbose_name = u"analyzer result"
+        verbose_name_plural = u"analyzer results"
+        unique_together = (
+            ("tool", "tool_version", "configuration", "file_hash"),
+        )
+        index_together = (
+            ("last_access_datetime", "id"),
+        )
+
+    tool = models.CharField(verbose_name=u"Analyzer", max_length=32)
+
+    tool_version = models.CharField(verbose_name=u"Version of the analyzer", max_length=256)
+
+    configuration = models.CharField(verbose_name=u"Configuration of the analyzer", max_length=256)
+
+    file_hash = models.CharField(verbose_name=u"SHA-1 of the contents of the analyzed file", max_length=40)
+
+    result = models.TextField(verbose_name=u"Result of the analyzer (JSON)")
+
+    size = models.PositiveIntegerField(verbose_name=u"Size of the result")
+
+    creation_datetime = models.DateTimeField(verbose_name=u"Creation datetime")
+
+    last_access_datetime = models.DateTimeField(verbose_name=u"Last access datetime")
+
+    # Stored results of an analyzer for some file hashes.
+    # Returns a dict with the result of each file hash that has been analyzed before.
+    @staticmethod
+    def get_results(tool, tool_version, configuration, file_hashes):
+        file_hashes = list(file_hashes)
+        analyzer_results = AnalyzerResult.objects.filter(
+            tool=tool, tool_version=tool_version, configuration=configuration
+        )
+        results = {}
+        for batch_index in range(0, len(file_hashes), AnalyzerResult.BATCH_SIZE):
+            batch_file_hashes = file_hashes[batch_index:batch_index + AnalyzerResult.BATCH_SIZE]
+            batch_results = analyzer_results.filter(file_hash__in=batch_file_hashes)
+            read_results = {
+                file_hash: json.loads(result) for file_hash, result in batch_results.values_list("file_hash", "result")
+            }
+            # Results that are read are the last ones to be evicted
+            if read_results:
+                batch_results.update(last_access_datetime=timezone.now())
+                results.update(read_results)
+        return results
+
+    # Store the results of an analyzer (a dict with the result of each file hash) and evict the least
+    # recently used results if the maximum size of the stored results is exceeded
+    @staticmethod
+    def store_results(tool, tool_version, configuration, results):
+        stored_file_hashes = set(
+            AnalyzerResult.get_results(tool, tool_version, configuration, results.keys()).keys()
+        )
+        now = timezone.now()
+        new_analyzer_results = []
+        for file_hash, result in results.items():
+            if file_hash in stored_file_hashes:
+                continue
+            json_result = json.dumps(result)
+            new_analyzer_results.append(AnalyzerResult(
+                tool=tool, tool_version=tool_version, configuration=configuration, file_hash=file_hash,
+                result=json_result, size=len(json_result), creation_datetime=now, last_access_datetime=now
+            ))
+
+        try:
+            with transaction.atomic():
+                AnalyzerResult.objects.bulk_create(new_analyzer_results)
+            created_analyzer_results = new_analyzer_results
+        # Other process has stored the results of some of these files in the meantime
+        except IntegrityError:
+            created_analyzer_results = []
+            for new_analyzer_result in new_analyzer_results:
+                analyzer_result, created = AnalyzerResult.objects.get_or_create(
+                    tool=tool, tool_version=tool_version, configuration=configuration,
+                    file_hash=new_analyzer_result.file_hash,
+                    defaults={
+                        "result": new_analyzer_result.result, "size": new_analyzer_result.size,
+                        "creation_datetime": now, "last_access_datetime": now
+                    }
+                )
+                if created:
+                    created_analyzer_results.append(analyzer_result)
+
+        created_size = sum(analyzer_result.size for analyzer_result in created_analyzer_results)
+        if AnalyzerResult._increment_stored_size(created_size) > settings.ANALYZER_RESULT_STORE_MAX_SIZE:
+            AnalyzerResult.evict(settings.ANALYZER_RESULT_STORE_MAX_SIZE)
+
+    # Delete the least recently used results until their size is not greater than max_size
+    @staticmethod
+    def evict(max_size):
+        total_size = AnalyzerResult._get_stored_size()
+        if total_size > max_size:
+            evicted_ids = []
+            analyzer_results = AnalyzerResult.objects.order_by("last_access_datetime", "id").values_list("id", "size")
+            for analyzer_result_id, size in analyzer_results.iterator():
+                if total_size <= max_size:
+                    break
+                evicted_ids.append(analyzer_result_id)
+                total_size -= size
+            for batch_index in range(0, len(evicted_ids), AnalyzerResult.BATCH_SIZE):
+                AnalyzerResult.objects.filter(
+                    id__in=evicted_ids[batch_index:batch_index + AnalyzerResult.BATCH_SIZE]
+                ).delete()
+        cache.set(AnalyzerResult.STORED_SIZE_CACHE_KEY, total_size, None)
+
+    # Add some size to the counter of the size of the stored results and return the new size.
+    # The counter is kept in the cache, so the size is only computed with a query when the counter is not there.
+    @staticmethod
+    def _increment_stored_size(size):
+        try:
+            return cache.incr(AnalyzerResult.STORED_SIZE_CACHE_KEY, size)
+        except ValueError:
+            stored_size = AnalyzerResult._get_stored_size()
+            cache.set(AnalyzerResult.STORED_SIZE_CACHE_KEY, stored_size, None)
+            return stored_size
+
+    # Size of the stored results
+    @staticmethod
+    def _get_stored_size():
+        return AnalyzerResult.objects.aggregate(total_size=Sum("size"))["total_size"] or 0
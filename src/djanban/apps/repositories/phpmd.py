@@ -7,11 +7,13 @@ import os
 import re
 import subprocess
 
+import six
 
-# PHP-md for directories
+from djanban.apps.repositories import analyzer_results
 from djanban.apps.repositories.cloc import Cloc
 
 
+# PHP-md for directories
 class PhpDirectoryAnalyzer(object):
 
     def __init__(self, dir_path):
@@ -19,25 +21,30 @@ class PhpDirectoryAnalyzer(object):
 
     def run(self):
         Cloc.assert_existence()
-        results = []
+        file_paths = []
         for root, subdirs, files in os.walk(self.dir_path):
             for filename in files:
                 if PhpDirectoryAnalyzer.is_php_file(filename):
                     file_path = u"{0}/{1}".format(root, filename)
                     # Check if file is not empty
                     if not PhpDirectoryAnalyzer.file_is_empty(file_path):
-                        # Count of lines of code
-                        cloc = Cloc(file_path)
-                        cloc_result = cloc.run()
+                        file_paths.append(file_path)
 
-                        # Assessment of code quality
-                        phpmd_analyzer = PhpMdAnalyzer(file_path)
-                        phpmd_result = phpmd_analyzer.run()
+        if not file_paths:
+            return []
 
-                        # Add cloc results
-                        phpmd_result.cloc_result = cloc_result
+        # Count of lines of code and assessment of code quality of the files whose contents have not been
+        # analyzed before
+        cloc_results = Cloc.count_files(file_paths)
+        messages = PhpMdAnalyzer.analyze_files(file_paths)
 
-                        results.append(phpmd_result)
+        results = []
+        for file_path in file_paths:
+            if file_path in cloc_results:
+                phpmd_result = PhpMdAnalysisResult.from_messages(file_path, messages[file_path])
+                # Add cloc results
+                phpmd_result.cloc_result = cloc_results[file_path]
+                results.append(phpmd_result)
 
         return results
 
@@ -53,6 +60,9 @@ class PhpDirectoryAnalyzer(object):
 # Runs PHP-md on a file
 class PhpMdAnalyzer(object):
 
+    # Rulesets of PHP-md
+    RULESETS = "cleancode,codesize,controversial,design,naming,unusedcode"
+
     def __init__(self, file_path):
         self.file_path = file_path
         self.stdout = None
@@ -61,7 +71,7 @@ class PhpMdAnalyzer(object):
     def run(self):
         PhpMdAnalyzer.assert_existence()
 
-        php_md_command = "phpmd {0} xml cleancode,codesize,controversial,design,naming,unusedcode".format(self.file_path)
+        php_md_command = "phpmd {0} xml {1}".format(self.file_path, PhpMdAnalyzer.RULESETS)
         phpmd_call_results = subprocess.Popen(php_md_command, shell=True, stdout=subprocess.PIPE)
 
         self.stdout = phpmd_call_results.stdout.read()
@@ -72,6 +82,23 @@ class PhpMdAnalyzer(object):
 
         return PhpMdAnalysisResult(self.file_path, self.stdout, self.stderr)
 
+    # Assess several files running PHP-md only for the files whose contents have not been assessed before.
+    # If a multiprocessing pool is passed, the files are assessed in its processes.
+    # Returns a dict with the messages of each file path.
+    @staticmethod
+    def analyze_files(file_paths, pool=None):
+        PhpMdAnalyzer.assert_existence()
+        map_function = pool.map if pool else map
+        return analyzer_results.get_results(
+            "phpmd", PhpMdAnalyzer.get_version(), PhpMdAnalyzer.RULESETS, file_paths,
+            lambda new_file_paths: dict(map_function(_analyze_file, new_file_paths))
+        )
+
+    # Version of the PHP-md installed in this system
+    @staticmethod
+    def get_version():
+        return subprocess.check_output(["phpmd", "--version"]).decode("utf-8").strip()
+
     # Asserts that phpmd is installed in this system
     @staticmethod
     def assert_existence():
@@ -94,6 +121,13 @@ class PhpMdAnalysisResult(object):
 
         self._init_results()
 
+    # Result with the messages got from a previous execution of PHP-md
+    @staticmethod
+    def from_messages(file_path, messages):
+        phpmd_result = PhpMdAnalysisResult(file_path, "", "")
+        phpmd_result.messages = messages
+        return phpmd_result
+
     # Initialize results
     def _init_results(self):
         bs = BeautifulSoup(self.stdout, "html.parser")
@@ -112,3 +146,12 @@ class PhpMdAnalysisResult(object):
 
         return self.messages
 
+
+# Assess a file (executed in the processes of the pool of PhpMdAnalyzer.analyze_files)
+def _analyze_file(file_path):
+    messages = PhpMdAnalyzer(file_path).run().messages
+    # Messages are BeautifulSoup strings, that cannot be serialized
+    return file_path, [
+        dict(message, message=six.text_type(message["message"]) if message["message"] else "")
+        for message in messages
+    ]
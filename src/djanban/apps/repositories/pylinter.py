@@ -5,7 +5,12 @@ from __future__ import unicode_literals
 import json
 import os
 import re
+
+import pylint
+import six
 from pylint import epylint as lint
+
+from djanban.apps.repositories import analyzer_results
 from djanban.apps.repositories.cloc import Cloc
 
 
@@ -17,19 +22,24 @@ class PythonDirectoryAnalyzer(object):
 
     def run(self):
         Cloc.assert_existence()
-        results = []
+        file_paths = []
         for root, subdirs, files in os.walk(self.dir_path):
             for filename in files:
                 if PythonDirectoryAnalyzer.is_python_file(filename):
                     file_path = u"{0}/{1}".format(root, filename)
                     if not PythonDirectoryAnalyzer.file_is_empty(file_path):
-                        # Count of lines of code
-                        cloc = Cloc(file_path)
-                        cloc_result = cloc.run()
-                        pylinter = Pylinter(file_path)
-                        pylinter_result = pylinter.run()
-                        pylinter_result.cloc_result = cloc_result
-                        results.append(pylinter_result)
+                        file_paths.append(file_path)
+
+        # Count of lines of code and linting of the files whose contents have not been analyzed before
+        cloc_results = Cloc.count_files(file_paths)
+        messages = Pylinter.lint_files(file_paths)
+
+        results = []
+        for file_path in file_paths:
+            if file_path in cloc_results:
+                pylinter_result = PylinterResult.from_messages(file_path, messages[file_path])
+                pylinter_result.cloc_result = cloc_results[file_path]
+                results.append(pylinter_result)
         return results
 
     @staticmethod
@@ -45,16 +55,30 @@ class PythonDirectoryAnalyzer(object):
 # Runs pylint on a file
 class Pylinter(object):
 
+    # Options of pylint
+    OPTIONS = u"--output-format=json --reports=y"
+
     def __init__(self, file_path):
         self.file_path = file_path
         self.stdout = None
         self.stderr = None
 
     def run(self):
-        command_options = u"{0} --output-format=json --reports=y".format(self.file_path)
+        command_options = u"{0} {1}".format(self.file_path, Pylinter.OPTIONS)
         (stdout, stderr) = lint.py_run(command_options, return_std=True)
         return PylinterResult(self.file_path, stdout, stderr)
 
+    # Lint several files running pylint only for the files whose contents have not been linted before.
+    # If a multiprocessing pool is passed, the files are linted in its processes.
+    # Returns a dict with the messages of each file path.
+    @staticmethod
+    def lint_files(file_paths, pool=None):
+        map_function = pool.map if pool else map
+        return analyzer_results.get_results(
+            "pylint", pylint.__version__, Pylinter.OPTIONS, file_paths,
+            lambda new_file_paths: dict(map_function(_lint_file, new_file_paths))
+        )
+
 
 # Stores pylint result
 class PylinterResult(object):
@@ -66,9 +90,21 @@ class PylinterResult(object):
 
         self._init_results()
 
+    # Result with the messages got from a previous execution of pylint
+    @staticmethod
+    def from_messages(file_path, messages):
+        pylinter_result = PylinterResult(file_path, six.StringIO(""), six.StringIO(""))
+        pylinter_result.messages = messages
+        return pylinter_result
+
     # Initialize results
     def _init_results(self):
         self.messages = []
         if self.stdout != "":
             self.messages = json.loads(self.stdout)
 
+
+# Lint a file (executed in the processes of the pool of Pylinter.lint_files)
+def _lint_file(file_path):
+    return file_path, [message for message in Pylinter(file_path).run().messages if message]
+
@@ -1,3 +1,242 @@
-from django.test import TestCase
+# -*- coding: utf-8 -*-
 
-# Create your tests here.
+from __future__ import unicode_literals
+
+import os
+import shutil
+import subprocess
+import tempfile
+from io import open
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from djanban.apps.boards.models import Board
+from djanban.apps.members.models import Member
+from djanban.apps.repositories import analyzer_results
+from djanban.apps.repositories.assessment import CommitAssessor
+from djanban.apps.repositories.checkout import CheckoutManager, GitCommandError
+from djanban.apps.repositories.models import AnalyzerResult, Commit, CommitFile, GitHubPublicRepository, \
+    PylintMessage
+
+
+# Tests of the incremental assessment of the code quality of the commits
+class CommitAssessorTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(TMP_DIR=self.tmp_dir + "/")
+        self.settings_override.enable()
+
+        user = get_user_model().objects.create_user("assessor")
+        member = Member.objects.create(user=user, is_developer=True)
+        self.board = Board.objects.create(creator=member, name="Board name", description="board description",
+                                          comments="board comments", uuid="assessor-board")
+        self.repository = GitHubPublicRepository.objects.create(
+            board=self.board, name="project", url="https://github.com/user/project", username="user",
+            type=ContentType.objects.get_for_model(GitHubPublicRepository)
+        )
+        os.makedirs(self.repository.repository_path)
+        self._git("init", "-q")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp_dir)
+
+    def _git(self, *args):
+        return subprocess.check_output(
+            ("git", "-c", "user.name=test", "-c", "user.email=test@example.com") + args,
+            cwd=self.repository.repository_path
+        ).decode("utf-8").strip()
+
+    # Write some files and commit them
+    def _commit(self, files):
+        for path, content in files.items():
+            with open(os.path.join(self.repository.repository_path, path), "w", encoding="utf-8") as file_:
+                file_.write(content)
+        self._git("add", "-A")
+        self._git("commit", "-q", "-m", "Commit")
+        return Commit.objects.create(board=self.board, repository=self.repository,
+                                     commit=self._git("rev-parse", "HEAD"), creation_datetime=timezone.now())
+
+    # Store an assessment as if the tools had been run on the files of a commit
+    def _store_assessment(self, commit, paths):
+        blob_hashes = CommitAssessor(commit)._get_files()
+        for path in paths:
+            commit_file = CommitFile.objects.create(
+                board=self.board, repository=self.repository, commit=commit, language="Python",
+                path="{0}/{1}".format(self.repository.repository_path, path),
+                blob_hash=blob_hashes[path]["blob_hash"], blank_lines=0, commented_lines=0, lines_of_code=1
+            )
+            PylintMessage.objects.create(
+                board=self.board, repository=self.repository, commit=commit, commit_file=commit_file,
+                type="convention", path=path, message="Missing docstring", message_symbolic_name="missing-docstring",
+                line=1, column=0, object=""
+            )
+        commit.has_been_assessed = True
+        commit.save()
+
+    # Unchanged files reuse the results of the previous commit without running the tools
+    def test_reuse(self):
+        first_commit = self._commit({"a.py": "a = 1\n", "b.py": "b = 1\n", "README": "Readme\n"})
+        self._store_assessment(first_commit, ["a.py", "b.py"])
+
+        second_commit = self._commit({"README": "New readme\n"})
+        commit_assessor = CommitAssessor(second_commit)
+        commit_assessor.run()
+
+        self.assertEqual(commit_assessor.previous_commit, first_commit)
+        self.assertEqual(commit_assessor.number_of_reused_files, 2)
+        self.assertEqual(commit_assessor.number_of_analyzed_files, 0)
+        self.assertTrue(Commit.objects.get(id=second_commit.id).has_been_assessed)
+        self.assertEqual(
+            sorted(second_commit.pylint_messages.values_list("commit_file__path", flat=True)),
+            sorted(first_commit.pylint_messages.values_list("commit_file__path", flat=True))
+        )
+
+        # Changed files are not reused
+        third_commit = self._commit({"b.py": "b = 2\n"})
+        commit_assessor = CommitAssessor(third_commit)
+        self.assertEqual(list(commit_assessor._get_reusable_files(commit_assessor._get_files()).keys()), ["a.py"])
+
+
+# Tests of the stored results of the analyzers
+class AnalyzerResultTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.analyzed_file_paths = []
+        cache.delete(AnalyzerResult.STORED_SIZE_CACHE_KEY)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, filename, content):
+        file_path = os.path.join(self.tmp_dir, filename)
+        with open(file_path, "w", encoding="utf-8") as file_:
+            file_.write(content)
+        return file_path
+
+    def _analyze(self, file_paths):
+        self.analyzed_file_paths += file_paths
+        return {file_path: [{"path": file_path, "line": 1}] for file_path in file_paths}
+
+    # Files with the same contents are analyzed only once
+    def test_reuse(self):
+        a_path = self._write("a.py", "a = 1\n")
+        copy_path = self._write("copy.py", "a = 1\n")
+
+        analyzer_results.get_results("pylint", "1.0", "", [a_path], self._analyze)
+        results = analyzer_results.get_results("pylint", "1.0", "", [a_path, copy_path], self._analyze)
+        self.assertEqual(self.analyzed_file_paths, [a_path])
+        self.assertEqual(results[copy_path], [{"path": copy_path, "line": 1}])
+
+        # Other version of the analyzer does not reuse the results
+        analyzer_results.get_results("pylint", "2.0", "", [a_path], self._analyze)
+        self.assertEqual(self.analyzed_file_paths, [a_path, a_path])
+
+    # Least recently used results are evicted
+    def test_eviction(self):
+        file_paths = [self._write("{0}.py".format(index), "a = {0}\n".format(index)) for index in range(3)]
+        for file_path in file_paths:
+            analyzer_results.get_results("pylint", "1.0", "", [file_path], self._analyze)
+        size = AnalyzerResult.objects.all()[0].size
+
+        AnalyzerResult.evict(max_size=2 * size)
+
+        self.assertEqual(AnalyzerResult.objects.count(), 2)
+        self.assertFalse(
+            AnalyzerResult.objects.filter(file_hash=analyzer_results.get_file_hash(file_paths[0])).exists()
+        )
+
+    # The size of the stored results is only computed when its counter is not in the cache or it exceeds the limit
+    def test_stored_size_counter(self):
+        def count_size_queries(file_contents):
+            file_path = self._write("{0}.py".format(len(self.analyzed_file_paths)), file_contents)
+            with CaptureQueriesContext(connection) as queries:
+                analyzer_results.get_results("pylint", "1.0", "", [file_path], self._analyze)
+            return len([query for query in queries.captured_queries if "SUM(" in query["sql"]])
+
+        self.assertEqual(count_size_queries("a = 1\n"), 1)
+        self.assertEqual(count_size_queries("a = 2\n"), 0)
+        size = AnalyzerResult.objects.all()[0].size
+        with override_settings(ANALYZER_RESULT_STORE_MAX_SIZE=2 * size):
+            self.assertEqual(count_size_queries("a = 3\n"), 1)
+        self.assertEqual(AnalyzerResult.objects.count(), 2)
+        self.assertEqual(cache.get(AnalyzerResult.STORED_SIZE_CACHE_KEY), 2 * size)
+
+    # Results stored by other process in the meantime are not stored again
+    def test_concurrent_store(self):
+        AnalyzerResult.store_results("pylint", "1.0", "", {"hash": [], "other hash": []})
+        get_results = AnalyzerResult.get_results
+        AnalyzerResult.get_results = staticmethod(lambda *args: {})
+        try:
+            AnalyzerResult.store_results("pylint", "1.0", "", {"hash": [], "new hash": []})
+        finally:
+            AnalyzerResult.get_results = staticmethod(get_results)
+        self.assertEqual(
+            sorted(AnalyzerResult.objects.values_list("file_hash", flat=True)), ["hash", "new hash", "other hash"]
+        )
+        self.assertEqual(cache.get(AnalyzerResult.STORED_SIZE_CACHE_KEY), 3 * len("[]"))
+
+
+# Tests of the checkouts of commits in worktrees of the mirror of a repository
+class CheckoutManagerTest(TestCase):
+
+    # Repository whose remote is a local git repository
+    class LocalRepository(object):
+        def __init__(self, id, clone_url):
+            self.id = id
+            self.clone_url = clone_url
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(TMP_DIR=self.tmp_dir + "/")
+        self.settings_override.enable()
+        self.remote_path = os.path.join(self.tmp_dir, "remote")
+        os.makedirs(self.remote_path)
+        self._git("init", "-q")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp_dir)
+
+    def _git(self, *args):
+        return subprocess.check_output(
+            ("git", "-c", "user.name=test", "-c", "user.email=test@example.com") + args, cwd=self.remote_path
+        ).decode("utf-8").strip()
+
+    def _commit(self, content):
+        with open(os.path.join(self.remote_path, "a.py"), "w", encoding="utf-8") as file_:
+            file_.write(content)
+        self._git("add", "-A")
+        self._git("commit", "-q", "-m", "Commit")
+        return self._git("rev-parse", "HEAD")
+
+    # Several commits can be checked out at the same time
+    def test_checkout(self):
+        first_commit = self._commit("a = 1\n")
+        second_commit = self._commit("a = 2\n")
+        checkout_manager = CheckoutManager(CheckoutManagerTest.LocalRepository(1, self.remote_path))
+
+        with checkout_manager.checkout(first_commit) as first_path:
+            with checkout_manager.checkout(second_commit) as second_path:
+                with open(os.path.join(first_path, "a.py"), encoding="utf-8") as file_:
+                    self.assertEqual(file_.read(), "a = 1\n")
+                with open(os.path.join(second_path, "a.py"), encoding="utf-8") as file_:
+                    self.assertEqual(file_.read(), "a = 2\n")
+        self.assertFalse(os.path.exists(first_path))
+        self.assertFalse(os.path.exists(second_path))
+
+        # Commits created after the fetch are not available until a new manager fetches them again
+        third_commit = self._commit("a = 3\n")
+        with self.assertRaises(GitCommandError):
+            with checkout_manager.checkout(third_commit):
+                pass
+        with CheckoutManager(CheckoutManagerTest.LocalRepository(1, self.remote_path)).checkout(third_commit) as path:
+            self.assertTrue(os.path.isfile(os.path.join(path, "a.py")))
@@ -4,6 +4,10 @@ from __future__ import unicode_literals
 
 from django.db import models
 from django.db.models import Sum
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from djanban.apps.charts import dependencies
 
 
 # A requirement for a project
@@ -62,3 +66,18 @@ class Requirement(models.Model):
     @property
     def pending_cards(self):
         return self.cards.exclude(list__type="done")
+
+
+# Invalidate the requirement charts of a board when one of its requirements changes
+@receiver(post_save, sender=Requirement)
+@receiver(post_delete, sender=Requirement)
+def invalidate_requirement_charts(sender, instance, **kwargs):
+    instance.board.invalidate_cached_charts(dependencies.REQUIREMENTS)
+
+
+# Invalidate the requirement charts of a board when the cards of one of its requirements change.
+# The instance is a requirement or a card (if the change is done from the card side), both of the same board.
+@receiver(m2m_changed, sender=Requirement.cards.through)
+def invalidate_requirement_charts_on_card_change(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        instance.board.invalidate_cached_charts(dependencies.REQUIREMENTS)
@@ -10,6 +10,7 @@ from django.db.models import Q
 from django.template.loader import get_template
 from django.utils import timezone
 
+from djanban.apps.dev_times.export import DailySpentTimeCsvExporter
 from djanban.apps.work_hours_packages.models import WorkHoursPackage
 
 
@@ -93,7 +94,7 @@ class Command(BaseCommand):
 
         subject = "[Djanban][WorkHoursPackage] Work hours package {0} at {1}".format(package.name, percentage)
 
-        csv_report = get_template('daily_spent_times/csv.txt').render({"spent_times": daily_spent_times})
+        csv_report = DailySpentTimeCsvExporter(daily_spent_times).content
 
         try:
             # Send the email
@@ -2,6 +2,9 @@
 
 from __future__ import unicode_literals, absolute_import
 
+from django.conf import settings
+
+from djanban.apps.outbox.connector import OutboxConnector
 from djanban.remote_backends.native.connector import NativeConnector
 from djanban.remote_backends.trello.connector import TrelloConnector
 
@@ -9,13 +12,18 @@ from djanban.remote_backends.trello.connector import TrelloConnector
 # Backend factory
 class RemoteBackendConnectorFactory(object):
 
+    # If deferred is True and the outbox is enabled, the operations whose result is not needed
+    # are not sent to the remote backend in this moment but stored to be sent by a background worker
     @staticmethod
-    def factory(member):
+    def factory(member, deferred=True):
         # If the member is paired with a Trello Member, the remote backend is Trello
         if member.has_trello_profile:
-            return TrelloConnector(member)
+            connector = TrelloConnector(member)
+            if deferred and settings.REMOTE_BACKEND_OUTBOX_ENABLED:
+                return OutboxConnector(member, connector)
+            return connector
         # Otherwise, the remote backend is a fake one, called "native" but really is none
         # this backend only initializes some object attributes and of course makes no
         # local object save because that's the responsibility of the method that calls the operation
         else:
-            return NativeConnector(member)
\ No newline at end of file
+            return NativeConnector(member)
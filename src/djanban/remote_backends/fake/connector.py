@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals, absolute_import
+
+from djanban.remote_backends.native.connector import NativeConnector
+
+
+# Connector used in tests. It records the calls to its operations and can be configured
+# to fail a number of times before the operations succeed.
+class FakeConnector(NativeConnector):
+
+    OPERATIONS = (
+        "add_member", "remove_member",
+        "move_list", "edit_list",
+        "order_card", "move_card", "move_list_cards",
+        "delete_attachment_of_card", "delete_comment_of_card",
+        "add_label_to_card", "remove_label_of_card",
+        "add_member_to_card", "remove_member_of_card",
+        "set_card_name", "set_card_description", "set_card_is_closed",
+        "set_card_due_datetime", "remove_card_due_datetime",
+    )
+
+    def __init__(self, member, calls=None, number_of_failures=0):
+        super(FakeConnector, self).__init__(member)
+        self.calls = calls if calls is not None else []
+        self.number_of_failures = number_of_failures
+
+    def __getattribute__(self, name):
+        if name in FakeConnector.OPERATIONS:
+            return self._get_recorded_operation(name)
+        return super(FakeConnector, self).__getattribute__(name)
+
+    # Return a function that records the call to the operation
+    def _get_recorded_operation(self, operation_name):
+        def operation(**kwargs):
+            if self.number_of_failures > 0:
+                self.number_of_failures -= 1
+                raise IOError(u"Remote backend is not available")
+            self.calls.append((operation_name, kwargs))
+        return operation
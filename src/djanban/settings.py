@@ -106,6 +106,7 @@ INSTALLED_APPS = [
     'djanban.apps.multiboards',
     'djanban.apps.niko_niko_calendar',
     'djanban.apps.notifications',
+    'djanban.apps.outbox',
     'djanban.apps.password_reseter',
     'djanban.apps.recurrent_cards',
     'djanban.apps.reporter',
@@ -119,6 +120,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE_CLASSES = (
+    # First middleware, so the queries of the rest of middlewares are also counted
+    'djanban.apps.base.middleware.QueryCountMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -208,6 +211,72 @@ USE_L10N = False
 
 USE_TZ = True
 
+# Cache backends. By default, a local memory cache
+if hasattr(settings_local, "CACHES"):
+    CACHES = settings_local.CACHES
+
+# Cache backend (one of the CACHES aliases) used to share the rendered charts between processes
+CHART_CACHE_ALIAS = "default"
+if hasattr(settings_local, "CHART_CACHE_ALIAS"):
+    CHART_CACHE_ALIAS = settings_local.CHART_CACHE_ALIAS
+
+# Number of seconds a rendered chart is kept in the shared chart cache
+CHART_CACHE_TIMEOUT = 7 * 24 * 3600
+if hasattr(settings_local, "CHART_CACHE_TIMEOUT"):
+    CHART_CACHE_TIMEOUT = settings_local.CHART_CACHE_TIMEOUT
+
+# Maximum size (in bytes) of the rendered charts kept in memory by each process
+CHART_MEMORY_CACHE_MAX_SIZE = 32 * 1024 * 1024
+if hasattr(settings_local, "CHART_MEMORY_CACHE_MAX_SIZE"):
+    CHART_MEMORY_CACHE_MAX_SIZE = settings_local.CHART_MEMORY_CACHE_MAX_SIZE
+
+# Operations of the remote backend (Trello) whose result is not needed are stored and sent
+# by the process_remote_operations command instead of making the user wait for them.
+# Only enable it if that command is running (see README), otherwise these operations are never sent.
+REMOTE_BACKEND_OUTBOX_ENABLED = False
+if hasattr(settings_local, "REMOTE_BACKEND_OUTBOX_ENABLED"):
+    REMOTE_BACKEND_OUTBOX_ENABLED = settings_local.REMOTE_BACKEND_OUTBOX_ENABLED
+
+# Number of times a remote operation is tried before marking it as failed
+REMOTE_OPERATION_MAX_ATTEMPTS = 5
+if hasattr(settings_local, "REMOTE_OPERATION_MAX_ATTEMPTS"):
+    REMOTE_OPERATION_MAX_ATTEMPTS = settings_local.REMOTE_OPERATION_MAX_ATTEMPTS
+
+# Seconds of the first wait before retrying a failed remote operation (it is doubled in each attempt)
+REMOTE_OPERATION_BACKOFF = 10
+if hasattr(settings_local, "REMOTE_OPERATION_BACKOFF"):
+    REMOTE_OPERATION_BACKOFF = settings_local.REMOTE_OPERATION_BACKOFF
+
+# Number of processes that run pylint and phpmd when assessing the code quality of a commit
+# (None to use as many processes as CPUs)
+CODE_QUALITY_ASSESSMENT_PROCESSES = None
+if hasattr(settings_local, "CODE_QUALITY_ASSESSMENT_PROCESSES"):
+    CODE_QUALITY_ASSESSMENT_PROCESSES = settings_local.CODE_QUALITY_ASSESSMENT_PROCESSES
+
+# Maximum size (in bytes) of the stored results of cloc, pylint and phpmd (the least recently used ones are deleted)
+ANALYZER_RESULT_STORE_MAX_SIZE = 256 * 1024 * 1024
+if hasattr(settings_local, "ANALYZER_RESULT_STORE_MAX_SIZE"):
+    ANALYZER_RESULT_STORE_MAX_SIZE = settings_local.ANALYZER_RESULT_STORE_MAX_SIZE
+
+# Maximum size (in bytes) of the regression models of the forecasters kept in memory by each process
+# (the least recently used ones are evicted)
+FORECASTER_MODEL_REGISTRY_MAX_SIZE = 16 * 1024 * 1024
+if hasattr(settings_local, "FORECASTER_MODEL_REGISTRY_MAX_SIZE"):
+    FORECASTER_MODEL_REGISTRY_MAX_SIZE = settings_local.FORECASTER_MODEL_REGISTRY_MAX_SIZE
+
+# Number of seconds the date indices of hourly rates and spent time factors are kept in memory by each process.
+# Indices are invalidated in all processes when their objects change (their versions are stored in the cache backend
+# DATE_INTERVAL_INDEX_CACHE_ALIAS), so this is only the time a process could use an old index if the cache backend
+# is not shared between processes or the versions are evicted
+DATE_INTERVAL_INDEX_CACHE_TIMEOUT = 300
+if hasattr(settings_local, "DATE_INTERVAL_INDEX_CACHE_TIMEOUT"):
+    DATE_INTERVAL_INDEX_CACHE_TIMEOUT = settings_local.DATE_INTERVAL_INDEX_CACHE_TIMEOUT
+
+# Cache backend (one of the CACHES aliases) where the versions of the date indices are shared between processes
+DATE_INTERVAL_INDEX_CACHE_ALIAS = "default"
+if hasattr(settings_local, "DATE_INTERVAL_INDEX_CACHE_ALIAS"):
+    DATE_INTERVAL_INDEX_CACHE_ALIAS = settings_local.DATE_INTERVAL_INDEX_CACHE_ALIAS
+
 LOGIN_URL = '/base/login/'
 
 EMAIL_USE_TLS = settings_local.EMAIL_USE_TLS